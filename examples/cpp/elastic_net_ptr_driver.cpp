@@ -185,10 +185,10 @@ double ElasticNet(const std::vector<T>&A, const std::vector<T>&b, const std::vec
   int sourceDev=0; //index of first GPU to own data
   const char ord='r'; // normal C-order
   // only need train weight
-  //  extern int makePtr_dense<T>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, const char ord,
+  //  extern int makePtr_dense<T>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, const char ord, int intercept,
   //                           const T *data, const T *datay, const T *vdata, const T *vdatay, const T *weight,
   //                           void **_data, void **_datay, void **_vdata, void **_vdatay, void **_weight);
-  h2o4gpu::makePtr_dense(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, trainX.data(), trainY.data(), validX.data(), validY.data(), trainW.data(), &aa, &bb, &cc, &dd, &ee); // //static_cast<T*>(NULL)
+  h2o4gpu::makePtr_dense(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, 0, trainX.data(), trainY.data(), validX.data(), validY.data(), trainW.data(), &aa, &bb, &cc, &dd, &ee); // //static_cast<T*>(NULL)
 
 
   int datatype = 1;
@@ -200,11 +200,19 @@ double ElasticNet(const std::vector<T>&A, const std::vector<T>&b, const std::vec
   size_t countfull=0;
   size_t countshort=0;
   size_t countmore=0;
+  size_t cachehits=0;
+  size_t factorizations=0;
+  double factortime=0;
   int dopredict=0;
   const char family='e';
+  const char solver='a'; // 'a' for ADMM or 'c' for coordinate descent
   double tol = 1E-2;
   double tolseekfactor = 1E-1;
   int lambdastopearly=1;
+  int screening=0;
+  int anderson=0;
+  int eigen=0;
+  size_t cachebytes=0; // 0 for the default budget
   int glmstopearly=1;
   double glmstopearlyrmsefraction=1.0;
   int maxiterations=5000;
@@ -213,15 +221,23 @@ double ElasticNet(const std::vector<T>&A, const std::vector<T>&b, const std::vec
   T *lambdas = NULL;
   int gpu_id = 0;
   int totalnGPUs = nGPUs; // not really right TODO: Should have elasticNetptr figure out total number of GPUs
-  double time = h2o4gpu::ElasticNetptr<T>(family, dopredict, sourceDev, datatype, sharedA, nThreads, gpu_id, nGPUs, totalnGPUs, ord, mTrain, n, mValid, intercept, standardize, lambda_max, lambda_min_ratio, nLambdas, nFolds, nAlphas, alpha_min, alpha_max, alphas, lambdas, tol, tolseekfactor, lambdastopearly, glmstopearly, glmstopearlyrmsefraction, maxiterations, verbose, aa, bb, cc, dd, ee, givefullpath, &Xvsalphalambda, &Xvsalpha, &validPredsvsalphalambda, &validPredsvsalpha, &countfull, &countshort, &countmore);
+  double time = h2o4gpu::ElasticNetptr<T>(family, solver, dopredict, sourceDev, datatype, sharedA, nThreads, gpu_id, nGPUs, totalnGPUs, ord, mTrain, n, mValid, intercept, standardize, lambda_max, lambda_min_ratio, nLambdas, nFolds, NULL, nAlphas, alpha_min, alpha_max, alphas, lambdas, tol, tolseekfactor, lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, glmstopearlyrmsefraction, maxiterations, verbose, aa, bb, cc, dd, ee, givefullpath, &Xvsalphalambda, &Xvsalpha, &validPredsvsalphalambda, &validPredsvsalpha, &countfull, &countshort, &countmore, &cachehits, &factorizations, &factortime);
 
   // print out some things about Xvsalphalambda and Xvsalpha
   printf("countfull=%d countshort=%d countmore=%d\n",countfull,countshort,countmore); fflush(stdout);
+  printf("cachehits=%zu factorizations=%zu factortime=%g\n",cachehits,factorizations,factortime); fflush(stdout);
 
   // print out some things about validPredsvsalphalambda and validPredsvsalpha
 
   // do some prediction, say on validX already have
 
+  // free what makePtr_dense allocated, pointers aliasing the inputs (sharedA!=0) are left alone
+  if (aa != trainX.data()) h2o4gpu::modelFree1(aa);
+  if (bb != trainY.data()) h2o4gpu::modelFree1(bb);
+  if (cc != validX.data()) h2o4gpu::modelFree1(cc);
+  if (dd != validY.data()) h2o4gpu::modelFree1(dd);
+  if (ee != trainW.data()) h2o4gpu::modelFree1(ee);
+
   return(time);
 
   
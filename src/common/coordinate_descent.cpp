@@ -0,0 +1,544 @@
+/*!
+ * Copyright 2017-2018 H2O.ai, Inc.
+ * License   Apache License Version 2.0 (see LICENSE for details)
+ */
+#include "coordinate_descent.h"
+
+#include <algorithm>
+#include <cmath>
+
+namespace h2o4gpu {
+
+namespace {
+
+// smallest p(1-p) of the logistic IRLS weights (as glmnet)
+const double kMinVariance = 1e-5;
+
+inline double SoftThreshold(double u, double l1) {
+	if (u > l1)
+		return u - l1;
+	if (u < -l1)
+		return u + l1;
+	return 0;
+}
+
+}  // namespace
+
+template<typename T>
+CoordinateDescent<T>::CoordinateDescent(const char family, const char ord,
+		size_t m, size_t n, const T *X, const T *y, const T *w, size_t mValid,
+		const T *validX, size_t classes)
+		: _family(family),
+		  _ord(ord),
+		  _m(m),
+		  _n(n),
+		  _mValid(mValid),
+		  _classes(classes),
+		  _class(0),
+		  _sparse(false),
+		  _fromgram(false),
+		  _X(m * n),
+		  _y(y, y + m),
+		  _w(w, w + m),
+		  _validX(validX),
+		  _validCsc(),
+		  _x(n * classes, static_cast<T>(0)),
+		  _trainPreds(m * classes),
+		  _validPreds(mValid * classes),
+		  _final_iter(0),
+		  _max_iter(kMaxIter),
+		  _rel_tol(static_cast<T>(kRelTol)),
+		  _abs_tol(static_cast<T>(kAbsTol)),
+		  _scale(0),
+		  _covariance(family == 'e' && n < m),
+		  _synced(false),
+		  _z(m),
+		  _zall(classes > 1 ? m * classes : 0),
+		  _r(m),
+		  _v(w, w + m),
+		  _grad(_covariance ? n : 0),
+		  _xsq(n),
+		  _gram(_covariance ? n : 0),
+		  _isactive(n * classes, 0),
+		  _active(classes),
+		  _l1(n),
+		  _l2(n) {
+	if (ord == 'r' || ord == 'R') {
+		for (size_t i = 0; i < m; ++i)
+			for (size_t j = 0; j < n; ++j)
+				_X[j * m + i] = X[i * n + j];
+	} else {
+		std::copy(X, X + m * n, _X.begin());
+	}
+	_Init();
+}
+
+template<typename T>
+CoordinateDescent<T>::CoordinateDescent(const char family,
+		const CscMatrix<T> &X, const T *y, const T *w,
+		const CscMatrix<T> *validX, size_t classes)
+		: _family(family),
+		  _ord('c'),
+		  _m(X.m),
+		  _n(X.n),
+		  _mValid(validX ? validX->m : 0),
+		  _classes(classes),
+		  _class(0),
+		  _sparse(true),
+		  _fromgram(false),
+		  _X(X.val, X.val + X.ptr[X.n]),
+		  _ind(X.ind, X.ind + X.ptr[X.n]),
+		  _ptr(X.ptr, X.ptr + X.n + 1),
+		  _y(y, y + X.m),
+		  _w(w, w + X.m),
+		  _validX(NULL),
+		  _validCsc(),
+		  _x(X.n * classes, static_cast<T>(0)),
+		  _trainPreds(X.m * classes),
+		  _validPreds(_mValid * classes),
+		  _final_iter(0),
+		  _max_iter(kMaxIter),
+		  _rel_tol(static_cast<T>(kRelTol)),
+		  _abs_tol(static_cast<T>(kAbsTol)),
+		  _scale(0),
+		  _covariance(false),
+		  _synced(false),
+		  _z(X.m),
+		  _zall(classes > 1 ? X.m * classes : 0),
+		  _r(X.m),
+		  _v(w, w + X.m),
+		  _xsq(X.n),
+		  _isactive(X.n * classes, 0),
+		  _active(classes),
+		  _l1(X.n),
+		  _l2(X.n) {
+	if (validX)
+		_validCsc = *validX;
+	_Init();
+}
+
+template<typename T>
+CoordinateDescent<T>::CoordinateDescent(const GramStats<T> &stats)
+		: _family('e'),
+		  _ord('c'),
+		  _m(0),
+		  _n(stats.n),
+		  _mValid(0),
+		  _classes(1),
+		  _class(0),
+		  _sparse(false),
+		  _fromgram(true),
+		  _validX(NULL),
+		  _validCsc(),
+		  _x(stats.n, static_cast<T>(0)),
+		  _final_iter(0),
+		  _max_iter(kMaxIter),
+		  _rel_tol(static_cast<T>(kRelTol)),
+		  _abs_tol(static_cast<T>(kAbsTol)),
+		  _scale(0),
+		  _covariance(true),
+		  _synced(false),
+		  _grad(stats.n),
+		  _b(stats.b, stats.b + stats.n),
+		  _xsq(stats.n),
+		  _gram(stats.n),
+		  _isactive(stats.n, 0),
+		  _active(1),
+		  _l1(stats.n),
+		  _l2(stats.n) {
+	// the Gram matrix is symmetric, so its rows are its columns
+	for (size_t j = 0; j < _n; ++j) {
+		_gram[j].assign(stats.gram + j * _n, stats.gram + (j + 1) * _n);
+		_xsq[j] = _gram[j][j];
+	}
+	double wsum = stats.sums[kGramW], wy = stats.sums[kGramWY];
+	_scale = stats.sums[kGramWYY] - (wsum > 0 ? wy * wy / wsum : 0);
+	if (_scale <= 0)
+		_scale = (wsum > 0 ? wsum : 1);
+}
+
+template<typename T>
+void CoordinateDescent<T>::_Init() {
+	double wsum = 0, wy = 0;
+	for (size_t i = 0; i < _m; ++i) {
+		wsum += _w[i];
+		wy += _w[i] * _y[i];
+	}
+	if (_family == 'm') {
+		// sum over the classes of the weighted sum of squares of their indicators
+		std::vector<double> wk(_classes, 0.0);
+		for (size_t i = 0; i < _m; ++i)
+			wk[static_cast<size_t>(_y[i])] += _w[i];
+		for (size_t k = 0; k < _classes; ++k)
+			_scale += (wsum > 0 ? wk[k] * (wsum - wk[k]) / wsum : 0);
+	} else {
+		double ymean = (wsum > 0 ? wy / wsum : 0);
+		for (size_t i = 0; i < _m; ++i)
+			_scale += _w[i] * (_y[i] - ymean) * (_y[i] - ymean);
+	}
+	if (_scale <= 0)
+		_scale = (wsum > 0 ? wsum : 1);
+
+	if (_family == 'e') {
+		for (size_t j = 0; j < _n; ++j)
+			_xsq[j] = _SqNorm(j);
+	}
+}
+
+// sum_i v_i a_ij r_i
+template<typename T>
+double CoordinateDescent<T>::_Dot(size_t j, const std::vector<double> &r) const {
+	double sum = 0;
+	if (_sparse) {
+		for (int k = _ptr[j]; k < _ptr[j + 1]; ++k)
+			sum += _v[_ind[k]] * _X[k] * r[_ind[k]];
+	} else {
+		const T *col = &_X[j * _m];
+		for (size_t i = 0; i < _m; ++i)
+			sum += _v[i] * col[i] * r[i];
+	}
+	return sum;
+}
+
+// sum_i v_i a_ij^2
+template<typename T>
+double CoordinateDescent<T>::_SqNorm(size_t j) const {
+	double sum = 0;
+	if (_sparse) {
+		for (int k = _ptr[j]; k < _ptr[j + 1]; ++k)
+			sum += _v[_ind[k]] * _X[k] * _X[k];
+	} else {
+		const T *col = &_X[j * _m];
+		for (size_t i = 0; i < _m; ++i)
+			sum += _v[i] * col[i] * col[i];
+	}
+	return sum;
+}
+
+// z += a a_j
+template<typename T>
+void CoordinateDescent<T>::_Axpy(size_t j, double a, std::vector<double> &z) const {
+	if (_sparse) {
+		for (int k = _ptr[j]; k < _ptr[j + 1]; ++k)
+			z[_ind[k]] += a * _X[k];
+	} else {
+		const T *col = &_X[j * _m];
+		for (size_t i = 0; i < _m; ++i)
+			z[i] += a * col[i];
+	}
+}
+
+template<typename T>
+void CoordinateDescent<T>::ResetX(void) {
+	std::fill(_x.begin(), _x.end(), static_cast<T>(0));
+	std::fill(_isactive.begin(), _isactive.end(), 0);
+	for (size_t k = 0; k < _classes; ++k)
+		_active[k].clear();
+	_synced = false;
+}
+
+template<typename T>
+void CoordinateDescent<T>::SetInitX(const T *x) {
+	ResetX();
+	for (_class = 0; _class < _classes; ++_class) {
+		for (size_t j = 0; j < _n; ++j) {
+			_x[_class * _n + j] = x[_class * _n + j];
+			if (x[_class * _n + j] != 0)
+				_Activate(j);
+		}
+	}
+	_class = 0;
+}
+
+// column j of the class being updated
+template<typename T>
+void CoordinateDescent<T>::_Activate(size_t j) {
+	_isactive[_class * _n + j] = 1;
+	_active[_class].push_back(j);
+}
+
+// linear predictions of the class being updated
+template<typename T>
+void CoordinateDescent<T>::_Predict() {
+	const T *x = &_x[_class * _n];
+	std::fill(_z.begin(), _z.end(), 0.0);
+	for (size_t j = 0; j < _n; ++j) {
+		if (x[j] != 0)
+			_Axpy(j, x[j], _z);
+	}
+}
+
+// The multinomial loss only depends on the differences between the classes'
+// coefficients, so center the unpenalized ones (e.g. the intercept) over the
+// classes as glmnet does.  Returns whether any coefficient moved.
+template<typename T>
+bool CoordinateDescent<T>::_Center() {
+	bool moved = false;
+	for (size_t j = 0; j < _n; ++j) {
+		if (_l1[j] != 0 || _l2[j] != 0)
+			continue;
+		double mean = 0;
+		for (size_t k = 0; k < _classes; ++k)
+			mean += _x[k * _n + j];
+		mean /= _classes;
+		if (mean == 0)
+			continue;
+		for (size_t k = 0; k < _classes; ++k) {
+			_x[k * _n + j] = static_cast<T>(_x[k * _n + j] - mean);
+			if (_x[k * _n + j] != 0 && !_isactive[k * _n + j]) {
+				_isactive[k * _n + j] = 1;
+				_active[k].push_back(j);
+			}
+		}
+		moved = true;
+	}
+	return moved;
+}
+
+// Recompute the linear predictions, residuals and gradient at _x.
+template<typename T>
+void CoordinateDescent<T>::_Sync() {
+	if (_fromgram) {
+		// gradient b - G x
+		std::copy(_b.begin(), _b.end(), _grad.begin());
+		for (size_t l = 0; l < _n; ++l) {
+			if (_x[l] == 0)
+				continue;
+			for (size_t j = 0; j < _n; ++j)
+				_grad[j] -= _gram[l][j] * _x[l];
+		}
+		_synced = true;
+		return;
+	}
+	if (_family == 'm') {
+		for (_class = 0; _class < _classes; ++_class) {
+			_Predict();
+			for (size_t i = 0; i < _m; ++i)
+				_zall[i * _classes + _class] = _z[i];
+		}
+		_class = 0;
+		_synced = true;
+		return;
+	}
+	_Predict();
+	if (_family == 'e') {
+		for (size_t i = 0; i < _m; ++i)
+			_r[i] = _y[i] - _z[i];
+		if (_covariance) {
+			for (size_t j = 0; j < _n; ++j)
+				_grad[j] = _Dot(j, _r);
+		}
+	}
+	_synced = true;
+}
+
+// Quadratic approximation of the logistic loss at the current predictions:
+// weights w p (1-p) and working residuals (y - p) / (p (1-p)).  For the
+// multinomial loss p is the softmax probability of the class being updated
+// and y its indicator, with the other classes' predictions held fixed.
+template<typename T>
+void CoordinateDescent<T>::_Working() {
+	for (size_t i = 0; i < _m; ++i) {
+		double p, y;
+		if (_family == 'm') {
+			const double *z = &_zall[i * _classes];
+			double zmax = *std::max_element(z, z + _classes), sum = 0;
+			for (size_t k = 0; k < _classes; ++k)
+				sum += std::exp(z[k] - zmax);
+			p = std::exp(z[_class] - zmax) / sum;
+			y = (static_cast<size_t>(_y[i]) == _class ? 1 : 0);
+			_z[i] = z[_class];
+		} else {
+			p = 1.0 / (1.0 + std::exp(-_z[i]));
+			y = _y[i];
+		}
+		double q = std::max(p * (1.0 - p), kMinVariance);
+		_v[i] = _w[i] * q;
+		_r[i] = (y - p) / q;
+	}
+	for (size_t j = 0; j < _n; ++j)
+		_xsq[j] = _SqNorm(j);
+}
+
+// One sweep over all columns or over the active set, returns the largest
+// decrease xsq_j * dx_j^2 of the (approximate) objective.
+template<typename T>
+double CoordinateDescent<T>::_Sweep(bool all) {
+	double maxchange = 0;
+	T *x = &_x[_class * _n];
+	const char *isactive = &_isactive[_class * _n];
+	const std::vector<size_t> &active = _active[_class];
+	size_t count = (all ? _n : active.size());
+	for (size_t k = 0; k < count; ++k) {
+		size_t j = (all ? k : active[k]);
+		double gj = (_covariance ? _grad[j] : _Dot(j, _r));
+		double xj = x[j];
+		double denom = _xsq[j] + _l2[j];
+		double xnew = (denom > 0 ? SoftThreshold(gj + _xsq[j] * xj, _l1[j]) / denom : 0);
+		double dx = static_cast<T>(xnew) - xj;
+		if (dx == 0)
+			continue;
+		x[j] = static_cast<T>(xnew);
+		if (!isactive[j])
+			_Activate(j);
+		if (_covariance) {
+			std::vector<double> &gram = _gram[j];
+			if (gram.empty()) {
+				const T *col = &_X[j * _m];
+				gram.resize(_n);
+				for (size_t l = 0; l < _n; ++l) {
+					const T *coll = &_X[l * _m];
+					double sum = 0;
+					for (size_t i = 0; i < _m; ++i)
+						sum += _w[i] * coll[i] * col[i];
+					gram[l] = sum;
+				}
+			}
+			for (size_t l = 0; l < _n; ++l)
+				_grad[l] -= gram[l] * dx;
+		} else {
+			_Axpy(j, -dx, _r);
+			if (_family != 'e')
+				_Axpy(j, dx, _z);
+		}
+		maxchange = std::max(maxchange, _xsq[j] * dx * dx);
+	}
+	return maxchange;
+}
+
+// Cycle over the active set until converged, then check all the columns
+// with a full sweep, until that sweep converges too.  Returns the number
+// of sweeps done (at most budget).
+template<typename T>
+unsigned int CoordinateDescent<T>::_Cycle(double thresh, unsigned int budget,
+		double *firstchange) {
+	unsigned int sweeps = 0;
+	*firstchange = 0;
+	while (sweeps < budget) {
+		double change = _Sweep(true);
+		if (sweeps++ == 0)
+			*firstchange = change;
+		if (change < thresh)
+			break;
+		while (sweeps < budget) {
+			change = _Sweep(false);
+			sweeps++;
+			if (change < thresh)
+				break;
+		}
+	}
+	return sweeps;
+}
+
+template<typename T>
+H2O4GPUStatus CoordinateDescent<T>::Solve(const FunctionVector<T> &g) {
+	for (const FunctionRun &run : g.Runs()) {
+		for (size_t j = run.begin; j < run.end; ++j) {
+			_l1[j] = (run.h == kAbs ? g.c[j] : 0);
+			_l2[j] = g.e[j];
+		}
+	}
+	if (!_synced)
+		_Sync();
+	double rel = _rel_tol;
+	double thresh = std::max(rel * rel * _scale, static_cast<double>(_abs_tol));
+
+	unsigned int sweeps = 0;
+	double firstchange = 0;
+	if (_family == 'e') {
+		sweeps = _Cycle(thresh, _max_iter, &firstchange);
+	} else if (_family == 'm') {
+		// IRLS over the classes in turn, until every class's quadratic approximation is already solved
+		int outer = 0;
+		while (sweeps < _max_iter) {
+			double change = 0;
+			for (_class = 0; _class < _classes && sweeps < _max_iter; ++_class) {
+				_Working();
+				double classchange;
+				sweeps += _Cycle(thresh, _max_iter - sweeps, &classchange);
+				change = std::max(change, classchange);
+				for (size_t i = 0; i < _m; ++i)
+					_zall[i * _classes + _class] = _z[i];
+			}
+			_class = 0;
+			if (outer++ == 0)
+				firstchange = change;
+			if (change < thresh)
+				break;
+		}
+		if (_Center())
+			_Sync();
+	} else {
+		// IRLS: solve the quadratic approximation, until it's already solved where it's taken
+		int outer = 0;
+		while (sweeps < _max_iter) {
+			_Working();
+			double change;
+			sweeps += _Cycle(thresh, _max_iter - sweeps, &change);
+			if (outer++ == 0)
+				firstchange = change;
+			if (change < thresh)
+				break;
+		}
+	}
+	// like ADMM, a warm start that already solves the problem takes no iterations
+	if (sweeps >= _max_iter)
+		_final_iter = _max_iter;
+	else if (firstchange < thresh)
+		_final_iter = 0;
+	else
+		_final_iter = sweeps;
+
+	// predictions
+	if (_fromgram) {
+		// no rows to predict, only their statistics are known
+	} else if (_covariance) {
+		_Predict();
+		for (size_t i = 0; i < _m; ++i)
+			_trainPreds[i] = static_cast<T>(_z[i]);
+	} else if (_family == 'e') {
+		for (size_t i = 0; i < _m; ++i)
+			_trainPreds[i] = static_cast<T>(_y[i] - _r[i]);
+	} else if (_family == 'm') {
+		for (size_t i = 0; i < _m * _classes; ++i)
+			_trainPreds[i] = static_cast<T>(_zall[i]);
+	} else {
+		for (size_t i = 0; i < _m; ++i)
+			_trainPreds[i] = static_cast<T>(_z[i]);
+	}
+	// without a validation set there is nothing to predict (and _validCsc
+	// holds no arrays)
+	for (size_t c = 0; _mValid > 0 && c < _classes; ++c) {
+		const T *x = &_x[c * _n];
+		if (_sparse) {
+			std::vector<double> pred(_mValid, 0.0);
+			for (size_t j = 0; j < _n; ++j) {
+				if (x[j] == 0)
+					continue;
+				for (int k = _validCsc.ptr[j]; k < _validCsc.ptr[j + 1]; ++k)
+					pred[_validCsc.ind[k]] += x[j] * _validCsc.val[k];
+			}
+			for (size_t i = 0; i < _mValid; ++i)
+				_validPreds[i * _classes + c] = static_cast<T>(pred[i]);
+		} else {
+			for (size_t i = 0; i < _mValid; ++i) {
+				double pred = 0;
+				if (_ord == 'r' || _ord == 'R') {
+					const T *row = &_validX[i * _n];
+					for (size_t j = 0; j < _n; ++j)
+						pred += x[j] * row[j];
+				} else {
+					for (size_t j = 0; j < _n; ++j)
+						pred += x[j] * _validX[j * _mValid + i];
+				}
+				_validPreds[i * _classes + c] = static_cast<T>(pred);
+			}
+		}
+	}
+	return (_final_iter == _max_iter ? H2O4GPU_MAX_ITER : H2O4GPU_SUCCESS);
+}
+
+template class CoordinateDescent<float>;
+template class CoordinateDescent<double>;
+
+}  // namespace h2o4gpu
@@ -0,0 +1,203 @@
+/*!
+ * Copyright 2017-2018 H2O.ai, Inc.
+ * License   Apache License Version 2.0 (see LICENSE for details)
+ */
+#pragma once
+#include <stddef.h>
+#include <vector>
+
+#include "solver/glm.h"
+
+namespace h2o4gpu {
+
+/**
+ * View (not a copy) of a matrix in compressed sparse column form: column j
+ * holds the values val[k] in the rows ind[k] (0-based) for k in
+ * [ptr[j], ptr[j+1]).
+ */
+template<typename T>
+struct CscMatrix {
+	size_t m, n;
+	const T *val;
+	const int *ind;
+	const int *ptr;
+};
+
+// Entries of the sums kept by GramStats
+enum GramSum {
+	kGramRows, // number of rows
+	kGramW, // sum_i w_i
+	kGramWY, // sum_i w_i y_i
+	kGramWYY, // sum_i w_i y_i^2
+	kGramY, // sum_i y_i
+	kGramYY, // sum_i y_i^2
+	kGramMin, // min_i y_i
+	kGramMax, // max_i y_i
+	kGramSums
+};
+
+/**
+ * View (not a copy) of the sufficient statistics of the weighted squared
+ * loss over a set of rows a_i with response y_i and weights w_i: the Gram
+ * matrix sum_i w_i a_i a_i^T (n x n), b = sum_i w_i y_i a_i and the sums of
+ * GramSum.  They can be accumulated in one pass over data that doesn't fit
+ * in memory.
+ */
+template<typename T>
+struct GramStats {
+	size_t n;
+	const T *gram;
+	const T *b;
+	const double *sums;
+};
+
+/**
+ * Cyclic coordinate descent (as in glmnet) for the elastic net, logistic
+ * and multinomial GLMs on the host.
+ *
+ * Minimizes, in the original (not equilibrated) space of the data,
+ *
+ *   elasticnet:  (1/2) sum_i w_i (a_i^T x - y_i)^2 + sum_j g_j(x_j)
+ *   logistic:    sum_i w_i (log(1 + e^{a_i^T x}) - y_i a_i^T x) + sum_j g_j(x_j)
+ *   multinomial: sum_i w_i (log(sum_k e^{a_i^T x_k}) - a_i^T x_{y_i}) + sum_k sum_j g_j(x_jk)
+ *
+ * with g_j(x) = c_j |x| + (1/2) e_j x^2, the same objective the ADMM
+ * solver gets from the lambda path.  The multinomial response y_i is the
+ * class 0..K-1 and x holds one block of n coefficients per class.  The elastic net uses covariance
+ * updates (kept in the gradient, with lazily computed Gram columns) when
+ * there are fewer columns than rows and naive residual updates otherwise.
+ * The logistic family wraps the naive updates in IRLS, the multinomial
+ * family does the same for one class at a time (partial Newton steps
+ * over the same copy of the data).  Each solve cycles
+ * over the active columns until converged and then checks all the columns
+ * with one full sweep, so warm starts along the lambda path only touch
+ * the columns that are or have been nonzero.  The data can be dense or
+ * compressed sparse columns, the latter only ever touching the nonzeros
+ * (and always using naive updates), or only the Gram statistics of the
+ * data for the elastic net, which then has no training predictions.
+ *
+ * Mirrors the parts of the H2O4GPU solver interface used along the path.
+ */
+template<typename T>
+class CoordinateDescent {
+public:
+	/**
+	 * @param family 'e' for elasticnet, 'l' for logistic or 'm' for multinomial
+	 * @param ord Order of X and validX, 'r' for row major or 'c' for column major
+	 * @param m Number of rows of X
+	 * @param n Number of columns of X and validX
+	 * @param X Training data, copied
+	 * @param y Response of length m, copied
+	 * @param w Weights of length m, copied
+	 * @param mValid Number of rows of validX
+	 * @param validX Validation data, must outlive the solver (can be NULL if mValid is 0)
+	 * @param classes Number of classes K of the multinomial family
+	 */
+	CoordinateDescent(const char family, const char ord, size_t m, size_t n,
+			const T *X, const T *y, const T *w, size_t mValid, const T *validX,
+			size_t classes = 1);
+	/**
+	 * @param family 'e' for elasticnet, 'l' for logistic or 'm' for multinomial
+	 * @param X Training data, copied
+	 * @param y Response of length X.m, copied
+	 * @param w Weights of length X.m, copied
+	 * @param validX Validation data with X.n columns, must outlive the solver (can be NULL)
+	 * @param classes Number of classes K of the multinomial family
+	 */
+	CoordinateDescent(const char family, const CscMatrix<T> &X, const T *y,
+			const T *w, const CscMatrix<T> *validX, size_t classes = 1);
+	/**
+	 * Elastic net from the Gram statistics of the training data alone.
+	 *
+	 * @param stats Statistics of the training data, copied
+	 */
+	explicit CoordinateDescent(const GramStats<T> &stats);
+
+	// Solve for the penalties g (kAbs or kZero, with c the L1 and e the L2
+	// penalty), the same for the coefficients of every class.
+	H2O4GPUStatus Solve(const FunctionVector<T> &g);
+	void ResetX(void);
+	void SetInitX(const T *x);
+
+	// coefficients, K blocks of n when multinomial
+	const T* GetX() const {
+		return &_x[0];
+	}
+	// linear predictions, K per row when multinomial
+	const T* GettrainPreds() const {
+		return _trainPreds.empty() ? NULL : &_trainPreds[0];
+	}
+	const T* GetvalidPreds() const {
+		return _validPreds.empty() ? NULL : &_validPreds[0];
+	}
+	unsigned int GetFinalIter() const {
+		return _final_iter;
+	}
+	unsigned int GetMaxIter() const {
+		return _max_iter;
+	}
+	T GetRelTol() const {
+		return _rel_tol;
+	}
+	T GetAbsTol() const {
+		return _abs_tol;
+	}
+
+	void SetRelTol(T rel_tol) {
+		_rel_tol = rel_tol;
+	}
+	void SetAbsTol(T abs_tol) {
+		_abs_tol = abs_tol;
+	}
+	void SetMaxIter(unsigned int max_iter) {
+		_max_iter = max_iter;
+	}
+
+private:
+	char _family;
+	char _ord;
+	size_t _m, _n, _mValid;
+	size_t _classes; // blocks of coefficients (1 unless multinomial)
+	size_t _class; // class being updated
+	bool _sparse;
+	bool _fromgram; // only the Gram statistics of the data are known
+	std::vector<T> _X; // column major copy of the training data, or its nonzeros when sparse
+	std::vector<int> _ind, _ptr; // row indices and column offsets of the nonzeros when sparse
+	std::vector<T> _y, _w;
+	const T *_validX;
+	CscMatrix<T> _validCsc; // validation data when sparse
+
+	std::vector<T> _x;
+	std::vector<T> _trainPreds, _validPreds;
+	unsigned int _final_iter, _max_iter;
+	T _rel_tol, _abs_tol;
+	double _scale; // weighted sum of squares of y around its mean, scales the convergence threshold
+
+	bool _covariance; // covariance updates instead of naive updates
+	bool _synced; // state below matches _x
+	std::vector<double> _z; // linear predictions (of _class when multinomial)
+	std::vector<double> _zall; // linear predictions of all classes when multinomial, K per row
+	std::vector<double> _r; // (working) residuals of the naive updates
+	std::vector<double> _v; // (working) weights of the naive updates
+	std::vector<double> _grad; // sum_i w_i a_ij r_i of the covariance updates
+	std::vector<double> _b; // sum_i w_i y_i a_ij when from Gram statistics
+	std::vector<double> _xsq; // sum_i v_i a_ij^2
+	std::vector<std::vector<double> > _gram; // Gram columns of the covariance updates, computed when needed
+	std::vector<char> _isactive; // column (of a class) is in _active
+	std::vector<std::vector<size_t> > _active; // columns that are or have been nonzero, per class
+	std::vector<double> _l1, _l2;
+
+	void _Init();
+	double _Dot(size_t j, const std::vector<double> &r) const;
+	double _SqNorm(size_t j) const;
+	void _Axpy(size_t j, double a, std::vector<double> &z) const;
+	void _Predict();
+	void _Sync();
+	void _Working();
+	double _Sweep(bool all);
+	unsigned int _Cycle(double thresh, unsigned int budget, double *firstchange);
+	void _Activate(size_t j);
+	bool _Center();
+};
+
+}  // namespace h2o4gpu
@@ -3,7 +3,9 @@
  * License   Apache License Version 2.0 (see LICENSE for details)
  */
 #include "elastic_net_ptr.h"
+#include "coordinate_descent.h"
 #include <float.h>
+#include <stdexcept>
 #include "../include/util.h"
 #include <sys/stat.h>
 
@@ -121,6 +123,9 @@ const std::string HARDWARE = SOCKETS + "x" + CPUTYPE;
 
 #define RELAXEARLYSTOP 0
 
+// solve on the full matrix once more than this fraction of the penalized features pass the strong rule
+#define SCREENMAXFRACTION 0.5
+
 namespace h2o4gpu {
 
 volatile sig_atomic_t flag = 0;
@@ -235,22 +240,23 @@ bool fileExists(const std::string& filename)
 #define VALIDError 2
 
 #define NUMError 3 // train, hold-out CV, valid
-#define NUMOTHER 3 // for lambda, alpha, tol
+#define NUMOTHER 4 // for lambda, alpha, tol, screened features
 
 template<typename T>
 double ElasticNetptr(
-		const char family, int dopredict, int sourceDev, int datatype, int sharedA,
+		const char family, const char solver, int dopredict, int sourceDev, int datatype, int sharedA,
 		int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain, size_t n,
 		size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max,
 		T *alphas, T *lambdas,
 		double tol, double tolseekfactor,
-		int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations, int verbose,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations, int verbose,
 		T *trainXptr, T *trainYptr, T *validXptr, T *validYptr,
 		T *weightptr, int givefullpath, T **Xvsalphalambda, T **Xvsalpha,
 		T **validPredsvsalphalambda, T **validPredsvsalpha, size_t *countfull,
-		size_t *countshort, size_t *countmore) {
+		size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime) {
 
 	if(0){ // DEBUG
 		if(alphas!=NULL){
@@ -269,51 +275,58 @@ double ElasticNetptr(
 	}
 
 	if (dopredict == 0) {
-		return ElasticNetptr_fit(family, sourceDev, datatype, sharedA, nThreads, gpu_id, nGPUs, totalnGPUs,
+		return ElasticNetptr_fit(family, solver, sourceDev, datatype, sharedA, nThreads, gpu_id, nGPUs, totalnGPUs,
 								 ord, mTrain, n, mValid, intercept, standardize,
-								 lambda_max, lambda_min_ratio, nLambdas, nFolds,
+								 lambda_max, lambda_min_ratio, nLambdas, nFolds, foldid,
 								 nAlphas, alpha_min, alpha_max,
 								 alphas, lambdas,
 								 tol, tolseekfactor,
-								 lambdastopearly, glmstopearly, stopearlyerrorfraction, max_iterations, verbose, trainXptr,
+								 lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose, trainXptr,
 								 trainYptr, validXptr, validYptr, weightptr, givefullpath,
 								 Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
-								 validPredsvsalpha, countfull, countshort, countmore);
+								 validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime);
 	} else {
-		return ElasticNetptr_predict(family, sourceDev, datatype, sharedA, nThreads, gpu_id, nGPUs, totalnGPUs,
+		return ElasticNetptr_predict(family, solver, sourceDev, datatype, sharedA, nThreads, gpu_id, nGPUs, totalnGPUs,
 									 ord, mTrain, n, mValid, intercept, standardize,
-									 lambda_max, lambda_min_ratio, nLambdas, nFolds,
+									 lambda_max, lambda_min_ratio, nLambdas, nFolds, foldid,
 									 nAlphas, alpha_min, alpha_max,
 									 alphas, lambdas,
 									 tol, tolseekfactor,
-									 lambdastopearly, glmstopearly, stopearlyerrorfraction, max_iterations, verbose, trainXptr,
+									 lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose, trainXptr,
 									 trainYptr, validXptr, validYptr, weightptr, givefullpath,
 									 Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
-									 validPredsvsalpha, countfull, countshort, countmore);
+									 validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime);
 	}
 
 }
 
-#define MAPXALL(i,a,which) (which + a*(n+NUMError+NUMOTHER) + i*(n+NUMError+NUMOTHER)*nAlphas)
-#define MAPXBEST(a,which) (which + a*(n+NUMError+NUMOTHER))
+// nx is the number of coefficients of a model: n, or n per class for the multinomial family
+#define MAPXALL(i,a,which) (which + a*(nx+NUMError+NUMOTHER) + i*(nx+NUMError+NUMOTHER)*nAlphas)
+#define MAPXBEST(a,which) (which + a*(nx+NUMError+NUMOTHER))
 
 #define MAPPREDALL(i,a,which, m) (which + a*m + i*m*nAlphas)
 #define MAPPREDBEST(a,which, m) (which + a*m)
 
 template<typename T>
-double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sharedA, int nThreads,
+double ElasticNetptr_fit(const char family, const char solver, int sourceDev, int datatype, int sharedA, int nThreads,
 						 int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain, size_t n, size_t mValid,
 						 int intercept, int standardize,
-						 double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+						 double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 						 int nAlphas, double alpha_min, double alpha_max,
 						 T *alphas, T *lambdas,
 						 double tol, double tolseekfactor,
-						 int lambdastopearly, int glmstopearly, double stopearlyerrorfraction,
+						 int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction,
 						 int max_iterations, int verbose, T *trainXptr, T *trainYptr,
 						 T *validXptr, T *validYptr, T *weightptr, int givefullpath,
 						 T **Xvsalphalambda, T **Xvsalpha, T **validPredsvsalphalambda,
 						 T **validPredsvsalpha, size_t *countfull, size_t *countshort,
-						 size_t *countmore) {
+						 size_t *countmore, size_t *cachehits, size_t *factorizations,
+						 double *factortime, const h2o4gpu::CscMatrix<T> *sparseTrainX,
+						 const h2o4gpu::CscMatrix<T> *sparseValidX,
+						 const h2o4gpu::GramStats<T> *gramFolds,
+						 const h2o4gpu::GramStats<T> *gramValid) {
 
 	if (0) {
 		std::default_random_engine generator;
@@ -380,26 +393,36 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 	DEBUG_FPRINTF(stderr, "Set folds=%d realfolds=%zu Total Folds=%zu\n",
 				  nFolds, realfolds, totalfolds);
 
-	if (VERBOSEENET || verbose>3) {
-		fprintf(stderr, "Before malloc X\n");
-		fflush(stderr);
-	}
-	// setup storage for returning results back to user
-	// iterate over predictors (n) or other information fastest so can memcpy X
-	*countmore = NUMError + NUMOTHER;
-	if (givefullpath) {
-		*countfull = nLambdas * nAlphas * (n + *countmore);
-		*Xvsalphalambda = (T*) calloc(*countfull, sizeof(T)); // +NUMOTHER for values of lambda, alpha, and tolerance
-	} else { // only give back solution for optimal lambda after CV is done
-		*countfull = 0;
-		*Xvsalphalambda = NULL;
+	// with Gram statistics (of each fold) there are no rows in memory, only their sums
+	const bool usegram = (gramFolds != NULL);
+	const bool usecd = (solver == 'c');
+	if (family == 'm' && !usecd) {
+		throw "The multinomial family needs the coordinate descent solver";
 	}
-	*countshort = nAlphas * (n + *countmore);
-	*Xvsalpha = (T*) calloc(*countshort, sizeof(T));
-	//    printf("inside: countfull=%zu countshort=%zu countmore=%zu\n",*countfull,*countshort,*countmore); fflush(stdout);
-	if (VERBOSEENET || verbose>3) {
-		fprintf(stderr, "After malloc X\n");
-		fflush(stderr);
+	const size_t mRows = (usegram ? 0 : mTrain);
+	const size_t mValidRows = (usegram ? 0 : mValid);
+
+	// fold of each training row: given by the user (e.g. shuffled or stratified) or contiguous blocks of rows
+	// Each fold is fit on a compact copy of the other folds' rows, so held-out rows cost nothing.
+	std::vector<int> foldof;
+	if (realfolds > 1 && !usegram) {
+		foldof.resize(mTrain);
+		std::vector<size_t> foldcount(realfolds, 0);
+		for (size_t j = 0; j < mTrain; ++j) {
+			int f = (foldid != NULL ? foldid[j] : (int) (j * realfolds / mTrain));
+			if (f < 0 || f >= (int) realfolds) {
+				throw std::invalid_argument("Invalid foldid " + std::to_string(f) + " for row "
+						+ std::to_string(j) + " with nFolds=" + std::to_string(nFolds));
+			}
+			foldof[j] = f;
+			foldcount[f]++;
+		}
+		for (size_t f = 0; f < realfolds; ++f) {
+			if (foldcount[f] == 0 || foldcount[f] == mTrain) {
+				throw std::invalid_argument("Fold " + std::to_string(f) + " has " + std::to_string(foldcount[f])
+						+ " of " + std::to_string(mTrain) + " rows, every fold needs held-out and training rows");
+			}
+		}
 	}
 
 	// for source, create class objects that creates cuda memory, cpu memory, etc.
@@ -412,7 +435,7 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 	}
 	int sourceme = sourceDev;
 	h2o4gpu::MatrixDense<T> Asource_(sharedA, sourceme, sourceDev, datatype,
-									 ord, mTrain, n, mValid, reinterpret_cast<T *>(trainXptr),
+									 ord, mRows, n, mValidRows, reinterpret_cast<T *>(trainXptr),
 									 reinterpret_cast<T *>(trainYptr), reinterpret_cast<T *>(validXptr),
 									 reinterpret_cast<T *>(validYptr), reinterpret_cast<T *>(weightptr));
 	if (VERBOSEENET || verbose>3) {
@@ -422,7 +445,20 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 	// now can always access A_(sourceDev) to get pointer from within other MatrixDense calls
 	T min[2], max[2], mean[2], var[2], sd[2], skew[2], kurt[2];
 	T lambdamax0;
-	Asource_.Stats(intercept, min, max, mean, var, sd, skew, kurt, lambdamax0);
+	const bool setlambdamax = (lambda_max < 0.0);
+	std::vector<T> gramtotal, btotal;
+	std::vector<double> sumstotal;
+	h2o4gpu::GramStats<T> gramTrain = {};
+	if (usegram) {
+		gramTrain = (realfolds > 1 ? h2o4gpu::gramSum(gramFolds, realfolds, gramtotal, btotal, sumstotal)
+				: gramFolds[0]);
+		h2o4gpu::gramStats(intercept, gramTrain, gramValid,
+				min, max, mean, var, sd, skew, kurt, lambdamax0);
+	} else if (sparseTrainX)
+		h2o4gpu::cscStats(intercept, *sparseTrainX, trainYptr, mValid, sparseValidX, validYptr, weightptr,
+				min, max, mean, var, sd, skew, kurt, lambdamax0);
+	else
+		Asource_.Stats(intercept, min, max, mean, var, sd, skew, kurt, lambdamax0);
 	double sdTrainY = (double) sd[0], meanTrainY = (double) mean[0];
 	double sdValidY = (double) sd[1], meanValidY = (double) mean[1];
 	if(lambda_max<0.0){ // set if user didn't set
@@ -489,26 +525,85 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 	}
 
 	// temporarily get trainX, etc. from h2o4gpu (which may be on gpu)
+	// (trainX and validX are needed to build each fold's training data when doing folds,
+	// the screened sub-problems and their gradient checks when screening,
+	// and the coordinate descent solver's own copy of the data, sparse data is used in place)
+	int getX = (!sparseTrainX && !usegram && (OLDPRED || realfolds > 1 || screening || usecd));
 	T *trainX = NULL;
 	T *trainY = NULL;
 	T *validX = NULL;
 	T *validY = NULL;
 	T *trainW = NULL;
-	if (OLDPRED)
+	if (getX)
 		trainX = (T *) malloc(sizeof(T) * mTrain * n);
-	trainY = (T *) malloc(sizeof(T) * mTrain);
-	if (OLDPRED)
+	trainY = (T *) malloc(sizeof(T) * mRows);
+	if (getX)
 		validX = (T *) malloc(sizeof(T) * mValid * n);
-	validY = (T *) malloc(sizeof(T) * mValid);
-	trainW = (T *) malloc(sizeof(T) * mTrain);
+	validY = (T *) malloc(sizeof(T) * mValidRows);
+	trainW = (T *) malloc(sizeof(T) * mRows);
 
-	if (OLDPRED)
+	if (getX)
 		Asource_.GetTrainX(datatype, mTrain * n, &trainX);
-	Asource_.GetTrainY(datatype, mTrain, &trainY);
-	if (OLDPRED)
+	Asource_.GetTrainY(datatype, mRows, &trainY);
+	if (getX)
 		Asource_.GetValidX(datatype, mValid * n, &validX);
-	Asource_.GetValidY(datatype, mValid, &validY);
-	Asource_.GetWeight(datatype, mTrain, &trainW);
+	Asource_.GetValidY(datatype, mValidRows, &validY);
+	Asource_.GetWeight(datatype, mRows, &trainW);
+
+	// multinomial models have a block of n coefficients per class, the response is the class
+	const size_t nclass = (family == 'm' ? h2o4gpu::multinomialClasses(mTrain, trainY, mValid, validY) : 1);
+	const size_t nx = n * nclass;
+	if (family == 'm' && setlambdamax) {
+		lambda_max = (double) (sparseTrainX ?
+				h2o4gpu::multinomialLambdaMax(intercept, nclass, *sparseTrainX, trainY, trainW) :
+				h2o4gpu::multinomialLambdaMax(intercept, nclass, ord, mTrain, n, trainX, trainY, trainW));
+	}
+
+	if (VERBOSEENET || verbose>3) {
+		fprintf(stderr, "Before malloc X\n");
+		fflush(stderr);
+	}
+	// setup storage for returning results back to user
+	// iterate over predictors (nx) or other information fastest so can memcpy X
+	*countmore = NUMError + NUMOTHER;
+	if (givefullpath) {
+		*countfull = nLambdas * nAlphas * (nx + *countmore);
+		*Xvsalphalambda = (T*) calloc(*countfull, sizeof(T)); // +NUMOTHER for values of lambda, alpha, and tolerance
+	} else { // only give back solution for optimal lambda after CV is done
+		*countfull = 0;
+		*Xvsalphalambda = NULL;
+	}
+	*countshort = nAlphas * (nx + *countmore);
+	*Xvsalpha = (T*) calloc(*countshort, sizeof(T));
+	*cachehits = 0;
+	*factorizations = 0;
+	*factortime = 0;
+	//    printf("inside: countfull=%zu countshort=%zu countmore=%zu\n",*countfull,*countshort,*countmore); fflush(stdout);
+	if (VERBOSEENET || verbose>3) {
+		fprintf(stderr, "After malloc X\n");
+		fflush(stderr);
+	}
+
+#ifdef HAVECUDA
+	const bool sharefolds = false;
+#else
+	if (realfolds <= 1 && sharedA > 0 && !usecd) {
+		// every thread's solver aliases this single copy, equilibrate it once
+		// here (after Stats, which needs the original data)
+		Asource_.Init();
+		Asource_.Equil(1);
+	}
+	// with sharedA>0 each fold's training rows are copied and equilibrated
+	// once, by the first thread reaching the fold, and the threads solving
+	// the fold share them until the last one moves on
+	const bool sharefolds = sharedA > 0 && realfolds > 1 && !usecd;
+#endif
+	std::vector<std::weak_ptr<h2o4gpu::MatrixDense<T> > > foldshared(sharefolds ? realfolds : 0);
+	std::vector<std::mutex> foldlock(sharefolds ? realfolds : 0);
+
+	// last lambda-path solution of each fold and alpha to warm start the fixed-lambda folds
+	// with coordinate descent
+	std::vector<T> foldpathX(realfolds > 1 && usecd ? realfolds * nAlphas * nx : 0);
 
 	T alphaarray[realfolds * 2][nAlphas]; // shared memory space for storing alpha for various folds and alphas
 	T lambdaarray[realfolds * 2][nAlphas]; // shared memory space for storing lambda for various folds and alphas
@@ -602,7 +697,8 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 
 		// choose GPU device ID for each thread
 		int wDev = gpu_id + (nGPUs > 0 ? me % nGPUs : 0);
-		wDev = wDev % totalnGPUs;
+		if (totalnGPUs > 0) // no GPUs at all on a CPU-only machine
+			wDev = wDev % totalnGPUs;
 		if(verbose){
 		    cerr << "OpenMP: wDev=" << wDev << endl;
 		}
@@ -629,12 +725,29 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 		////////////
 		double t0 = timer<double>();
 		DEBUG_FPRINTF(fil, "Moving data to the GPU. Starting at %21.15g\n", t0);
+		// Without folds each thread solves on its own copy of all training data.
+		// With folds each thread builds a solver for the fold it works on (see SETUP FOLD below).
+		h2o4gpu::MatrixDense<T> *A_ = NULL;
+		h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > *fullsolver = NULL;
+		h2o4gpu::CoordinateDescent<T> *cdsolver = NULL;
+		if (realfolds <= 1 && usecd) {
+			if (usegram)
+				cdsolver = new h2o4gpu::CoordinateDescent<T>(gramTrain);
+			else if (sparseTrainX)
+				cdsolver = new h2o4gpu::CoordinateDescent<T>(family, *sparseTrainX,
+						trainY, trainW, sparseValidX, nclass);
+			else
+				cdsolver = new h2o4gpu::CoordinateDescent<T>(family, ord, mTrain, n,
+						trainX, trainY, trainW, mValid, validX, nclass);
+			cdsolver->SetMaxIter(max_iterations);
+		} else if (realfolds <= 1) {
 #pragma omp barrier // not required barrier
-		h2o4gpu::MatrixDense<T> A_(sharedA, me, wDev, Asource_);
-#pragma omp barrier // required barrier for wDev=sourceDev so that Asource_._data (etc.) is not overwritten inside h2o4gpu_data(wDev=sourceDev) below before other cores copy data
-		h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > h2o4gpu_data(
-				sharedA, me, wDev, A_);
+			A_ = new h2o4gpu::MatrixDense<T>(sharedA, me, wDev, Asource_);
+#pragma omp barrier // required barrier for wDev=sourceDev so that Asource_._data (etc.) is not overwritten inside fullsolver(wDev=sourceDev) below before other cores copy data
+			fullsolver = new h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> >(
+					sharedA, me, wDev, *A_);
 #pragma omp barrier // not required barrier
+		}
 		double t1 = timer<double>();
 		if (me == 0) { //only thread=0 times entire post-warmup procedure
 			t1me0 = t1;
@@ -647,32 +760,86 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 		///////////////////////////////////////////////////
 		// BEGIN SVD
 		if (0) {
-			A_.svd1();
+			A_->svd1();
 		}
 
 		////////////////////////////////////////////////
 		// BEGIN GLM
 
 		// Setup constant parameters for all models
-		h2o4gpu_data.SetnDev(1); // set how many cuda devices to use internally in h2o4gpu
-		//    h2o4gpu_data.SetRelTol(1e-4); // set how many cuda devices to use internally in h2o4gpu
-		//    h2o4gpu_data.SetAbsTol(1e-5); // set how many cuda devices to use internally in h2o4gpu
-		//    h2o4gpu_data.SetAdaptiveRho(true);
-		//h2o4gpu_data.SetEquil(false);
-		//      h2o4gpu_data.SetRho(1E-6);
-		//      h2o4gpu_data.SetRho(1E-3);
-		h2o4gpu_data.SetRho(1.0);
-		h2o4gpu_data.SetVerbose(verbose);
-		h2o4gpu_data.SetStopEarly(glmstopearly);
-		h2o4gpu_data.SetStopEarlyErrorFraction(stopearlyerrorfraction);
-		h2o4gpu_data.SetMaxIter(max_iterations);
+		auto setupsolver = [&](h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > &solver) {
+			solver.SetnDev(1); // set how many cuda devices to use internally in h2o4gpu
+			//    solver.SetRelTol(1e-4); // set how many cuda devices to use internally in h2o4gpu
+			//    solver.SetAbsTol(1e-5); // set how many cuda devices to use internally in h2o4gpu
+			//    solver.SetAdaptiveRho(true);
+			//solver.SetEquil(false);
+			//      solver.SetRho(1E-6);
+			//      solver.SetRho(1E-3);
+			solver.SetRho(1.0);
+			solver.SetVerbose(verbose);
+			solver.SetStopEarly(glmstopearly);
+			solver.SetStopEarlyErrorFraction(stopearlyerrorfraction);
+			solver.SetMaxIter(max_iterations);
+			solver.SetAnderson(anderson);
+			solver.GetProjector().SetEigen(eigen != 0);
+			if (cachebytes > 0)
+				solver.GetProjector().SetCacheBytes(cachebytes);
+		};
+		if (fullsolver != NULL)
+			setupsolver(*fullsolver);
+
+		// Delete a solver, adding up the factorization reuse of its projector
+		size_t mycachehits = 0, myfactorizations = 0;
+		double myfactortime = 0;
+		auto deletesolver = [&](h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > *&solver) {
+			if (solver == NULL)
+				return;
+			mycachehits += solver->GetProjector().GetCacheHits();
+			myfactorizations += solver->GetProjector().GetFactorizations();
+			myfactortime += solver->GetProjector().GetFactorTime();
+			delete solver;
+			solver = NULL;
+		};
 
 		DEBUG_FPRINTF(fil, "BEGIN SOLVE: %d\n", 0);
 		int fi, a;
 
-		T *X0 = new T[n]();
-		T *L0 = new T[mTrain]();
+		T *X0 = new T[nx]();
+		T *L0 = new T[usecd ? 0 : mTrain](); // coordinate descent has no dual variables
 		int gotpreviousX0 = 0;
+		int L0fold = -1; // fold L0 belongs to, as the dual variables are per training row
+
+		// this thread's current fold (kept while consecutive iterations are on the same fold)
+		int foldon = -1;
+		h2o4gpu::MatrixDense<T> *Afold = NULL;
+		std::shared_ptr<h2o4gpu::MatrixDense<T> > foldsource; // keeps this fold in foldshared
+		h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > *foldsolver = NULL;
+		std::vector<size_t> foldrows, heldrows;
+		std::vector<T> foldX, foldY, foldW, heldY, heldW, heldPreds;
+		std::vector<int> foldind, foldptr; // nonzeros of foldX when sparse
+		std::vector<T> foldgram, foldb;
+		std::vector<double> foldsums;
+		h2o4gpu::GramStats<T> gramFit = gramTrain; // statistics of the rows being fit with Gram statistics
+
+		// strong rule screening: each lambda of the path is solved on the
+		// columns that pass the sequential strong rule (plus the intercept),
+		// the solution is checked against the KKT conditions on all columns
+		// and the violating columns are added before solving again
+		std::vector<size_t> allrows, validrows, screencols, screencand;
+		std::vector<T> screenX, screenDual, screenR, screenBX, screenVX, screenX0;
+		std::vector<double> screenGrad;
+		h2o4gpu::MatrixDense<T> *Ascreen = NULL;
+		h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > *screensolver = NULL;
+		if (screening && !usecd) {
+			if (realfolds <= 1) {
+				allrows.resize(mTrain);
+				for (size_t j = 0; j < mTrain; ++j)
+					allrows[j] = j;
+			}
+			validrows.resize(mValid);
+			for (size_t j = 0; j < mValid; ++j)
+				validrows[j] = j;
+		}
 
 		////////////////////////////
 		//
@@ -754,50 +921,158 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 					// SETUP FOLD (and weights)
 					//
 					////////////
-					// FOLDTYPE: 0 = any portion and can be overlapping
-					// FOLDTYPE: 1 = non-overlapping folds
-#define FOLDTYPE 1
-					T fractrain;
-					if (FOLDTYPE == 0) {
-						fractrain = (realfolds > 1 ? 0.8 : 1.0);
-					} else {
-						fractrain = (
-								realfolds > 1 ?
-								1.0 - 1.0 / ((double) realfolds) : 1.0);
-					}
-					T fracvalid = 1.0 - fractrain;
-					T weights[mTrain];
+					// Rows of fold fi are held out, the solver only sees the other folds' rows.
+					size_t mFit; // number of rows being fit
+					const T *fitY;
+					const T *weights;
 					if (realfolds > 1) {
-						for (unsigned int j = 0; j < mTrain; ++j) {
-							T foldon = 1;
-							int jfold = j - fi * fracvalid * mTrain;
-							if (jfold >= 0 && jfold < fracvalid * mTrain)
-								foldon = 1E-13;
-
-							weights[j] = foldon * trainW[j];
-							//              fprintf(stderr,"a=%d fold=%d j=%d foldon=%g trainW=%g weights=%g\n",a,fi,j,foldon,trainW[j],weights[j]); fflush(stderr);
+						if (fi != foldon) {
+							deletesolver(foldsolver);
+							delete Afold;
+							delete cdsolver;
+							foldrows.clear();
+							heldrows.clear();
+							for (size_t j = 0; j < mRows; ++j) {
+								if (foldof[j] == fi)
+									heldrows.push_back(j);
+								else
+									foldrows.push_back(j);
+							}
+							heldY.resize(heldrows.size());
+							heldW.resize(heldrows.size());
+							heldPreds.resize(heldrows.size() * nclass);
+							for (size_t j = 0; j < heldrows.size(); ++j) {
+								heldY[j] = trainY[heldrows[j]];
+								heldW[j] = trainW[heldrows[j]];
+							}
+							auto buildfold = [&]() {
+								if (sparseTrainX) {
+									h2o4gpu::copyRows(*sparseTrainX, foldrows, foldX, foldind, foldptr);
+								} else {
+									foldX.resize(foldrows.size() * n);
+									h2o4gpu::copyRows(ord, mTrain, n, trainX, foldrows, &foldX[0]);
+								}
+								foldY.resize(foldrows.size());
+								foldW.resize(foldrows.size());
+								for (size_t j = 0; j < foldrows.size(); ++j) {
+									foldY[j] = trainY[foldrows[j]];
+									foldW[j] = trainW[foldrows[j]];
+								}
+							};
+							// matrix on the fold rows, on the CPU it takes them over instead of copying
+							auto makefold = [&](int foldsharedA) {
+								buildfold();
+#ifdef HAVECUDA
+								// fold data is on the host (datatype 0)
+								return new h2o4gpu::MatrixDense<T>(foldsharedA, me, wDev, 0, ord,
+										foldrows.size(), n, mValid, &foldX[0], &foldY[0],
+										validX, validY, &foldW[0]);
+#else
+								return new h2o4gpu::MatrixDense<T>(foldsharedA, me, wDev, ord,
+										foldrows.size(), n, mValid, std::move(foldX), std::move(foldY),
+										validX, validY, std::move(foldW));
+#endif
+							};
+							if (usegram) {
+								// the fold is fit on the statistics of all the rows but its own
+								gramFit = h2o4gpu::gramDifference(gramTrain, gramFolds[fi], foldgram, foldb, foldsums);
+								cdsolver = new h2o4gpu::CoordinateDescent<T>(gramFit);
+								cdsolver->SetMaxIter(max_iterations);
+							} else if (usecd) {
+								buildfold();
+								if (sparseTrainX) {
+									h2o4gpu::CscMatrix<T> foldcsc = {foldrows.size(), n,
+											foldX.empty() ? NULL : &foldX[0],
+											foldind.empty() ? NULL : &foldind[0], &foldptr[0]};
+									cdsolver = new h2o4gpu::CoordinateDescent<T>(family, foldcsc,
+											&foldY[0], &foldW[0], sparseValidX, nclass);
+								} else {
+									cdsolver = new h2o4gpu::CoordinateDescent<T>(family, ord, foldrows.size(), n,
+											&foldX[0], &foldY[0], &foldW[0], mValid, validX, nclass);
+								}
+								cdsolver->SetMaxIter(max_iterations);
+								// the solver keeps its own copy
+								std::vector<T>().swap(foldX);
+								std::vector<int>().swap(foldind);
+								std::vector<int>().swap(foldptr);
+							} else if (sharefolds) {
+								foldsource.reset();
+								std::lock_guard<std::mutex> guard(foldlock[fi]);
+								foldsource = foldshared[fi].lock();
+								if (!foldsource) {
+									foldsource.reset(makefold(sharedA));
+									foldsource->Init();
+									foldsource->Equil(1);
+									foldshared[fi] = foldsource;
+								}
+								Afold = new h2o4gpu::MatrixDense<T>(sharedA, me, wDev, *foldsource);
+							} else {
+								// private to this thread (sharedA 0)
+								Afold = makefold(0);
+							}
+							if (!usecd) {
+								foldsolver = new h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> >(
+										sharefolds ? sharedA : 0, me, wDev, *Afold);
+								setupsolver(*foldsolver);
+							}
+							foldon = fi;
 						}
-					} else {   // then assume meant one should just copy weights
-						for (unsigned int j = 0; j < mTrain; ++j)
-							weights[j] = trainW[j];
+						mFit = foldrows.size();
+						fitY = (usegram ? NULL : usecd ? &foldY[0] : Afold->Datay());
+						weights = (usegram ? NULL : usecd ? &foldW[0] : Afold->Weight());
+					} else {
+						mFit = mRows;
+						fitY = trainY;
+						weights = trainW;
 					}
+					// ADMM solver of this fold (NULL with coordinate descent)
+					h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > *h2o4gpu_data =
+							(realfolds > 1 ? foldsolver : fullsolver);
 
-					// normalize weights before input (method has issue with small typical weights, so avoid normalization and just normalize in error itself only)
-					T sumweight = 0, maxweight = -std::numeric_limits<T>::max();
-					for (unsigned int j = 0; j < mTrain; ++j)
-						sumweight += weights[j];
-					for (unsigned int j = 0; j < mTrain; ++j) {
-						if (maxweight < weights[j])
-							maxweight = weights[j];
-					}
-					if (0) {
-						if (sumweight != 0.0) {
-							for (unsigned int j = 0; j < mTrain; ++j)
-								weights[j] /= sumweight;
-						} else
-							continue; // skip this fi,a
-						//            fprintf(stderr,"a=%d fold=%d sumweights=%g\n",a,fi,sumweight); fflush(stderr);
+					/////////////
+					//
+					// SETUP SCREENING (only along the lambda path and with an L1 penalty)
+					//
+					////////////
+					// (coordinate descent already sweeps only the active columns)
+					const bool doscreen = screening && !usecd && lambdatype == LAMBDATYPEPATH && alpha > 0;
+					const std::vector<size_t> &fitrows = (realfolds > 1 ? foldrows : allrows);
+					const size_t npen = n - intercept; // penalized columns
+					int fullwarm = 1; // h2o4gpu_data holds the current solution as warm start
+					int screenwarm = 0; // screensolver holds the current solution as warm start
+					int havedual = 0; // screenDual holds the dual variables of the current solution
+					int gotgrad = 0; // screenGrad holds the loss gradient at screenX
+					double lambdaprev = -1; // last lambda solved along the path
+					if (doscreen) {
+						deletesolver(screensolver);
+						delete Ascreen;
+						Ascreen = NULL;
+						screencols.clear();
+						screenX.assign(n, static_cast<T>(0));
+						screenDual.resize(mFit);
+						screenR.resize(mFit);
+						screenGrad.resize(n);
 					}
+					// loss gradient A^T (w * (mu(z) - y)) over the fit rows, z are the linear predictions
+					auto lossgradient = [&](const T *z) {
+						for (size_t j = 0; j < mFit; ++j) {
+							T mu = (family == 'l' ? static_cast<T>(1 / (1 + exp(-z[j]))) : z[j]);
+							screenR[j] = weights[j] * (mu - fitY[j]);
+						}
+						h2o4gpu::gradientRows(ord, mTrain, n, trainX, fitrows, &screenR[0], &screenGrad[0]);
+						gotgrad = 1;
+					};
+					// current solution (length n) of this alpha and fold
+					const T *xsol = (usecd ? cdsolver->GetX() : &h2o4gpu_data->GetX()[0]);
+					auto settol = [&](double reltol, double abstol) {
+						if (usecd) {
+							cdsolver->SetRelTol(reltol);
+							cdsolver->SetAbsTol(abstol);
+						} else {
+							h2o4gpu_data->SetRelTol(reltol);
+							h2o4gpu_data->SetAbsTol(abstol);
+						}
+					};
 
 					////////////////////////////
 					//
@@ -819,6 +1094,7 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 					double tbestalpha = -1, tbestlambda = -1, tbesttol =
 							std::numeric_limits<double>::max(),
 							tbesterror[NUMError];
+					size_t tbestscreened = 0;
 					ErrorLOOP(ri)
 						tbesterror[ri] = std::numeric_limits<double>::max();
 
@@ -842,15 +1118,30 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 						if (lambdatype == LAMBDATYPEPATH) {
 
 							// Reset Solution if starting fresh for this alpha
-							if (i == 0) {
+							if (i == 0 && doscreen) {
+								// same warm start, kept on the host until a solver is picked
+								if (gotpreviousX0)
+									memcpy(&screenX[0], X0, n * sizeof(T));
+								havedual = (gotpreviousX0 && L0fold == fi);
+								if (havedual)
+									memcpy(&screenDual[0], L0, mFit * sizeof(T));
+								fullwarm = 0;
+							} else if (i == 0 && usecd) {
+								if (gotpreviousX0)
+									cdsolver->SetInitX(X0);
+								else
+									cdsolver->ResetX();
+							} else if (i == 0) {
 								// see if have previous solution for new alpha for better warmstart
-								if (gotpreviousX0) {
+								// (only together with its dual variables: a fold's solver starting from
+								// another fold's X0 alone can diverge to NaN for logistic regression)
+								if (gotpreviousX0 && L0fold == fi) {
 									//              DEBUG_FPRINTF(stderr,"m=%d a=%d i=%d Using old alpha solution\n",me,a,i);
 									//              for(unsigned int ll=0;ll<n;ll++) DEBUG_FPRINTF(stderr,"X0[%d]=%g\n",ll,X0[ll]);
-									h2o4gpu_data.SetInitX(X0);
-									h2o4gpu_data.SetInitLambda(L0);
+									h2o4gpu_data->SetInitX(X0);
+									h2o4gpu_data->SetInitLambda(L0);
 								} else {
-									h2o4gpu_data.ResetX(); // reset X if new alpha if expect much different solution
+									h2o4gpu_data->ResetX(); // reset X if new alpha if expect much different solution
 								}
 							}
 
@@ -863,8 +1154,7 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 							double jumpuse = DBL_MAX;
 							//h2o4gpu_data.SetRho(maxweight); // can't trust warm start for rho, because if adaptive rho is working hard to get primary or dual residuals below eps, can drive rho out of control even though residuals and objective don't change in error, but then wouldn't be good to start with that rho and won't find solution for any other latter lambda or alpha.  Use maxweight to scale rho, because weight and lambda should scale the same way.
 							tolnew = tol; //*lambda/lambdaslocal[0]; // as lambda gets smaller, so must attempt at relative tolerance, in order to capture affect of lambda regularization on primary term (that is otherwise order unity unless weights are not unity).
-							h2o4gpu_data.SetRelTol(tolnew);
-							h2o4gpu_data.SetAbsTol(
+							settol(tolnew,
 									1.0 * std::numeric_limits<T>::epsilon()); // way code written, has 1+rho and other things where catastrophic cancellation occur for very small weights or rho, so can't go below certain absolute tolerance.  This affects adaptive rho and how warm-start on rho would work.
 							// see if getting below stddev, if so decrease tolerance
 							if (scoring_history.size() >= 1) {
@@ -878,8 +1168,7 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 									if (tolnew < tollow)
 										tolnew = tollow;
 
-									h2o4gpu_data.SetRelTol(tolnew);
-									h2o4gpu_data.SetAbsTol(
+									settol(tolnew,
 											1.0
 													* std::numeric_limits<T>::epsilon()); // way code written, has 1+rho and other things where catastrophic cancellation occur for very small weights or rho, so can't go below certain absolute tolerance.
 									jumpuse = jump;
@@ -887,11 +1176,14 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 								//              fprintf(stderr,"me=%d a=%d i=%d jump=%g jumpuse=%g ratio=%g tolnew=%g norm=%g score=%g\n",me,a,i,jump,jumpuse,ratio,tolnew,norm,scoring_history.back());
 							}
 						} else { // single lambda
-							// assume warm-start value of X and other internal variables
+							// coordinate descent warm starts from this fold's and alpha's lambda-path solution,
+							// ADMM from its own last solution and dual variables (a solver just built for this
+							// fold starts cold: x alone, without its duals, can send ADMM diverging)
+							if (usecd)
+								cdsolver->SetInitX(&foldpathX[(fi * nAlphas + a) * nx]);
 							//                fprintf(stderr,"tolnew to use for last alpha=%g lambda=%g is %g\n",alphaarrayofa[a],lambdaarrayofa[a],tolarrayofa[a]); fflush(stderr);
 							tolnew = tolarrayofa[a];
-							h2o4gpu_data.SetRelTol(tolnew);
-							h2o4gpu_data.SetAbsTol(
+							settol(tolnew,
 									10.0 * std::numeric_limits<T>::epsilon()); // way code written, has 1+rho and other things where catastrophic cancellation occur for very small weights or rho, so can't go below certain absolute tolerance.
 						}
 
@@ -901,47 +1193,171 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 						//
 						////////////////////
 						// setup f,g as functions of alpha
-						std::vector<FunctionObj<T>> f;
-						std::vector<FunctionObj<T>> g;
-						f.reserve(mTrain);
-						g.reserve(n);
+						FunctionVector<T> f;
+						FunctionVector<T> g(n, kAbs);
+						if (intercept) g.SetKind(n - 1, n, kZero);
 
 						/*
 						Start logic for type of `family` argument passed in
 						*/
 						if(family == 'e'){ //elasticnet
 							// minimize ||Ax-b||_2^2 + \alpha\lambda||x||_1 + (1/2)(1-alpha)*lambda x^2
-							for (unsigned int j = 0; j < mTrain; ++j) f.emplace_back(kSquare, 1.0, trainY[j], weights[j]); // h2o4gpu.R
-							for (unsigned int j = 0; j < n - intercept; ++j) g.emplace_back(kAbs);
-							if (intercept) g.emplace_back(kZero);
+							f = FunctionVector<T>(mFit, kSquare); // h2o4gpu.R
+							f.b.Set(fitY, mFit);
+							f.c.Set(weights, mFit);
 						}else if(family == 'l'){ //logistic
 							// minimize \sum_i -d_i y_i + log(1 + e ^ y_i) + \lambda ||x||_1
-							for (unsigned int j = 0; j < mTrain; ++j) f.emplace_back(kLogistic, 1.0, 0.0, weights[j], -weights[j]*trainY[j]); // h2o4gpu.R
-							for (unsigned int j = 0; j < n - intercept; ++j) g.emplace_back(kAbs);
-							if (intercept) g.emplace_back(kZero);
+							f = FunctionVector<T>(mFit, kLogistic); // h2o4gpu.R
+							f.c.Set(weights, mFit);
+							std::vector<T> wy(mFit);
+							for (unsigned int j = 0; j < mFit; ++j) wy[j] = -weights[j]*fitY[j];
+							f.d.Set(wy.data(), mFit);
+						}else if(family == 'm'){ //multinomial
+							// coordinate descent only, which takes the loss from the family and the penalty of
+							// each column (the same for all the classes) from g
 							// }else if(family == 's'){ //svm
 							// 	// minimize (1/2) ||w||_2^2 + \lambda \sum (a_i^T * [w; b] + 1)_+.
-							// 	for (unsigned int j = 0; j < mTrain; ++j) f.emplace_back(kMaxPos0, 1.0, -1.0, weights[j]*lambda); // h2o4gpu.R}
-							// 	for (unsigned int j = 0; j < n - intercept; ++j) g.emplace_back(kSquare);
-							// 	if (intercept) g.emplace_back(kZero);
+							// 	f = FunctionVector<T>(mTrain, kMaxPos0); f.b.Set(-1.0); // c = weights*lambda, h2o4gpu.R
+							// 	g.SetKind(0, n - intercept, kSquare);
 						}else{
 							//throw error
 							throw "Wrong family type selected. Should be either elasticnet or logistic";
 						}
 						T penalty_factor = static_cast<T>(1.0); // like h2o4gpu.R
 						// assign lambda (no penalty for intercept, the last coeff, if present)
-						for (unsigned int j = 0; j < n - intercept; ++j) {
-							g[j].c = static_cast<T>(alpha * lambda
-									* penalty_factor); //for L1
-							g[j].e = static_cast<T>((1.0 - alpha) * lambda
-									* penalty_factor); //for L2
-						}
-						if (intercept) {
-							g[n - 1].c = 0;
-							g[n - 1].e = 0;
+						g.c.Set(static_cast<T>(alpha * lambda * penalty_factor)); //for L1, ignored by kZero
+						g.e.Set(static_cast<T>((1.0 - alpha) * lambda * penalty_factor)); //for L2
+						if (intercept && g.e.value != 0) {
+							std::vector<T> l2(n, g.e.value);
+							l2[n - 1] = 0;
+							g.e.Set(l2.data(), n);
 						}
 						// Solve
-						h2o4gpu_data.Solve(f, g);
+						h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > *solved = h2o4gpu_data;
+						size_t screened = 0; // penalized columns left out of the solve
+						if (usecd) {
+							cdsolver->Solve(g);
+							xsol = cdsolver->GetX();
+						} else if (doscreen) {
+							if (!gotgrad) {
+								h2o4gpu::predictRows(ord, mTrain, n, trainX, fitrows, &screenX[0], &screenR[0]);
+								std::vector<T> z(screenR);
+								lossgradient(&z[0]);
+							}
+							// sequential strong rule: keep the active columns and those with
+							// |gradient| >= alpha*(2*lambda - previous lambda)
+							double cut = alpha * (2.0 * lambda - (lambdaprev > 0 ? lambdaprev : lambda));
+							screencand.clear();
+							size_t jbest = 0;
+							for (size_t j = 0; j < npen; ++j) {
+								if (screenX[j] != 0 || std::abs(screenGrad[j]) >= cut)
+									screencand.push_back(j);
+								if (std::abs(screenGrad[j]) > std::abs(screenGrad[jbest]))
+									jbest = j;
+							}
+							if (screencand.empty() && !intercept)
+								screencand.push_back(jbest); // never solve an empty problem
+							if (intercept)
+								screencand.push_back(n - 1);
+							std::vector<char> instrong(n);
+							while (true) {
+								size_t nstrong = screencand.size() - intercept;
+								if (nstrong > SCREENMAXFRACTION * npen) {
+									// too few columns screened out to gain from a smaller problem
+									if (!fullwarm) {
+										if (havedual || std::any_of(screenX.begin(), screenX.end(), [](T x) { return x != 0; })) {
+											h2o4gpu_data->SetInitX(&screenX[0]);
+											if (havedual)
+												h2o4gpu_data->SetInitLambda(&screenDual[0]);
+										} else {
+											h2o4gpu_data->ResetX(); // nothing to warm start from
+										}
+									}
+									h2o4gpu_data->Solve(f, g);
+									solved = h2o4gpu_data;
+									fullwarm = 1;
+									screenwarm = 0;
+									screened = 0;
+									memcpy(&screenX[0], &h2o4gpu_data->GetX()[0], n * sizeof(T));
+									lossgradient(&h2o4gpu_data->GettrainPreds()[0]);
+									break;
+								}
+								size_t ns = screencand.size();
+								if (screencand != screencols) {
+									// (re)build the reduced problem on the candidate columns
+									screencols = screencand;
+									deletesolver(screensolver);
+									delete Ascreen;
+									screenBX.resize(mFit * ns);
+									h2o4gpu::copyBlock(ord, mTrain, n, trainX, fitrows, screencols, &screenBX[0]);
+									screenVX.resize(mValid * ns);
+									if (mValid > 0)
+										h2o4gpu::copyBlock(ord, mValid, n, validX, validrows, screencols, &screenVX[0]);
+									// host data (datatype 0), private to this thread (sharedA 0)
+									Ascreen = new h2o4gpu::MatrixDense<T>(0, me, wDev, 0, ord, mFit, ns, mValid,
+											&screenBX[0], const_cast<T *>(fitY), mValid > 0 ? &screenVX[0] : NULL,
+											validY, const_cast<T *>(weights));
+									screensolver = new h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> >(
+											0, me, wDev, *Ascreen);
+									setupsolver(*screensolver);
+									screenwarm = 0;
+								}
+								screensolver->SetRelTol(h2o4gpu_data->GetRelTol());
+								screensolver->SetAbsTol(h2o4gpu_data->GetAbsTol());
+								if (!screenwarm) {
+									screenX0.resize(ns);
+									for (size_t k = 0; k < ns; ++k)
+										screenX0[k] = screenX[screencols[k]];
+									if (havedual || std::any_of(screenX0.begin(), screenX0.end(), [](T x) { return x != 0; })) {
+										screensolver->SetInitX(&screenX0[0]);
+										if (havedual)
+											screensolver->SetInitLambda(&screenDual[0]);
+									} else {
+										screensolver->ResetX(); // nothing to warm start from
+									}
+								}
+								screensolver->Solve(f, g.Select(screencols));
+								solved = screensolver;
+								fullwarm = 0;
+								screenwarm = 1;
+								std::fill(screenX.begin(), screenX.end(), static_cast<T>(0));
+								for (size_t k = 0; k < ns; ++k)
+									screenX[screencols[k]] = screensolver->GetX()[k];
+								memcpy(&screenDual[0], &screensolver->GetLambda()[0], mFit * sizeof(T));
+								havedual = 1;
+								screened = npen - (ns - intercept);
+
+								// KKT check: a column left out must have |gradient| <= alpha*lambda
+								// (up to the solver's relative tolerance)
+								lossgradient(&screensolver->GettrainPreds()[0]);
+								std::fill(instrong.begin(), instrong.end(), 0);
+								for (size_t k = 0; k < ns; ++k)
+									instrong[screencols[k]] = 1;
+								double bound = alpha * lambda * (1.0 + tolnew);
+								size_t nviolations = 0;
+								for (size_t j = 0; j < npen; ++j) {
+									if (!instrong[j] && std::abs(screenGrad[j]) > bound) {
+										screencand.push_back(j);
+										nviolations++;
+									}
+								}
+								if (nviolations == 0)
+									break;
+								// keep columns ordered, the intercept (n-1) last
+								std::sort(screencand.begin(), screencand.end());
+								DEBUG_FPRINTF(fil, "lambda %d: %zu strong rule violations\n", i, nviolations);
+							}
+							lambdaprev = lambda;
+							xsol = &screenX[0];
+						} else {
+							h2o4gpu_data->Solve(f, g);
+							xsol = &h2o4gpu_data->GetX()[0];
+						}
+						// iterations and predictions of the solver that gave xsol
+						const unsigned int finaliter = (usecd ? cdsolver->GetFinalIter() : solved->GetFinalIter());
+						const unsigned int maxiter = (usecd ? cdsolver->GetMaxIter() : solved->GetMaxIter());
+						const T *solvedtrainpreds = (usecd ? cdsolver->GettrainPreds() : &solved->GettrainPreds()[0]);
+						const T *solvedvalidpreds = (usecd ? cdsolver->GetvalidPreds() : &solved->GetvalidPreds()[0]);
 
 						int doskiplambda = 0;
 						if (lambdatype == LAMBDATYPEPATH) {
@@ -950,7 +1366,7 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 							// Check if getting solution was too easy and was 0 iterations.  If so, overhead is not worth it, so try skipping by 1.
 							//
 							/////////////////
-							if (h2o4gpu_data.GetFinalIter() == 0) {
+							if (finaliter == 0) {
 								doskiplambda = 1;
 								skiplambdaamount++;
 							} else {
@@ -964,32 +1380,43 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 							//
 							////////////////////////////////////////////
 							int maxedout = 0;
-							if (h2o4gpu_data.GetFinalIter()
-									== h2o4gpu_data.GetMaxIter())
+							if (finaliter == maxiter)
 								maxedout = 1;
 							else
 								maxedout = 0;
 
-							if (maxedout)
-								h2o4gpu_data.ResetX(); // reset X if bad solution so don't start next lambda with bad solution
+							if (maxedout) {
+								// reset X if bad solution so don't start next lambda with bad solution
+								if (usecd)
+									cdsolver->ResetX();
+								else
+									solved->ResetX();
+								if (doscreen) {
+									std::fill(screenX.begin(), screenX.end(), static_cast<T>(0));
+									havedual = 0;
+									gotgrad = 0;
+								}
+							}
 							// store good high-lambda solution to start next alpha with (better than starting with low-lambda solution)
 							if (gotX0 == 0 && maxedout == 0) {
 								gotX0 = 1;
 								// TODO: FIXME: Need to get (and have solver set) best solution or return all, because last is not best.
 								gotpreviousX0 = 1;
-								memcpy(X0, &h2o4gpu_data.GetX()[0],
-									   n * sizeof(T));
-								memcpy(L0, &h2o4gpu_data.GetLambda()[0],
-									   mTrain * sizeof(T));
+								memcpy(X0, xsol, nx * sizeof(T));
+								if (!usecd) { // coordinate descent has no dual variables
+									memcpy(L0, &solved->GetLambda()[0],
+										   mFit * sizeof(T));
+									L0fold = fi;
+								}
 							}
 
 						}
 
 						if (intercept) {
 							DEBUG_FPRINTF(fil, "intercept: %g\n",
-										  h2o4gpu_data.GetX()[n - 1]);
+										  xsol[n - 1]);
 							DEBUG_FPRINTF(stdout, "intercept: %g\n",
-										  h2o4gpu_data.GetX()[n - 1]);
+										  xsol[n - 1]);
 						}
 
 						////////////////////////////////////////
@@ -998,12 +1425,15 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 						//
 						//////////////////////////////////////////
 
-						// Degrees of freedom
+						// Degrees of freedom (columns used by any class)
 						size_t dof = 0;
 						{
 							for (size_t i = 0; i < n - intercept; ++i) {
-								if (std::abs(h2o4gpu_data.GetX()[i]) > 1e-8) {
-									dof++;
+								for (size_t k = 0; k < nclass; ++k) {
+									if (std::abs(xsol[k * n + i]) > 1e-8) {
+										dof++;
+										break;
+									}
 								}
 							}
 						}
@@ -1013,17 +1443,17 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 						int whichmax = 1; // 0 : larger  1: largest absolute magnitude
 						h2o4gpu::topkwrap(whichmax, (int) (n - intercept),
 										  (int) (NUMBETA),
-										  const_cast<T*>(&h2o4gpu_data.GetX()[0]),
+										  const_cast<T*>(xsol),
 										  &whichbeta[0], &valuebeta[0]);
 
 						//              memcpy(X0,&h2o4gpu_data.GetX()[0],n*sizeof(T));
 						if (0) {
-							std::sort(const_cast<T*>(&h2o4gpu_data.GetX()[0]),
-									  const_cast<T*>(&h2o4gpu_data.GetX()[n
+							std::sort(const_cast<T*>(xsol),
+									  const_cast<T*>(&xsol[n
 											  - intercept]));
 							for (size_t i = 0; i < n - intercept; ++i) {
 								fprintf(stderr, "BETA: i=%zu beta=%g\n", i,
-										h2o4gpu_data.GetX()[i]);
+										xsol[i]);
 								fflush(stderr);
 							}
 						}
@@ -1034,13 +1464,12 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 						for (size_t i = 0; i < mTrain; ++i) {
 							trainPreds[i] = 0;
 							for (size_t j = 0; j < n; ++j) {
-								trainPreds[i] += h2o4gpu_data.GetX()[j] * trainX[i * n + j]; //add predictions
+								trainPreds[i] += xsol[j] * trainX[i * n + j]; //add predictions
 							}
 						}
 #else
-						std::vector<T> trainPreds(
-								&h2o4gpu_data.GettrainPreds()[0],
-								&h2o4gpu_data.GettrainPreds()[0] + mTrain);
+						std::vector<T> trainPreds(solvedtrainpreds,
+								solvedtrainpreds + mFit * nclass);
 						//              for(unsigned int iii=0;iii<mTrain;iii++){
 						//                fprintf(stderr,"trainPreds[%d]=%g\n",iii,trainPreds[iii]);
 						//              }
@@ -1048,13 +1477,21 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 						//Compute inverse logit of predictions if family == 'logistic' to get actual probabilities.
 						if(family == 'l'){
 							std::transform(trainPreds.begin(), trainPreds.end(), trainPreds.begin(),[](T i) -> T { return 1/(1+exp(-i)); });
+						} else if (family == 'm') {
+							h2o4gpu::softmaxRows(mFit, nclass, &trainPreds[0]);
 						}
 						// Error: TRAIN
-						trainError = h2o4gpu::getError(weights, mTrain,
-													   &trainPreds[0], trainY, family);
+						if (usegram)
+							trainError = h2o4gpu::gramError(gramFit, xsol);
+						else if (family == 'm')
+							trainError = h2o4gpu::multinomialError(weights, mFit, nclass,
+																   &trainPreds[0], fitY);
+						else
+							trainError = h2o4gpu::getError(weights, mFit,
+														   &trainPreds[0], fitY, family);
 
 						if(verbose){
-							if(family == 'l'){
+							if(family != 'e'){
 								std::cout << "Training Logloss = " << trainError << " for lambda = " << lambda << " and alpha = " << alpha << std::endl;
 							} else {
 								std::cout << "Training RMSE = " << trainError << " for lambda = " << lambda << " and alpha = " << alpha << std::endl;
@@ -1062,7 +1499,7 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 						}
 						if (standardize) {
 							trainError *= sdTrainY;
-							for (size_t i = 0; i < mTrain; ++i) {
+							for (size_t i = 0; i < mFit; ++i) {
 								// reverse standardization
 								trainPreds[i] *= sdTrainY; //scale
 								trainPreds[i] += meanTrainY; //intercept
@@ -1072,11 +1509,37 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 
 						// Error: on fold's held-out training data
 						if (realfolds > 1) {
-							const T offset = 1.0;
-							ivalidError = h2o4gpu::getError(offset, weights,
-															mTrain, &trainPreds[0], trainY, family);
-							if(verbose){
+							if (usegram) {
+								ivalidError = h2o4gpu::gramError(gramFolds[fi], xsol);
+							} else {
+								std::vector<T> classPreds(nclass > 1 ? heldrows.size() : 0);
+								for (size_t k = 0; k < nclass; ++k) {
+									T *preds = (nclass > 1 ? &classPreds[0] : &heldPreds[0]);
+									if (sparseTrainX)
+										h2o4gpu::predictRows(*sparseTrainX, heldrows, &xsol[k * n], preds);
+									else
+										h2o4gpu::predictRows(ord, mTrain, n, trainX, heldrows,
+															 &xsol[k * n], preds);
+									for (size_t j = 0; nclass > 1 && j < heldrows.size(); ++j)
+										heldPreds[j * nclass + k] = classPreds[j];
+								}
 								if(family == 'l'){
+									std::transform(heldPreds.begin(), heldPreds.end(), heldPreds.begin(),[](T i) -> T { return 1/(1+exp(-i)); });
+								} else if (family == 'm') {
+									h2o4gpu::softmaxRows(heldrows.size(), nclass, &heldPreds[0]);
+								}
+								if (family == 'm')
+									ivalidError = h2o4gpu::multinomialError(&heldW[0], heldrows.size(), nclass,
+																			&heldPreds[0], &heldY[0]);
+								else
+									ivalidError = h2o4gpu::getError(&heldW[0], heldrows.size(),
+																	&heldPreds[0], &heldY[0], family);
+							}
+							if (standardize) {
+								ivalidError *= sdTrainY;
+							}
+							if(verbose){
+								if(family != 'e'){
 									std::cout << "Average CV Logloss = " << ivalidError << " for lambda = " << lambda << " and alpha = " << alpha << std::endl;
 								} else {
 									std::cout << "Average CV RMSE = " << ivalidError << " for lambda = " << lambda << " and alpha = " << alpha << std::endl;
@@ -1088,12 +1551,17 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 
 						// VALID (preds and error)
 						validError = -1;
-						if (mValid > 0) {
-
-							T weightsvalid[mValid];
-							for (size_t i = 0; i < mValid; ++i) {          //row
-								weightsvalid[i] = 1.0;
+						if (mValid > 0 && usegram) {
+							validError = h2o4gpu::gramError(*gramValid, xsol);
+							if(verbose){
+								std::cout << "Validation RMSE = " << validError << " for lambda = " << lambda << " and alpha = " << alpha << std::endl;
+							}
+							if (standardize) {
+								validError *= sdTrainY;
 							}
+						} else if (mValid > 0) {
+
+							std::vector<T> weightsvalid(mValid, 1.0);
 
 							// Valid Preds
 #if(OLDPRED)
@@ -1101,25 +1569,30 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 							for (size_t i = 0; i < mValid; ++i) { //row
 								validPreds[i] = 0;
 								for (size_t j = 0; j < n; ++j) { //col
-									validPreds[i] += h2o4gpu_data.GetX()[j] * validX[i * n + j];//add predictions
+									validPreds[i] += xsol[j] * validX[i * n + j];//add predictions
 								}
 							}
 #else
 
-							std::vector<T> validPreds(
-									&h2o4gpu_data.GetvalidPreds()[0],
-									&h2o4gpu_data.GetvalidPreds()[0] + mValid);
+							std::vector<T> validPreds(solvedvalidpreds,
+									solvedvalidpreds + mValid * nclass);
 #endif
 							//Compute inverse logit of predictions if family == 'logistic' to get actual probabilities.
 							if(family == 'l'){
 								std::transform(validPreds.begin(), validPreds.end(), validPreds.begin(),[](T i) -> T { return 1/(1+exp(-i)); });
+							} else if (family == 'm') {
+								h2o4gpu::softmaxRows(mValid, nclass, &validPreds[0]);
 							}
 							// Error: VALIDs
-							validError = h2o4gpu::getError(weightsvalid, mValid,
-														   &validPreds[0], validY, family);
+							if (family == 'm')
+								validError = h2o4gpu::multinomialError(&weightsvalid[0], mValid, nclass,
+																	   &validPreds[0], validY);
+							else
+								validError = h2o4gpu::getError(&weightsvalid[0], mValid,
+															   &validPreds[0], validY, family);
 
 							if(verbose){
-								if(family == 'l'){
+								if(family != 'e'){
 									std::cout << "Validation Logloss = " << validError << " for lambda = " << lambda << " and alpha = " << alpha << std::endl;
 								} else {
 									std::cout << "Validation RMSE = " << validError << " for lambda = " << lambda << " and alpha = " << alpha << std::endl;
@@ -1161,6 +1634,7 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 							tbestalpha = alpha;
 							tbestlambda = lambda;
 							tbesttol = tolnew;
+							tbestscreened = screened;
 							ErrorLOOP(ri)
 								tbesterror[ri] = localerror[ri];
 						}
@@ -1172,38 +1646,43 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 							if (fi == 0 && givefullpath) { // only store first fold for user
 								//#define MAPXALL(i,a,which) (which + a*(n+NUMError+NUMOTHER) + i*(n+NUMError+NUMOTHER)*nlambdas)
 								//#define MAPXBEST(a,which) (which + a*(n+NUMError+NUMOTHER))
-								//#define NUMOTHER 3 // for lambda, alpha, tolnew
+								//#define NUMOTHER 4 // for lambda, alpha, tolnew, screened
 								// Save solution to return to user
 								memcpy(&((*Xvsalphalambda)[MAPXALL(i, a, 0)]),
-									   &h2o4gpu_data.GetX()[0],
-									   n * sizeof(T));
+									   xsol,
+									   nx * sizeof(T));
 								// Save error to return to user
 								ErrorLOOP(ri)
-									(*Xvsalphalambda)[MAPXALL(i, a, n + ri)] =
+									(*Xvsalphalambda)[MAPXALL(i, a, nx + ri)] =
 											localerror[ri];
 								// Save lambda to return to user
-								(*Xvsalphalambda)[MAPXALL(i, a, n+NUMError)] =
+								(*Xvsalphalambda)[MAPXALL(i, a, nx+NUMError)] =
 										lambda;
 								// Save alpha to return to user
-								(*Xvsalphalambda)[MAPXALL(i, a, n+NUMError+1)] =
+								(*Xvsalphalambda)[MAPXALL(i, a, nx+NUMError+1)] =
 										alpha;
 								// Save tolnew to return to user
-								(*Xvsalphalambda)[MAPXALL(i, a, n+NUMError+2)] =
+								(*Xvsalphalambda)[MAPXALL(i, a, nx+NUMError+2)] =
 										tolnew;
+								// Save number of screened out features to return to user
+								(*Xvsalphalambda)[MAPXALL(i, a, nx+NUMError+3)] =
+										screened;
 							}
 						} else {                  // only done if realfolds>1
 							memcpy(&((*Xvsalpha)[MAPXBEST(a, 0)]),
-								   &h2o4gpu_data.GetX()[0], n * sizeof(T));
+								   xsol, nx * sizeof(T));
 							// Save error to return to user
 							ErrorLOOP(ri)
-								(*Xvsalpha)[MAPXBEST(a, n + ri)] =
+								(*Xvsalpha)[MAPXBEST(a, nx + ri)] =
 										localerror[ri];
 							// Save lambda to return to user
-							(*Xvsalpha)[MAPXBEST(a, n+NUMError)] = lambda;
+							(*Xvsalpha)[MAPXBEST(a, nx+NUMError)] = lambda;
 							// Save alpha to return to user
-							(*Xvsalpha)[MAPXBEST(a, n+NUMError+1)] = alpha;
+							(*Xvsalpha)[MAPXBEST(a, nx+NUMError+1)] = alpha;
 							// Save tolnew to return to user
-							(*Xvsalpha)[MAPXBEST(a, n+NUMError+2)] = tolnew;
+							(*Xvsalpha)[MAPXBEST(a, nx+NUMError+2)] = tolnew;
+							// Save number of screened out features to return to user
+							(*Xvsalpha)[MAPXBEST(a, nx+NUMError+3)] = screened;
 						}
 
 						if (lambdatype == LAMBDATYPEPATH) {
@@ -1260,6 +1739,11 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 
 					} // over lambda(s)
 
+					if (lambdatype == LAMBDATYPEPATH && realfolds > 1 && usecd) {
+						memcpy(&foldpathX[(fi * nAlphas + a) * nx],
+							   xsol, nx * sizeof(T));
+					}
+
 					// store results
 					int pickfi;
 					if (lambdatype == LAMBDATYPEPATH)
@@ -1277,18 +1761,20 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 					if (lambdatype == LAMBDATYPEPATH && nFolds < 2) {
 						if (fi == 0) { // only store first fold for user
 							memcpy(&((*Xvsalpha)[MAPXBEST(a, 0)]),
-								   &h2o4gpu_data.GetX()[0], n * sizeof(T)); // not quite best, last lambda TODO FIXME
+								   xsol, nx * sizeof(T)); // not quite best, last lambda TODO FIXME
 							//                for(unsigned int iii=0; iii<n;iii++) fprintf(stderr,"Xvsalpha[%d]=%g\n",iii,(*Xvsalpha)[MAPXBEST(a,iii)]); fflush(stderr);
 							// Save error to return to user
 							ErrorLOOP(ri)
-								(*Xvsalpha)[MAPXBEST(a, n + ri)] =
+								(*Xvsalpha)[MAPXBEST(a, nx + ri)] =
 										tbesterror[ri];
 							// Save lambda to return to user
-							(*Xvsalpha)[MAPXBEST(a, n+NUMError)] = tbestlambda;
+							(*Xvsalpha)[MAPXBEST(a, nx+NUMError)] = tbestlambda;
 							// Save alpha to return to user
-							(*Xvsalpha)[MAPXBEST(a, n+NUMError+1)] = tbestalpha;
+							(*Xvsalpha)[MAPXBEST(a, nx+NUMError+1)] = tbestalpha;
 							// Save tol to return to user
-							(*Xvsalpha)[MAPXBEST(a, n+NUMError+2)] = tbesttol;
+							(*Xvsalpha)[MAPXBEST(a, nx+NUMError+2)] = tbesttol;
+							// Save number of screened out features to return to user
+							(*Xvsalpha)[MAPXBEST(a, nx+NUMError+3)] = tbestscreened;
 						}
 					}
 
@@ -1355,8 +1841,22 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 			delete[] X0;
 		if (L0)
 			delete[] L0;
+		deletesolver(screensolver);
+		delete Ascreen;
+		deletesolver(foldsolver);
+		delete Afold;
+		delete cdsolver;
+		foldsource.reset();
+		deletesolver(fullsolver);
+		delete A_;
 		if (fil != NULL)
 			fclose(fil);
+#pragma omp critical
+		{
+			*cachehits += mycachehits;
+			*factorizations += myfactorizations;
+			*factortime += myfactortime;
+		}
 	} // end parallel region
 
 	///////////////////////
@@ -1380,11 +1880,11 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 	}
 
 	// free any malloc's
-	if (trainX && OLDPRED)
+	if (trainX)
 		free(trainX);
 	if (trainY)
 		free(trainY);
-	if (validX && OLDPRED)
+	if (validX)
 		free(validX);
 	if (validY)
 		free(validY);
@@ -1409,18 +1909,19 @@ double ElasticNetptr_fit(const char family, int sourceDev, int datatype, int sha
 }
 
 template<typename T>
-double ElasticNetptr_predict(const char family, int sourceDev, int datatype, int sharedA,
+double ElasticNetptr_predict(const char family, const char solver, int sourceDev, int datatype, int sharedA,
 							 int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain, size_t n,
 							 size_t mValid, int intercept, int standardize,
-							 double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+							 double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 							 int nAlphas, double alpha_min, double alpha_max,
 							 T *alphas, T *lambdas,
 							 double tol, double tol_seek_factor,
-							 int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations, int verbose,
+							 int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations, int verbose,
 							 T *trainXptr, T *trainYptr, T *validXptr, T *validYptr,
 							 T *weightptr, int givefullpath, T **Xvsalphalambda, T **Xvsalpha,
 							 T **validPredsvsalphalambda, T **validPredsvsalpha, size_t *countfull,
-							 size_t *countshort, size_t *countmore) {
+							 size_t *countshort, size_t *countmore, size_t *cachehits,
+							 size_t *factorizations, double *factortime) {
 
 
 	// Adjust any parameters for user friendliness
@@ -1431,6 +1932,10 @@ double ElasticNetptr_predict(const char family, int sourceDev, int datatype, int
 	signal(SIGINT, my_function);
 	signal(SIGTERM, my_function);
 	int nlambda = nLambdas;
+	if (family == 'm') {
+		throw "Multinomial models are predicted from their coefficients, not with the solver";
+	}
+	const size_t nx = n; // single response models only
 
 	FILE *filerror = NULL;
 	if(VERBOSEANIM){
@@ -1534,7 +2039,8 @@ double ElasticNetptr_predict(const char family, int sourceDev, int datatype, int
 
 		// choose GPU device ID for each thread
 		int wDev = gpu_id + (nGPUs > 0 ? me % nGPUs : 0);
-		wDev = wDev % totalnGPUs;
+		if (totalnGPUs > 0) // no GPUs at all on a CPU-only machine
+			wDev = wDev % totalnGPUs;
 
 		FILE *fil=NULL;
 		if(VERBOSEANIM){
@@ -1579,6 +2085,15 @@ double ElasticNetptr_predict(const char family, int sourceDev, int datatype, int
 
 		int a, i;
 
+		// Full path: every (lambda, alpha) solution is a column of Xvsalphalambda
+		// (leading dimension n+NUMError+NUMOTHER), so score them all with one GEMM
+		// straight into validPredsvsalphalambda (already in MAPPREDALL order).
+		if (givefullpath) {
+#pragma omp single
+			h2o4gpu_data.PredictBatch(*Xvsalphalambda, n + NUMError + NUMOTHER,
+					(size_t) nlambda * nAlphas, *validPredsvsalphalambda);
+		}
+
 		//////////////////////////////
 		// LOOP OVER ALPHAS
 		///////////////////////////////
@@ -1596,25 +2111,27 @@ double ElasticNetptr_predict(const char family, int sourceDev, int datatype, int
 			// LOOP over lambda
 			for (i = 0; i < nlambdalocal; ++i) {
 
-				// copy existing solution to X0
-				T *X0 = new T[n]();
+				T *X0 = NULL;
+				std::vector<T> validPreds(mValid);
 				if (givefullpath) {
-					memcpy(X0, &((*Xvsalphalambda)[MAPXALL(i, a, 0)]),
-							n * sizeof(T));
+					// Get valid prediction from the batched product
+					T *pathPreds = &((*validPredsvsalphalambda)[MAPPREDALL(i, a, 0, mValid)]);
+					validPreds.assign(pathPreds, pathPreds + mValid);
 				} else {
+					// copy existing solution to X0
+					X0 = new T[n]();
 					memcpy(X0, &((*Xvsalpha)[MAPXBEST(a, 0)]), n * sizeof(T));
-				}
 
-				// set X from X0
-				h2o4gpu_data.SetInitX(X0);
+					// set X from X0
+					h2o4gpu_data.SetInitX(X0);
 
+					// compute predictions
+					h2o4gpu_data.Predict();
 
-				// compute predictions
-				h2o4gpu_data.Predict();
-
-				// Get valid prediction
-				std::vector<T> validPreds(&h2o4gpu_data.GetvalidPreds()[0],
-						&h2o4gpu_data.GetvalidPreds()[0] + mValid);
+					// Get valid prediction
+					validPreds.assign(&h2o4gpu_data.GetvalidPreds()[0],
+							&h2o4gpu_data.GetvalidPreds()[0] + mValid);
+				}
 
 				//Compute inverse logit of predictions if family == 'logistic' to get actual probabilities.
 				if(family == 'l'){
@@ -1724,89 +2241,179 @@ double ElasticNetptr_predict(const char family, int sourceDev, int datatype, int
 }
 
 template double ElasticNetptr<double>(
-		const char family, int dopredict, int sourceDev,
+		const char family, const char solver, int dopredict, int sourceDev,
 		int datatype, int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord,
 		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max,
 		double *alphas, double *lambdas,
 		double tol,  double tolseekfactor,
-		int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
 		int verbose, double *trainXptr, double *trainYptr, double *validXptr,
 		double *validYptr, double *weightptr, int givefullpath,
 		double **Xvsalphalambda, double **Xvsalpha,
 		double **validPredsvsalphalambda, double **validPredsvsalpha,
-		size_t *countfull, size_t *countshort, size_t *countmore);
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
 
-template double ElasticNetptr<float>(const char family, int dopredict, int sourceDev, int datatype,
+template double ElasticNetptr<float>(const char family, const char solver, int dopredict, int sourceDev, int datatype,
 		int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain,
 		size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max,
 		float *alphas, float *lambdas,
 		double tol,  double tolseekfactor,
-		int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
 		int verbose, float *trainXptr, float *trainYptr, float *validXptr,
 		float *validYptr, float *weightptr, int givefullpath,
 		float **Xvsalphalambda, float **Xvsalpha,
 		float **validPredsvsalphalambda, float **validPredsvsalpha,
-		size_t *countfull, size_t *countshort, size_t *countmore);
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
 
-template double ElasticNetptr_fit<double>(const char family, int sourceDev, int datatype,
+template double ElasticNetptr_fit<double>(const char family, const char solver, int sourceDev, int datatype,
 		int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain,
 		size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max,
 		double *alphas, double *lambdas,
 		double tol,  double tolseekfactor,
-		int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
 		int verbose, double *trainXptr, double *trainYptr, double *validXptr,
 		double *validYptr, double *weightptr, int givefullpath,
 		double **Xvsalphalambda, double **Xvsalpha,
 		double **validPredsvsalphalambda, double **validPredsvsalpha,
-		size_t *countfull, size_t *countshort, size_t *countmore);
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime,
+		const h2o4gpu::CscMatrix<double> *sparseTrainX, const h2o4gpu::CscMatrix<double> *sparseValidX,
+		const h2o4gpu::GramStats<double> *gramFolds, const h2o4gpu::GramStats<double> *gramValid);
 
-template double ElasticNetptr_fit<float>(const char family, int sourceDev, int datatype,
+template double ElasticNetptr_fit<float>(const char family, const char solver, int sourceDev, int datatype,
 		int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain,
 		size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max,
 		float *alphas, float *lambdas,
 		double tol,  double tolseekfactor,
-		int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
 		int verbose, float *trainXptr, float *trainYptr, float *validXptr,
 		float *validYptr, float *weightptr, int givefullpath,
 		float **Xvsalphalambda, float **Xvsalpha,
 		float **validPredsvsalphalambda, float **validPredsvsalpha,
-		size_t *countfull, size_t *countshort, size_t *countmore);
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime,
+		const h2o4gpu::CscMatrix<float> *sparseTrainX, const h2o4gpu::CscMatrix<float> *sparseValidX,
+		const h2o4gpu::GramStats<float> *gramFolds, const h2o4gpu::GramStats<float> *gramValid);
 
-template double ElasticNetptr_predict<double>(const char family, int sourceDev, int datatype,
+template double ElasticNetptr_predict<double>(const char family, const char solver, int sourceDev, int datatype,
 		int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain,
 		size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max,
 		double *alphas, double *lambdas,
 		double tol,  double tolseekfactor,
-		int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
 		int verbose, double *trainXptr, double *trainYptr, double *validXptr,
 		double *validYptr, double *weightptr, int givefullpath,
 		double **Xvsalphalambda, double **Xvsalpha,
 		double **validPredsvsalphalambda, double **validPredsvsalpha,
-		size_t *countfull, size_t *countshort, size_t *countmore);
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
 
-template double ElasticNetptr_predict<float>(const char family, int sourceDev, int datatype,
+template double ElasticNetptr_predict<float>(const char family, const char solver, int sourceDev, int datatype,
 		int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain,
 		size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max,
 		float *alphas, float *lambdas,
 		double tol,  double tolseekfactor,
-		int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
 		int verbose, float *trainXptr, float *trainYptr, float *validXptr,
 		float *validYptr, float *weightptr, int givefullpath,
 		float **Xvsalphalambda, float **Xvsalpha,
 		float **validPredsvsalphalambda, float **validPredsvsalpha,
-		size_t *countfull, size_t *countshort, size_t *countmore);
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
+
+template<typename T>
+double ElasticNetptr_sparse(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
+		int nAlphas, double alpha_min, double alpha_max,
+		T *alphas, T *lambdas,
+		double tol, double tolseekfactor,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int verbose, T *trainval, int *trainind, int *trainptr, T *trainY,
+		T *validval, int *validind, int *validptr, T *validY,
+		T *weight, int givefullpath, T **Xvsalphalambda, T **Xvsalpha,
+		T **validPredsvsalphalambda, T **validPredsvsalpha, size_t *countfull,
+		size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime) {
+	h2o4gpu::CscMatrix<T> trainX = {mTrain, n, trainval, trainind, trainptr};
+	h2o4gpu::CscMatrix<T> validX = {mValid, n, validval, validind, validptr};
+	std::vector<T> ones;
+	if (weight == NULL) {
+		ones.assign(mTrain, static_cast<T>(1.0));
+		weight = &ones[0];
+	}
+	// the data is used in place on the host by the coordinate descent solver,
+	// only the response and weights are copied by the source matrix
+	return ElasticNetptr_fit(family, 'c', 0, 1, 0, nThreads, gpu_id, nGPUs, totalnGPUs,
+			'c', mTrain, n, mValid, intercept, standardize,
+			lambda_max, lambda_min_ratio, nLambdas, nFolds, foldid,
+			nAlphas, alpha_min, alpha_max,
+			alphas, lambdas,
+			tol, tolseekfactor,
+			lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose,
+			(T *) NULL, trainY, (T *) NULL, validY, weight, givefullpath,
+			Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
+			validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime,
+			&trainX, (mValid > 0 && validptr != NULL ? &validX : NULL));
+}
+
+template<typename T>
+double ElasticNetptr_gram(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		int nAlphas, double alpha_min, double alpha_max,
+		T *alphas, T *lambdas,
+		double tol, double tolseekfactor,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int verbose, T *traingram, T *trainb, double *trainsums,
+		T *validgram, T *validb, double *validsums,
+		int givefullpath, T **Xvsalphalambda, T **Xvsalpha,
+		T **validPredsvsalphalambda, T **validPredsvsalpha, size_t *countfull,
+		size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime) {
+	if (family != 'e') {
+		throw "Only the elasticnet family can be fit on Gram statistics";
+	}
+	size_t nsets = (nFolds > 1 ? nFolds : 1);
+	std::vector<h2o4gpu::GramStats<T> > trainstats(nsets);
+	for (size_t f = 0; f < nsets; ++f) {
+		h2o4gpu::GramStats<T> stats = {n, &traingram[f * n * n], &trainb[f * n],
+				&trainsums[f * h2o4gpu::kGramSums]};
+		trainstats[f] = stats;
+	}
+	h2o4gpu::GramStats<T> validstats = {n, validgram, validb, validsums};
+	if (validgram == NULL)
+		mValid = 0;
+	// only the statistics are used, by the coordinate descent solver
+	return ElasticNetptr_fit(family, 'c', 0, 1, 0, nThreads, gpu_id, nGPUs, totalnGPUs,
+			'c', mTrain, n, mValid, intercept, standardize,
+			lambda_max, lambda_min_ratio, nLambdas, nFolds, (int *) NULL,
+			nAlphas, alpha_min, alpha_max,
+			alphas, lambdas,
+			tol, tolseekfactor,
+			lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose,
+			(T *) NULL, (T *) NULL, (T *) NULL, (T *) NULL, (T *) NULL, givefullpath,
+			Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
+			validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime,
+			(const h2o4gpu::CscMatrix<T> *) NULL, (const h2o4gpu::CscMatrix<T> *) NULL,
+			&trainstats[0], (mValid > 0 ? &validstats : NULL));
+}
 
 template<typename T>
 int modelFree2(T *aptr) {
@@ -1817,55 +2424,168 @@ int modelFree2(T *aptr) {
 template int modelFree2<float>(float *aptr);
 template int modelFree2<double>(double *aptr);
 
-double elastic_net_ptr_double(const char family, int dopredict, int sourceDev, int datatype,
+double elastic_net_ptr_double(const char family, const char solver, int dopredict, int sourceDev, int datatype,
 		int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain,
 		size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max,
 		double *alphas, double *lambdas,
 		double tol,  double tolseekfactor,
-		int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
 		int verbose, double *trainXptr, double *trainYptr, double *validXptr,
 		double *validYptr, double *weightptr, int givefullpath,
 		double **Xvsalphalambda, double **Xvsalpha,
 		double **validPredsvsalphalambda, double **validPredsvsalpha,
-		size_t *countfull, size_t *countshort, size_t *countmore) {
-	return ElasticNetptr<double>(family, dopredict, sourceDev, datatype, sharedA,
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime) {
+	return ElasticNetptr<double>(family, solver, dopredict, sourceDev, datatype, sharedA,
 			nThreads, gpu_id, nGPUs, totalnGPUs, ord, mTrain, n, mValid, intercept, standardize,
-			lambda_max, lambda_min_ratio, nLambdas, nFolds,
+			lambda_max, lambda_min_ratio, nLambdas, nFolds, foldid,
 			nAlphas, alpha_min, alpha_max,
 			alphas, lambdas,
 			tol, tolseekfactor,
-			lambdastopearly, glmstopearly, stopearlyerrorfraction, max_iterations, verbose, trainXptr,
+			lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose, trainXptr,
 			trainYptr, validXptr, validYptr, weightptr, givefullpath,
 			Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
-			validPredsvsalpha, countfull, countshort, countmore);
+			validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime);
 }
-double elastic_net_ptr_float(const char family, int dopredict, int sourceDev, int datatype,
+double elastic_net_ptr_float(const char family, const char solver, int dopredict, int sourceDev, int datatype,
 		int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain,
 		size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max,
 		float *alphas, float *lambdas,
 		double tol,  double tolseekfactor,
-		int lambdastopearly, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
 		int verbose, float *trainXptr, float *trainYptr, float *validXptr,
 		float *validYptr, float *weightptr, int givefullpath,
 		float **Xvsalphalambda, float **Xvsalpha,
 		float **validPredsvsalphalambda, float **validPredsvsalpha,
-		size_t *countfull, size_t *countshort, size_t *countmore) {
-	return ElasticNetptr<float>(family, dopredict, sourceDev, datatype, sharedA,
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime) {
+	return ElasticNetptr<float>(family, solver, dopredict, sourceDev, datatype, sharedA,
 			nThreads, gpu_id, nGPUs, totalnGPUs, ord, mTrain, n, mValid, intercept, standardize,
-			lambda_max, lambda_min_ratio, nLambdas, nFolds,
+			lambda_max, lambda_min_ratio, nLambdas, nFolds, foldid,
 			nAlphas, alpha_min, alpha_max,
 			alphas, lambdas,
 			tol, tolseekfactor,
-			lambdastopearly, glmstopearly, stopearlyerrorfraction, max_iterations, verbose, trainXptr,
+			lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose, trainXptr,
 			trainYptr, validXptr, validYptr, weightptr, givefullpath,
 			Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
-			validPredsvsalpha, countfull, countshort, countmore);
+			validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime);
+}
+
+double elastic_net_sparse_double(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
+		int nAlphas, double alpha_min, double alpha_max,
+		double *alphas, double *lambdas,
+		double tol, double tolseekfactor,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int verbose, double *trainval, int *trainind, int *trainptr, double *trainY,
+		double *validval, int *validind, int *validptr, double *validY,
+		double *weight, int givefullpath,
+		double **Xvsalphalambda, double **Xvsalpha,
+		double **validPredsvsalphalambda, double **validPredsvsalpha,
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime) {
+	return ElasticNetptr_sparse<double>(family, nThreads, gpu_id, nGPUs, totalnGPUs,
+			mTrain, n, mValid, intercept, standardize,
+			lambda_max, lambda_min_ratio, nLambdas, nFolds, foldid,
+			nAlphas, alpha_min, alpha_max,
+			alphas, lambdas,
+			tol, tolseekfactor,
+			lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose,
+			trainval, trainind, trainptr, trainY, validval, validind, validptr, validY,
+			weight, givefullpath,
+			Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
+			validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime);
+}
+double elastic_net_sparse_float(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
+		int nAlphas, double alpha_min, double alpha_max,
+		float *alphas, float *lambdas,
+		double tol, double tolseekfactor,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int verbose, float *trainval, int *trainind, int *trainptr, float *trainY,
+		float *validval, int *validind, int *validptr, float *validY,
+		float *weight, int givefullpath,
+		float **Xvsalphalambda, float **Xvsalpha,
+		float **validPredsvsalphalambda, float **validPredsvsalpha,
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime) {
+	return ElasticNetptr_sparse<float>(family, nThreads, gpu_id, nGPUs, totalnGPUs,
+			mTrain, n, mValid, intercept, standardize,
+			lambda_max, lambda_min_ratio, nLambdas, nFolds, foldid,
+			nAlphas, alpha_min, alpha_max,
+			alphas, lambdas,
+			tol, tolseekfactor,
+			lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose,
+			trainval, trainind, trainptr, trainY, validval, validind, validptr, validY,
+			weight, givefullpath,
+			Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
+			validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime);
 }
 
+double elastic_net_gram_double(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		int nAlphas, double alpha_min, double alpha_max,
+		double *alphas, double *lambdas,
+		double tol, double tolseekfactor,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int verbose, double *traingram, double *trainb, double *trainsums,
+		double *validgram, double *validb, double *validsums,
+		int givefullpath,
+		double **Xvsalphalambda, double **Xvsalpha,
+		double **validPredsvsalphalambda, double **validPredsvsalpha,
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime) {
+	return ElasticNetptr_gram<double>(family, nThreads, gpu_id, nGPUs, totalnGPUs,
+			mTrain, n, mValid, intercept, standardize,
+			lambda_max, lambda_min_ratio, nLambdas, nFolds,
+			nAlphas, alpha_min, alpha_max,
+			alphas, lambdas,
+			tol, tolseekfactor,
+			lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose,
+			traingram, trainb, trainsums, validgram, validb, validsums,
+			givefullpath,
+			Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
+			validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime);
+}
+double elastic_net_gram_float(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		int nAlphas, double alpha_min, double alpha_max,
+		float *alphas, float *lambdas,
+		double tol, double tolseekfactor,
+		int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly, double stopearlyerrorfraction, int max_iterations,
+		int verbose, float *traingram, float *trainb, double *trainsums,
+		float *validgram, float *validb, double *validsums,
+		int givefullpath,
+		float **Xvsalphalambda, float **Xvsalpha,
+		float **validPredsvsalphalambda, float **validPredsvsalpha,
+		size_t *countfull, size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime) {
+	return ElasticNetptr_gram<float>(family, nThreads, gpu_id, nGPUs, totalnGPUs,
+			mTrain, n, mValid, intercept, standardize,
+			lambda_max, lambda_min_ratio, nLambdas, nFolds,
+			nAlphas, alpha_min, alpha_max,
+			alphas, lambdas,
+			tol, tolseekfactor,
+			lambdastopearly, screening, anderson, eigen, cachebytes, glmstopearly, stopearlyerrorfraction, max_iterations, verbose,
+			traingram, trainb, trainsums, validgram, validb, validsums,
+			givefullpath,
+			Xvsalphalambda, Xvsalpha, validPredsvsalphalambda,
+			validPredsvsalpha, countfull, countshort, countmore,
+			cachehits, factorizations, factortime);
+}
 
 }
 
@@ -7,12 +7,18 @@
 #include <stdio.h>
 #include <limits>
 #include <vector>
+#include <algorithm>
+#include <memory>
+#include <mutex>
+#include <cstring>
+#include <stdexcept>
 #include <cassert>
 #include <iostream>
 #include <random>
 
 #include "matrix/matrix_dense.h"
 #include "solver/glm.h"
+#include "coordinate_descent.h"
 #include "timer.h"
 #include <omp.h>
 #include <cmath>
@@ -163,6 +169,550 @@ T getError(const T offset, const T*weights, size_t len, const T *predicted,
 
 }
 
+/**
+ * Copy a subset of the rows of a matrix into a compact matrix of the same order.
+ *
+ * @param ord Order of both matrices, 'r' for row major or 'c' for column major
+ * @param m Number of rows of the source matrix
+ * @param n Number of columns
+ * @param src Source matrix
+ * @param rows Indices of the rows to copy, in the order they are stored in `dst`
+ * @param dst Destination matrix of size rows.size() x n
+ */
+template<typename T>
+void copyRows(const char ord, size_t m, size_t n, const T *src,
+		const std::vector<size_t> &rows, T *dst) {
+	size_t mrows = rows.size();
+	if (ord == 'r' || ord == 'R') {
+		for (size_t i = 0; i < mrows; ++i) {
+			memcpy(&dst[i * n], &src[rows[i] * n], n * sizeof(T));
+		}
+	} else {
+		for (size_t j = 0; j < n; ++j) {
+			for (size_t i = 0; i < mrows; ++i) {
+				dst[j * mrows + i] = src[j * m + rows[i]];
+			}
+		}
+	}
+}
+
+/**
+ * Compute linear predictions for a subset of the rows of a matrix.
+ *
+ * @param ord Order of the matrix, 'r' for row major or 'c' for column major
+ * @param m Number of rows of the matrix
+ * @param n Number of columns
+ * @param X Matrix
+ * @param rows Indices of the rows to predict
+ * @param x Coefficients of length n
+ * @param preds Output of length rows.size()
+ */
+template<typename T>
+void predictRows(const char ord, size_t m, size_t n, const T *X,
+		const std::vector<size_t> &rows, const T *x, T *preds) {
+	for (size_t i = 0; i < rows.size(); ++i) {
+		double pred = 0;
+		if (ord == 'r' || ord == 'R') {
+			for (size_t j = 0; j < n; ++j)
+				pred += x[j] * X[rows[i] * n + j];
+		} else {
+			for (size_t j = 0; j < n; ++j)
+				pred += x[j] * X[j * m + rows[i]];
+		}
+		preds[i] = static_cast<T>(pred);
+	}
+}
+
+/**
+ * Copy a subset of the rows and columns of a matrix into a compact matrix of the same order.
+ *
+ * @param ord Order of both matrices, 'r' for row major or 'c' for column major
+ * @param m Number of rows of the source matrix
+ * @param n Number of columns of the source matrix
+ * @param src Source matrix
+ * @param rows Indices of the rows to copy, in the order they are stored in `dst`
+ * @param cols Indices of the columns to copy, in the order they are stored in `dst`
+ * @param dst Destination matrix of size rows.size() x cols.size()
+ */
+template<typename T>
+void copyBlock(const char ord, size_t m, size_t n, const T *src,
+		const std::vector<size_t> &rows, const std::vector<size_t> &cols, T *dst) {
+	size_t mrows = rows.size();
+	size_t ncols = cols.size();
+	if (ord == 'r' || ord == 'R') {
+		for (size_t i = 0; i < mrows; ++i) {
+			const T *srcrow = &src[rows[i] * n];
+			for (size_t j = 0; j < ncols; ++j)
+				dst[i * ncols + j] = srcrow[cols[j]];
+		}
+	} else {
+		for (size_t j = 0; j < ncols; ++j) {
+			const T *srccol = &src[cols[j] * m];
+			for (size_t i = 0; i < mrows; ++i)
+				dst[j * mrows + i] = srccol[rows[i]];
+		}
+	}
+}
+
+/**
+ * Compute X^T r for a subset of the rows of a matrix.
+ *
+ * @param ord Order of the matrix, 'r' for row major or 'c' for column major
+ * @param m Number of rows of the matrix
+ * @param n Number of columns
+ * @param X Matrix
+ * @param rows Indices of the rows used
+ * @param r Values of length rows.size(), one per row in `rows`
+ * @param grad Output of length n
+ */
+template<typename T>
+void gradientRows(const char ord, size_t m, size_t n, const T *X,
+		const std::vector<size_t> &rows, const T *r, double *grad) {
+	if (ord == 'r' || ord == 'R') {
+		std::fill(grad, grad + n, 0.0);
+		for (size_t i = 0; i < rows.size(); ++i) {
+			const T *row = &X[rows[i] * n];
+			double ri = r[i];
+			for (size_t j = 0; j < n; ++j)
+				grad[j] += ri * row[j];
+		}
+	} else {
+		for (size_t j = 0; j < n; ++j) {
+			const T *col = &X[j * m];
+			double sum = 0;
+			for (size_t i = 0; i < rows.size(); ++i)
+				sum += r[i] * col[rows[i]];
+			grad[j] = sum;
+		}
+	}
+}
+
+/**
+ * Copy a subset of the rows of a compressed sparse column matrix into a compact one.
+ *
+ * @param src Source matrix
+ * @param rows Indices of the rows to copy, in the order they are stored in the destination
+ * @param val Nonzeros of the destination
+ * @param ind Row indices of the destination's nonzeros
+ * @param ptr Column offsets of the destination, of length src.n + 1
+ */
+template<typename T>
+void copyRows(const CscMatrix<T> &src, const std::vector<size_t> &rows,
+		std::vector<T> &val, std::vector<int> &ind, std::vector<int> &ptr) {
+	std::vector<int> newrow(src.m, -1);
+	for (size_t i = 0; i < rows.size(); ++i)
+		newrow[rows[i]] = (int) i;
+	val.clear();
+	ind.clear();
+	ptr.assign(1, 0);
+	for (size_t j = 0; j < src.n; ++j) {
+		for (int k = src.ptr[j]; k < src.ptr[j + 1]; ++k) {
+			if (newrow[src.ind[k]] >= 0) {
+				val.push_back(src.val[k]);
+				ind.push_back(newrow[src.ind[k]]);
+			}
+		}
+		ptr.push_back((int) val.size());
+	}
+}
+
+/**
+ * Compute linear predictions for a subset of the rows of a compressed sparse column matrix.
+ *
+ * @param X Matrix
+ * @param rows Indices of the rows to predict
+ * @param x Coefficients of length X.n
+ * @param preds Output of length rows.size()
+ */
+template<typename T>
+void predictRows(const CscMatrix<T> &X, const std::vector<size_t> &rows,
+		const T *x, T *preds) {
+	std::vector<double> pred(X.m, 0.0);
+	for (size_t j = 0; j < X.n; ++j) {
+		if (x[j] == 0)
+			continue;
+		for (int k = X.ptr[j]; k < X.ptr[j + 1]; ++k)
+			pred[X.ind[k]] += x[j] * X.val[k];
+	}
+	for (size_t i = 0; i < rows.size(); ++i)
+		preds[i] = static_cast<T>(pred[rows[i]]);
+}
+
+/**
+ * Statistics of the response and lambda_max of a compressed sparse column
+ * training matrix, as MatrixDense::Stats for dense data (index 0 for the
+ * training and 1 for the validation response).
+ *
+ * @param intercept Whether the last column of X is the intercept
+ * @param X Training data
+ * @param y Training response of length X.m
+ * @param mValid Number of validation rows
+ * @param validX Validation data (can be NULL), only checked for nan/inf
+ * @param validY Validation response of length mValid (can be NULL)
+ * @param w Weights of length X.m
+ * @param lambda_max0 Output, smallest lambda for which all the penalized coefficients are zero
+ * @throws std::invalid_argument on nan/inf values or a zero lambda_max0
+ */
+template<typename T>
+int cscStats(int intercept, const CscMatrix<T> &X, const T *y, size_t mValid,
+		const CscMatrix<T> *validX, const T *validY, const T *w, T *min, T *max,
+		T *mean, T *var, T *sd, T *skew, T *kurt, T &lambda_max0) {
+	const T *ys[2] = {y, validY};
+	size_t lens[2] = {X.m, (validY != NULL ? mValid : 0)};
+	for (int s = 0; s < 2; ++s) {
+		size_t len = lens[s];
+		min[s] = max[s] = mean[s] = var[s] = sd[s] = skew[s] = kurt[s] = 0; // skew and kurt not implemented
+		if (len == 0)
+			continue;
+		// one pass, with sums shifted by the first value for accuracy
+		const T *v = ys[s];
+		const T *ws = (s == 0 ? w : NULL);
+		const double shift = v[0];
+		double lo = v[0], hi = v[0], s1 = 0, s2 = 0;
+		size_t bad = 0;
+#pragma omp parallel for reduction(+:bad,s1,s2) reduction(min:lo) reduction(max:hi)
+		for (size_t i = 0; i < len; ++i) {
+			double d = v[i] - shift;
+			bad += !std::isfinite(v[i]) + (ws != NULL && !std::isfinite(ws[i]));
+			lo = std::min(lo, static_cast<double>(v[i]));
+			hi = std::max(hi, static_cast<double>(v[i]));
+			s1 += d;
+			s2 += d * d;
+		}
+		if (bad > 0) {
+			throw std::invalid_argument(s == 0 ? "Data training predictions/labels (trainY) or weights have nan/inf or missing was not encoded"
+					: "Validation Data training predictions/labels (validY) has nan/inf or missing was not encoded");
+		}
+		min[s] = static_cast<T>(lo);
+		max[s] = static_cast<T>(hi);
+		mean[s] = static_cast<T>(shift + s1 / len);
+		var[s] = static_cast<T>(len > 1 ? std::max(s2 - s1 * s1 / len, 0.0) / (len - 1) : 0);
+		sd[s] = std::sqrt(var[s]);
+	}
+
+	size_t bad = 0;
+	if (validX != NULL) {
+#pragma omp parallel for reduction(+:bad)
+		for (int k = 0; k < validX->ptr[validX->n]; ++k)
+			bad += !std::isfinite(validX->val[k]);
+		if (bad > 0) {
+			throw std::invalid_argument("Validation Data matrix (validX) has nan/inf or missing was not encoded");
+		}
+	}
+
+	// the values of X are checked while computing lambda_max0
+	double lmax = 0;
+	const double centre = intercept * static_cast<double>(mean[0]);
+#pragma omp parallel for reduction(+:bad) reduction(max:lmax) schedule(dynamic, 64)
+	for (size_t j = 0; j < X.n; ++j) {
+		double u = 0;
+		for (int k = X.ptr[j]; k < X.ptr[j + 1]; ++k) {
+			int i = X.ind[k];
+			bad += !std::isfinite(X.val[k]);
+			u += w[i] * X.val[k] * (y[i] - centre);
+		}
+		if (j < X.n - intercept)
+			lmax = std::max(lmax, std::abs(u));
+	}
+	if (bad > 0) {
+		throw std::invalid_argument("Data matrix (trainX) has nan/inf or missing was not encoded");
+	}
+	lambda_max0 = static_cast<T>(lmax);
+	if (lambda_max0 == 0.0 || !std::isfinite(lambda_max0)) {
+		throw std::invalid_argument("Failure to compute lambda_max0");
+	}
+	return 0;
+}
+
+/**
+ * Statistics of the response and lambda_max from the Gram statistics of the
+ * data, as cscStats for sparse data.
+ *
+ * @param intercept Whether the last column is the intercept
+ * @param train Statistics of the training data
+ * @param valid Statistics of the validation data (can be NULL)
+ * @param lambda_max0 Output, smallest lambda for which all the penalized coefficients are zero
+ * @throws std::invalid_argument on nan/inf values or a zero lambda_max0
+ */
+template<typename T>
+int gramStats(int intercept, const GramStats<T> &train, const GramStats<T> *valid,
+		T *min, T *max, T *mean, T *var, T *sd, T *skew, T *kurt, T &lambda_max0) {
+	const size_t n = train.n;
+	for (size_t k = 0; k < n * n; ++k) {
+		if (!std::isfinite(train.gram[k])) {
+			throw std::invalid_argument("Gram matrix of the training data has nan/inf or missing was not encoded");
+		}
+	}
+
+	const GramStats<T> *stats[2] = {&train, valid};
+	for (int s = 0; s < 2; ++s) {
+		min[s] = max[s] = mean[s] = var[s] = sd[s] = skew[s] = kurt[s] = 0; // skew and kurt not implemented
+		if (stats[s] == NULL || stats[s]->sums[kGramRows] == 0)
+			continue;
+		const double *sums = stats[s]->sums;
+		double len = sums[kGramRows];
+		double m1 = sums[kGramY] / len;
+		min[s] = static_cast<T>(sums[kGramMin]);
+		max[s] = static_cast<T>(sums[kGramMax]);
+		mean[s] = static_cast<T>(m1);
+		var[s] = static_cast<T>(len > 1 ? std::max(sums[kGramYY] - len * m1 * m1, 0.0) / (len - 1) : 0);
+		sd[s] = std::sqrt(var[s]);
+	}
+
+	// sum_i w_i a_ij (y_i - intercept * mean), with sum_i w_i a_ij from the intercept column
+	double lmax = 0;
+	for (size_t j = 0; j < n - intercept; ++j) {
+		double u = train.b[j];
+		if (intercept)
+			u -= mean[0] * train.gram[j * n + n - 1];
+		lmax = std::max(lmax, std::abs(u));
+	}
+	lambda_max0 = static_cast<T>(lmax);
+	if (lambda_max0 == 0.0 || !std::isfinite(lambda_max0)) {
+		throw std::invalid_argument("Failure to compute lambda_max0");
+	}
+	return 0;
+}
+
+/**
+ * Sum the Gram statistics of disjoint sets of rows.
+ *
+ * @param parts Statistics of each set
+ * @param count Number of sets
+ * @param gram Output, storage of the summed Gram matrix
+ * @param b Output, storage of the summed b
+ * @param sums Output, storage of the summed sums
+ * @return View of the statistics of all the rows
+ */
+template<typename T>
+GramStats<T> gramSum(const GramStats<T> *parts, size_t count,
+		std::vector<T> &gram, std::vector<T> &b, std::vector<double> &sums) {
+	const size_t n = parts[0].n;
+	gram.assign(n * n, static_cast<T>(0));
+	b.assign(n, static_cast<T>(0));
+	sums.assign(kGramSums, 0.0);
+	sums[kGramMin] = std::numeric_limits<double>::max();
+	sums[kGramMax] = -std::numeric_limits<double>::max();
+	for (size_t p = 0; p < count; ++p) {
+		for (size_t k = 0; k < n * n; ++k)
+			gram[k] += parts[p].gram[k];
+		for (size_t j = 0; j < n; ++j)
+			b[j] += parts[p].b[j];
+		for (int k = 0; k < kGramMin; ++k)
+			sums[k] += parts[p].sums[k];
+		sums[kGramMin] = std::min(sums[kGramMin], parts[p].sums[kGramMin]);
+		sums[kGramMax] = std::max(sums[kGramMax], parts[p].sums[kGramMax]);
+	}
+	GramStats<T> total = {n, &gram[0], &b[0], &sums[0]};
+	return total;
+}
+
+/**
+ * Gram statistics of the rows of total that are not in part (with the
+ * range of the response of total).
+ *
+ * @param gram Output, storage of the Gram matrix
+ * @param b Output, storage of b
+ * @param sums Output, storage of the sums
+ * @return View of the statistics
+ */
+template<typename T>
+GramStats<T> gramDifference(const GramStats<T> &total, const GramStats<T> &part,
+		std::vector<T> &gram, std::vector<T> &b, std::vector<double> &sums) {
+	const size_t n = total.n;
+	gram.resize(n * n);
+	b.resize(n);
+	sums.assign(total.sums, total.sums + kGramSums);
+	for (size_t k = 0; k < n * n; ++k)
+		gram[k] = total.gram[k] - part.gram[k];
+	for (size_t j = 0; j < n; ++j)
+		b[j] = total.b[j] - part.b[j];
+	for (int k = 0; k < kGramMin; ++k)
+		sums[k] -= part.sums[k];
+	GramStats<T> rest = {n, &gram[0], &b[0], &sums[0]};
+	return rest;
+}
+
+/**
+ * Weighted root mean squared error of the linear predictions a_i^T x from
+ * the Gram statistics of the rows, as getError for the elastic net:
+ * sqrt((sum_i w_i y_i^2 - 2 x^T b + x^T G x) / sum_i w_i).
+ *
+ * @param stats Statistics of the rows
+ * @param x Coefficients of length stats.n
+ */
+template<typename T>
+T gramError(const GramStats<T> &stats, const T *x) {
+	const size_t n = stats.n;
+	double sse = stats.sums[kGramWYY];
+	for (size_t j = 0; j < n; ++j) {
+		if (x[j] == 0)
+			continue;
+		const T *row = &stats.gram[j * n];
+		double gx = 0;
+		for (size_t l = 0; l < n; ++l)
+			gx += row[l] * x[l];
+		sse += x[j] * (gx - 2.0 * stats.b[j]);
+	}
+	return static_cast<T>(std::sqrt(std::max(sse, 0.0) / stats.sums[kGramW]));
+}
+
+/**
+ * Number of classes K of a multinomial response, which must hold the classes
+ * 0..K-1 (the validation response only ones also in the training response).
+ *
+ * @param m Number of training rows
+ * @param y Training response
+ * @param mValid Number of validation rows
+ * @param validY Validation response (can be NULL if mValid is 0)
+ * @throws std::invalid_argument on any other response value
+ */
+template<typename T>
+size_t multinomialClasses(size_t m, const T *y, size_t mValid, const T *validY) {
+	const T *ys[2] = {y, validY};
+	size_t lens[2] = {m, mValid};
+	T classes = 0;
+	for (int s = 0; s < 2; ++s) {
+		for (size_t i = 0; i < lens[s]; ++i) {
+			T c = ys[s][i];
+			if (!(c >= 0) || c != std::floor(c) || (s == 1 && c >= classes)) {
+				char message[160];
+				snprintf(message, sizeof(message),
+						"Multinomial %s response must be a class 0..K-1 seen in training, got %g in row %zu",
+						s == 0 ? "training" : "validation", (double) c, i);
+				throw std::invalid_argument(message);
+			}
+			if (s == 0)
+				classes = std::max(classes, c + 1);
+		}
+	}
+	return static_cast<size_t>(classes);
+}
+
+/**
+ * Residuals w_i (y_ik - p_k) of the multinomial model with only the class
+ * frequencies p_k (the intercepts), or uniform p_k without an intercept,
+ * with y_ik the indicator of class k.
+ *
+ * @return m x K residuals, K per row
+ */
+template<typename T>
+std::vector<double> multinomialNullResiduals(int intercept, size_t classes,
+		size_t m, const T *y, const T *w) {
+	std::vector<double> p(classes, 1.0 / classes);
+	if (intercept) {
+		double wsum = 0;
+		std::fill(p.begin(), p.end(), 0.0);
+		for (size_t i = 0; i < m; ++i) {
+			p[static_cast<size_t>(y[i])] += w[i];
+			wsum += w[i];
+		}
+		for (size_t k = 0; k < classes; ++k)
+			p[k] /= wsum;
+	}
+	std::vector<double> r(m * classes);
+	for (size_t i = 0; i < m; ++i) {
+		for (size_t k = 0; k < classes; ++k)
+			r[i * classes + k] = w[i] * ((static_cast<size_t>(y[i]) == k ? 1 : 0) - p[k]);
+	}
+	return r;
+}
+
+/**
+ * lambda_max of the multinomial family, the largest gradient of its loss
+ * over the penalized columns and the classes at the model without them.
+ *
+ * @param intercept Whether the last column of X is the intercept
+ * @param classes Number of classes K
+ * @param ord Order of X, 'r' for row major or 'c' for column major
+ * @param m Number of rows of X
+ * @param n Number of columns of X
+ * @param X Training data
+ * @param y Training response, the classes 0..K-1
+ * @param w Weights of length m
+ */
+template<typename T>
+T multinomialLambdaMax(int intercept, size_t classes, const char ord, size_t m,
+		size_t n, const T *X, const T *y, const T *w) {
+	std::vector<double> r = multinomialNullResiduals(intercept, classes, m, y, w);
+	std::vector<double> grad((n - intercept) * classes, 0.0);
+	for (size_t j = 0; j < n - intercept; ++j) {
+		double *g = &grad[j * classes];
+		for (size_t i = 0; i < m; ++i) {
+			T a = (ord == 'r' || ord == 'R' ? X[i * n + j] : X[j * m + i]);
+			if (a == 0)
+				continue;
+			for (size_t k = 0; k < classes; ++k)
+				g[k] += a * r[i * classes + k];
+		}
+	}
+	double lmax = 0;
+	for (size_t k = 0; k < grad.size(); ++k)
+		lmax = std::max(lmax, std::abs(grad[k]));
+	return static_cast<T>(lmax);
+}
+
+/**
+ * lambda_max of the multinomial family for compressed sparse column training data.
+ */
+template<typename T>
+T multinomialLambdaMax(int intercept, size_t classes, const CscMatrix<T> &X,
+		const T *y, const T *w) {
+	std::vector<double> r = multinomialNullResiduals(intercept, classes, X.m, y, w);
+	double lmax = 0;
+	std::vector<double> g(classes);
+	for (size_t j = 0; j < X.n - intercept; ++j) {
+		std::fill(g.begin(), g.end(), 0.0);
+		for (int k = X.ptr[j]; k < X.ptr[j + 1]; ++k) {
+			for (size_t c = 0; c < classes; ++c)
+				g[c] += X.val[k] * r[X.ind[k] * classes + c];
+		}
+		for (size_t c = 0; c < classes; ++c)
+			lmax = std::max(lmax, std::abs(g[c]));
+	}
+	return static_cast<T>(lmax);
+}
+
+/**
+ * Turn linear predictions, K per row, into class probabilities in place.
+ *
+ * @param len Number of rows
+ * @param classes Number of classes K
+ * @param preds len x K predictions
+ */
+template<typename T>
+void softmaxRows(size_t len, size_t classes, T *preds) {
+	for (size_t i = 0; i < len; ++i) {
+		T *z = &preds[i * classes];
+		double zmax = *std::max_element(z, z + classes), sum = 0;
+		for (size_t k = 0; k < classes; ++k)
+			sum += std::exp(z[k] - zmax);
+		for (size_t k = 0; k < classes; ++k)
+			z[k] = static_cast<T>(std::exp(z[k] - zmax) / sum);
+	}
+}
+
+/**
+ * Weighted multinomial logloss, as getError for the logistic family.
+ *
+ * @param weights Weight vector given to observations
+ * @param len Length of outcome vector
+ * @param classes Number of classes K
+ * @param predicted len x K class probabilities
+ * @param actual Actual classes 0..K-1
+ */
+template<typename T>
+T multinomialError(const T *weights, size_t len, size_t classes,
+		const T *predicted, const T *actual) {
+	double weightsum = 0, logloss = 0;
+	for (size_t i = 0; i < len; ++i) {
+		double p = predicted[i * classes + static_cast<size_t>(actual[i])];
+		logloss -= weights[i] * std::log(std::max(1e-15, p));
+		weightsum += weights[i];
+	}
+	return static_cast<T>(logloss / weightsum);
+}
+
 // C++ program for implementation of Heap Sort
 #define mysize_t int
 template<typename T>
@@ -276,70 +826,176 @@ int topkwrap(int whichmax, mysize_t n, mysize_t k, T arr[], mysize_t *whichbeta,
 // for many values of \lambda and multiple values of \alpha
 // See <h2o4gpu>/matlab/examples/lasso_path.m for detailed description.
 // m and n are training data size
+//
+// family is 'e' (elasticnet), 'l' (logistic) or 'm' (multinomial, with the
+// coordinate descent solver only).  The multinomial response is the class
+// 0..K-1 and each model has K blocks of n coefficients, one per class,
+// wherever the other families have n.
+//
+// eigen and cachebytes (0 for the default) set how the ADMM direct
+// projectors reuse factorizations (see ProjectorDirect), cachehits,
+// factorizations and factortime return their totals over all solvers of a
+// fit (left unchanged by predict).
 
 template<typename T>
-double ElasticNetptr(const char family, int dopredict, int sourceDev,
+double ElasticNetptr(const char family, const char solver, int dopredict, int sourceDev,
 		int datatype, int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord,
 		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max, T *alphas, T *lambdas,
-		double tol, double tolseekfactor, int lambdastopearly, int glmstopearly,
+		double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
 		double glmstopearlyerrorfraction, int max_iterations, int verbose,
 		T *trainXptr, T *trainYptr, T *validXptr, T *validYptr,
 		T *weightptr, int givefullpath, T **Xvsalphalambda, T **Xvsalpha,
 		T **validPredsvsalphalambda, T **validPredsvsalpha, size_t *countfull,
-		size_t *countshort, size_t *countmore);
+		size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
 template<typename T>
-double ElasticNetptr_fit(const char family, int sourceDev, int datatype,
+double ElasticNetptr_fit(const char family, const char solver, int sourceDev, int datatype,
 		int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain,
 		size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max, T *alphas, T *lambdas,
-		double tol, double tolseekfactor, int lambdastopearly, int glmstopearly,
+		double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
 		double glmstopearlyerrorfraction, int max_iterations, int verbose,
 		T *trainXptr, T *trainYptr, T *validXptr, T *validYptr,
 		T *weightptr, int givefullpath, T **Xvsalphalambda, T **Xvsalpha,
 		T **validPredsvsalphalambda, T **validPredsvsalpha, size_t *countfull,
-		size_t *countshort, size_t *countmore);
+		size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime,
+		const CscMatrix<T> *sparseTrainX = NULL, const CscMatrix<T> *sparseValidX = NULL,
+		const GramStats<T> *gramFolds = NULL, const GramStats<T> *gramValid = NULL);
 template<typename T>
-double ElasticNetptr_predict(const char family, int sourceDev, int datatype,
+double ElasticNetptr_predict(const char family, const char solver, int sourceDev, int datatype,
 		int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord, size_t mTrain,
 		size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max, T *alphas, T *lambdas,
-		double tol, double tolseekfactor, int lambdastopearly, int glmstopearly,
+		double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
 		double glmstopearlyerrorfraction, int max_iterations, int verbose,
 		T *trainXptr, T *trainYptr, T *validXptr, T *validYptr,
 		T *weightptr, int givefullpath, T **Xvsalphalambda, T **Xvsalpha,
 		T **validPredsvsalphalambda, T **validPredsvsalpha, size_t *countfull,
-		size_t *countshort, size_t *countmore);
+		size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
+
+// Elastic net fit with the coordinate descent solver on sparse data in
+// compressed sparse column form (with the intercept column already appended),
+// the validation data (can be NULL) in the same form.
+template<typename T>
+double ElasticNetptr_sparse(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
+		int nAlphas, double alpha_min, double alpha_max, T *alphas, T *lambdas,
+		double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
+		double glmstopearlyerrorfraction, int max_iterations, int verbose,
+		T *trainval, int *trainind, int *trainptr, T *trainY,
+		T *validval, int *validind, int *validptr, T *validY,
+		T *weight, int givefullpath, T **Xvsalphalambda, T **Xvsalpha,
+		T **validPredsvsalphalambda, T **validPredsvsalpha, size_t *countfull,
+		size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
+
+// Elastic net fit with the coordinate descent solver on the Gram statistics
+// of the data alone (see GramStats, with the intercept column already
+// appended), so the rows can be streamed from out of core once to compute
+// them.  traingram (n x n), trainb (n) and trainsums (kGramSums) hold the
+// statistics of each of the max(nFolds, 1) folds one after the other, the
+// validation ones (can be NULL) those of all the validation rows.
+template<typename T>
+double ElasticNetptr_gram(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		int nAlphas, double alpha_min, double alpha_max, T *alphas, T *lambdas,
+		double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
+		double glmstopearlyerrorfraction, int max_iterations, int verbose,
+		T *traingram, T *trainb, double *trainsums,
+		T *validgram, T *validb, double *validsums,
+		int givefullpath, T **Xvsalphalambda, T **Xvsalpha,
+		T **validPredsvsalphalambda, T **validPredsvsalpha, size_t *countfull,
+		size_t *countshort, size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
 
 template<typename T>
 int modelFree2(T *aptr);
 
-double elastic_net_ptr_double(const char family, int dopredict, int sourceDev,
+double elastic_net_ptr_double(const char family, const char solver, int dopredict, int sourceDev,
 		int datatype, int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord,
 		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max, double *alphas,
-		double *lambdas, double tol, double tolseekfactor, int lambdastopearly, int glmstopearly,
+		double *lambdas, double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
 		double glmstopearlyerrorfraction, int max_iterations, int verbose,
 		double *trainXptr, double *trainYptr, double *validXptr, double *validYptr,
 		double *weightptr, int givefullpath, double **Xvsalphalambda,
 		double **Xvsalpha, double **validPredsvsalphalambda,
 		double **validPredsvsalpha, size_t *countfull, size_t *countshort,
-		size_t *countmore);
-double elastic_net_ptr_float(const char family, int dopredict, int sourceDev,
+		size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
+double elastic_net_ptr_float(const char family, const char solver, int dopredict, int sourceDev,
 		int datatype, int sharedA, int nThreads, int gpu_id, int nGPUs, int totalnGPUs, const char ord,
 		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
-		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
 		int nAlphas, double alpha_min, double alpha_max, float *alphas,
-		float *lambdas, double tol, double tolseekfactor, int lambdastopearly, int glmstopearly,
+		float *lambdas, double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
 		double glmstopearlyerrorfraction, int max_iterations, int verbose,
 		float *trainXptr, float *trainYptr, float *validXptr, float *validYptr,
 		float *weightptr, int givefullpath, float **Xvsalphalambda,
 		float **Xvsalpha, float **validPredsvsalphalambda,
 		float **validPredsvsalpha, size_t *countfull, size_t *countshort,
-		size_t *countmore);
+		size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
+double elastic_net_sparse_double(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
+		int nAlphas, double alpha_min, double alpha_max, double *alphas,
+		double *lambdas, double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
+		double glmstopearlyerrorfraction, int max_iterations, int verbose,
+		double *trainval, int *trainind, int *trainptr, double *trainY,
+		double *validval, int *validind, int *validptr, double *validY,
+		double *weight, int givefullpath, double **Xvsalphalambda,
+		double **Xvsalpha, double **validPredsvsalphalambda,
+		double **validPredsvsalpha, size_t *countfull, size_t *countshort,
+		size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
+double elastic_net_sparse_float(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds, int *foldid,
+		int nAlphas, double alpha_min, double alpha_max, float *alphas,
+		float *lambdas, double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
+		double glmstopearlyerrorfraction, int max_iterations, int verbose,
+		float *trainval, int *trainind, int *trainptr, float *trainY,
+		float *validval, int *validind, int *validptr, float *validY,
+		float *weight, int givefullpath, float **Xvsalphalambda,
+		float **Xvsalpha, float **validPredsvsalphalambda,
+		float **validPredsvsalpha, size_t *countfull, size_t *countshort,
+		size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
+double elastic_net_gram_double(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		int nAlphas, double alpha_min, double alpha_max, double *alphas,
+		double *lambdas, double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
+		double glmstopearlyerrorfraction, int max_iterations, int verbose,
+		double *traingram, double *trainb, double *trainsums,
+		double *validgram, double *validb, double *validsums,
+		int givefullpath, double **Xvsalphalambda,
+		double **Xvsalpha, double **validPredsvsalphalambda,
+		double **validPredsvsalpha, size_t *countfull, size_t *countshort,
+		size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
+double elastic_net_gram_float(const char family, int nThreads, int gpu_id, int nGPUs, int totalnGPUs,
+		size_t mTrain, size_t n, size_t mValid, int intercept, int standardize,
+		double lambda_max, double lambda_min_ratio, int nLambdas, int nFolds,
+		int nAlphas, double alpha_min, double alpha_max, float *alphas,
+		float *lambdas, double tol, double tolseekfactor, int lambdastopearly, int screening, int anderson, int eigen, size_t cachebytes, int glmstopearly,
+		double glmstopearlyerrorfraction, int max_iterations, int verbose,
+		float *traingram, float *trainb, double *trainsums,
+		float *validgram, float *validb, double *validsums,
+		int givefullpath, float **Xvsalphalambda,
+		float **Xvsalpha, float **validPredsvsalphalambda,
+		float **validPredsvsalpha, size_t *countfull, size_t *countshort,
+		size_t *countmore,
+		size_t *cachehits, size_t *factorizations, double *factortime);
 
 }
@@ -0,0 +1,386 @@
+/*!
+ * Copyright 2018 H2O.ai, Inc.
+ * License   Apache License Version 2.0 (see LICENSE for details)
+ */
+#include <algorithm>
+#include <cmath>
+#include <cstdlib>
+#include <cstring>
+#include <limits>
+#include <vector>
+#include "cblas.h"
+#include "solver/factorization.h"
+
+// CPU counterpart of gpu/factorization. The "device" pointers handed back to
+// Python are plain host buffers owned by this module, so the same fit loop
+// drives both backends.
+
+namespace {
+
+template <class T> void copy_to_host(T **dst, const T *src, const long size) {
+  *dst = static_cast<T *>(malloc(sizeof(T) * size));
+  memcpy(*dst, src, sizeof(T) * size);
+}
+
+// Counting sort transposition of a CSR matrix into CSC (the CSR of its
+// transpose), the entries of each column stay ordered by row.
+template <class T>
+void csr_to_csc(const int m, const int n, const int *csrRowIndex,
+                const int *csrColIndex, const T *csrVal, int *cscRowIndex,
+                int *cscColIndex, T *cscVal) {
+  std::fill(cscColIndex, cscColIndex + n + 1, 0);
+  for (int k = 0; k < csrRowIndex[m]; ++k)
+    ++cscColIndex[csrColIndex[k] + 1];
+  for (int j = 0; j < n; ++j)
+    cscColIndex[j + 1] += cscColIndex[j];
+  std::vector<int> next(cscColIndex, cscColIndex + n);
+  for (int i = 0; i < m; ++i) {
+    for (int k = csrRowIndex[i]; k < csrRowIndex[i + 1]; ++k) {
+      const int p = next[csrColIndex[k]]++;
+      cscRowIndex[p] = i;
+      cscVal[p] = csrVal[k];
+    }
+  }
+}
+
+// Row major BLAS helpers, only the upper triangle of symmetric matrices is
+// referenced.
+
+// A = G^T G and b = G^T r for the k x f matrix G.
+inline void gram(const int f, const int k, const float *G, const float *r,
+                 float *A, float *b) {
+  cblas_ssyrk(CblasRowMajor, CblasUpper, CblasTrans, f, k, 1.0f, G, f, 0.0f,
+              A, f);
+  cblas_sgemv(CblasRowMajor, CblasTrans, k, f, 1.0f, G, f, r, 1, 0.0f, b, 1);
+}
+
+inline void gram(const int f, const int k, const double *G, const double *r,
+                 double *A, double *b) {
+  cblas_dsyrk(CblasRowMajor, CblasUpper, CblasTrans, f, k, 1.0, G, f, 0.0, A,
+              f);
+  cblas_dgemv(CblasRowMajor, CblasTrans, k, f, 1.0, G, f, r, 1, 0.0, b, 1);
+}
+
+// A12 = U11^-T A12, then A22 -= A12^T A12, for the nb x nb block U11 and the
+// nb x r panel A12 of a matrix with leading dimension lda.
+inline void cholesky_panel(const int nb, const int r, const int lda,
+                           const float *U11, float *A12, float *A22) {
+  cblas_strsm(CblasRowMajor, CblasLeft, CblasUpper, CblasTrans, CblasNonUnit,
+              nb, r, 1.0f, U11, lda, A12, lda);
+  cblas_ssyrk(CblasRowMajor, CblasUpper, CblasTrans, r, nb, -1.0f, A12, lda,
+              1.0f, A22, lda);
+}
+
+inline void cholesky_panel(const int nb, const int r, const int lda,
+                           const double *U11, double *A12, double *A22) {
+  cblas_dtrsm(CblasRowMajor, CblasLeft, CblasUpper, CblasTrans, CblasNonUnit,
+              nb, r, 1.0, U11, lda, A12, lda);
+  cblas_dsyrk(CblasRowMajor, CblasUpper, CblasTrans, r, nb, -1.0, A12, lda,
+              1.0, A22, lda);
+}
+
+// b = U^-1 U^-T b
+inline void cholesky_substitute(const int f, const float *U, float *b) {
+  cblas_strsv(CblasRowMajor, CblasUpper, CblasTrans, CblasNonUnit, f, U, f, b,
+              1);
+  cblas_strsv(CblasRowMajor, CblasUpper, CblasNoTrans, CblasNonUnit, f, U, f,
+              b, 1);
+}
+
+inline void cholesky_substitute(const int f, const double *U, double *b) {
+  cblas_dtrsv(CblasRowMajor, CblasUpper, CblasTrans, CblasNonUnit, f, U, f, b,
+              1);
+  cblas_dtrsv(CblasRowMajor, CblasUpper, CblasNoTrans, CblasNonUnit, f, U, f,
+              b, 1);
+}
+
+// Unblocked A = U^T U of the leading f x f block, returns false if it is not
+// positive definite.
+template <class T> bool cholesky_block(const int f, const int lda, T *A) {
+  for (int j = 0; j < f; ++j) {
+    T *Aj = &A[j * lda];
+    if (!(Aj[j] > 0))
+      return false;
+    const T d = std::sqrt(Aj[j]);
+    Aj[j] = d;
+    for (int i = j + 1; i < f; ++i)
+      Aj[i] /= d;
+    for (int k = j + 1; k < f; ++k) {
+      T *Ak = &A[k * lda];
+      const T u = Aj[k];
+#pragma omp simd
+      for (int i = k; i < f; ++i)
+        Ak[i] -= u * Aj[i];
+    }
+  }
+  return true;
+}
+
+// In place Cholesky solve of A x = b for a symmetric positive definite f x f
+// row major A, only the upper triangle is read. Factorizes 32 x 32 diagonal
+// blocks directly and leaves the panels and trailing updates to BLAS.
+// Returns false if A is not positive definite.
+template <class T> bool cholesky_solve(const int f, T *A, T *b) {
+  const int nb = 32;
+  for (int j = 0; j < f; j += nb) {
+    const int jb = std::min(nb, f - j);
+    T *U11 = &A[j * f + j];
+    if (!cholesky_block(jb, f, U11))
+      return false;
+    if (j + jb < f)
+      cholesky_panel(jb, f - j - jb, f, U11, U11 + jb,
+                     &A[(j + jb) * f + j + jb]);
+  }
+  cholesky_substitute(f, A, b);
+  return true;
+}
+
+// One ALS half step: for every row of the compressed rating matrix solve
+// (sum_j t_j t_j^T + lambda * nnz_row * I) x = sum_j r_j t_j, with t_j the
+// fixed factors of the rated columns (weighted lambda regularization, as
+// get_hermitianT10 on the GPU). Rows without ratings are set to nan.
+//
+// Each thread only needs one f x f system and the gathered factors of one
+// row, so the batches merely split the rows into consecutive chunks instead
+// of bounding a batch of Hermitians.
+template <class T>
+void update_factors(const int rows, const int f, const T lambda,
+                    const int *ptr, const int *idx, const T *val,
+                    const T *fixed, T *factors, const int batches) {
+  const int nbatch = std::max(1, std::min(batches, rows));
+  for (int batch = 0; batch < nbatch; ++batch) {
+    const int start = batch * (rows / nbatch);
+    const int end = batch == nbatch - 1 ? rows : start + rows / nbatch;
+#pragma omp parallel
+    {
+      std::vector<T> A(f * f);
+      std::vector<T> b(f);
+      std::vector<T> G;
+#pragma omp for schedule(dynamic, 64)
+      for (int row = start; row < end; ++row) {
+        T *x = &factors[static_cast<size_t>(row) * f];
+        const int count = ptr[row + 1] - ptr[row];
+        if (count == 0) {
+          std::fill(x, x + f, std::numeric_limits<T>::quiet_NaN());
+          continue;
+        }
+        // gather the fixed factors of the rated columns, A = G^T G
+        G.resize(static_cast<size_t>(count) * f);
+        for (int k = 0; k < count; ++k) {
+          const T *t = &fixed[static_cast<size_t>(idx[ptr[row] + k]) * f];
+          std::copy(t, t + f, &G[static_cast<size_t>(k) * f]);
+        }
+        gram(f, count, G.data(), &val[ptr[row]], A.data(), b.data());
+        for (int a = 0; a < f; ++a)
+          A[a * f + a] += lambda * count;
+        if (cholesky_solve(f, A.data(), b.data()))
+          std::copy(b.begin(), b.end(), x);
+        else
+          std::fill(x, x + f, std::numeric_limits<T>::quiet_NaN());
+      }
+    }
+  }
+}
+
+}  // namespace
+
+template <class T> void free_data(T **ptr) {
+  if (ptr) {
+    free(*ptr);
+    *ptr = NULL;
+  }
+}
+
+void free_data_float(float **ptr) { free_data<float>(ptr); }
+
+void free_data_double(double **ptr) { free_data<double>(ptr); }
+
+void free_data_int(int **ptr) { free_data<int>(ptr); }
+
+template <class T>
+void copy_fecatorization_result(T *dst, const T **src, const int size) {
+  memcpy(dst, *src, sizeof(T) * size);
+}
+
+void copy_fecatorization_result_float(float *dst, const float **src,
+                                      const int size) {
+  copy_fecatorization_result(dst, src, size);
+}
+
+void copy_fecatorization_result_double(double *dst, const double **src,
+                                       const int size) {
+  copy_fecatorization_result(dst, src, size);
+}
+
+template <class T>
+int make_factorization_data(
+    const int m, const int n, const int f, const long nnz, const long nnz_test,
+    const int *csrRowIndexHostPtr, const int *csrColIndexHostPtr,
+    const T *csrValHostPtr, T *thetaTHost, T *XTHost,
+    const int *csrRowIndexTestHostPtr, const int *csrColIndexTestHostPtr,
+    const T *csrValTestHostPtr,
+
+    int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr, T **csrValDevicePtr,
+    int **cscRowIndexDevicePtr, int **cscColIndexDevicePtr, T **cscValDevicePtr,
+    T **thetaTDevice, T **XTDevice, int **csrRowIndexTestDevicePtr,
+    int **csrColIndexTestDevicePtr, T **csrValTestDevicePtr) {
+  // the ratings are only read: use the caller's CSR, which the caller keeps
+  // alive and must not free through free_data
+  *csrRowIndexDevicePtr = const_cast<int *>(csrRowIndexHostPtr);
+  *csrColIndexDevicePtr = const_cast<int *>(csrColIndexHostPtr);
+  *csrValDevicePtr = const_cast<T *>(csrValHostPtr);
+
+  // theta is updated column by column, transpose the ratings once here
+  *cscRowIndexDevicePtr = static_cast<int *>(malloc(sizeof(int) * nnz));
+  *cscColIndexDevicePtr = static_cast<int *>(malloc(sizeof(int) * (n + 1)));
+  *cscValDevicePtr = static_cast<T *>(malloc(sizeof(T) * nnz));
+  csr_to_csc(m, n, *csrRowIndexDevicePtr, *csrColIndexDevicePtr,
+             *csrValDevicePtr, *cscRowIndexDevicePtr, *cscColIndexDevicePtr,
+             *cscValDevicePtr);
+
+  // dimension: F*N
+  copy_to_host(thetaTDevice, thetaTHost, static_cast<long>(n) * f);
+  // dimension: M*F
+  copy_to_host(XTDevice, XTHost, static_cast<long>(m) * f);
+
+  if (csrRowIndexTestHostPtr && csrColIndexTestHostPtr && csrValTestHostPtr &&
+      nnz_test > 0) {
+    *csrRowIndexTestDevicePtr = const_cast<int *>(csrRowIndexTestHostPtr);
+    *csrColIndexTestDevicePtr = const_cast<int *>(csrColIndexTestHostPtr);
+    *csrValTestDevicePtr = const_cast<T *>(csrValTestHostPtr);
+  }
+  return 0;
+}
+
+template <typename T>
+T factorization_score(const int m, const int n, const int f, const long nnz,
+                      const T lambda, T **thetaTDevice, T **XTDevice,
+                      int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
+                      T **csrValDevicePtr) {
+  const T *thetaT = *thetaTDevice;
+  const T *XT = *XTDevice;
+  const int *ptr = *csrRowIndexDevicePtr;
+  const int *col = *csrColIndexDevicePtr;
+  const T *val = *csrValDevicePtr;
+  double error = 0;
+#pragma omp parallel for schedule(dynamic, 64) reduction(+ : error)
+  for (int row = 0; row < m; ++row) {
+    const T *b = &XT[static_cast<size_t>(row) * f];
+    for (int k = ptr[row]; k < ptr[row + 1]; ++k) {
+      const T *a = &thetaT[static_cast<size_t>(col[k]) * f];
+      T e = val[k];
+      // users or items without ratings in the training set are nan
+      if (!std::isnan(a[0]) && !std::isnan(b[0]))
+        for (int i = 0; i < f; ++i)
+          e -= a[i] * b[i];
+      error += static_cast<double>(e) * e;
+    }
+  }
+  return static_cast<T>(std::sqrt(error / nnz));
+}
+
+template <typename T>
+int run_factorization_step(
+    const int m, const int n, const int f, const long nnz, const T lambda,
+    int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr, T **csrValDevicePtr,
+    int **cscRowIndexDevicePtr, int **cscColIndexDevicePtr, T **cscValDevicePtr,
+    T **thetaTDevice, T **XTDevice, const int X_BATCH, const int THETA_BATCH) {
+  // update X with theta fixed, then theta with X fixed
+  update_factors(m, f, lambda, *csrRowIndexDevicePtr, *csrColIndexDevicePtr,
+                 *csrValDevicePtr, *thetaTDevice, *XTDevice, X_BATCH);
+  update_factors(n, f, lambda, *cscColIndexDevicePtr, *cscRowIndexDevicePtr,
+                 *cscValDevicePtr, *XTDevice, *thetaTDevice, THETA_BATCH);
+  return 0;
+}
+
+float factorization_score_float(const int m, const int n, const int f,
+                                const long nnz, const float lambda,
+                                float **thetaTDevice, float **XTDevice,
+                                int **csrRowIndexDevicePtr,
+                                int **csrColIndexDevicePtr,
+                                float **csrValDevicePtr) {
+  return factorization_score<float>(m, n, f, nnz, lambda, thetaTDevice,
+                                    XTDevice, csrRowIndexDevicePtr,
+                                    csrColIndexDevicePtr, csrValDevicePtr);
+}
+
+double factorization_score_double(const int m, const int n, const int f,
+                                  const long nnz, const float lambda,
+                                  double **thetaTDevice, double **XTDevice,
+                                  int **csrRowIndexDevicePtr,
+                                  int **csrColIndexDevicePtr,
+                                  double **csrValDevicePtr) {
+  return factorization_score<double>(m, n, f, nnz, lambda, thetaTDevice,
+                                     XTDevice, csrRowIndexDevicePtr,
+                                     csrColIndexDevicePtr, csrValDevicePtr);
+}
+
+int run_factorization_step_double(
+    const int m, const int n, const int f, const long nnz, const double lambda,
+    int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
+    double **csrValDevicePtr, int **cscRowIndexDevicePtr,
+    int **cscColIndexDevicePtr, double **cscValDevicePtr, double **thetaTDevice,
+    double **XTDevice, const int X_BATCH, const int THETA_BATCH) {
+  return run_factorization_step<double>(
+      m, n, f, nnz, lambda, csrRowIndexDevicePtr, csrColIndexDevicePtr,
+      csrValDevicePtr, cscRowIndexDevicePtr, cscColIndexDevicePtr,
+      cscValDevicePtr, thetaTDevice, XTDevice, X_BATCH, THETA_BATCH);
+}
+
+int run_factorization_step_float(
+    const int m, const int n, const int f, const long nnz, const float lambda,
+    int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
+    float **csrValDevicePtr, int **cscRowIndexDevicePtr,
+    int **cscColIndexDevicePtr, float **cscValDevicePtr, float **thetaTDevice,
+    float **XTDevice, const int X_BATCH, const int THETA_BATCH) {
+  return run_factorization_step<float>(
+      m, n, f, nnz, lambda, csrRowIndexDevicePtr, csrColIndexDevicePtr,
+      csrValDevicePtr, cscRowIndexDevicePtr, cscColIndexDevicePtr,
+      cscValDevicePtr, thetaTDevice, XTDevice, X_BATCH, THETA_BATCH);
+}
+
+int make_factorization_data_double(
+    const int m, const int n, const int f, const long nnz, const long nnz_test,
+    const int *csrRowIndexHostPtr, const int *csrColIndexHostPtr,
+    const double *csrValHostPtr, double *thetaTHost, double *XTHost,
+    const int *csrRowIndexTestHostPtr, const int *csrColIndexTestHostPtr,
+    const double *csrValTestHostPtr,
+
+    int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
+    double **csrValDevicePtr, int **cscRowIndexDevicePtr,
+    int **cscColIndexDevicePtr, double **cscValDevicePtr, double **thetaTDevice,
+    double **XTDevice, int **csrRowIndexTestDevicePtr,
+    int **csrColIndexTestDevicePtr, double **csrValTestDevicePtr) {
+  return make_factorization_data<double>(
+      m, n, f, nnz, nnz_test, csrRowIndexHostPtr, csrColIndexHostPtr,
+      csrValHostPtr, thetaTHost, XTHost, csrRowIndexTestHostPtr,
+      csrColIndexTestHostPtr, csrValTestHostPtr,
+
+      csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr,
+      cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr, thetaTDevice,
+      XTDevice, csrRowIndexTestDevicePtr, csrColIndexTestDevicePtr,
+      csrValTestDevicePtr);
+}
+
+int make_factorization_data_float(
+    const int m, const int n, const int f, const long nnz, const long nnz_test,
+    const int *csrRowIndexHostPtr, const int *csrColIndexHostPtr,
+    const float *csrValHostPtr, float *thetaTHost, float *XTHost,
+    const int *csrRowIndexTestHostPtr, const int *csrColIndexTestHostPtr,
+    const float *csrValTestHostPtr,
+
+    int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
+    float **csrValDevicePtr, int **cscRowIndexDevicePtr,
+    int **cscColIndexDevicePtr, float **cscValDevicePtr, float **thetaTDevice,
+    float **XTDevice, int **csrRowIndexTestDevicePtr,
+    int **csrColIndexTestDevicePtr, float **csrValTestDevicePtr) {
+  return make_factorization_data<float>(
+      m, n, f, nnz, nnz_test, csrRowIndexHostPtr, csrColIndexHostPtr,
+      csrValHostPtr, thetaTHost, XTHost, csrRowIndexTestHostPtr,
+      csrColIndexTestHostPtr, csrValTestHostPtr,
+
+      csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr,
+      cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr, thetaTDevice,
+      XTDevice, csrRowIndexTestDevicePtr, csrColIndexTestDevicePtr,
+      csrValTestDevicePtr);
+}
@@ -4,9 +4,11 @@
 #include "solver/glm.h"
 
 #include <algorithm>
+#include <cmath>
 #include <deque>
 #include <limits>
 #include <numeric>
+#include <vector>
 
 #include <cstring>
 #include <functional>
@@ -28,15 +30,96 @@ namespace h2o4gpu {
 
 namespace {
 
-template <typename T, typename Op>
-struct ApplyOp : std::binary_function<FunctionObj<T>, FunctionObj<T>, T> {
-  Op binary_op;
-  ApplyOp(Op binary_op) : binary_op(binary_op) {}
-  FunctionObj<T> operator()(FunctionObj<T> &h, T x) {
-    h.a = binary_op(h.a, x);
-    h.d = binary_op(h.d, x);
-    h.e = binary_op(binary_op(h.e, x), x);
-    return h;
+// Type-II Anderson acceleration of a fixed point iteration s <- F(s), from
+// the differences of the last `memory` values of F(s) and of the residual
+// F(s) - s.
+template <typename T>
+class Anderson {
+ public:
+  Anderson(size_t dim, unsigned int memory)
+      : _dim(dim), _memory(memory), _count(0), _next(0), _have_prev(false),
+        _dg(dim * memory), _df(dim * memory), _g(dim), _g_prev(dim),
+        _f_prev(dim), _gram(memory * memory) {}
+
+  void Reset() {
+    _count = 0;
+    _next = 0;
+    _have_prev = false;
+  }
+
+  // Replaces fs = F(s) by the extrapolated next iterate. Returns false and
+  // leaves fs alone while there is no history or the least squares problem
+  // for the mixing weights is singular.
+  bool Step(const T *s, T *fs) {
+    for (size_t i = 0; i < _dim; ++i) _g[i] = fs[i] - s[i];
+    if (_have_prev) {
+      // Overwrite the oldest column and its row of the Gram matrix of dG.
+      size_t col = _next;
+      T *dg = &_dg[col * _dim], *df = &_df[col * _dim];
+      for (size_t i = 0; i < _dim; ++i) {
+        dg[i] = _g[i] - _g_prev[i];
+        df[i] = fs[i] - _f_prev[i];
+      }
+      _next = (_next + 1) % _memory;
+      _count = std::min(_count + 1, _memory);
+      for (size_t j = 0; j < _count; ++j)
+        _gram[col * _memory + j] = _gram[j * _memory + col] =
+            Dot(dg, &_dg[j * _dim]);
+    }
+    std::copy(_g.begin(), _g.end(), _g_prev.begin());
+    std::copy(fs, fs + _dim, _f_prev.begin());
+    _have_prev = true;
+    if (_count == 0) return false;
+
+    // gamma = argmin |g - dG gamma|, from the Tikhonov regularized normal
+    // equations solved by Cholesky.
+    size_t c = _count;
+    std::vector<double> L(c * c), gamma(c);
+    double trace = 0;
+    for (size_t j = 0; j < c; ++j) trace += _gram[j * _memory + j];
+    for (size_t j = 0; j < c; ++j) {
+      gamma[j] = Dot(&_dg[j * _dim], &_g[0]);
+      for (size_t l = 0; l <= j; ++l) L[j * c + l] = _gram[j * _memory + l];
+      L[j * c + j] += 1e-10 * trace;
+    }
+    for (size_t j = 0; j < c; ++j) {
+      for (size_t l = 0; l < j; ++l) L[j * c + j] -= L[j * c + l] * L[j * c + l];
+      if (!(L[j * c + j] > 0)) return false;
+      L[j * c + j] = std::sqrt(L[j * c + j]);
+      for (size_t r = j + 1; r < c; ++r) {
+        for (size_t l = 0; l < j; ++l) L[r * c + j] -= L[r * c + l] * L[j * c + l];
+        L[r * c + j] /= L[j * c + j];
+      }
+    }
+    for (size_t j = 0; j < c; ++j) {
+      for (size_t l = 0; l < j; ++l) gamma[j] -= L[j * c + l] * gamma[l];
+      gamma[j] /= L[j * c + j];
+    }
+    for (size_t j = c; j-- > 0;) {
+      for (size_t l = j + 1; l < c; ++l) gamma[j] -= L[l * c + j] * gamma[l];
+      gamma[j] /= L[j * c + j];
+      if (!std::isfinite(gamma[j])) return false;
+    }
+
+    for (size_t j = 0; j < c; ++j) {
+      const T *df = &_df[j * _dim];
+      T gj = static_cast<T>(gamma[j]);
+      for (size_t i = 0; i < _dim; ++i) fs[i] -= gj * df[i];
+    }
+    return true;
+  }
+
+ private:
+  size_t _dim;
+  unsigned int _memory, _count, _next;
+  bool _have_prev;
+  std::vector<T> _dg, _df, _g, _g_prev, _f_prev;
+  std::vector<double> _gram;
+
+  double Dot(const T *a, const T *b) const {
+    double dot = 0;
+    for (size_t i = 0; i < _dim; ++i) dot += static_cast<double>(a[i]) * b[i];
+    return dot;
   }
 };
 
@@ -75,6 +158,7 @@ H2O4GPU<T, M, P>::H2O4GPU(int sharedA, int me, int wDev, const M &A)
       _stop_early_error_fraction(1.0),
       _init_iter(kInitIter),
       _verbose(kVerbose),
+      _anderson(kAnderson),
       _adaptive_rho(kAdaptiveRho),
       _equil(kEquil),
       _gap_stop(kGapStop),
@@ -123,6 +207,7 @@ H2O4GPU<T, M, P>::H2O4GPU(const M &A)
       _stop_early_error_fraction(1.0),
       _init_iter(kInitIter),
       _verbose(kVerbose),
+      _anderson(kAnderson),
       _adaptive_rho(kAdaptiveRho),
       _equil(kEquil),
       _gap_stop(kGapStop),
@@ -164,6 +249,12 @@ int H2O4GPU<T, M, P>::_Init() {
 template <typename T, typename M, typename P>
 H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
                                       const std::vector<FunctionObj<T> > &g) {
+  return Solve(FunctionVector<T>(f), FunctionVector<T>(g));
+}
+
+template <typename T, typename M, typename P>
+H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const FunctionVector<T> &f,
+                                      const FunctionVector<T> &g) {
   double t0 = timer<double>();
   // Constants for adaptive-rho and over-relaxation.
   const T kDeltaMin = static_cast<T>(1.05);
@@ -177,6 +268,10 @@ H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
   const T kProjTolMin = static_cast<T>(1e-2);
   const T kProjTolPow = static_cast<T>(1.3);
   const T kProjTolIni = static_cast<T>(1e-5);
+  // Constants for residual balancing with Anderson acceleration.
+  const T kBalance = static_cast<T>(5.);
+  const T kRhoStepMax = static_cast<T>(10.);
+  const unsigned int kRhoInterval = 40u;
   bool use_exact_stop = true;
 
   // Initialize Projector P and Matrix A.
@@ -186,8 +281,8 @@ H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
   size_t m = _A.Rows();
   size_t mvalid = _A.ValidRows();
   size_t n = _A.Cols();
-  std::vector<FunctionObj<T> > f_cpu = f;
-  std::vector<FunctionObj<T> > g_cpu = g;
+  FunctionVector<T> f_cpu = f;
+  FunctionVector<T> g_cpu = g;
 
   // Allocate data for ADMM variables.
   gsl::vector<T> de = gsl::vector_view_array(_A._de, m + n);
@@ -196,6 +291,15 @@ H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
   gsl::vector<T> zprev = gsl::vector_calloc<T>(m + n);
   gsl::vector<T> ztemp = gsl::vector_calloc<T>(m + n);
   gsl::vector<T> z12 = gsl::vector_calloc<T>(m + n);
+  // With Anderson acceleration ADMM is the fixed point iteration of
+  // s = z + zt: zs holds s and the next s, zplain the plain ADMM step.
+  const bool anderson = _anderson > 0;
+  gsl::vector<T> zs = gsl::vector_calloc<T>(anderson ? m + n : 1);
+  gsl::vector<T> zplain = gsl::vector_calloc<T>(anderson ? m + n : 1);
+  Anderson<T> accel(anderson ? m + n : 0, _anderson);
+  bool accelerated = false;
+  T nrm_fp = static_cast<T>(0.);
+  unsigned int krho = 0u, naccepted = 0u, nrejected = 0u;
 
   // Create views for x and y components.
   gsl::vector<T> d = gsl::vector_subvector(&de, 0, m);
@@ -210,10 +314,8 @@ H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
   gsl::vector<T> ytemp = gsl::vector_subvector(&ztemp, n, m);
 
   // Scale f and g to account for diagonal scaling e and d.
-  std::transform(f_cpu.begin(), f_cpu.end(), d.data, f_cpu.begin(),
-                 ApplyOp<T, std::divides<T> >(std::divides<T>()));
-  std::transform(g_cpu.begin(), g_cpu.end(), e.data, g_cpu.begin(),
-                 ApplyOp<T, std::multiplies<T> >(std::multiplies<T>()));
+  f_cpu.Apply(d.data, std::divides<T>());
+  g_cpu.Apply(e.data, std::multiplies<T>());
 
   // TODO: Need to give scale to these
   //  const T kRhoMin     = static_cast<T>(1e-4); // lower range for adaptive
@@ -323,6 +425,30 @@ H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
     gsl::blas_axpy(kAlpha, &z12, &ztemp);
     gsl::blas_axpy(kOne - kAlpha, &zprev, &ztemp);
 
+    // Extrapolate the step with Anderson acceleration. The plain step never
+    // increases the fixed point residual |F(s) - s|, so an extrapolated s
+    // is only kept if its residual is below that of the previous iterate,
+    // otherwise the plain step from there is taken and the history dropped.
+    if (anderson) {
+      gsl::vector_memcpy(&zs, &zprev);
+      gsl::blas_axpy(kOne, &zt, &zs);
+      gsl::blas_axpy(-kOne, &ztemp, &zs);
+      T nrm_fp_k = gsl::blas_nrm2(&zs);
+      gsl::blas_axpy(kOne, &ztemp, &zs);
+      if (accelerated && !(nrm_fp_k <= nrm_fp)) {
+        gsl::vector_memcpy(&ztemp, &zplain);
+        accel.Reset();
+        accelerated = false;
+        nrejected++;
+      } else {
+        nrm_fp = nrm_fp_k;
+        gsl::vector_memcpy(&zplain, &ztemp);
+        accelerated = accel.Step(zs.data, ztemp.data);
+        naccepted += accelerated;
+      }
+      gsl::vector_memcpy(&zs, &ztemp);
+    }
+
     // Project onto y = Ax.
     T proj_tol = kProjTolMin / std::pow(static_cast<T>(k + 1), kProjTolPow);
     proj_tol = std::max(proj_tol, kProjTolMax);
@@ -428,12 +554,36 @@ H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
     }
 
     // Update dual variable.
-    gsl::blas_axpy(kAlpha, &z12, &zt);
-    gsl::blas_axpy(kOne - kAlpha, &zprev, &zt);
-    gsl::blas_axpy(-kOne, &z, &zt);
+    if (anderson) {
+      gsl::vector_memcpy(&zt, &zs);
+      gsl::blas_axpy(-kOne, &z, &zt);
+    } else {
+      gsl::blas_axpy(kAlpha, &z12, &zt);
+      gsl::blas_axpy(kOne - kAlpha, &zprev, &zt);
+      gsl::blas_axpy(-kOne, &z, &zt);
+    }
 
     // Rescale rho.
-    if (_adaptive_rho) {
+    if (_adaptive_rho && anderson) {
+      // Residual balancing: move rho by the square root of the ratio of the
+      // relative residuals when one exceeds the other kBalance times, at
+      // most every kRhoInterval iterations. The graph projection does not
+      // depend on rho, so its factorization stays valid, but the fixed point
+      // map changes and the history is dropped.
+      T ratio = (nrm_r / eps_pri) / (nrm_s / eps_dua);
+      if (k - krho >= kRhoInterval && std::isfinite(ratio) &&
+          (ratio > kBalance || ratio < 1 / kBalance)) {
+        T step = std::min(std::max(std::sqrt(ratio), 1 / kRhoStepMax),
+                          kRhoStepMax);
+        step = std::min(std::max(_rho * step, kRhoMin), kRhoMax) / _rho;
+        _rho *= step;
+        gsl::blas_scal(1 / step, &zt);
+        accel.Reset();
+        accelerated = false;
+        krho = k;
+        if (_verbose > 3) Printf("rho %e\n", _rho);
+      }
+    } else if (_adaptive_rho) {
       if (nrm_s < xi * eps_dua && nrm_r > xi * eps_pri &&
           kTau * static_cast<T>(k) > static_cast<T>(kd)) {
         if (_rho < kRhoMax) {
@@ -482,6 +632,9 @@ H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
            "Timing: Total = %3.2e s, Init = %3.2e s\n"
            "Iter  : %u\n",
            H2O4GPUStatusString(status).c_str(), _time, time_init, k);
+    if (anderson)
+      Printf("Anderson: memory = %u, accelerated = %u, rejected = %u\n",
+             _anderson, naccepted, nrejected);
     Printf(__HBAR__
            "Error Metrics:\n"
            "Pri: "
@@ -552,6 +705,8 @@ H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
   gsl::vector_free(&z12);
   gsl::vector_free(&zprev);
   gsl::vector_free(&ztemp);
+  gsl::vector_free(&zs);
+  gsl::vector_free(&zplain);
   gsl::vector_free(&x12copy);
 
   return status;
@@ -590,6 +745,21 @@ int H2O4GPU<T, M, P>::Predict(void) {
   return 0;
 }
 
+// Validation predictions for k solutions at once with a single GEMM.
+// x is a column-major n x k matrix with leading dimension ldx,
+// validPreds is a column-major mvalid x k matrix.
+template <typename T, typename M, typename P>
+int H2O4GPU<T, M, P>::PredictBatch(const T *x, size_t ldx, size_t k,
+                                   T *validPreds) {
+  // Initialize
+  if (!_done_init) _Init_Predict();
+
+  _A.MulvalidBatch(static_cast<T>(1.), x, ldx, k, static_cast<T>(0.),
+                   validPreds);
+
+  return 0;
+}
+
 template <typename T, typename M, typename P>
 void H2O4GPU<T, M, P>::ResetX(void) {
   if (!_done_init) _Init();
@@ -1,152 +1,533 @@
 /*!
  * Modifications Copyright 2017-2018 H2O.ai, Inc.
  */
-#define MAX_NCPUS 1
+#include <stdint.h>
+#include <algorithm>
+#include <cmath>
+#include <limits>
+#include <random>
+#include <vector>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 
 namespace kmeans {
 
+// Upper bound on the number of entries of one block of the distance matrix.
+const size_t kDistanceBlock = 1 << 22;
+
+inline int max_threads() {
+#ifdef _OPENMP
+  return omp_get_max_threads();
+#else
+  return 1;
+#endif
+}
+
+inline int thread_num() {
+#ifdef _OPENMP
+  return omp_get_thread_num();
+#else
+  return 0;
+#endif
+}
+
+// C = alpha * A * B^T + beta * C, all row-major, A is m x d, B is n x d.
+inline void gemm_nt(int m, int n, int d, float alpha, const float *A,
+                    const float *B, float beta, float *C) {
+  cblas_sgemm(CblasRowMajor, CblasNoTrans, CblasTrans, m, n, d, alpha, A, d,
+              B, d, beta, C, n);
+}
+
+inline void gemm_nt(int m, int n, int d, double alpha, const double *A,
+                    const double *B, double beta, double *C) {
+  cblas_dgemm(CblasRowMajor, CblasNoTrans, CblasTrans, m, n, d, alpha, A, d,
+              B, d, beta, C, n);
+}
+
+// Counter based uniform [0, 1) draw, independent of the thread layout.
+inline double uniform_hash(uint64_t seed, uint64_t round, uint64_t row) {
+  uint64_t z = seed * 0x9E3779B97F4A7C15ULL ^ (round << 48) ^ row;
+  for (int i = 0; i < 2; i++) {
+    z += 0x9E3779B97F4A7C15ULL;
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+    z ^= z >> 31;
+  }
+  return (z >> 11) * (1.0 / 9007199254740992.0);
+}
+
 template <typename T>
-void self_dot(std::vector<T> array_in, int n, int dim, std::vector<T> &dots) {
+void self_dot(const T *array_in, int n, int dim, T *dots) {
+#pragma omp parallel for
   for (int pt = 0; pt < n; pt++) {
+    const T *row = array_in + (size_t)pt * dim;
     T sum = 0.0;
     for (int i = 0; i < dim; i++) {
-      sum += array_in[pt * dim + i] * array_in[pt * dim + i];
+      sum += row[i] * row[i];
     }
     dots[pt] = sum;
   }
 }
 
 template <typename T>
-void find_centroids(std::vector<T> array_in, int n, int dim,
-                    std::vector<int> labels_in, std::vector<T> &centroids,
-                    int k) {
-  std::vector<int> members(k);  // Number of points in each cluster
-
-  std::fill(members.begin(), members.end(), 0);
-  if (0) {  // see gpu code for comments
-    std::fill(centroids.begin(), centroids.end(), 0.0);
+T squared_distance(const T *a, const T *b, int dim) {
+  T sum = 0.0;
+  for (int i = 0; i < dim; i++) {
+    T diff = a[i] - b[i];
+    sum += diff * diff;
   }
+  return sum;
+}
 
-  // Add all vectors in the cluster
-  for (int pt = 0; pt < n; pt++) {
-    int this_cluster = labels_in[pt];
-    members[this_cluster]++;
-    for (int i = 0; i < dim; i++)
-      centroids[this_cluster * dim + i] += array_in[pt * dim + i];
+/**
+ * Squared distances of n rows to k centroids as a row-major n x k matrix,
+ * ||x||^2 + ||c||^2 - 2 x c^T with the cross term done by a single GEMM.
+ */
+template <typename T>
+void compute_distances(const T *data_in, const T *data_dots_in, int n, int dim,
+                       const T *centroids_in, const T *centroid_dots, int k,
+                       T *pairwise_distances) {
+  gemm_nt(n, k, dim, (T)-2.0, data_in, centroids_in, (T)0.0,
+          pairwise_distances);
+#pragma omp parallel for
+  for (int nn = 0; nn < n; nn++) {
+    T *dist = pairwise_distances + (size_t)nn * k;
+    for (int c = 0; c < k; c++) {
+      dist[c] = std::max(dist[c] + data_dots_in[nn] + centroid_dots[c], (T)0);
+    }
   }
-  // Divide by the number of points in the cluster
-  for (int cluster = 0; cluster < k; cluster++) {
-    if (dim < 6)
-      std::cout << cluster << "(" << members[cluster] << " members):  ";
-    for (int i = 0; i < dim; i++) {
-      centroids[cluster * dim + i] /= members[cluster];
-      if (dim < 6) std::cout << centroids[cluster * dim + i] << "  ";
+}
+
+/**
+ * Computes the distance matrix in row blocks of at most kDistanceBlock
+ * entries and hands each block to f(rows, offset, pairwise_distances).
+ */
+template <typename T, typename F>
+void batch_distances(const T *data, const T *data_dots, int n, int dim,
+                     const T *centroids, const T *centroid_dots, int k, F f) {
+  int block = static_cast<int>(
+      std::max<size_t>(1, std::min<size_t>(n, kDistanceBlock / k)));
+  std::vector<T> pairwise_distances((size_t)block * k);
+  for (int offset = 0; offset < n; offset += block) {
+    int rows = std::min(block, n - offset);
+    compute_distances(data + (size_t)offset * dim, data_dots + offset, rows,
+                      dim, centroids, centroid_dots, k,
+                      pairwise_distances.data());
+    f(rows, offset, pairwise_distances.data());
+  }
+}
+
+// Closest and second closest squared distance in one row of distances.
+template <typename T>
+int nearest_two(const T *dist, int k, T *best, T *second) {
+  int idx = 0;
+  T d1 = dist[0];
+  T d2 = std::numeric_limits<T>::max();
+  for (int c = 1; c < k; c++) {
+    if (dist[c] < d1) {
+      d2 = d1;
+      d1 = dist[c];
+      idx = c;
+    } else if (dist[c] < d2) {
+      d2 = dist[c];
     }
-    if (dim < 6) std::cout << std::endl;
   }
+  *best = d1;
+  *second = d2;
+  return idx;
 }
 
-void compute_distances(std::vector<double> data_in,
-                       std::vector<double> data_dots_in, int n, int dim,
-                       std::vector<double> centroids_in,
-                       std::vector<double> centroid_dots, int k,
-                       std::vector<double> &pairwise_distances) {
-  self_dot(centroids_in, k, dim, centroid_dots);
-  for (int nn = 0; nn < n; nn++)
-    for (int c = 0; c < k; c++) {
-      pairwise_distances[nn * k + c] = data_dots_in[nn] + centroid_dots[c];
+template <typename T>
+void relabel(const T *data, const T *data_dots, int n, int dim,
+             const T *centroids, int k, int *labels) {
+  std::vector<T> centroid_dots(k);
+  self_dot(centroids, k, dim, centroid_dots.data());
+  batch_distances(data, data_dots, n, dim, centroids, centroid_dots.data(), k,
+                  [&](int rows, int offset, const T *pairwise_distances) {
+#pragma omp parallel for
+                    for (int i = 0; i < rows; i++) {
+                      T d1, d2;
+                      labels[offset + i] = nearest_two(
+                          pairwise_distances + (size_t)i * k, k, &d1, &d2);
+                    }
+                  });
+}
+
+/**
+ * Recomputes centroids as the mean of their members. Clusters left without
+ * members keep their previous centroid.
+ */
+template <typename T>
+void find_centroids(const T *data, int n, int dim, const int *labels,
+                    T *centroids, int k) {
+  int n_threads = max_threads();
+  std::vector<T> sums((size_t)n_threads * k * dim, (T)0);
+  std::vector<int> members((size_t)n_threads * k, 0);
+
+#pragma omp parallel num_threads(n_threads)
+  {
+    int t = thread_num();
+    T *sum = &sums[(size_t)t * k * dim];
+    int *count = &members[(size_t)t * k];
+#pragma omp for schedule(static)
+    for (int pt = 0; pt < n; pt++) {
+      int c = labels[pt];
+      const T *row = data + (size_t)pt * dim;
+      T *centroid = sum + (size_t)c * dim;
+      count[c]++;
+      for (int i = 0; i < dim; i++) centroid[i] += row[i];
+    }
+  }
+
+#pragma omp parallel for
+  for (int c = 0; c < k; c++) {
+    int count = 0;
+    for (int t = 0; t < n_threads; t++) count += members[(size_t)t * k + c];
+    if (count == 0) continue;
+    for (int i = 0; i < dim; i++) {
+      T sum = 0;
+      for (int t = 0; t < n_threads; t++)
+        sum += sums[((size_t)t * k + c) * dim + i];
+      centroids[(size_t)c * dim + i] = sum / count;
     }
-  double alpha = -2.0;
-  double beta = 1.0;
-  cblas_dgemm(CblasRowMajor, CblasNoTrans, CblasTrans, n, k, dim, alpha,
-              &data_in[0], dim, &centroids_in[0], dim, beta,
-              &pairwise_distances[0], k);
+  }
 }
 
-void compute_distances(std::vector<float> data_in,
-                       std::vector<float> data_dots_in, int n, int dim,
-                       std::vector<float> centroids_in,
-                       std::vector<float> centroid_dots, int k,
-                       std::vector<float> &pairwise_distances) {
-  self_dot(centroids_in, k, dim, centroid_dots);
-  for (int nn = 0; nn < n; nn++)
-    for (int c = 0; c < k; c++) {
-      pairwise_distances[nn * k + c] = data_dots_in[nn] + centroid_dots[c];
+/**
+ * Greedy K-Means++ seeding over a (small) weighted set of points, returns
+ * the indices of the k chosen points. Every step samples 2 + log(k)
+ * candidates and keeps the one that lowers the weighted potential most,
+ * plain K-Means++ often leaves well separated clusters without a centroid.
+ */
+template <typename T>
+std::vector<int> kmeans_plus_plus(int verbose, int seed, const T *points,
+                                  const std::vector<T> &weights, int m,
+                                  int dim, int k) {
+  std::mt19937 gen(seed);
+  std::vector<int> chosen;
+  chosen.reserve(k);
+  std::vector<double> probs(weights.begin(), weights.end());
+  std::vector<T> best_distances(m, std::numeric_limits<T>::max());
+  std::vector<T> trial_distances(m), kept_distances(m);
+  int n_trials = 2 + static_cast<int>(std::log(k));
+
+  for (int iter = 0; iter < k; iter++) {
+    log_verbose(verbose, "KMeans++ - Iteration %d/%d.", iter, k);
+    double total = 0.0;
+    for (int j = 0; j < m; j++) total += probs[j];
+
+    int idx = -1;
+    if (total > 0.0) {
+      std::discrete_distribution<int> sample(probs.begin(), probs.end());
+      double best_potential = std::numeric_limits<double>::max();
+      for (int trial = 0; trial < (iter == 0 ? 1 : n_trials); trial++) {
+        int candidate = sample(gen);
+        const T *centroid = points + (size_t)candidate * dim;
+        double potential = 0.0;
+#pragma omp parallel for reduction(+ : potential)
+        for (int j = 0; j < m; j++) {
+          trial_distances[j] =
+              std::min(best_distances[j],
+                       squared_distance(points + (size_t)j * dim, centroid,
+                                        dim));
+          potential += weights[j] * trial_distances[j];
+        }
+        if (potential < best_potential) {
+          best_potential = potential;
+          idx = candidate;
+          kept_distances.swap(trial_distances);
+        }
+      }
+      best_distances.swap(kept_distances);
+    } else {
+      // Remaining points coincide with chosen ones, take any of them.
+      for (int j = 0; j < m && idx < 0; j++) {
+        if (std::find(chosen.begin(), chosen.end(), j) == chosen.end()) idx = j;
+      }
+      const T *centroid = points + (size_t)idx * dim;
+      for (int j = 0; j < m; j++) {
+        best_distances[j] = std::min(
+            best_distances[j],
+            squared_distance(points + (size_t)j * dim, centroid, dim));
+      }
     }
-  float alpha = -2.0;
-  float beta = 1.0;
-  cblas_sgemm(CblasRowMajor, CblasNoTrans, CblasTrans, n, k, dim, alpha,
-              &data_in[0], dim, &centroids_in[0], dim, beta,
-              &pairwise_distances[0], k);
+    chosen.push_back(idx);
+
+    for (int j = 0; j < m; j++) probs[j] = weights[j] * best_distances[j];
+    probs[idx] = 0.0;
+  }
+  return chosen;
 }
 
+/**
+ * K-Means|| initialization as described in "Scalable K-Means++", the CPU
+ * counterpart of kmeans_parallel in the GPU backend. Each round samples
+ * rows with probability 2 k cost(x) / total cost, the resulting candidates
+ * are weighted by the number of rows they attract and reduced to k centroids
+ * with K-Means++.
+ *
+ * http://theory.stanford.edu/~sergei/papers/vldb12-kmpar.pdf
+ */
 template <typename T>
-int relabel(std::vector<T> data_in, int n, std::vector<T> pairwise_distances_in,
-            int k, std::vector<int> &labels) {
-  int changes = 0;
-  for (int nn = 0; nn < n; nn++) {
-    T min = pairwise_distances_in[nn * k];
-    int idx = 0;
-    for (int cc = 1; cc < k; cc++) {
-      T this_dist = pairwise_distances_in[nn * k + cc];
-      if (this_dist < min) {
-        idx = cc;
-        min = this_dist;
+void kmeans_parallel(int verbose, int seed, const T *data, const T *data_dots,
+                     int n, int dim, int k, T *centroids) {
+  std::mt19937 gen(seed);
+  std::uniform_int_distribution<> dis(0, n - 1);
+
+  std::vector<int> candidates(1, dis(gen));
+  std::vector<int> fresh = candidates;
+  std::vector<T> min_costs(n, std::numeric_limits<T>::max());
+  std::vector<T> fresh_data, fresh_dots;
+
+  // The original white paper claims 8 should be enough
+  int max_iter = std::min(8, (int)(2 + std::log(k)));
+  for (int counter = 0; counter < max_iter; counter++) {
+    log_verbose(verbose, "KMeans|| - Iteration %d.", counter);
+    int n_fresh = fresh.size();
+    if (n_fresh > 0) {
+      fresh_data.resize((size_t)n_fresh * dim);
+      fresh_dots.resize(n_fresh);
+      for (int j = 0; j < n_fresh; j++) {
+        std::copy(data + (size_t)fresh[j] * dim,
+                  data + (size_t)(fresh[j] + 1) * dim,
+                  fresh_data.begin() + (size_t)j * dim);
+        fresh_dots[j] = data_dots[fresh[j]];
       }
+      batch_distances(
+          data, data_dots, n, dim, fresh_data.data(), fresh_dots.data(),
+          n_fresh, [&](int rows, int offset, const T *pairwise_distances) {
+#pragma omp parallel for
+            for (int i = 0; i < rows; i++) {
+              const T *dist = pairwise_distances + (size_t)i * n_fresh;
+              T best = *std::min_element(dist, dist + n_fresh);
+              min_costs[offset + i] = std::min(min_costs[offset + i], best);
+            }
+          });
     }
-    if (labels[nn] != idx) {
-      changes++;
-      labels[nn] = idx;
+
+    double total_min_cost = 0.0;
+#pragma omp parallel for reduction(+ : total_min_cost)
+    for (int i = 0; i < n; i++) total_min_cost += min_costs[i];
+
+    log_verbose(verbose, "KMeans|| - Total min cost from centers %g.",
+                total_min_cost);
+
+    if (total_min_cost == 0.0) break;
+
+    std::vector<char> picked(n);
+#pragma omp parallel for
+    for (int i = 0; i < n; i++) {
+      double prob_x = 2.0 * k * min_costs[i] / total_min_cost;
+      picked[i] = prob_x > uniform_hash(seed, counter, i);
+    }
+    fresh.clear();
+    for (int i = 0; i < n; i++) {
+      if (picked[i]) fresh.push_back(i);
+    }
+    candidates.insert(candidates.end(), fresh.begin(), fresh.end());
+
+    log_verbose(verbose, "KMeans|| - New potential centroids %d.",
+                (int)fresh.size());
+  }
+
+  int n_candidates = candidates.size();
+  std::vector<int> chosen_rows;
+  if (n_candidates <= k) {
+    // Too few candidates (e.g. many duplicate rows), top up with random rows
+    chosen_rows = candidates;
+    std::vector<char> used(n, 0);
+    for (int row : chosen_rows) used[row] = 1;
+    std::vector<int> order(n);
+    for (int i = 0; i < n; i++) order[i] = i;
+    std::shuffle(order.begin(), order.end(), gen);
+    for (int i = 0; i < n && (int)chosen_rows.size() < k; i++) {
+      if (!used[order[i]]) chosen_rows.push_back(order[i]);
     }
+  } else {
+    std::vector<T> candidate_data((size_t)n_candidates * dim);
+    std::vector<T> candidate_dots(n_candidates);
+    for (int j = 0; j < n_candidates; j++) {
+      std::copy(data + (size_t)candidates[j] * dim,
+                data + (size_t)(candidates[j] + 1) * dim,
+                candidate_data.begin() + (size_t)j * dim);
+      candidate_dots[j] = data_dots[candidates[j]];
+    }
+
+    // Weights correspond to the number of data points assigned to each
+    // potential cluster center
+    std::vector<int> closest(n);
+    batch_distances(data, data_dots, n, dim, candidate_data.data(),
+                    candidate_dots.data(), n_candidates,
+                    [&](int rows, int offset, const T *pairwise_distances) {
+#pragma omp parallel for
+                      for (int i = 0; i < rows; i++) {
+                        T d1, d2;
+                        closest[offset + i] = nearest_two(
+                            pairwise_distances + (size_t)i * n_candidates,
+                            n_candidates, &d1, &d2);
+                      }
+                    });
+    std::vector<T> weights(n_candidates, (T)0);
+    for (int i = 0; i < n; i++) weights[closest[i]] += 1;
+
+    std::vector<int> chosen = kmeans_plus_plus(
+        verbose, seed, candidate_data.data(), weights, n_candidates, dim, k);
+    for (int idx : chosen) chosen_rows.push_back(candidates[idx]);
+  }
+
+  for (int c = 0; c < k; c++) {
+    std::copy(data + (size_t)chosen_rows[c] * dim,
+              data + (size_t)(chosen_rows[c] + 1) * dim,
+              centroids + (size_t)c * dim);
   }
-  return changes;
 }
 
+/**
+ * Lloyd iterations with Hamerly's triangle inequality pruning.
+ *
+ * Every row keeps an upper bound on the distance to its assigned centroid
+ * and a lower bound on the distance to any other centroid. Rows whose upper
+ * bound stays below max(lower bound, half the distance from the assigned
+ * centroid to its closest neighbour) cannot change cluster and are skipped,
+ * the remaining rows are gathered and relabeled with blocked GEMM.
+ *
+ * Iterations stop after max_iterations, when no row changes cluster or when
+ * the squared centroid movement drops below threshold (same criterion as
+ * the GPU backend). Labels always refer to the returned centroids.
+ *
+ * @return The number of iterations actually performed.
+ */
 template <typename T>
 int kmeans(int verbose, volatile std::atomic_int *flag, int n, int d, int k,
-           std::vector<T> &data, std::vector<int> &labels,
-           std::vector<T> &centroids, int max_iterations,
-           int init_from_data = 0, double threshold = 1e-3) {
-  // TRANSLATE to CPU CODE
-  std::vector<T> data_dots(n);
+           const T *data, const T *data_dots, int *labels, T *centroids,
+           int max_iterations, double threshold = 1e-3) {
   std::vector<T> centroid_dots(k);
-  std::vector<T> pairwise_distances(k * n);
-  std::vector<int> labels_copy(n);
+  std::vector<T> old_centroids((size_t)k * d);
+  std::vector<T> shift(k);
+  std::vector<T> half_separation(k);
+  std::vector<T> centroid_distances((size_t)k * k);
+  std::vector<T> upper(n), lower(n);
+  std::vector<char> stale(n);
+  std::vector<int> todo;
 
-  // rest is original CPU code
-  self_dot(data, n, d, data_dots);
+  self_dot(centroids, k, d, centroid_dots.data());
+  batch_distances(data, data_dots, n, d, centroids, centroid_dots.data(), k,
+                  [&](int rows, int offset, const T *pairwise_distances) {
+#pragma omp parallel for
+                    for (int i = 0; i < rows; i++) {
+                      T d1, d2;
+                      labels[offset + i] = nearest_two(
+                          pairwise_distances + (size_t)i * k, k, &d1, &d2);
+                      upper[offset + i] = std::sqrt(d1);
+                      lower[offset + i] = std::sqrt(d2);
+                    }
+                  });
 
-  // Let the first k points be the centroids of the clusters
-  //    memcpy(&centroids[0], &data[0], sizeof(T)*k*d);
+  int block = static_cast<int>(
+      std::max<size_t>(1, std::min<size_t>(n, kDistanceBlock / k)));
+  std::vector<T> block_data((size_t)block * d);
+  std::vector<T> block_dots(block);
+  std::vector<T> block_distances((size_t)block * k);
 
   int i;
   for (i = 0; i < max_iterations; i++) {
-    compute_distances(data, data_dots, n, d, centroids, centroid_dots, k,
-                      pairwise_distances);
-
-    int moved_points = relabel(data, n, pairwise_distances, k, labels);
-    std::cout << std::endl << "*** Iteration " << i << " ***" << std::endl;
-    std::cout << moved_points << " points moved between clusters." << std::endl;
-
-    if (i > 0) {
-      double fraction = (double)moved_points / n;
-#define NUMSTEP 10
-      if (VERBOSE || VERBOSE == 0 && i % NUMSTEP == 0) {
-        std::cout << "Iteration: " << i << ", moved points: " << moved_points
-                  << std::endl;
+    std::copy(centroids, centroids + (size_t)k * d, old_centroids.begin());
+    find_centroids(data, n, d, labels, centroids, k);
+
+    double squared_norm = 0.0;
+    int max_c = 0;
+    T max_shift = 0, second_shift = 0;
+    for (int c = 0; c < k; c++) {
+      T moved2 = squared_distance(centroids + (size_t)c * d,
+                                  &old_centroids[(size_t)c * d], d);
+      squared_norm += moved2;
+      shift[c] = std::sqrt(moved2);
+      if (shift[c] > max_shift) {
+        second_shift = max_shift;
+        max_shift = shift[c];
+        max_c = c;
+      } else if (shift[c] > second_shift) {
+        second_shift = shift[c];
+      }
+    }
+
+    self_dot(centroids, k, d, centroid_dots.data());
+    compute_distances(centroids, centroid_dots.data(), k, d, centroids,
+                      centroid_dots.data(), k, centroid_distances.data());
+    for (int c = 0; c < k; c++) {
+      T closest = std::numeric_limits<T>::max();
+      for (int o = 0; o < k; o++) {
+        if (o != c) closest = std::min(closest, centroid_distances[c * k + o]);
+      }
+      half_separation[c] = std::sqrt(closest) / 2;
+    }
+
+#pragma omp parallel for
+    for (int pt = 0; pt < n; pt++) {
+      int c = labels[pt];
+      upper[pt] += shift[c];
+      lower[pt] -= c == max_c ? second_shift : max_shift;
+      T bound = std::max(half_separation[c], lower[pt]);
+      stale[pt] = 0;
+      if (upper[pt] > bound) {
+        upper[pt] = std::sqrt(squared_distance(data + (size_t)pt * d,
+                                               centroids + (size_t)c * d, d));
+        stale[pt] = upper[pt] > bound;
       }
-      if (fraction < threshold || 0 == moved_points) {
-        std::cout << "Threshold triggered. Terminating early." << std::endl;
-        return i + 1;
+    }
+
+    todo.clear();
+    for (int pt = 0; pt < n; pt++) {
+      if (stale[pt]) todo.push_back(pt);
+    }
+
+    int moved_points = 0;
+    int n_todo = todo.size();
+    for (int offset = 0; offset < n_todo; offset += block) {
+      int rows = std::min(block, n_todo - offset);
+#pragma omp parallel for
+      for (int r = 0; r < rows; r++) {
+        int pt = todo[offset + r];
+        std::copy(data + (size_t)pt * d, data + (size_t)(pt + 1) * d,
+                  block_data.begin() + (size_t)r * d);
+        block_dots[r] = data_dots[pt];
+      }
+      compute_distances(block_data.data(), block_dots.data(), rows, d,
+                        centroids, centroid_dots.data(), k,
+                        block_distances.data());
+#pragma omp parallel for reduction(+ : moved_points)
+      for (int r = 0; r < rows; r++) {
+        int pt = todo[offset + r];
+        T d1, d2;
+        int idx =
+            nearest_two(block_distances.data() + (size_t)r * k, k, &d1, &d2);
+        if (idx != labels[pt]) {
+          labels[pt] = idx;
+          moved_points++;
+        }
+        upper[pt] = std::sqrt(d1);
+        lower[pt] = std::sqrt(d2);
       }
     }
+
+    log_verbose(verbose,
+                "KMeans - Iteration %d, recomputed %d rows, moved points %d.",
+                i, n_todo, moved_points);
+
+    if (moved_points == 0 || squared_norm < threshold) {
+      log_debug(verbose, "KMeans - Threshold triggered. Terminating early.");
+      i++;
+      break;
+    }
+
     if (*flag) {
       fprintf(stderr, "Signal caught. Terminated early.\n");
       fflush(stderr);
       *flag = 0;  // set flag
+      i++;
+      break;
     }
-
-    find_centroids(data, n, d, labels, centroids, k);
   }
 
   return i;
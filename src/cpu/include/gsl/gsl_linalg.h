@@ -2,6 +2,7 @@
 #define GSL_LINALG_H_
 
 #include <cmath>
+#include <limits>
 
 #include "gsl_blas.h"
 #include "gsl_matrix.h"
@@ -60,6 +61,70 @@ void linalg_cholesky_svx(const matrix<T, O> *LLT, vector<T> *x) {
   blas_trsv(CblasLower, CblasTrans, CblasNonUnit, LLT, x);
 }
 
+// Cyclic Jacobi eigendecomposition of a symmetric matrix.
+//   A = Q diag(eval) Q^T
+//
+// Only the lower triangular part of A is read, A is overwritten.
+// Eigenvectors are stored in the columns of Q.
+template <typename T, CBLAS_ORDER O>
+void linalg_symm_eigen(matrix<T, O> *A, vector<T> *eval, matrix<T, O> *Q) {
+  size_t n = A->size1;
+  const size_t kMaxSweeps = 100;
+  for (size_t i = 0; i < n; ++i) {
+    for (size_t j = 0; j < i; ++j)
+      matrix_set(A, j, i, matrix_get(A, i, j));
+  }
+  matrix_set_all(Q, static_cast<T>(0));
+  for (size_t i = 0; i < n; ++i)
+    matrix_set(Q, i, i, static_cast<T>(1));
+
+  for (size_t sweep = 0; sweep < kMaxSweeps; ++sweep) {
+    double off = 0, diag = 0;
+    for (size_t i = 0; i < n; ++i) {
+      diag += static_cast<double>(matrix_get(A, i, i)) * matrix_get(A, i, i);
+      for (size_t j = 0; j < i; ++j)
+        off += static_cast<double>(matrix_get(A, i, j)) * matrix_get(A, i, j);
+    }
+    if (off <= std::numeric_limits<T>::epsilon() *
+        std::numeric_limits<T>::epsilon() * diag)
+      break;
+
+    for (size_t p = 0; p + 1 < n; ++p) {
+      for (size_t q = p + 1; q < n; ++q) {
+        T apq = matrix_get(A, p, q);
+        if (apq == static_cast<T>(0))
+          continue;
+        // Rotation zeroing A(p, q).
+        T theta = (matrix_get(A, q, q) - matrix_get(A, p, p)) / (2 * apq);
+        T t = static_cast<T>(theta >= 0 ? 1 : -1) /
+            (std::abs(theta) + std::sqrt(theta * theta + 1));
+        T c = 1 / std::sqrt(t * t + 1);
+        T s = t * c;
+        for (size_t k = 0; k < n; ++k) {
+          T akp = matrix_get(A, k, p);
+          T akq = matrix_get(A, k, q);
+          matrix_set(A, k, p, c * akp - s * akq);
+          matrix_set(A, k, q, s * akp + c * akq);
+        }
+        for (size_t k = 0; k < n; ++k) {
+          T apk = matrix_get(A, p, k);
+          T aqk = matrix_get(A, q, k);
+          matrix_set(A, p, k, c * apk - s * aqk);
+          matrix_set(A, q, k, s * apk + c * aqk);
+        }
+        for (size_t k = 0; k < n; ++k) {
+          T qkp = matrix_get(Q, k, p);
+          T qkq = matrix_get(Q, k, q);
+          matrix_set(Q, k, p, c * qkp - s * qkq);
+          matrix_set(Q, k, q, s * qkp + c * qkq);
+        }
+      }
+    }
+  }
+  for (size_t i = 0; i < n; ++i)
+    vector_set(eval, i, matrix_get(A, i, i));
+}
+
 }  // namespace gsl
 
 #endif  // GSL_LINALG_H_
@@ -8,6 +8,7 @@
 #include <cstring>
 #include <unistd.h>
 #include <numeric>
+#include <stdexcept>
 //#include <execution>
 
 #include "gsl/gsl_blas.h"
@@ -50,6 +51,9 @@ template <typename T>
 void MultDiag(const T *d, const T *e, size_t m, size_t n,
               typename MatrixDense<T>::Ord ord, T *data);
 
+template <typename T>
+void CopyAddIntercept(char ord, size_t m, size_t n, const T *src, T *dst);
+
 }  // namespace
 
   // TODO: Can have Equil (or whatever wants to modify _data) called by single core first when inporting 
@@ -257,7 +261,18 @@ MatrixDense<T>::MatrixDense(int sharedA, int me, int wDev, int datatype, char or
 
   if(!this->_done_alloc){
     this->_done_alloc = true;
-    if(sharedA!=0){ // can't do this in case input pointers were from one thread and this function called on multiple threads.  However, currently, this function is only called by outside parallel region when getting first copying. For sharedA case, minimize memory use overall, so allow pointer assignment here just for source (this assumes scoring using internal calculation, not using OLDPREDS because matrix is modified).  So this call isn't only because shared memory case, but rather want minimal memory even on source thread in shared memory case
+    if(sharedA>=0){ // the matrix owns one copy of the data. With sharedA>0 it is for all threads, equilibrated once by the caller (Init() then Equil()) and only read afterwards
+      _shared = std::make_shared<Shared>();
+      if(data) _shared->data.assign(data, data + this->_m * this->_n);
+      if(datay) _shared->datay.assign(datay, datay + this->_m);
+      if(vdata) _shared->vdata.assign(vdata, vdata + this->_mvalid * this->_n);
+      if(vdatay) _shared->vdatay.assign(vdatay, vdatay + this->_mvalid);
+      if(weight) _shared->weight.assign(weight, weight + this->_m);
+      else _shared->weight.assign(this->_m, static_cast<T>(1.0));
+      _shared->de.assign(this->_m + this->_n, static_cast<T>(0.0));
+      Adopt();
+    }
+    else{ // can't do this in case input pointers were from one thread and this function called on multiple threads.  However, currently, this function is only called by outside parallel region when getting first copying. For sharedA case, minimize memory use overall, so allow pointer assignment here just for source (this assumes scoring using internal calculation, not using OLDPREDS because matrix is modified).  So this call isn't only because shared memory case, but rather want minimal memory even on source thread in shared memory case
       _data = const_cast<T*>(data);
       _datay = const_cast<T*>(datay);
       if(_datay) _dopredict=0; else _dopredict=1;
@@ -265,59 +280,9 @@ MatrixDense<T>::MatrixDense(int sharedA, int me, int wDev, int datatype, char or
       _vdatay = const_cast<T*>(vdatay);
       _weight = const_cast<T*>(weight);
     }
-    else{
-      // TODO: Properly free these at end if allocated.  Just need flag to say if allocated, as can't just check if NULL or not.
-
-      if(VERBOSEOUT){ fprintf(stderr,"1 %p\n",info->orig_data); fflush(stderr); }
-      if(info->orig_data){
-    	if(VERBOSEOUT){ fprintf(stderr,"1a %p\n",info->orig_data); fflush(stderr); }
-        _data = new T[this->_m * this->_n];
-        if(VERBOSEOUT){ fprintf(stderr,"1b %p\n",info->orig_data); fflush(stderr); }
-        ASSERT(_data != 0);
-        memcpy(_data, info->orig_data, this->_m * this->_n * sizeof(T));
-        if(VERBOSEOUT){ fprintf(stderr,"1c %p\n",info->orig_data); fflush(stderr); }
-      }
-      if(VERBOSEOUT){ fprintf(stderr,"2\n"); fflush(stderr); }
-      if(infoy->orig_data){
-        _datay = new T[this->_m];
-        ASSERT(_datay != 0);
-        memcpy(_datay, infoy->orig_data, this->_m * sizeof(T));
-        _dopredict=0;
-      }
-      else _dopredict=1;
-      if(VERBOSEOUT){ fprintf(stderr,"3\n"); fflush(stderr); }
-      if(vinfo->orig_data){
-        _vdata = new T[this->_mvalid * this->_n];
-        ASSERT(_vdata != 0);
-        memcpy(_vdata, vinfo->orig_data, this->_mvalid * this->_n * sizeof(T));
-      }
-      if(VERBOSEOUT){ fprintf(stderr,"4\n"); fflush(stderr); }
-      if(vinfoy->orig_data){
-        _vdatay = new T[this->_mvalid];
-        ASSERT(_vdatay != 0);
-        memcpy(_vdatay, vinfoy->orig_data, this->_mvalid * sizeof(T));
-      }
-      if(VERBOSEOUT){ fprintf(stderr,"5\n"); fflush(stderr); }
-      if(weightinfo->orig_data){
-        _weight = new T[this->_m];
-        ASSERT(_weight != 0);
-        memcpy(_weight, weightinfo->orig_data, this->_m * sizeof(T));
-        //for(size_t ii=0;ii<this->_m;ii++){
-//        	fprintf(stderr,"weight[%d]=%g\n",ii,_weight[ii]);
-        	//fflush(stderr);
-        //}
-      }
-      else{
-        _weight = new T[this->_m];
-        ASSERT(_weight != 0);
-        std::fill(_weight, _weight + this->_m,1.0);
-      }
-    }
     if(VERBOSEOUT){ fprintf(stderr,"6\n"); fflush(stderr); }
-    _de = new T[this->_m + this->_n]; ASSERT(_de != 0);std::fill(_de, _de + this->_m + this->_n, 0.0); // NOTE: If passing pointers, only pass data pointers out and back in in this function, so _de still needs to get allocated and equlilibrated.  This means allocation and equilibration done twice effectively.  Can avoid during first pointer assignment if want to pass user option JONTODO
-    if(sharedA>0){
-      Init();
-      Equil(1); // JONTODO: hack for now, should pass user bool
+    if(!_shared){
+      _de = new T[this->_m + this->_n]; ASSERT(_de != 0);std::fill(_de, _de + this->_m + this->_n, 0.0); // NOTE: If passing pointers, only pass data pointers out and back in in this function, so _de still needs to get allocated and equlilibrated.  This means allocation and equilibration done twice effectively.  Can avoid during first pointer assignment if want to pass user option JONTODO
     }
   }
   if(VERBOSEOUT){ fprintf(stderr,"7\n"); fflush(stderr); }
@@ -348,6 +313,31 @@ MatrixDense<T>::MatrixDense(int sharedA, int me, int wDev, int datatype, char or
 
 }
 
+  // Takes over the rows built by the caller instead of copying them, e.g. the training rows of a fold in src/common/elastic_net_ptr.cpp
+template <typename T>
+MatrixDense<T>::MatrixDense(int sharedA, int me, int wDev, char ord, size_t m, size_t n, size_t mValid, std::vector<T> &&data, std::vector<T> &&datay, const T *vdata, const T *vdatay, std::vector<T> &&weight)
+  : MatrixDense<T>(sharedA < 0 ? 0 : sharedA, me, wDev, 0, ord, m, n, mValid, 0, 0, const_cast<T*>(vdata), const_cast<T*>(vdatay), 0) {
+  ASSERT(data.size() == m * n && datay.size() == m && weight.size() == m);
+  _shared->data.swap(data);
+  _shared->datay.swap(datay);
+  _shared->weight.swap(weight);
+  Adopt();
+  reinterpret_cast<CpuData<T>*>(this->_info)->orig_data = _data;
+  reinterpret_cast<CpuData<T>*>(this->_infoy)->orig_data = _datay;
+  reinterpret_cast<CpuData<T>*>(this->_weightinfo)->orig_data = _weight;
+}
+
+template <typename T>
+void MatrixDense<T>::Adopt() {
+  _data = _shared->data.empty() ? 0 : &_shared->data[0];
+  _datay = _shared->datay.empty() ? 0 : &_shared->datay[0];
+  _dopredict = _datay ? 0 : 1;
+  _vdata = _shared->vdata.empty() ? 0 : &_shared->vdata[0];
+  _vdatay = _shared->vdatay.empty() ? 0 : &_shared->vdatay[0];
+  _weight = _shared->weight.empty() ? 0 : &_shared->weight[0];
+  _de = &_shared->de[0];
+}
+
 
 
 template <typename T>
@@ -379,7 +369,8 @@ MatrixDense<T>::MatrixDense(int sharedA, int me, int wDev, const MatrixDense<T>&
   else vinfo = new CpuData<T>(0);
   if(A._vdatay) vinfoy = new CpuData<T>(vinfoy_A->orig_data); // create new CpuData structure with point to CPU data
   else vinfoy = new CpuData<T>(0);
-  if(A._weight) weightinfo = new CpuData<T>(weightinfo_A->orig_data); // create new CpuData structure with point to CPU data
+  // (a thread's duplicate of a matrix without weights has unit _weight but no _weightinfo)
+  if(A._weight && weightinfo_A) weightinfo = new CpuData<T>(weightinfo_A->orig_data); // create new CpuData structure with point to CPU data
   else weightinfo = new CpuData<T>(0);
 
   if(A._data) this->_info = reinterpret_cast<void*>(info); // back to cast as void
@@ -400,6 +391,8 @@ MatrixDense<T>::MatrixDense(int sharedA, int me, int wDev, const MatrixDense<T>&
       _vdatay = A._vdatay;
       _weight = A._weight;
       _de = A._de; // now share de as never gets modified after original A was processed
+      _shared = A._shared;
+      this->_done_equil = A._done_equil; // equilibrated data must not be scaled again
       //      Init();
       //      this->_done_equil=1;
     }
@@ -432,7 +425,7 @@ MatrixDense<T>::MatrixDense(int sharedA, int me, int wDev, const MatrixDense<T>&
       if(A._weight){
         _weight = new T[A._m];
         ASSERT(_weight != 0);
-        memcpy(_weight, weightinfo_A->orig_data, A._m * sizeof(T));
+        memcpy(_weight, A._weight, A._m * sizeof(T)); // weights are never modified, unlike _data
       }
       else{
         _weight = new T[this->_m];
@@ -485,43 +478,43 @@ MatrixDense<T>::~MatrixDense() {
     this->_weightinfo = 0;
   }
   
-  if(1){ // Note that this frees these pointers as soon as MatrixDense constructor goes out of scope, and might want more fine-grained control over GPU memory if inside (say) high-level python API
+  if(!_shared){ // Note that this frees these pointers as soon as MatrixDense constructor goes out of scope, and might want more fine-grained control over GPU memory if inside (say) high-level python API
 
     if (this->_done_init && _data) {
       //      fprintf(stderr,"Freeing _data: %p\n",(void*)_data); fflush(stderr);
-      delete _data;
+      delete[] _data;
       this->_data = 0;
     }
     //  fprintf(stderr,"HERE2\n"); fflush(stderr);
     if (this->_done_init && _datay) {
       //      fprintf(stderr,"Freeing _datay: %p\n",(void*)_datay); fflush(stderr);
-      delete _datay;
+      delete[] _datay;
       this->_datay = 0;
     }
     //  fprintf(stderr,"HERE3\n"); fflush(stderr);
     if (this->_done_init && _vdata) {
       //      fprintf(stderr,"Freeing _vdata: %p\n",(void*)_vdata); fflush(stderr);
-      delete _vdata;
+      delete[] _vdata;
       this->_vdata = 0;
     }
     //  fprintf(stderr,"HERE4\n"); fflush(stderr);
     if (this->_done_init && _vdatay) {
       //      fprintf(stderr,"Freeing _vdatay: %p\n",(void*)_vdatay); fflush(stderr);
-      delete _vdatay;
+      delete[] _vdatay;
       this->_vdatay = 0;
     }
     //  fprintf(stderr,"HERE5\n"); fflush(stderr);
 
     if (this->_done_init && _weight) {
       //      fprintf(stderr,"Freeing _weight: %p\n",(void*)_weight); fflush(stderr);
-      delete _weight;
+      delete[] _weight;
       this->_weight = 0;
     }
     //  fprintf(stderr,"HERE6\n"); fflush(stderr);
 
     if(this->_done_init && _de && !_sharedA){ // JONTODO: When sharedA=1, only free on sourceme thread and sourcewDev device (can store sourcethread for-- sourceme -- data and only free if on source thread)
       //      fprintf(stderr,"Freeing _de: %p\n",(void*)_weight); fflush(stderr);
-      delete _de;
+      delete[] _de;
       this->_de=0;
     }
   }
@@ -617,8 +610,6 @@ int MatrixDense<T>::Mulvalid(char trans, T alpha, const T *x, T beta, T *y) cons
   const gsl::vector<T> x_vec = gsl::vector_view_array<T>(x, this->_n);
   gsl::vector<T> y_vec = gsl::vector_view_array<T>(y, this->_mvalid);
 
-  fprintf(stderr,"_ord=%d mvalid=%d n=%d\n",_ord,this->_mvalid,this->_n); fflush(stderr);
-
   //  for(int i=0; i<this->_mvalid;i++){
   //    for(int j=0;j<this->_n;j++){
   //      fprintf(stderr,"i=%d j=%d A=%g x=%g\n",i,j,_vdata[i*this->_n + j],x[j]);
@@ -641,6 +632,36 @@ int MatrixDense<T>::Mulvalid(char trans, T alpha, const T *x, T beta, T *y) cons
 }
 
 
+// Y = alpha * Avalid * X + beta * Y for k vectors at once, X is a
+// column-major n x k matrix with leading dimension ldx and Y is a
+// column-major mvalid x k matrix.
+template <typename T>
+int MatrixDense<T>::MulvalidBatch(T alpha, const T *x, size_t ldx, size_t k,
+                                  T beta, T *y) const {
+  DEBUG_EXPECT(this->_done_init);
+  if (!this->_done_init)
+    return 1;
+
+  gsl::matrix<T, CblasColMajor> X =
+      gsl::matrix_view_array<T, CblasColMajor>(x, this->_n, k);
+  X.tda = ldx;
+  gsl::matrix<T, CblasColMajor> Y =
+      gsl::matrix_view_array<T, CblasColMajor>(y, this->_mvalid, k);
+
+  if (_ord == ROW) {
+    // row-major Avalid is its column-major transpose
+    gsl::matrix<T, CblasColMajor> At =
+        gsl::matrix_view_array<T, CblasColMajor>(_vdata, this->_n, this->_mvalid);
+    gsl::blas_gemm(CblasTrans, CblasNoTrans, alpha, &At, &X, beta, &Y);
+  } else {
+    gsl::matrix<T, CblasColMajor> A =
+        gsl::matrix_view_array<T, CblasColMajor>(_vdata, this->_mvalid, this->_n);
+    gsl::blas_gemm(CblasNoTrans, CblasNoTrans, alpha, &A, &X, beta, &Y);
+  }
+
+  return 0;
+}
+
 template <typename T>
   int MatrixDense<T>::svd1(void) {
     return(0); // TODO FIXME nothing yet.
@@ -751,15 +772,117 @@ int MatrixDense<T>::Equil(bool equillocal) {
 
 
 
+namespace {
+
+// Rows and columns of the training data swept at a time by Stats, so the
+// partial sums of X^T r of a column tile stay in cache over a row block
+const size_t kStatsRows = 256;
+const size_t kStatsCols = 2048;
+
+// Number of nan/inf values among v[0..len)
+template<typename T>
+size_t countNonFinite(size_t len, const T *v) {
+  size_t bad = 0;
+#ifdef _OPENMP
+#pragma omp parallel for reduction(+:bad)
+#endif
+  for (size_t i = 0; i < len; ++i)
+    bad += !std::isfinite(v[i]);
+  return bad;
+}
+
+// Moments of the response y[0..len) in one pass, from sums shifted by y[0]
+// to keep the variance accurate. Counts the nan/inf of y and of the
+// weights w (can be NULL) on the way.
 template<typename T>
-T getVar(size_t len, T *v, T mean) {
-  double var = 0;
+size_t responseStats(size_t len, const T *y, const T *w, T &min, T &max,
+                     T &mean, T &var) {
+  min = max = mean = var = 0;
+  if (len == 0 || y == NULL) return 0;
+  const double shift = y[0];
+  double lo = y[0], hi = y[0], s1 = 0, s2 = 0;
+  size_t bad = 0;
+#ifdef _OPENMP
+#pragma omp parallel for reduction(+:bad,s1,s2) reduction(min:lo) reduction(max:hi)
+#endif
   for (size_t i = 0; i < len; ++i) {
-    var += (v[i] - mean) * (v[i] - mean);
+    double d = y[i] - shift;
+    bad += !std::isfinite(y[i]) + (w != NULL && !std::isfinite(w[i]));
+    lo = std::min(lo, static_cast<double>(y[i]));
+    hi = std::max(hi, static_cast<double>(y[i]));
+    s1 += d;
+    s2 += d * d;
   }
-  return static_cast<T>(var / (len - 1));
+  min = static_cast<T>(lo);
+  max = static_cast<T>(hi);
+  mean = static_cast<T>(shift + s1 / len);
+  var = static_cast<T>(len > 1 ? std::max(s2 - s1 * s1 / len, 0.0) / (len - 1) : 0);
+  return bad;
 }
-  
+
+// u := X^T r for X m x n in order ord, counting the nan/inf of X (all of
+// its n columns) in the same pass. r is NULL when only checking X.
+template<typename T>
+size_t fusedXtr(size_t m, size_t n, typename MatrixDense<T>::Ord ord,
+                const T *x, const double *r, double *u) {
+  size_t bad = 0;
+  if (ord == MatrixDense<T>::COL) {
+    // contiguous columns, each a dot product
+#ifdef _OPENMP
+#pragma omp parallel for reduction(+:bad) schedule(static)
+#endif
+    for (size_t j = 0; j < n; ++j) {
+      const T *col = x + j * m;
+      double uj = 0;
+      size_t badj = 0;
+      for (size_t i = 0; i < m; ++i) {
+        badj += !std::isfinite(col[i]);
+        if (r != NULL) uj += r[i] * col[i];
+      }
+      bad += badj;
+      if (r != NULL) u[j] = uj;
+    }
+    return bad;
+  }
+
+  // contiguous rows: each thread sweeps blocks of rows by column tiles into
+  // its own partial sums, which are added up at the end
+  if (r != NULL) std::fill(u, u + n, 0.0);
+#ifdef _OPENMP
+#pragma omp parallel reduction(+:bad)
+#endif
+  {
+    std::vector<double> partial(r != NULL ? n : 0, 0.0);
+#ifdef _OPENMP
+#pragma omp for schedule(static)
+#endif
+    for (size_t i0 = 0; i0 < m; i0 += kStatsRows) {
+      size_t i1 = std::min(i0 + kStatsRows, m);
+      for (size_t j0 = 0; j0 < n; j0 += kStatsCols) {
+        size_t j1 = std::min(j0 + kStatsCols, n);
+        for (size_t i = i0; i < i1; ++i) {
+          const T *row = x + i * n;
+          for (size_t j = j0; j < j1; ++j)
+            bad += !std::isfinite(row[j]);
+          if (r == NULL) continue;
+          double ri = r[i];
+          for (size_t j = j0; j < j1; ++j)
+            partial[j] += ri * row[j];
+        }
+      }
+    }
+    if (r != NULL) {
+#ifdef _OPENMP
+#pragma omp critical
+#endif
+      for (size_t j = 0; j < n; ++j)
+        u[j] += partial[j];
+    }
+  }
+  return bad;
+}
+
+}  // namespace
 
 template <typename T>
 int MatrixDense<T>::Stats(int intercept, T *min, T *max, T *mean, T *var, T *sd, T *skew, T *kurt, T &lambda_max0)
@@ -768,127 +891,56 @@ int MatrixDense<T>::Stats(int intercept, T *min, T *max, T *mean, T *var, T *sd,
   size_t mTrain=this->_m;
   size_t mValid=this->_mvalid;
 
-
-  if(_data!=NULL){
-	  bool gotnan=false;
-	  for (size_t j = 0; j < n*mTrain; ++j) {
-		  if(std::isnan(_data[j]) || std::isinf(_data[j])){
-			  gotnan=true;
-		  }
-	  }
-	  if(gotnan==true){
-		  fprintf(stderr,"Data matrix (trainX) has nan/inf or missing was not encoded\n");
-		  fflush(stderr);
-		  exit(1);
-	  }
+  // Everything is validated and the statistics gathered in one parallel
+  // pass over each array: the responses and weights first, whose mean the
+  // pass over the training data needs for lambda_max0.
+  T vmin, vmax, vmean, vvar;
+  if(responseStats(mTrain, _datay, _weight, min[0], max[0], mean[0], var[0]) > 0 ||
+     (_datay == NULL && _weight != NULL && countNonFinite(mTrain, _weight) > 0)){
+	  throw std::invalid_argument("Data training predictions/labels (trainY) or weights have nan/inf or missing was not encoded");
   }
-  if(_datay!=NULL){
-	  bool gotnan=false;
-	  for (size_t j = 0; j < mTrain; ++j) {
-		  if(std::isnan(_datay[j]) || std::isinf(_datay[j])){
-			  gotnan=true;
-		  }
-	  }
-	  if(gotnan==true){
-		  fprintf(stderr,"Data training predictions/labels (trainY) has nan/inf or missing was not encoded\n");
-		  fflush(stderr);
-		  exit(1);
-	  }
+  if(responseStats(mValid, _vdatay, static_cast<const T *>(NULL), vmin, vmax, vmean, vvar) > 0){
+	  throw std::invalid_argument("Validation Data training predictions/labels (validY) has nan/inf or missing was not encoded");
   }
-  if(_vdata!=NULL){
-	  bool gotnan=false;
-	  for (size_t j = 0; j < n*mValid; ++j) {
-		  if(std::isnan(_vdata[j]) || std::isinf(_vdata[j])){
-			  gotnan=true;
-		  }
-	  }
-	  if(gotnan==true){
-		  fprintf(stderr,"Validation Data matrix (validX) has nan/inf or missing was not encoded\n");
-		  fflush(stderr);
-		  exit(1);
-	  }
+  if(_vdata!=NULL && fusedXtr(mValid, n, _ord, _vdata, static_cast<const double *>(NULL), static_cast<double *>(NULL)) > 0){
+	  throw std::invalid_argument("Validation Data matrix (validX) has nan/inf or missing was not encoded");
   }
-  if(_vdatay!=NULL){
-	  bool gotnan=false;
-	  for (size_t j = 0; j < mValid; ++j) {
-		  if(std::isnan(_vdatay[j]) || std::isinf(_vdatay[j])){
-			  gotnan=true;
-		  }
-	  }
-	  if(gotnan==true){
-		  fprintf(stderr,"Validation Data training predictions/labels (validY) has nan/inf or missing was not encoded\n");
-		  fflush(stderr);
-		  exit(1);
-	  }
+
+  // r = w (y - intercept * mean), then u = X^T r while checking X
+  std::vector<double> r, u(n, 0.0);
+  if(_datay!=NULL){
+	  r.resize(mTrain);
+	  for (size_t i = 0; i < mTrain; ++i)
+		  r[i] = (_weight != NULL ? _weight[i] : 1.0) * (_datay[i] - intercept * static_cast<double>(mean[0]));
+  }
+  if(_data!=NULL && fusedXtr(mTrain, n, _ord, _data, r.empty() ? NULL : &r[0], &u[0]) > 0){
+	  throw std::invalid_argument("Data matrix (trainX) has nan/inf or missing was not encoded");
   }
-  if(_weight!=NULL){
-  	  bool gotnan=false;
-  	  for (size_t j = 0; j < mTrain; ++j) {
-  		  if(std::isnan(_weight[j]) || std::isinf(_weight[j])){
-  			  gotnan=true;
-  		  }
-  	  }
-  	  if(gotnan==true){
-  		  fprintf(stderr,"Weight Training Data has nan/inf or missing was not encoded\n");
-  		  fflush(stderr);
-  		  exit(1);
-  	  }
-    }
 
   // return if nothing else to do
   if(_datay==NULL) return(0);
-  
-  int len=0;
-
-  // Training mean and stddev
-  len=this->_m;
-  min[0]=*std::min_element(_datay, _datay+len);
-  max[0]=*std::max_element(_datay, _datay+len);
-  mean[0] = std::accumulate(_datay, _datay+len, T(0)) / len;
-  var[0] = getVar(len,_datay, mean[0]);
+
   sd[0] = std::sqrt(var[0]);
   skew[0]=0.0; // not implemented
   kurt[0]=0.0; // not implemented
 
-    // Training mean and stddev
-  len=this->_mvalid;
-  min[1]=*std::min_element(_datay, _datay+len);
-  max[1]=*std::max_element(_datay, _datay+len);
-  mean[1] = std::accumulate(_vdatay, _vdatay+len, T(0)) / len;
-  var[1] = getVar(len,_vdatay, mean[1]);
+  min[1]=vmin;
+  max[1]=vmax;
+  mean[1]=vmean;
+  var[1]=vvar;
   sd[1] = std::sqrt(var[1]);
   skew[1]=0.0; // not implemented
   kurt[1]=0.0; // not implemented
 
   // set lambda max 0 (i.e. base lambda_max)
-  lambda_max0 = static_cast<T>(0.0);
-  for (size_t j = 0; j < n-intercept; ++j) { //col
-    T u = 0;
-    if(_weight!=NULL){
-      for (size_t i = 0; i < mTrain; ++i) { //row
-        u += _weight[i] * _data[i * n + j] * (_datay[i] - intercept*mean[0]);
-        if(!std::isfinite(u)){
-        	//fprintf(stderr,"i=%d weight=%g data=%g datay=%g intercept=%d mean=%g\n",i,_weight[i], _data[i * n + j],_datay[i],intercept,mean[0]);
-        	fprintf(stderr,"Bad product in calculating u\n");
-   		    fflush(stderr);
-        	exit(1);
-        }
-      }
-    }
-    else{
-      for (size_t i = 0; i < mTrain; ++i) { //row
-        u += _data[i * n + j] * (_datay[i] - intercept*mean[0]);
-      }
-    }
-    //fprintf(stderr,"j=%zu lambda_max0: %g u=%g intercept=%d mean=%g\n",j,lambda_max0,u,intercept,mean[0]); fflush(stderr);
-    lambda_max0 = static_cast<T>(std::max(lambda_max0, std::abs(u)));
-  }
+  double lmax = 0;
+  for (size_t j = 0; j < n-intercept; ++j) //col
+    lmax = std::max(lmax, std::abs(u[j]));
+  lambda_max0 = static_cast<T>(lmax);
   fprintf(stderr,"lambda_max0=%g\n",lambda_max0); fflush(stderr);
   
   if(lambda_max0==0.0 || !std::isfinite(lambda_max0)){
-	  fprintf(stderr,"Failure to compute lambda_max0\n");
-	  fflush(stderr);
-	  exit(1);
+	  throw std::invalid_argument("Failure to compute lambda_max0");
   }
 
   return 0;
@@ -953,6 +1005,24 @@ void MultDiag(const T *d, const T *e, size_t m, size_t n,
   }
 }
 
+// Copies m x (n-1) src into m x n dst and sets the last column of dst to 1,
+// so that callers do not have to append the intercept column themselves.
+template <typename T>
+void CopyAddIntercept(char ord, size_t m, size_t n, const T *src, T *dst) {
+  if (ord == 'r' || ord == 'R') {
+#ifdef _OPENMP
+#pragma omp parallel for
+#endif
+    for (size_t i = 0; i < m; ++i) {
+      memcpy(dst + i * n, src + i * (n - 1), (n - 1) * sizeof(T));
+      dst[i * n + n - 1] = static_cast<T>(1.0);
+    }
+  } else {
+    memcpy(dst, src, m * (n - 1) * sizeof(T));
+    std::fill(dst + m * (n - 1), dst + m * n, static_cast<T>(1.0));
+  }
+}
+
 
 }  // namespace
 
@@ -967,20 +1037,35 @@ template class MatrixDense<float>;
 
 
 template <typename T>
-int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, char ord, const T *data, const T *datay, const T *vdata, const T *vdatay, const T *weight,T **_data, T **_datay, T **_vdata, T **_vdatay, T **_weight){
+int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, char ord, int intercept, const T *data, const T *datay, const T *vdata, const T *vdatay, const T *weight,T **_data, T **_datay, T **_vdata, T **_vdatay, T **_weight){
 
+  // intercept!=0: data and vdata have n-1 columns and the constant column is added while copying
+  // the caller owns (and modelFree1's) every returned pointer that is not one of the inputs
   if(sharedA!=0){ // can't because _data contents get modified, unless do sharedA case and Equil is processed locally before given to other threads
     *_data = const_cast<T*>(data);
     *_datay = const_cast<T*>(datay);
     *_vdata = const_cast<T*>(vdata);
     *_vdatay = const_cast<T*>(vdatay);
     *_weight = const_cast<T*>(weight);
+    if(intercept){ // inputs are narrower than n, so cannot be shared as is, the wide copies are the caller's
+      if(data){
+        *_data = new T[m * n];
+        ASSERT(*_data != 0);
+        CopyAddIntercept(ord, m, n, data, *_data);
+      }
+      if(vdata){
+        *_vdata = new T[mValid * n];
+        ASSERT(*_vdata != 0);
+        CopyAddIntercept(ord, mValid, n, vdata, *_vdata);
+      }
+    }
   }
   else{ // if sharedA==0, then assume need to make copy of data in case gets modified by Equil
     if(data){
       *_data = new T[m * n];
       ASSERT(*_data != 0);
-      memcpy(*_data, data, m * n * sizeof(T));
+      if(intercept) CopyAddIntercept(ord, m, n, data, *_data);
+      else memcpy(*_data, data, m * n * sizeof(T));
     }
     else *_data=NULL;
 
@@ -994,7 +1079,8 @@ int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n, size_t mVal
     if(vdata){
       *_vdata = new T[mValid * n];
       ASSERT(*_vdata != 0);
-      memcpy(*_vdata, vdata, mValid * n * sizeof(T));
+      if(intercept) CopyAddIntercept(ord, mValid, n, vdata, *_vdata);
+      else memcpy(*_vdata, vdata, mValid * n * sizeof(T));
     }
     else *_vdata=NULL;
 
@@ -1021,18 +1107,18 @@ int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n, size_t mVal
 
 
   template
-  int makePtr_dense<double>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, char ord,
+  int makePtr_dense<double>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, char ord, int intercept,
                                      const double *data, const double *datay, const double *vdata, const double *vdatay, const double *weight,
                                      double **_data, double **_datay, double **_vdata, double **_vdatay, double **_weight);
   template
-  int makePtr_dense<float>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, char ord,
+  int makePtr_dense<float>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, char ord, int intercept,
                                     const float *data, const float *datay, const float *vdata, const float *vdatay, const float *weight,
                                     float **_data, float **_datay, float **_vdata, float **_vdatay, float **_weight);
 
   template <typename T>
   int modelFree1(T *aptr){
     if(aptr!=NULL){
-        delete aptr;
+        delete[] aptr;
     }
     return(0);
   }
@@ -1049,14 +1135,14 @@ int modelfree1_double(double *aptr){
   return h2o4gpu::modelFree1<double>(aptr);
 }
 
-  int make_ptr_double(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord,
+  int make_ptr_double(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord, int intercept,
                       const double* trainX, const double* trainY, const double* validX, const double* validY, const double *weight,
                       double**a, double**b, double**c, double**d, double **e) {
-    return h2o4gpu::makePtr_dense<double>(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, trainX, trainY, validX, validY, weight, a, b, c, d, e);
+    return h2o4gpu::makePtr_dense<double>(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, intercept, trainX, trainY, validX, validY, weight, a, b, c, d, e);
   }
-  int make_ptr_float(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord,
+  int make_ptr_float(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord, int intercept,
                      const float* trainX, const float* trainY, const float* validX, const float* validY, const float *weight,
                      float**a, float**b, float**c, float**d, float **e) {
-    return h2o4gpu::makePtr_dense<float>(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, trainX, trainY, validX, validY, weight, a, b, c, d, e);
+    return h2o4gpu::makePtr_dense<float>(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, intercept, trainX, trainY, validX, validY, weight, a, b, c, d, e);
   }
 
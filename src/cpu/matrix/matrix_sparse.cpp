@@ -208,6 +208,18 @@ int MatrixSparse<T>::Mulvalid(char trans, T alpha, const T *x, T beta, T *y) con
   return 0;
 }
 
+// Sparse matrices have no batched product, one Mulvalid per column of X.
+template <typename T>
+int MatrixSparse<T>::MulvalidBatch(T alpha, const T *x, size_t ldx, size_t k,
+                                   T beta, T *y) const {
+  for (size_t j = 0; j < k; ++j) {
+    int err = Mulvalid('n', alpha, x + j * ldx, beta, y + j * this->_mvalid);
+    if (err)
+      return err;
+  }
+  return 0;
+}
+
 template <typename T>
 int MatrixSparse<T>::Equil(bool equillocal) {
   DEBUG_ASSERT(this->_done_init);
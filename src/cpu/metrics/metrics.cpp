@@ -3,23 +3,110 @@
 #include <iostream>
 #include <stdlib.h>
 #include <numeric>
+#include <limits>
 #include <algorithm>
 #include "metrics/metrics.h"
 
-namespace h2o4gpu {
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 
-  template <typename T>
-    std::vector<size_t> argsort(const std::vector<T> &v) {
-    std::vector<size_t> idx(v.size());
-    std::iota(idx.begin(), idx.end(), 0);
-    sort(idx.begin(), idx.end(), [&v](size_t i1, size_t i2) {return v[i1] < v[i2]; });
-    return idx;
-  }
+namespace h2o4gpu {
 
   typedef double(*CMMetricFunc)(double, double, double, double);
 
   #define CM_STATS_COLS 9
 
+  // Below this size the merge rounds cost more than they save.
+  #define PARALLEL_SORT_MIN 65536
+
+  template <typename T>
+  struct ScoredRow {
+    T proba;
+    int label;
+    double w;
+  };
+
+  /**
+   * Sorts [first, last) by splitting it into one chunk per thread, sorting
+   * the chunks concurrently and merging neighbouring chunks pairwise.
+   */
+  template <typename It, typename Cmp>
+  void parallel_sort(It first, It last, Cmp cmp) {
+    size_t n = last - first;
+    int chunks = 1;
+#ifdef _OPENMP
+    chunks = omp_get_max_threads();
+#endif
+    if (chunks <= 1 || n < PARALLEL_SORT_MIN) {
+      std::sort(first, last, cmp);
+      return;
+    }
+    std::vector<size_t> bounds(chunks + 1);
+    for (int c = 0; c <= chunks; ++c) bounds[c] = n * c / chunks;
+#pragma omp parallel for schedule(static, 1)
+    for (int c = 0; c < chunks; ++c)
+      std::sort(first + bounds[c], first + bounds[c + 1], cmp);
+    for (int width = 1; width < chunks; width *= 2) {
+#pragma omp parallel for schedule(static, 1)
+      for (int c = 0; c < chunks - width; c += 2 * width) {
+        int end = std::min(c + 2 * width, chunks);
+        std::inplace_merge(first + bounds[c], first + bounds[c + width],
+                           first + bounds[end], cmp);
+      }
+    }
+  }
+
+  /**
+   * Pairs every prediction with its label and weight (1 when w is empty)
+   * and sorts the rows by prediction once for all metrics.
+   */
+  template <typename T>
+  std::vector<ScoredRow<T>> sort_scores(const T *y, const T *yhat,
+                                        const T *w, int n) {
+    std::vector<ScoredRow<T>> rows(n);
+#pragma omp parallel for
+    for (int i = 0; i < n; ++i) {
+      rows[i].proba = yhat[i];
+      rows[i].label = static_cast<int>(y[i]);
+      rows[i].w = w == nullptr ? 1.0 : static_cast<double>(w[i]);
+    }
+    parallel_sort(rows.begin(), rows.end(),
+                  [](const ScoredRow<T> &a, const ScoredRow<T> &b) {
+                    return a.proba < b.proba;
+                  });
+    return rows;
+  }
+
+  /**
+   * Walks the sorted rows from the lowest prediction up and calls
+   * f(threshold, tp, tn, fp, fn) once per distinct prediction, with rows
+   * predicted positive when their prediction is at least the threshold.
+   */
+  template <typename T, typename F>
+  void sweep_thresholds(const std::vector<ScoredRow<T>> &rows, F f) {
+    double tp = 0;
+    double tn = 0;
+    double fp = 0;
+    double fn = 0;
+    for (auto &row : rows) {
+      tp += row.w * row.label;
+      fp += row.w * (1 - row.label);
+    }
+    for (size_t i = 0; i < rows.size(); ++i) {
+      if (i == 0 || rows[i].proba != rows[i - 1].proba) {
+        f(static_cast<double>(rows[i].proba), tp, tn, fp, fn);
+      }
+      if (rows[i].label == 1) {
+        tp -= rows[i].w;
+        fn += rows[i].w;
+      } else {
+        tn += rows[i].w;
+        fp -= rows[i].w;
+      }
+    }
+  }
+
   double mcc(double tp, double tn, double fp, double fn) {
     auto n = tp + tn + fp + fn;
     auto s = (tp + fn) / n;
@@ -49,150 +136,116 @@ namespace h2o4gpu {
     return (std::abs(y) < 1E-15) ? 0.0 : (tp + tn) / y;
   }
 
-  double cm_metric_opt(std::vector<double> y, std::vector<double> yhat,
-                       std::vector<double> w, CMMetricFunc metric) {
-    auto idx = argsort(yhat);
-    int n = static_cast<int>(y.size());
-    double tp = 0;
-    double tn = 0;
-    double fp = 0;
-    double fn = 0;
-    std::vector<double> y_sorted;
-    std::vector<double> w_sorted;
-    for (auto &i : idx) {
-      y_sorted.push_back(y[i]);  
-      w_sorted.push_back(w[i]);
-      auto label = static_cast<int>(y[i]);
-      tp += w[i] * label;
-      fp += w[i] * (1 - label);
+  static const CMMetricFunc cm_metric_funcs[] = {mcc, f05, f1, f2, acc};
+
+  /**
+   * Fills res (k rows of [best score, threshold]) with the optimum of every
+   * requested metric from a single sort and a single sweep.
+   */
+  template <typename T>
+  void threshold_metrics(const T *y, const T *yhat, const T *w, int n,
+                         const int *metrics, int k, double *res) {
+    for (int i = 0; i < k; ++i) {
+      res[2 * i] = -std::numeric_limits<double>::infinity();
+      res[2 * i + 1] = std::numeric_limits<double>::quiet_NaN();
     }
-    double best_score = 0;
-    double prev_proba = -1;
-    for (int i = 0; i < n; ++i) {
-      auto proba = yhat[idx[i]];
-      if (proba != prev_proba) {
-        prev_proba = proba;
-        best_score = std::max(best_score, metric(tp, tn, fp, fn));
-      }
-      if (static_cast<int>(y_sorted[i]) == 1) {
-          tp -= w_sorted[i];
-          fn += w_sorted[i];
-      } else {
-          tn += w_sorted[i];
-          fp -= w_sorted[i];
+    auto rows = sort_scores(y, yhat, w, n);
+    sweep_thresholds(rows, [&](double proba, double tp, double tn,
+                               double fp, double fn) {
+      for (int i = 0; i < k; ++i) {
+        auto score = cm_metric_funcs[metrics[i]](tp, tn, fp, fn);
+        if (score > res[2 * i]) {
+          res[2 * i] = score;
+          res[2 * i + 1] = proba;
+        }
       }
-    }
-    return best_score;
+    });
   }
-  
-  void cm_stats(std::vector<double> y, std::vector<double> yhat, std::vector<double> w,
+
+  double cm_metric_opt(const double *y, const double *yhat, const double *w,
+                       int n, CMMetric metric) {
+    double res[2];
+    int metrics[] = {metric};
+    threshold_metrics(y, yhat, w, n, metrics, 1, res);
+    return std::max(0.0, res[0]);
+  }
+
+  void cm_stats(const double *y, const double *yhat, const double *w, int n,
                 double cm[][CM_STATS_COLS]) {
-    auto idx = argsort(yhat);
-    int n = static_cast<int>(y.size());
-    double tp = 0;
-    double tn = 0;
-    double fp = 0;
-    double fn = 0;
-    std::vector<double> y_sorted;
-    std::vector<double> w_sorted;
-    for (auto &i : idx) {
-      y_sorted.push_back(y[i]);
-      w_sorted.push_back(w[i]);
-      auto label = static_cast<int>(y[i]);
-      tp += w[i] * label;
-      fp += w[i] * (1 - label);
-    }
-    double prev_proba = -1;
+    auto rows = sort_scores(y, yhat, w, n);
     int k = 0;
-    for (int i = 0; i < n; ++i) {
-      auto proba = yhat[idx[i]];
-      if (proba != prev_proba) {
-        prev_proba = proba;
-        cm[k][0] = proba;
-        cm[k][1] = tp;
-        cm[k][2] = tn;
-        cm[k][3] = fp;
-        cm[k][4] = fn;
-        cm[k][5] = fp / (fp + tn); // fpr
-        cm[k][6] = tp / (tp + fn); // tpr
-        cm[k][7] = mcc(tp, tn, fp, fn);
-        cm[k][8] = f1(tp, tn, fp, fn);
-        k += 1;
-      }
-      if (static_cast<int>(y_sorted[i]) == 1) {
-        tp -= w_sorted[i];
-        fn += w_sorted[i];
-      }
-      else {
-        tn += w_sorted[i];
-        fp -= w_sorted[i];
-      }
-    }
+    sweep_thresholds(rows, [&](double proba, double tp, double tn,
+                               double fp, double fn) {
+      cm[k][0] = proba;
+      cm[k][1] = tp;
+      cm[k][2] = tn;
+      cm[k][3] = fp;
+      cm[k][4] = fn;
+      cm[k][5] = fp / (fp + tn); // fpr
+      cm[k][6] = tp / (tp + fn); // tpr
+      cm[k][7] = mcc(tp, tn, fp, fn);
+      cm[k][8] = f1(tp, tn, fp, fn);
+      k += 1;
+    });
   }
 
   double mcc_opt(double *y, int n, double *yhat, int m) {
-    std::vector<double> w(n, 1.0);
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-                         w, mcc);
+    return cm_metric_opt(y, yhat, nullptr, n, kMcc);
   }
   
   double mcc_opt(double *y, int n, double *yhat, int m, double *w, int l) {
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-                         std::vector<double>(w, w + l), mcc);
+    return cm_metric_opt(y, yhat, w, n, kMcc);
   }
 
   double f05_opt(double *y, int n, double *yhat, int m) {
-    std::vector<double> w(n, 1.0);
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-      w, f05);
+    return cm_metric_opt(y, yhat, nullptr, n, kF05);
   }
 
   double f05_opt(double *y, int n, double *yhat, int m, double *w, int l) {
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-      std::vector<double>(w, w + l), f05);
+    return cm_metric_opt(y, yhat, w, n, kF05);
   }
 
   double f1_opt(double *y, int n, double *yhat, int m) {
-    std::vector<double> w(n, 1.0);
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-      w, f1);
+    return cm_metric_opt(y, yhat, nullptr, n, kF1);
   }
 
   double f1_opt(double *y, int n, double *yhat, int m, double *w, int l) {
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-      std::vector<double>(w, w + l), f1);
+    return cm_metric_opt(y, yhat, w, n, kF1);
   }
 
   double f2_opt(double *y, int n, double *yhat, int m) {
-    std::vector<double> w(n, 1.0);
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-      w, f2);
+    return cm_metric_opt(y, yhat, nullptr, n, kF2);
   }
 
   double f2_opt(double *y, int n, double *yhat, int m, double *w, int l) {
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-      std::vector<double>(w, w + l), f2);
+    return cm_metric_opt(y, yhat, w, n, kF2);
   }
 
   double acc_opt(double *y, int n, double *yhat, int m) {
-    std::vector<double> w(n, 1.0);
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-      w, acc);
+    return cm_metric_opt(y, yhat, nullptr, n, kAcc);
   }
 
   double acc_opt(double *y, int n, double *yhat, int m, double *w, int l) {
-    return cm_metric_opt(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-      std::vector<double>(w, w + l), acc);
+    return cm_metric_opt(y, yhat, w, n, kAcc);
   }
   
   void confusion_matrices(double *y, int n, double *yhat, int m, double *cm, int k, int j) {
-    std::vector<double> w(n, 1.0);
-    cm_stats(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-             w, reinterpret_cast<double(*)[CM_STATS_COLS]>(cm));
+    cm_stats(y, yhat, nullptr, n, reinterpret_cast<double(*)[CM_STATS_COLS]>(cm));
   }
 
   void confusion_matrices(double *y, int n, double *yhat, int m, double* w, int l, double *cm, int k, int j) {
-    cm_stats(std::vector<double>(y, y + n), std::vector<double>(yhat, yhat + m),
-             std::vector<double>(w, w + l), reinterpret_cast<double(*)[CM_STATS_COLS]>(cm));
+    cm_stats(y, yhat, w, n, reinterpret_cast<double(*)[CM_STATS_COLS]>(cm));
+  }
+
+  void threshold_metrics_float(float *y, int n, float *yhat, int m,
+                               float *w, int l, int *metrics, int k,
+                               double *res, int r, int c) {
+    threshold_metrics(y, yhat, l == 0 ? nullptr : w, n, metrics, k, res);
+  }
+
+  void threshold_metrics_double(double *y, int n, double *yhat, int m,
+                                double *w, int l, int *metrics, int k,
+                                double *res, int r, int c) {
+    threshold_metrics(y, yhat, l == 0 ? nullptr : w, n, metrics, k, res);
   }
 }
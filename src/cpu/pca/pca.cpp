@@ -0,0 +1,80 @@
+/*!
+ * Copyright 2018 H2O.ai, Inc.
+ * License   Apache License Version 2.0 (see LICENSE for details)
+ */
+#include <iostream>
+#include <string>
+#include "solver/pca.h"
+#include "../tsvd/tsvd_cpu.h"
+
+// CPU counterpart of gpu/pca: the truncated SVD of the data minus its column
+// means, with the centering folded into the products of the decomposition so
+// sparse data stays sparse.
+
+namespace {
+
+template <class T>
+void pca_cpu(const tsvd::CpuMatrix<T> &X, T *_Q, T *_w, T *_U,
+             T *_X_transformed, T *_explained_variance, T *_explained_variance_ratio, T *_mean,
+             pca::params _param) {
+  try {
+    tsvd::column_means(X, _mean);
+
+    tsvd::params svd_param = {_param.X_n, _param.X_m, _param.k, _param.algorithm, _param.n_iter, _param.random_state, _param.tol, _param.verbose, _param.gpu_id, _param.whiten, _param.n_oversamples, _param.n_power_iter};
+
+    tsvd::truncated_svd_cpu(X, static_cast<const T *>(_mean), _Q, _w, _U,
+                            _X_transformed, _explained_variance,
+                            _explained_variance_ratio, svd_param);
+  } catch (const std::exception &e) {
+    std::cerr << "pca error: " << e.what() << "\n";
+  } catch (std::string e) {
+    std::cerr << "pca error: " << e << "\n";
+  } catch (...) {
+    std::cerr << "pca error\n";
+  }
+}
+
+}  // namespace
+
+namespace pca {
+
+void pca_float(const float *_X, float *_Q, float *_w, float *_U,
+               float *_X_transformed, float *_explained_variance,
+               float *_explained_variance_ratio, float *_mean, params _param) {
+  tsvd::CpuMatrix<float> X = {_param.X_m, _param.X_n, _X, NULL, NULL, NULL};
+  pca_cpu(X, _Q, _w, _U, _X_transformed, _explained_variance,
+          _explained_variance_ratio, _mean, _param);
+}
+
+void pca_double(const double *_X, double *_Q, double *_w, double *_U,
+                double *_X_transformed, double *_explained_variance,
+                double *_explained_variance_ratio, double *_mean,
+                params _param) {
+  tsvd::CpuMatrix<double> X = {_param.X_m, _param.X_n, _X, NULL, NULL, NULL};
+  pca_cpu(X, _Q, _w, _U, _X_transformed, _explained_variance,
+          _explained_variance_ratio, _mean, _param);
+}
+
+void pca_csr_float(const float *_X_data, const int *_X_indices,
+                   const int *_X_indptr, float *_Q, float *_w, float *_U,
+                   float *_X_transformed, float *_explained_variance,
+                   float *_explained_variance_ratio, float *_mean,
+                   params _param) {
+  tsvd::CpuMatrix<float> X = {_param.X_m, _param.X_n, NULL, _X_data,
+                              _X_indices, _X_indptr};
+  pca_cpu(X, _Q, _w, _U, _X_transformed, _explained_variance,
+          _explained_variance_ratio, _mean, _param);
+}
+
+void pca_csr_double(const double *_X_data, const int *_X_indices,
+                    const int *_X_indptr, double *_Q, double *_w, double *_U,
+                    double *_X_transformed, double *_explained_variance,
+                    double *_explained_variance_ratio, double *_mean,
+                    params _param) {
+  tsvd::CpuMatrix<double> X = {_param.X_m, _param.X_n, NULL, _X_data,
+                               _X_indices, _X_indptr};
+  pca_cpu(X, _Q, _w, _U, _X_transformed, _explained_variance,
+          _explained_variance_ratio, _mean, _param);
+}
+
+}  // namespace pca
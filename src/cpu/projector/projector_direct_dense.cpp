@@ -3,6 +3,8 @@
  */
 #include <algorithm>
 #include <cstring>
+#include <list>
+#include <mutex>
 
 #include "gsl/cblas.h"
 #include "gsl/gsl_blas.h"
@@ -11,18 +13,163 @@
 #include "matrix/matrix_dense.h"
 #include "projector/projector_direct.h"
 #include "projector_helper.h"
+#include "timer.h"
 #include "util.h"
 
 namespace h2o4gpu {
 
 namespace {
 
+template<typename T>
+struct CachedFactor {
+  T s, *L;
+};
+
 template<typename T>
 struct CpuData {
-  T *AA, *L, s;
-  CpuData() : AA(0), L(0), s(static_cast<T>(-1.)) { }
+  T *AA;
+  // AA belongs to the matrix when its equilibrated data is shared.
+  bool shared_AA;
+  // Cholesky factors of AA + s I, most recently used first.
+  std::list<CachedFactor<T> > factors;
+  // Eigendecomposition AA = Q diag(eval) Q^T for eigen mode.
+  T *Q, *eval, *tmp;
+  size_t cache_bytes;
+  bool eigen;
+  size_t hits, factorizations;
+  double factor_time;
+  CpuData() : AA(0), shared_AA(false), Q(0), eval(0), tmp(0), cache_bytes(kDirectCacheBytes),
+      eigen(false), hits(0), factorizations(0), factor_time(0.) { }
 };
 
+// AA := A^T A if A is tall, A A^T otherwise (lower triangle).
+template<typename T>
+void ComputeGram(const MatrixDense<T> &A, size_t min_dim, T *AA) {
+  memset(AA, 0, min_dim * min_dim * sizeof(T));
+  CBLAS_TRANSPOSE_t op_type = A.Rows() > A.Cols() ? CblasTrans : CblasNoTrans;
+  if (A.Order() == MatrixDense<T>::ROW) {
+    const gsl::matrix<T, CblasRowMajor> A_mat =
+        gsl::matrix_view_array<T, CblasRowMajor>
+        (A.Data(), A.Rows(), A.Cols());
+    gsl::matrix<T, CblasRowMajor> AA_mat =
+        gsl::matrix_view_array<T, CblasRowMajor>(AA, min_dim, min_dim);
+    //C := alpha*A*A' + beta*C
+    gsl::blas_syrk(CblasLower, op_type,
+        static_cast<T>(1.), &A_mat, static_cast<T>(0.), &AA_mat);
+  } else {
+    const gsl::matrix<T, CblasColMajor> A_mat =
+        gsl::matrix_view_array<T, CblasColMajor>
+        (A.Data(), A.Rows(), A.Cols());
+    gsl::matrix<T, CblasColMajor> AA_mat =
+        gsl::matrix_view_array<T, CblasColMajor>(AA, min_dim, min_dim);
+    gsl::blas_syrk(CblasLower, op_type,
+        static_cast<T>(1.), &A_mat, static_cast<T>(0.), &AA_mat);
+  }
+}
+
+// Drop least recently used factors above the memory budget, keep at least one.
+template<typename T>
+void TrimFactors(CpuData<T> *info, size_t min_dim) {
+  size_t factor_bytes = min_dim * min_dim * sizeof(T);
+  while (info->factors.size() > 1 &&
+         info->factors.size() * factor_bytes > info->cache_bytes) {
+    delete [] info->factors.back().L;
+    info->factors.pop_back();
+  }
+}
+
+// Cholesky factor of AA + s I, computed only if not cached.
+template<typename T, CBLAS_ORDER O>
+T *CholeskyFactor(CpuData<T> *info, size_t min_dim, T s) {
+  typename std::list<CachedFactor<T> >::iterator it;
+  for (it = info->factors.begin(); it != info->factors.end(); ++it) {
+    if (it->s == s) {
+      info->hits++;
+      info->factors.splice(info->factors.begin(), info->factors, it);
+      return it->L;
+    }
+  }
+
+  double t0 = timer<double>();
+  size_t factor_bytes = min_dim * min_dim * sizeof(T);
+  if (!info->factors.empty() &&
+      (info->factors.size() + 1) * factor_bytes > info->cache_bytes) {
+    // Over budget, overwrite the least recently used factor.
+    info->factors.splice(info->factors.begin(), info->factors,
+        --info->factors.end());
+  } else {
+    CachedFactor<T> factor;
+    factor.L = new T[min_dim * min_dim];
+    ASSERT(factor.L != 0);
+    info->factors.push_front(factor);
+  }
+  CachedFactor<T> &factor = info->factors.front();
+  factor.s = s;
+
+  const gsl::matrix<T, O> AA = gsl::matrix_view_array<T, O>
+      (info->AA, min_dim, min_dim);
+  gsl::matrix<T, O> L = gsl::matrix_view_array<T, O>
+      (factor.L, min_dim, min_dim);
+  gsl::matrix_memcpy(&L, &AA); // originally from AA := A*A'
+  gsl::vector<T> diagL = gsl::matrix_diagonal(&L);
+  gsl::vector_add_constant(&diagL, s);
+  gsl::linalg_cholesky_decomp(&L);
+
+  info->factorizations++;
+  info->factor_time += timer<double>() - t0;
+  return factor.L;
+}
+
+// Eigendecomposition of AA, computed once.
+template<typename T, CBLAS_ORDER O>
+void EigenDecomp(CpuData<T> *info, size_t min_dim) {
+  double t0 = timer<double>();
+  info->Q = new T[min_dim * min_dim];
+  ASSERT(info->Q != 0);
+  info->eval = new T[min_dim];
+  ASSERT(info->eval != 0);
+  info->tmp = new T[min_dim];
+  ASSERT(info->tmp != 0);
+
+  gsl::matrix<T, O> W = gsl::matrix_alloc<T, O>(min_dim, min_dim);
+  const gsl::matrix<T, O> AA = gsl::matrix_view_array<T, O>
+      (info->AA, min_dim, min_dim);
+  gsl::matrix_memcpy(&W, &AA);
+  gsl::matrix<T, O> Q = gsl::matrix_view_array<T, O>
+      (info->Q, min_dim, min_dim);
+  gsl::vector<T> eval = gsl::vector_view_array(info->eval, min_dim);
+  gsl::linalg_symm_eigen(&W, &eval, &Q);
+  gsl::matrix_free(&W);
+
+  info->factorizations++;
+  info->factor_time += timer<double>() - t0;
+}
+
+// Solve (AA + s I) x = b, x overwrites b.
+template<typename T, CBLAS_ORDER O>
+void SolveShifted(CpuData<T> *info, size_t min_dim, T s, gsl::vector<T> *b) {
+  if (info->eigen) {
+    if (info->Q)
+      info->hits++;
+    else
+      EigenDecomp<T, O>(info, min_dim);
+    const gsl::matrix<T, O> Q = gsl::matrix_view_array<T, O>
+        (info->Q, min_dim, min_dim);
+    gsl::vector<T> tmp = gsl::vector_view_array(info->tmp, min_dim);
+    // x = Q diag(1 / (eval + s)) Q^T b
+    gsl::blas_gemv(CblasTrans, static_cast<T>(1.), &Q, b,
+        static_cast<T>(0.), &tmp);
+    for (size_t i = 0; i < min_dim; ++i)
+      info->tmp[i] /= info->eval[i] + s;
+    gsl::blas_gemv(CblasNoTrans, static_cast<T>(1.), &Q, &tmp,
+        static_cast<T>(0.), b);
+  } else {
+    const gsl::matrix<T, O> L = gsl::matrix_view_array<T, O>
+        (CholeskyFactor<T, O>(info, min_dim, s), min_dim, min_dim);
+    gsl::linalg_cholesky_svx(&L, b);
+  }
+}
+
 }  // namespace
 
 template <typename T, typename M>
@@ -45,14 +192,21 @@ template <typename T, typename M>
 ProjectorDirect<T, M>::~ProjectorDirect() {
   CpuData<T> *info = reinterpret_cast<CpuData<T>*>(this->_info);
 
-  if (info->AA) {
+  if (info->AA && !info->shared_AA) {
     delete [] info->AA;
     info->AA = 0;
   }
 
-  if (info->L) {
-    delete [] info->L;
-    info->L = 0;
+  typename std::list<CachedFactor<T> >::iterator it;
+  for (it = info->factors.begin(); it != info->factors.end(); ++it)
+    delete [] it->L;
+  info->factors.clear();
+
+  if (info->Q) {
+    delete [] info->Q;
+    delete [] info->eval;
+    delete [] info->tmp;
+    info->Q = info->eval = info->tmp = 0;
   }
 
   delete info;
@@ -70,34 +224,21 @@ int ProjectorDirect<T, M>::Init() {
 
   size_t min_dim = std::min(_A.Rows(), _A.Cols());
 
+  if (_A._shared) {
+    // Data equilibrated once for all solvers, so is its Gram matrix.
+    std::lock_guard<std::mutex> guard(_A._shared->gram_lock);
+    if (_A._shared->gram.empty()) {
+      _A._shared->gram.resize(min_dim * min_dim);
+      ComputeGram(_A, min_dim, &_A._shared->gram[0]);
+    }
+    info->AA = &_A._shared->gram[0];
+    info->shared_AA = true;
+    return 0;
+  }
+
   info->AA = new T[min_dim * min_dim];
   ASSERT(info->AA != 0);
-  info->L = new T[min_dim * min_dim];
-  ASSERT(info->L != 0);
-  memset(info->AA, 0, min_dim * min_dim * sizeof(T));
-  memset(info->L, 0, min_dim * min_dim * sizeof(T));
-
-  CBLAS_TRANSPOSE_t op_type = _A.Rows() > _A.Cols() ? CblasTrans : CblasNoTrans;
-
-  // Compute AA
-  if (_A.Order() == MatrixDense<T>::ROW) {
-    const gsl::matrix<T, CblasRowMajor> A =
-        gsl::matrix_view_array<T, CblasRowMajor>
-        (_A.Data(), _A.Rows(), _A.Cols());
-    gsl::matrix<T, CblasRowMajor> AA = gsl::matrix_view_array<T, CblasRowMajor>
-        (info->AA, min_dim, min_dim);
-    //C := alpha*A*A' + beta*C
-    gsl::blas_syrk(CblasLower, op_type,
-        static_cast<T>(1.), &A, static_cast<T>(0.), &AA);
-  } else {
-    const gsl::matrix<T, CblasColMajor> A =
-        gsl::matrix_view_array<T, CblasColMajor>
-        (_A.Data(), _A.Rows(), _A.Cols());
-    gsl::matrix<T, CblasColMajor> AA = gsl::matrix_view_array<T, CblasColMajor>
-        (info->AA, min_dim, min_dim);
-    gsl::blas_syrk(CblasLower, op_type,
-        static_cast<T>(1.), &A, static_cast<T>(0.), &AA);
-  }
+  ComputeGram(_A, min_dim, info->AA);
 
   return 0;
 }
@@ -127,30 +268,19 @@ int ProjectorDirect<T, M>::Project(const T *x0, const T *y0, T s, T *x, T *y,
     const gsl::matrix<T, CblasRowMajor> A =
         gsl::matrix_view_array<T, CblasRowMajor>
         (_A.Data(), _A.Rows(), _A.Cols());
-    gsl::matrix<T, CblasRowMajor> AA = gsl::matrix_view_array<T, CblasRowMajor>
-        (info->AA, min_dim, min_dim);
-    gsl::matrix<T, CblasRowMajor> L = gsl::matrix_view_array<T, CblasRowMajor>
-        (info->L, min_dim, min_dim);
-
-    if (s != info->s) {
-      gsl::matrix_memcpy(&L, &AA); // originally from AA := A*A'
-      gsl::vector<T> diagL = gsl::matrix_diagonal(&L);
-      gsl::vector_add_constant(&diagL, s);
-      gsl::linalg_cholesky_decomp(&L);
-    }
     if (_A.Rows() > _A.Cols()) {
       // 1*A*y + 1*x -> x
       gsl::blas_gemv(CblasTrans, static_cast<T>(1.), &A, &y_vec,
           static_cast<T>(1.), &x_vec);
-      // Solve L*x = 0 for x -> x
-      gsl::linalg_cholesky_svx(&L, &x_vec);
+      // Solve (A'A + s I)*x = x for x -> x
+      SolveShifted<T, CblasRowMajor>(info, min_dim, s, &x_vec);
       // 1*A*x+0*y -> y
       gsl::blas_gemv(CblasNoTrans, static_cast<T>(1.), &A, &x_vec,
           static_cast<T>(0.), &y_vec);
     } else {
       gsl::blas_gemv(CblasNoTrans, static_cast<T>(1.), &A, &x_vec,
           static_cast<T>(-1.), &y_vec);
-      gsl::linalg_cholesky_svx(&L, &y_vec);
+      SolveShifted<T, CblasRowMajor>(info, min_dim, s, &y_vec);
       gsl::blas_gemv(CblasTrans, static_cast<T>(-1.), &A, &y_vec,
           static_cast<T>(1.), &x_vec);
       gsl::blas_axpy(static_cast<T>(1.), &y0_vec, &y_vec);
@@ -159,27 +289,16 @@ int ProjectorDirect<T, M>::Project(const T *x0, const T *y0, T s, T *x, T *y,
     const gsl::matrix<T, CblasColMajor> A =
         gsl::matrix_view_array<T, CblasColMajor>
         (_A.Data(), _A.Rows(), _A.Cols());
-    gsl::matrix<T, CblasColMajor> AA = gsl::matrix_view_array<T, CblasColMajor>
-        (info->AA, min_dim, min_dim);
-    gsl::matrix<T, CblasColMajor> L = gsl::matrix_view_array<T, CblasColMajor>
-        (info->L, min_dim, min_dim);
-
-    if (s != info->s) {
-      gsl::matrix_memcpy(&L, &AA);
-      gsl::vector<T> diagL = gsl::matrix_diagonal(&L);
-      gsl::vector_add_constant(&diagL, s);
-      gsl::linalg_cholesky_decomp(&L);
-    }
     if (_A.Rows() > _A.Cols()) {
       gsl::blas_gemv(CblasTrans, static_cast<T>(1.), &A, &y_vec,
           static_cast<T>(1.), &x_vec);
-      gsl::linalg_cholesky_svx(&L, &x_vec);
+      SolveShifted<T, CblasColMajor>(info, min_dim, s, &x_vec);
       gsl::blas_gemv(CblasNoTrans, static_cast<T>(1.), &A, &x_vec,
           static_cast<T>(0.), &y_vec);
     } else {
       gsl::blas_gemv(CblasNoTrans, static_cast<T>(1.), &A, &x_vec,
           static_cast<T>(-1.), &y_vec);
-      gsl::linalg_cholesky_svx(&L, &y_vec);
+      SolveShifted<T, CblasColMajor>(info, min_dim, s, &y_vec);
       gsl::blas_gemv(CblasTrans, static_cast<T>(-1.), &A, &y_vec,
           static_cast<T>(1.), &x_vec);
       gsl::blas_axpy(static_cast<T>(1.), &y0_vec, &y_vec);
@@ -192,10 +311,37 @@ int ProjectorDirect<T, M>::Project(const T *x0, const T *y0, T s, T *x, T *y,
       static_cast<T>(1e3) * std::numeric_limits<T>::epsilon());
 #endif
 
-  info->s = s;
   return 0;
 }
 
+template <typename T, typename M>
+void ProjectorDirect<T, M>::SetCacheBytes(size_t cache_bytes) {
+  CpuData<T> *info = reinterpret_cast<CpuData<T>*>(this->_info);
+  info->cache_bytes = cache_bytes;
+  TrimFactors(info, std::min(_A.Rows(), _A.Cols()));
+}
+
+template <typename T, typename M>
+void ProjectorDirect<T, M>::SetEigen(bool eigen) {
+  CpuData<T> *info = reinterpret_cast<CpuData<T>*>(this->_info);
+  info->eigen = eigen;
+}
+
+template <typename T, typename M>
+size_t ProjectorDirect<T, M>::GetCacheHits() const {
+  return reinterpret_cast<CpuData<T>*>(this->_info)->hits;
+}
+
+template <typename T, typename M>
+size_t ProjectorDirect<T, M>::GetFactorizations() const {
+  return reinterpret_cast<CpuData<T>*>(this->_info)->factorizations;
+}
+
+template <typename T, typename M>
+double ProjectorDirect<T, M>::GetFactorTime() const {
+  return reinterpret_cast<CpuData<T>*>(this->_info)->factor_time;
+}
+
 #if !defined(H2O4GPU_DOUBLE) || H2O4GPU_DOUBLE==1
 template class ProjectorDirect<double, MatrixDense<double> >;
 #endif
@@ -0,0 +1,684 @@
+/*!
+ * Copyright 2018 H2O.ai, Inc.
+ * License   Apache License Version 2.0 (see LICENSE for details)
+ */
+#include <algorithm>
+#include <cfloat>
+#include <cmath>
+#include <cstdio>
+#include <iostream>
+#include <limits>
+#include <numeric>
+#include <random>
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include "gsl/cblas.h"
+#include "tsvd_cpu.h"
+
+// CPU counterpart of gpu/tsvd. Dense data is column major as on the GPU,
+// sparse data is CSR and is only ever read through products with blocks of
+// vectors, so it is neither densified nor centered (PCA subtracts the
+// projection of the mean from each product instead). The blocks of vectors
+// are row major, which keeps the sparse products contiguous.
+
+namespace {
+
+void gemm(CBLAS_TRANSPOSE_t ta, CBLAS_TRANSPOSE_t tb, int m, int n, int k,
+          const float *A, int lda, const float *B, int ldb, float beta,
+          float *C, int ldc) {
+  cblas_sgemm(CblasColMajor, ta, tb, m, n, k, 1.0f, A, lda, B, ldb, beta, C,
+              ldc);
+}
+
+void gemm(CBLAS_TRANSPOSE_t ta, CBLAS_TRANSPOSE_t tb, int m, int n, int k,
+          const double *A, int lda, const double *B, int ldb, double beta,
+          double *C, int ldc) {
+  cblas_dgemm(CblasColMajor, ta, tb, m, n, k, 1.0, A, lda, B, ldb, beta, C,
+              ldc);
+}
+
+// Sums of the l columns of the row major m x l block y
+template <class T>
+std::vector<double> column_sums(size_t m, int l, const T *y) {
+  std::vector<double> sums(l, 0.0);
+#pragma omp parallel
+  {
+    std::vector<double> local(l, 0.0);
+#pragma omp for schedule(static)
+    for (size_t i = 0; i < m; ++i)
+      for (int c = 0; c < l; ++c)
+        local[c] += y[i * l + c];
+#pragma omp critical
+    for (int c = 0; c < l; ++c)
+      sums[c] += local[c];
+  }
+  return sums;
+}
+
+// The matrix A = X - 1 mean^T, applied to row major blocks of l vectors
+template <class T>
+class Operator {
+ public:
+  Operator(const tsvd::CpuMatrix<T> &X, const T *mean) : _X(X), _mean(mean) {
+    if (X.dense != NULL)
+      return;
+    // CSR of X^T by a counting sort, for contiguous products with A^T
+    const size_t nnz = X.indptr[X.m];
+    _tptr.assign(X.n + 1, 0);
+    _tind.resize(nnz);
+    _tval.resize(nnz);
+    for (size_t p = 0; p < nnz; ++p)
+      ++_tptr[X.indices[p] + 1];
+    for (int j = 0; j < X.n; ++j)
+      _tptr[j + 1] += _tptr[j];
+    std::vector<int> next(_tptr.begin(), _tptr.end() - 1);
+    for (int i = 0; i < X.m; ++i) {
+      for (int p = X.indptr[i]; p < X.indptr[i + 1]; ++p) {
+        const int q = next[X.indices[p]]++;
+        _tind[q] = i;
+        _tval[q] = X.data[p];
+      }
+    }
+  }
+
+  int Rows() const { return _X.m; }
+  int Cols() const { return _X.n; }
+
+  // y = A b for the n x l block b and the m x l block y
+  void Apply(int l, const T *b, T *y) const {
+    if (_X.dense != NULL)
+      gemm(CblasNoTrans, CblasTrans, l, _X.m, _X.n, b, l, _X.dense, _X.m, 0,
+           y, l);
+    else
+      SparseProduct(_X.m, _X.indptr, _X.indices, _X.data, l, b, y);
+    if (_mean != NULL)
+      Center(_X.m, l, _mean, _X.n, b, y);
+  }
+
+  // b = A^T y for the m x l block y and the n x l block b
+  void ApplyT(int l, const T *y, T *b) const {
+    if (_X.dense != NULL)
+      gemm(CblasNoTrans, CblasNoTrans, l, _X.n, _X.m, y, l, _X.dense, _X.m, 0,
+           b, l);
+    else
+      SparseProduct(_X.n, &_tptr[0], &_tind[0], _tval.empty() ? NULL :
+                    &_tval[0], l, y, b);
+    if (_mean == NULL)
+      return;
+    // - mean (1^T y)
+    const std::vector<double> sums = column_sums(_X.m, l, y);
+#pragma omp parallel for schedule(static)
+    for (int j = 0; j < _X.n; ++j)
+      for (int c = 0; c < l; ++c)
+        b[static_cast<size_t>(j) * l + c] -= _mean[j] * sums[c];
+  }
+
+  // Population variance of each column of X, summed
+  double TotalVariance() const {
+    const size_t m = _X.m, n = _X.n;
+    double total = 0;
+    if (_X.dense != NULL) {
+#pragma omp parallel for schedule(static) reduction(+ : total)
+      for (size_t j = 0; j < n; ++j) {
+        double sum = 0, sumsq = 0;
+        for (size_t i = 0; i < m; ++i) {
+          sum += _X.dense[j * m + i];
+          sumsq += static_cast<double>(_X.dense[j * m + i]) *
+                   _X.dense[j * m + i];
+        }
+        total += sumsq / m - (sum / m) * (sum / m);
+      }
+    } else {
+#pragma omp parallel for schedule(dynamic, 256) reduction(+ : total)
+      for (size_t j = 0; j < n; ++j) {
+        double sum = 0, sumsq = 0;
+        for (int p = _tptr[j]; p < _tptr[j + 1]; ++p) {
+          sum += _tval[p];
+          sumsq += static_cast<double>(_tval[p]) * _tval[p];
+        }
+        total += sumsq / m - (sum / m) * (sum / m);
+      }
+    }
+    return total;
+  }
+
+ private:
+  // y = S b for the rows x cols CSR matrix S
+  static void SparseProduct(int rows, const int *ptr, const int *ind,
+                            const T *val, int l, const T *b, T *y) {
+#pragma omp parallel for schedule(dynamic, 256)
+    for (int i = 0; i < rows; ++i) {
+      T *yi = y + static_cast<size_t>(i) * l;
+      std::fill(yi, yi + l, T(0));
+      for (int p = ptr[i]; p < ptr[i + 1]; ++p) {
+        const T v = val[p];
+        const T *bj = b + static_cast<size_t>(ind[p]) * l;
+#pragma omp simd
+        for (int c = 0; c < l; ++c)
+          yi[c] += v * bj[c];
+      }
+    }
+  }
+
+  // y -= 1 (mean^T b)
+  static void Center(int m, int l, const T *mean, int n, const T *b, T *y) {
+    std::vector<double> shift(l, 0.0);
+    for (int j = 0; j < n; ++j)
+      for (int c = 0; c < l; ++c)
+        shift[c] += mean[j] * b[static_cast<size_t>(j) * l + c];
+#pragma omp parallel for schedule(static)
+    for (int i = 0; i < m; ++i)
+      for (int c = 0; c < l; ++c)
+        y[static_cast<size_t>(i) * l + c] -= shift[c];
+  }
+
+  tsvd::CpuMatrix<T> _X;
+  const T *_mean;
+  std::vector<int> _tptr, _tind;
+  std::vector<T> _tval;
+};
+
+// Gram matrix y^T y of the row major m x l block y
+template <class T>
+void block_gram(size_t m, int l, const T *y, std::vector<double> &gram) {
+  std::vector<T> g(static_cast<size_t>(l) * l);
+  gemm(CblasNoTrans, CblasTrans, l, l, m, y, l, y, l, 0, &g[0], l);
+  gram.assign(g.begin(), g.end());
+}
+
+// Orthonormalize the columns of the row major m x l block y in place with
+// Cholesky QR, twice so the columns are orthogonal to working precision.
+// The diagonal shift keeps the factorization defined when y is rank
+// deficient.
+template <class T>
+void orthonormalize(size_t m, int l, T *y) {
+  std::vector<double> g;
+  for (int pass = 0; pass < 2; ++pass) {
+    block_gram(m, l, y, g);
+    double trace = 0;
+    for (int c = 0; c < l; ++c)
+      trace += g[c * l + c];
+    if (!(trace > 0))
+      return;
+    const double shift = trace * std::numeric_limits<T>::epsilon();
+    // lower triangular L with g + shift I = L L^T
+    for (int j = 0; j < l; ++j) {
+      double d = g[j * l + j] + shift;
+      for (int p = 0; p < j; ++p)
+        d -= g[j * l + p] * g[j * l + p];
+      g[j * l + j] = std::sqrt(std::max(d, shift));
+      for (int i = j + 1; i < l; ++i) {
+        double v = g[i * l + j];
+        for (int p = 0; p < j; ++p)
+          v -= g[i * l + p] * g[j * l + p];
+        g[i * l + j] = v / g[j * l + j];
+      }
+    }
+    // each row x of y := x L^-T
+#pragma omp parallel
+    {
+      std::vector<double> x(l);
+#pragma omp for schedule(static)
+      for (size_t i = 0; i < m; ++i) {
+        T *yi = y + i * l;
+        for (int c = 0; c < l; ++c) {
+          double v = yi[c];
+          for (int p = 0; p < c; ++p)
+            v -= g[c * l + p] * x[p];
+          x[c] = v / g[c * l + c];
+        }
+        std::copy(x.begin(), x.end(), yi);
+      }
+    }
+  }
+}
+
+// Eigen decomposition of the symmetric row major n x n matrix a (destroyed)
+// by cyclic Jacobi rotations: eigenvalues in descending order in w and the
+// matching eigenvectors in the columns of the row major v
+void symmetric_eigen(int n, std::vector<double> &a, std::vector<double> &w,
+                     std::vector<double> &v) {
+  const size_t N = n;
+  std::vector<double> vectors(N * N, 0.0);
+  for (size_t i = 0; i < N; ++i)
+    vectors[i * N + i] = 1;
+  for (int sweep = 0; sweep < 100; ++sweep) {
+    double off = 0, diag = 0;
+    for (size_t p = 0; p < N; ++p) {
+      diag += a[p * N + p] * a[p * N + p];
+      for (size_t q = p + 1; q < N; ++q)
+        off += a[p * N + q] * a[p * N + q];
+    }
+    if (off <= 1e-30 * diag)
+      break;
+    for (size_t p = 0; p + 1 < N; ++p) {
+      for (size_t q = p + 1; q < N; ++q) {
+        const double apq = a[p * N + q];
+        if (apq == 0)
+          continue;
+        const double theta = (a[q * N + q] - a[p * N + p]) / (2 * apq);
+        const double t = (theta >= 0 ? 1 : -1) /
+                         (std::abs(theta) + std::sqrt(theta * theta + 1));
+        const double c = 1 / std::sqrt(t * t + 1), s = t * c;
+        for (size_t k = 0; k < N; ++k) {
+          const double akp = a[k * N + p], akq = a[k * N + q];
+          a[k * N + p] = c * akp - s * akq;
+          a[k * N + q] = s * akp + c * akq;
+        }
+        for (size_t k = 0; k < N; ++k) {
+          const double apk = a[p * N + k], aqk = a[q * N + k];
+          a[p * N + k] = c * apk - s * aqk;
+          a[q * N + k] = s * apk + c * aqk;
+        }
+        for (size_t k = 0; k < N; ++k) {
+          const double vkp = vectors[k * N + p], vkq = vectors[k * N + q];
+          vectors[k * N + p] = c * vkp - s * vkq;
+          vectors[k * N + q] = s * vkp + c * vkq;
+        }
+      }
+    }
+  }
+  std::vector<size_t> order(N);
+  std::iota(order.begin(), order.end(), 0);
+  std::stable_sort(order.begin(), order.end(), [&](size_t i, size_t j) {
+    return a[i * N + i] > a[j * N + j];
+  });
+  w.resize(N);
+  v.resize(N * N);
+  for (size_t c = 0; c < N; ++c) {
+    w[c] = a[order[c] * N + order[c]];
+    for (size_t k = 0; k < N; ++k)
+      v[k * N + c] = vectors[k * N + order[c]];
+  }
+}
+
+template <class T>
+void gaussian(std::mt19937 &generator, T *x, size_t size) {
+  std::normal_distribution<double> normal;
+  for (size_t i = 0; i < size; ++i)
+    x[i] = static_cast<T>(normal(generator));
+}
+
+// Rayleigh-Ritz step from the orthonormal m x l block Y: the SVD of the
+// small B = Y^T A from the eigen decomposition of B B^T, which gives the
+// leading k singular values s and right singular vectors V. Z is set to
+// B^T = A^T Y.
+template <class T>
+void rayleigh_ritz(const Operator<T> &A, size_t k, int l, const T *Y,
+                   std::vector<T> &Z, std::vector<double> &s,
+                   std::vector<T> &V) {
+  const size_t n = A.Cols();
+  A.ApplyT(l, Y, &Z[0]);
+
+  std::vector<double> BBt, lambda, W;
+  block_gram(n, l, &Z[0], BBt);
+  symmetric_eigen(l, BBt, lambda, W);
+
+  // V = B^T W / s for the leading k eigenpairs
+  std::vector<T> Wt(W.begin(), W.end());
+  V.resize(n * k);
+  gemm(CblasNoTrans, CblasNoTrans, k, n, l, &Wt[0], l, &Z[0], l, 0, &V[0], k);
+  s.resize(k);
+  for (size_t c = 0; c < k; ++c)
+    s[c] = std::sqrt(std::max(lambda[c], 0.0));
+  for (size_t j = 0; j < n; ++j)
+    for (size_t c = 0; c < k; ++c)
+      V[j * k + c] = s[c] > 0 ? static_cast<T>(V[j * k + c] / s[c]) : T(0);
+}
+
+// Orthonormal basis Y of the range of A Omega for a Gaussian n x l Omega
+template <class T>
+void range_finder(const Operator<T> &A, int l, int random_state,
+                  std::vector<T> &Y, std::vector<T> &Z) {
+  const size_t m = A.Rows(), n = A.Cols();
+  Y.resize(m * l);
+  Z.resize(n * l);
+  std::mt19937 generator(random_state);
+  gaussian(generator, &Z[0], Z.size());
+  A.Apply(l, &Z[0], &Y[0]);
+  orthonormalize(m, l, &Y[0]);
+}
+
+// Y := orthonormal basis of the range of (A A^T) Y, using Z as workspace
+template <class T>
+void power_step(const Operator<T> &A, int l, std::vector<T> &Y,
+                std::vector<T> &Z) {
+  A.ApplyT(l, &Y[0], &Z[0]);
+  orthonormalize(A.Cols(), l, &Z[0]);
+  A.Apply(l, &Z[0], &Y[0]);
+  orthonormalize(A.Rows(), l, &Y[0]);
+}
+
+/**
+ * Randomized range finder (Halko, Martinsson and Tropp 2011): an
+ * orthonormal basis Y of the range of A Omega for a Gaussian n x
+ * (k + n_oversamples) Omega, refined by n_power_iter power iterations
+ * (A A^T) Y, then the exact SVD of the small B = Y^T A.
+ */
+template <class T>
+void randomized_tsvd(const Operator<T> &A, tsvd::params param,
+                     std::vector<double> &s, std::vector<T> &V) {
+  const size_t m = A.Rows(), n = A.Cols(), k = param.k;
+  const int l = static_cast<int>(std::max(
+      k, std::min(k + std::max(param.n_oversamples, 0), std::min(m, n))));
+  std::vector<T> Y, Z;
+  range_finder(A, l, param.random_state, Y, Z);
+  for (int iter = 0; iter < param.n_power_iter; ++iter)
+    power_step(A, l, Y, Z);
+  rayleigh_ritz(A, k, l, &Y[0], Z, s, V);
+}
+
+/**
+ * Power method with deflation, as on the GPU but without forming A^T A:
+ * each eigenvector of A^T A - sum_d lambda_d v_d v_d^T is found by
+ * iterating b := A^T (A b) minus the deflated part, normalized.
+ */
+template <class T>
+void power_tsvd(const Operator<T> &A, tsvd::params param,
+                std::vector<double> &s, std::vector<T> &V) {
+  const size_t m = A.Rows(), n = A.Cols(), k = param.k;
+  std::vector<std::vector<T> > vectors(k, std::vector<T>(n));
+  std::vector<double> lambda(k);
+  std::vector<T> b(n), Ab(m), b1(n);
+  for (size_t c = 0; c < k; ++c) {
+    std::mt19937 generator(param.random_state + c);
+    gaussian(generator, &b[0], n);
+    double norm = 0;
+    for (size_t j = 0; j < n; ++j)
+      norm += static_cast<double>(b[j]) * b[j];
+    for (size_t j = 0; j < n; ++j)
+      b[j] = static_cast<T>(b[j] / std::sqrt(norm));
+
+    double previous_estimate = FLT_MAX, estimate = FLT_MAX;
+    for (int iter = 0; iter < param.n_iter; ++iter) {
+      A.Apply(1, &b[0], &Ab[0]);
+      A.ApplyT(1, &Ab[0], &b1[0]);
+      for (size_t d = 0; d < c; ++d) {
+        double dot = 0;
+        for (size_t j = 0; j < n; ++j)
+          dot += static_cast<double>(vectors[d][j]) * b[j];
+        for (size_t j = 0; j < n; ++j)
+          b1[j] -= static_cast<T>(lambda[d] * dot * vectors[d][j]);
+      }
+      estimate = 0;
+      norm = 0;
+      for (size_t j = 0; j < n; ++j) {
+        estimate += static_cast<double>(b1[j]) * b[j];
+        norm += static_cast<double>(b1[j]) * b1[j];
+      }
+      if (std::abs(estimate - previous_estimate) <=
+          param.tol * std::abs(previous_estimate))
+        break;
+      if (!(norm > 0))
+        break;
+      for (size_t j = 0; j < n; ++j)
+        b[j] = static_cast<T>(b1[j] / std::sqrt(norm));
+      previous_estimate = estimate;
+    }
+    lambda[c] = estimate;
+    vectors[c] = b;
+  }
+
+  V.resize(n * k);
+  s.resize(k);
+  for (size_t c = 0; c < k; ++c) {
+    s[c] = std::sqrt(std::max(lambda[c], 0.0));
+    for (size_t j = 0; j < n; ++j)
+      V[j * k + c] = vectors[c][j];
+  }
+}
+
+/**
+ * Decomposition to working precision, the CPU counterpart of the GPU
+ * "cusolver" algorithm. It does not form the n x n matrix A^T A, whose
+ * eigen decomposition would cost O(n^3): the randomized basis of
+ * max(2 k, k + n_oversamples) vectors is refined by power iterations until
+ * the leading k singular values change by less than a few ulps of the
+ * largest one, or for at most n_iter iterations. Each iteration costs two
+ * products with A and O((m + n) l^2) flops.
+ */
+template <class T>
+void exact_tsvd(const Operator<T> &A, tsvd::params param,
+                std::vector<double> &s, std::vector<T> &V) {
+  const size_t m = A.Rows(), n = A.Cols(), k = param.k;
+  const int l = static_cast<int>(std::min(
+      std::max(2 * k, k + std::max(param.n_oversamples, 0)), std::min(m, n)));
+  const double tol = 16 * std::numeric_limits<T>::epsilon();
+  std::vector<T> Y, Z;
+  std::vector<double> previous;
+  range_finder(A, l, param.random_state, Y, Z);
+  for (int iter = 0;; ++iter) {
+    rayleigh_ritz(A, k, l, &Y[0], Z, s, V);
+    // the basis spans the whole row space, nothing left to refine
+    if (static_cast<size_t>(l) == std::min(m, n) || iter >= param.n_iter)
+      break;
+    if (!previous.empty()) {
+      double change = 0;
+      for (size_t c = 0; c < k; ++c)
+        change = std::max(change, std::abs(s[c] - previous[c]));
+      if (change <= tol * s[0])
+        break;
+    }
+    previous = s;
+    power_step(A, l, Y, Z);
+  }
+}
+
+}  // namespace
+
+namespace tsvd {
+
+template <typename T>
+void column_means(const CpuMatrix<T> &X, T *mean) {
+  const size_t m = X.m, n = X.n;
+  if (X.dense != NULL) {
+#pragma omp parallel for schedule(static)
+    for (size_t j = 0; j < n; ++j) {
+      double sum = 0;
+      for (size_t i = 0; i < m; ++i)
+        sum += X.dense[j * m + i];
+      mean[j] = static_cast<T>(sum / m);
+    }
+    return;
+  }
+  std::vector<double> sums(n, 0.0);
+#pragma omp parallel
+  {
+    std::vector<double> local(n, 0.0);
+#pragma omp for schedule(static)
+    for (int p = 0; p < X.indptr[X.m]; ++p)
+      local[X.indices[p]] += X.data[p];
+#pragma omp critical
+    for (size_t j = 0; j < n; ++j)
+      sums[j] += local[j];
+  }
+  for (size_t j = 0; j < n; ++j)
+    mean[j] = static_cast<T>(sums[j] / m);
+}
+
+template <typename T>
+void truncated_svd_cpu(const CpuMatrix<T> &X, const T *mean, T *_Q, T *_w,
+                       T *_U, T *_X_transformed, T *_explained_variance,
+                       T *_explained_variance_ratio, params _param) {
+  const size_t m = X.m, n = X.n, k = _param.k;
+  if (_param.k < 1 || k > std::min(m, n))
+    throw std::invalid_argument("n_components must be between 1 and " +
+                                std::to_string(std::min(m, n)));
+  std::string algorithm(_param.algorithm);
+  Operator<T> A(X, mean);
+  std::vector<double> s;
+  std::vector<T> V;
+  if (algorithm == "cusolver") {
+    if (_param.verbose == 1) {
+      fprintf(stderr, "Algorithm is subspace iteration to working precision on the CPU with k = %d\n", _param.k); fflush(stderr);
+    }
+    exact_tsvd(A, _param, s, V);
+  } else if (algorithm == "randomized") {
+    if (_param.verbose == 1) {
+      fprintf(stderr, "Algorithm is randomized with k = %d, %d oversamples and %d power iterations\n", _param.k, _param.n_oversamples, _param.n_power_iter); fflush(stderr);
+    }
+    randomized_tsvd(A, _param, s, V);
+  } else {
+    if (_param.verbose == 1) {
+      fprintf(stderr, "Algorithm is power with k = %d and number of iterations = %d\n", _param.k, _param.n_iter); fflush(stderr);
+    }
+    power_tsvd(A, _param, s, V);
+  }
+
+  // biggest singular value first
+  std::vector<size_t> order(k);
+  std::iota(order.begin(), order.end(), 0);
+  std::stable_sort(order.begin(), order.end(),
+                   [&](size_t i, size_t j) { return s[i] > s[j]; });
+  std::vector<double> sorted(k);
+  std::vector<T> Vsorted(n * k);
+  for (size_t c = 0; c < k; ++c) {
+    sorted[c] = s[order[c]];
+    for (size_t j = 0; j < n; ++j)
+      Vsorted[j * k + c] = V[j * k + order[c]];
+  }
+  s.swap(sorted);
+  V.swap(Vsorted);
+
+  // U = A V / s
+  std::vector<T> U(m * k);
+  A.Apply(k, &V[0], &U[0]);
+
+  // sign correction as svd_flip() in sklearn: the entry of each column of U
+  // that is largest in absolute value is positive
+  std::vector<T> signs(k, T(1));
+  for (size_t c = 0; c < k; ++c) {
+    size_t best = 0;
+    for (size_t i = 1; i < m; ++i)
+      if (std::abs(U[i * k + c]) > std::abs(U[best * k + c]))
+        best = i;
+    signs[c] = U[best * k + c] < 0 ? T(-1) : T(1);
+  }
+
+  const double total_variance = A.TotalVariance();
+  for (size_t c = 0; c < k; ++c) {
+    _w[c] = static_cast<T>(s[c]);
+    const double scale = s[c] > 0 ? signs[c] / s[c] : 0.0;
+    double sum = 0, sumsq = 0;
+    for (size_t i = 0; i < m; ++i) {
+      const T u = static_cast<T>(U[i * k + c] * scale);
+      _U[c * m + i] = u;
+      _X_transformed[c * m + i] = static_cast<T>(u * s[c]);
+      sum += u * s[c];
+      sumsq += (u * s[c]) * (u * s[c]);
+    }
+    const double variance = sumsq / m - (sum / m) * (sum / m);
+    _explained_variance[c] = static_cast<T>(variance);
+    _explained_variance_ratio[c] =
+        static_cast<T>(total_variance != 0 ? variance / total_variance : 0);
+
+    const double whiten =
+        _param.whiten && s[c] > 0 ? std::sqrt(static_cast<double>(m)) / s[c]
+                                  : 1.0;
+    for (size_t j = 0; j < n; ++j)
+      _Q[j * k + c] = static_cast<T>(V[j * k + c] * signs[c] * whiten);
+  }
+}
+
+template void column_means<float>(const CpuMatrix<float> &X, float *mean);
+template void column_means<double>(const CpuMatrix<double> &X, double *mean);
+template void truncated_svd_cpu<float>(const CpuMatrix<float> &X, const float *mean, float *_Q, float *_w, float *_U, float *_X_transformed, float *_explained_variance, float *_explained_variance_ratio, params _param);
+template void truncated_svd_cpu<double>(const CpuMatrix<double> &X, const double *mean, double *_Q, double *_w, double *_U, double *_X_transformed, double *_explained_variance, double *_explained_variance_ratio, params _param);
+
+}  // namespace tsvd
+
+namespace {
+
+template <class T>
+void truncated_svd(const tsvd::CpuMatrix<T> &X, T *_Q, T *_w, T *_U,
+                   T *_X_transformed, T *_explained_variance,
+                   T *_explained_variance_ratio, tsvd::params _param) {
+  try {
+    tsvd::truncated_svd_cpu(X, static_cast<const T *>(NULL), _Q, _w, _U,
+                            _X_transformed, _explained_variance,
+                            _explained_variance_ratio, _param);
+  } catch (const std::exception &e) {
+    std::cerr << "tsvd error: " << e.what() << "\n";
+  } catch (std::string e) {
+    std::cerr << "tsvd error: " << e << "\n";
+  } catch (...) {
+    std::cerr << "tsvd error\n";
+  }
+}
+
+// X_transformed = X Q^T - 1 (Q mean)^T: each column of the output starts at
+// minus the projected mean and the (blocked, multithreaded) BLAS gemm adds
+// X Q^T to it, so X is neither copied nor centered.
+template <class T>
+void transform(const T *X, const T *Q, const T *mean, T *X_transformed,
+               tsvd::params param) {
+  const size_t m = param.X_m, n = param.X_n, k = param.k;
+  for (size_t j = 0; j < k; ++j) {
+    double offset = 0;
+    for (size_t i = 0; i < n; ++i)
+      offset += static_cast<double>(Q[i * k + j]) * mean[i];
+    std::fill(X_transformed + j * m, X_transformed + (j + 1) * m,
+              static_cast<T>(-offset));
+  }
+  if (m > 0 && n > 0)
+    gemm(CblasNoTrans, CblasTrans, param.X_m, param.k, param.X_n, X,
+         param.X_m, Q, param.k, 1, X_transformed, param.X_m);
+}
+
+}  // namespace
+
+namespace tsvd {
+
+void truncated_svd_float(const float *_X, float *_Q, float *_w, float *_U,
+                         float *_X_transformed, float *_explained_variance,
+                         float *_explained_variance_ratio, params _param) {
+  CpuMatrix<float> X = {_param.X_m, _param.X_n, _X, NULL, NULL, NULL};
+  truncated_svd(X, _Q, _w, _U, _X_transformed, _explained_variance,
+                _explained_variance_ratio, _param);
+}
+
+void truncated_svd_double(const double *_X, double *_Q, double *_w, double *_U,
+                          double *_X_transformed, double *_explained_variance,
+                          double *_explained_variance_ratio, params _param) {
+  CpuMatrix<double> X = {_param.X_m, _param.X_n, _X, NULL, NULL, NULL};
+  truncated_svd(X, _Q, _w, _U, _X_transformed, _explained_variance,
+                _explained_variance_ratio, _param);
+}
+
+void truncated_svd_csr_float(const float *_X_data, const int *_X_indices,
+                             const int *_X_indptr, float *_Q, float *_w,
+                             float *_U, float *_X_transformed,
+                             float *_explained_variance,
+                             float *_explained_variance_ratio, params _param) {
+  CpuMatrix<float> X = {_param.X_m, _param.X_n, NULL, _X_data, _X_indices,
+                        _X_indptr};
+  truncated_svd(X, _Q, _w, _U, _X_transformed, _explained_variance,
+                _explained_variance_ratio, _param);
+}
+
+void truncated_svd_csr_double(const double *_X_data, const int *_X_indices,
+                              const int *_X_indptr, double *_Q, double *_w,
+                              double *_U, double *_X_transformed,
+                              double *_explained_variance,
+                              double *_explained_variance_ratio,
+                              params _param) {
+  CpuMatrix<double> X = {_param.X_m, _param.X_n, NULL, _X_data, _X_indices,
+                         _X_indptr};
+  truncated_svd(X, _Q, _w, _U, _X_transformed, _explained_variance,
+                _explained_variance_ratio, _param);
+}
+
+void transform_float(const float *_X, const float *_components,
+                     const float *_mean, float *_X_transformed,
+                     params _param) {
+  transform(_X, _components, _mean, _X_transformed, _param);
+}
+
+void transform_double(const double *_X, const double *_components,
+                      const double *_mean, double *_X_transformed,
+                      params _param) {
+  transform(_X, _components, _mean, _X_transformed, _param);
+}
+
+}  // namespace tsvd
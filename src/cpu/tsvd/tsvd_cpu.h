@@ -0,0 +1,33 @@
+/*!
+ * Copyright 2018 H2O.ai, Inc.
+ * License   Apache License Version 2.0 (see LICENSE for details)
+ */
+#pragma once
+
+#include "solver/tsvd.h"
+
+namespace tsvd {
+
+// Data of a fit on the CPU: a column major dense matrix or a compressed
+// sparse row one (dense is NULL)
+template <typename T>
+struct CpuMatrix {
+  int m, n;
+  const T *dense;
+  const T *data;
+  const int *indices;
+  const int *indptr;
+};
+
+// Column means of X
+template <typename T>
+void column_means(const CpuMatrix<T> &X, T *mean);
+
+// Truncated SVD of X - 1 mean^T (of X if mean is NULL) with the outputs of
+// truncated_svd_float, the centering is never applied to X itself
+template <typename T>
+void truncated_svd_cpu(const CpuMatrix<T> &X, const T *mean, T *_Q, T *_w,
+                       T *_U, T *_X_transformed, T *_explained_variance,
+                       T *_explained_variance_ratio, params _param);
+
+}  // namespace tsvd
@@ -2623,20 +2623,38 @@ class ALSFactorization
         }
         cudacall(cudaFree(yTXT));
     }
-    T Score(const int *cooRowIndex, const int *cooColIndex, const T *cooData,
+    // CSC of the ratings (the CSR of their transpose), built on the device
+    // so the host only ever holds the CSR
+    void Transpose(const int *csrRowIndex, const int *csrColIndex,
+                   const T *csrVal, const long nnz, int *cscRowIndex,
+                   int *cscColIndex, T *cscVal)
+    {
+        cusparsecall(csr2csc(cushandle, m, n, nnz, csrVal, csrRowIndex,
+                             csrColIndex, cscVal, cscRowIndex, cscColIndex));
+        OK(cudaDeviceSynchronize());
+    }
+
+    T Score(const int *csrRowIndex, const int *csrColIndex, const T *csrData,
             const long nnz)
     {
+        // expand the row offsets of the CSR for the per rating kernel
+        int *cooRowIndex = 0;
+        cudacall(cudaMalloc((void **)&cooRowIndex, nnz * sizeof(cooRowIndex[0])));
+        cusparsecall(cusparseXcsr2coo(cushandle, csrRowIndex, nnz, m,
+                                      cooRowIndex, CUSPARSE_INDEX_BASE_ZERO));
+
         constexpr int error_size = 1000;
         T *errors_test = 0;
         cudacall(
             cudaMalloc((void **)&errors_test, error_size * sizeof(errors_test[0])));
         cudacall(cudaMemset(errors_test, 0, error_size * sizeof(float)));
         constexpr int block = 256;
-        RMSE<<<(nnz + block - 1) / block, block>>>(cooData, cooRowIndex,
-                                                   cooColIndex, thetaT, XT,
+        RMSE<<<(nnz + block - 1) / block, block>>>(csrData, cooRowIndex,
+                                                   csrColIndex, thetaT, XT,
                                                    errors_test, nnz, error_size, f);
         OK(cudaDeviceSynchronize());
         cudaCheckError();
+        cudacall(cudaFree(cooRowIndex));
 
         T *rmse = (T *)malloc(sizeof(T));
         cublascall(cublasSasum(handle, error_size, errors_test, 1, rmse));
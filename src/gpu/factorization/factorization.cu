@@ -32,33 +32,29 @@ template <class T>
 int make_factorization_data(
     const int m, const int n, const int f, const long nnz, const long nnz_test,
     const int *csrRowIndexHostPtr, const int *csrColIndexHostPtr,
-    const T *csrValHostPtr, const int *cscRowIndexHostPtr,
-    const int *cscColIndexHostPtr, const T *cscValHostPtr,
-    const int *cooRowIndexHostPtr, const int *cooColIndexHostPtr,
-    const T *cooValHostPtr, T *thetaTHost, T *XTHost,
-    const int *cooRowIndexTestHostPtr, const int *cooColIndexTestHostPtr,
-    const T *cooValTestHostPtr,
+    const T *csrValHostPtr, T *thetaTHost, T *XTHost,
+    const int *csrRowIndexTestHostPtr, const int *csrColIndexTestHostPtr,
+    const T *csrValTestHostPtr,
 
     int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr, T **csrValDevicePtr,
     int **cscRowIndexDevicePtr, int **cscColIndexDevicePtr, T **cscValDevicePtr,
-    int **cooRowIndexDevicePtr, int **cooColIndexDevicePtr, T **cooValDevicePtr,
-    T **thetaTDevice, T **XTDevice, int **cooRowIndexTestDevicePtr,
-    int **cooColIndexTestDevicePtr, T **cooValDeviceTestPtr) {
+    T **thetaTDevice, T **XTDevice, int **csrRowIndexTestDevicePtr,
+    int **csrColIndexTestDevicePtr, T **csrValDeviceTestPtr) {
 
-  CUDACHECK(cudaMalloc((void **)cooRowIndexDevicePtr,
-                       nnz * sizeof(**cooRowIndexDevicePtr)));
-  CUDACHECK(cudaMemcpy(*cooRowIndexDevicePtr, cooRowIndexHostPtr,
-                       (size_t)(nnz * sizeof(**cooRowIndexDevicePtr)),
+  CUDACHECK(cudaMalloc((void **)csrRowIndexDevicePtr,
+                       (m + 1) * sizeof(**csrRowIndexDevicePtr)));
+  CUDACHECK(cudaMalloc((void **)csrColIndexDevicePtr,
+                       nnz * sizeof(**csrColIndexDevicePtr)));
+  CUDACHECK(
+      cudaMalloc((void **)csrValDevicePtr, nnz * sizeof(**csrValDevicePtr)));
+  CUDACHECK(cudaMemcpy(*csrRowIndexDevicePtr, csrRowIndexHostPtr,
+                       (size_t)((m + 1) * sizeof(**csrRowIndexDevicePtr)),
                        cudaMemcpyHostToDevice));
-  CUDACHECK(cudaMalloc((void **)cooColIndexDevicePtr,
-                       nnz * sizeof(**cooColIndexDevicePtr)));
-  CUDACHECK(cudaMemcpy(*cooColIndexDevicePtr, cooColIndexHostPtr,
-                       (size_t)(nnz * sizeof(**cooColIndexDevicePtr)),
+  CUDACHECK(cudaMemcpy(*csrColIndexDevicePtr, csrColIndexHostPtr,
+                       (size_t)(nnz * sizeof(**csrColIndexDevicePtr)),
                        cudaMemcpyHostToDevice));
-  CUDACHECK(
-      cudaMalloc((void **)cooValDevicePtr, nnz * sizeof(**cooValDevicePtr)));
-  CUDACHECK(cudaMemcpy(*cooValDevicePtr, cooValHostPtr,
-                       (size_t)(nnz * sizeof(**cooValDevicePtr)),
+  CUDACHECK(cudaMemcpy(*csrValDevicePtr, csrValHostPtr,
+                       (size_t)(nnz * sizeof(**csrValDevicePtr)),
                        cudaMemcpyHostToDevice));
 
   CUDACHECK(cudaMalloc((void **)cscRowIndexDevicePtr,
@@ -71,15 +67,6 @@ int make_factorization_data(
   CUDACHECK(cudaMalloc((void **)thetaTDevice, f * n * sizeof(**thetaTDevice)));
   // dimension: M*F
   CUDACHECK(cudaMalloc((void **)XTDevice, f * m * sizeof(**XTDevice)));
-  CUDACHECK(cudaMemcpy(*cscRowIndexDevicePtr, cscRowIndexHostPtr,
-                       (size_t)nnz * sizeof(**cscRowIndexDevicePtr),
-                       cudaMemcpyHostToDevice));
-  CUDACHECK(cudaMemcpy(*cscColIndexDevicePtr, cscColIndexHostPtr,
-                       (size_t)(n + 1) * sizeof(**cscColIndexDevicePtr),
-                       cudaMemcpyHostToDevice));
-  CUDACHECK(cudaMemcpy(*cscValDevicePtr, cscValHostPtr,
-                       (size_t)(nnz * sizeof(**cscValDevicePtr)),
-                       cudaMemcpyHostToDevice));
   CUDACHECK(cudaMemcpy(*thetaTDevice, thetaTHost,
                        (size_t)(n * f * sizeof(**thetaTDevice)),
                        cudaMemcpyHostToDevice));
@@ -87,40 +74,30 @@ int make_factorization_data(
   CUDACHECK(cudaMemcpy(*XTDevice, XTHost, (size_t)(m * f * sizeof(**XTDevice)),
                        cudaMemcpyHostToDevice));
 
-  CUDACHECK(cudaMalloc((void **)csrRowIndexDevicePtr,
-                       (m + 1) * sizeof(**csrRowIndexDevicePtr)));
-  CUDACHECK(cudaMalloc((void **)csrColIndexDevicePtr,
-                       nnz * sizeof(**csrColIndexDevicePtr)));
-  CUDACHECK(
-      cudaMalloc((void **)csrValDevicePtr, nnz * sizeof(**csrValDevicePtr)));
-  CUDACHECK(cudaMemcpy(*csrRowIndexDevicePtr, csrRowIndexHostPtr,
-                       (size_t)((m + 1) * sizeof(**csrRowIndexDevicePtr)),
-                       cudaMemcpyHostToDevice));
-  CUDACHECK(cudaMemcpy(*csrColIndexDevicePtr, csrColIndexHostPtr,
-                       (size_t)(nnz * sizeof(**csrColIndexDevicePtr)),
-                       cudaMemcpyHostToDevice));
-  CUDACHECK(cudaMemcpy(*csrValDevicePtr, csrValHostPtr,
-                       (size_t)(nnz * sizeof(**csrValDevicePtr)),
-                       cudaMemcpyHostToDevice));
+  // the CSC is only ever built on the device
+  ALSFactorization<T> factorization(m, n, f, 0, *thetaTDevice, *XTDevice);
+  factorization.Transpose(*csrRowIndexDevicePtr, *csrColIndexDevicePtr,
+                          *csrValDevicePtr, nnz, *cscRowIndexDevicePtr,
+                          *cscColIndexDevicePtr, *cscValDevicePtr);
 
-  if (cooColIndexTestHostPtr && cooRowIndexTestHostPtr && cooValTestHostPtr &&
+  if (csrColIndexTestHostPtr && csrRowIndexTestHostPtr && csrValTestHostPtr &&
       nnz_test > 0) {
-    CUDACHECK(cudaMalloc((void **)cooRowIndexTestDevicePtr,
-                         nnz_test * sizeof(**cooRowIndexTestDevicePtr)));
-    CUDACHECK(cudaMalloc((void **)cooColIndexTestDevicePtr,
-                         nnz_test * sizeof(**cooColIndexTestDevicePtr)));
-    CUDACHECK(cudaMalloc((void **)cooValDeviceTestPtr,
-                         nnz_test * sizeof(**cooValDeviceTestPtr)));
+    CUDACHECK(cudaMalloc((void **)csrRowIndexTestDevicePtr,
+                         (m + 1) * sizeof(**csrRowIndexTestDevicePtr)));
+    CUDACHECK(cudaMalloc((void **)csrColIndexTestDevicePtr,
+                         nnz_test * sizeof(**csrColIndexTestDevicePtr)));
+    CUDACHECK(cudaMalloc((void **)csrValDeviceTestPtr,
+                         nnz_test * sizeof(**csrValDeviceTestPtr)));
     CUDACHECK(
-        cudaMemcpy(*cooRowIndexTestDevicePtr, cooRowIndexTestHostPtr,
-                   (size_t)(nnz_test * sizeof(**cooRowIndexTestDevicePtr)),
+        cudaMemcpy(*csrRowIndexTestDevicePtr, csrRowIndexTestHostPtr,
+                   (size_t)((m + 1) * sizeof(**csrRowIndexTestDevicePtr)),
                    cudaMemcpyHostToDevice));
     CUDACHECK(
-        cudaMemcpy(*cooColIndexTestDevicePtr, cooColIndexTestHostPtr,
-                   (size_t)(nnz_test * sizeof(**cooColIndexTestDevicePtr)),
+        cudaMemcpy(*csrColIndexTestDevicePtr, csrColIndexTestHostPtr,
+                   (size_t)(nnz_test * sizeof(**csrColIndexTestDevicePtr)),
                    cudaMemcpyHostToDevice));
-    CUDACHECK(cudaMemcpy(*cooValDeviceTestPtr, cooValTestHostPtr,
-                         (size_t)(nnz_test * sizeof(**cooValDeviceTestPtr)),
+    CUDACHECK(cudaMemcpy(*csrValDeviceTestPtr, csrValTestHostPtr,
+                         (size_t)(nnz_test * sizeof(**csrValDeviceTestPtr)),
                          cudaMemcpyHostToDevice));
   }
   return 0;
@@ -129,11 +106,11 @@ int make_factorization_data(
 template <typename T>
 T factorization_score(const int m, const int n, const int f, const long nnz,
                       const T lambda, T **thetaTDevice, T **XTDevice,
-                      int **cooRowIndexDevicePtr, int **cooColIndexDevicePtr,
-                      T **cooValDevicePtr) {
+                      int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
+                      T **csrValDevicePtr) {
   ALSFactorization<T> factorization(m, n, f, lambda, *thetaTDevice, *XTDevice);
-  return factorization.Score(*cooRowIndexDevicePtr, *cooColIndexDevicePtr,
-                             *cooValDevicePtr, nnz);
+  return factorization.Score(*csrRowIndexDevicePtr, *csrColIndexDevicePtr,
+                             *csrValDevicePtr, nnz);
 }
 
 template <typename T>
@@ -153,20 +130,20 @@ int run_factorization_step(
 float factorization_score_float(const int m, const int n, const int f,
                                 const long nnz, const float lambda,
                                 float **thetaTDevice, float **XTDevice,
-                                int **cooRowIndexDevicePtr,
-                                int **cooColIndexDevicePtr,
-                                float **cooValDevicePtr) {
+                                int **csrRowIndexDevicePtr,
+                                int **csrColIndexDevicePtr,
+                                float **csrValDevicePtr) {
   return factorization_score<float>(m, n, f, nnz, lambda, thetaTDevice,
-                                    XTDevice, cooRowIndexDevicePtr,
-                                    cooColIndexDevicePtr, cooValDevicePtr);
+                                    XTDevice, csrRowIndexDevicePtr,
+                                    csrColIndexDevicePtr, csrValDevicePtr);
 }
 
 double factorization_score_double(const int m, const int n, const int f,
                                   const long nnz, const float lambda,
                                   double **thetaTDevice, double **XTDevice,
-                                  int **cooRowIndexDevicePtr,
-                                  int **cooColIndexDevicePtr,
-                                  double **cooValDevicePtr) {
+                                  int **csrRowIndexDevicePtr,
+                                  int **csrColIndexDevicePtr,
+                                  double **csrValDevicePtr) {
   return 0.0;
 }
 
@@ -200,59 +177,45 @@ int run_factorization_step_float(
 int make_factorization_data_double(
     const int m, const int n, const int f, const long nnz, const long nnz_test,
     const int *csrRowIndexHostPtr, const int *csrColIndexHostPtr,
-    const double *csrValHostPtr, const int *cscRowIndexHostPtr,
-    const int *cscColIndexHostPtr, const double *cscValHostPtr,
-    const int *cooRowIndexHostPtr, const int *cooColIndexHostPtr,
-    const double *cooValHostPtr, double *thetaTHost, double *XTHost,
-    const int *cooRowIndexTestHostPtr, const int *cooColIndexTestHostPtr,
-    const double *cooValTestHostPtr,
+    const double *csrValHostPtr, double *thetaTHost, double *XTHost,
+    const int *csrRowIndexTestHostPtr, const int *csrColIndexTestHostPtr,
+    const double *csrValTestHostPtr,
 
     int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
     double **csrValDevicePtr, int **cscRowIndexDevicePtr,
-    int **cscColIndexDevicePtr, double **cscValDevicePtr,
-    int **cooRowIndexDevicePtr, int **cooColIndexDevicePtr,
-    double **cooValDevicePtr, double **thetaTDevice, double **XTDevice,
-    int **cooRowIndexTestDevicePtr, int **cooColIndexTestDevicePtr,
-    double **cooValTestDevicePtr) {
+    int **cscColIndexDevicePtr, double **cscValDevicePtr, double **thetaTDevice,
+    double **XTDevice, int **csrRowIndexTestDevicePtr,
+    int **csrColIndexTestDevicePtr, double **csrValTestDevicePtr) {
   return make_factorization_data<double>(
       m, n, f, nnz, nnz_test, csrRowIndexHostPtr, csrColIndexHostPtr,
-      csrValHostPtr, cscRowIndexHostPtr, cscColIndexHostPtr, cscValHostPtr,
-      cooRowIndexHostPtr, cooColIndexHostPtr, cooValHostPtr, thetaTHost, XTHost,
-      cooRowIndexTestHostPtr, cooColIndexTestHostPtr, cooValTestHostPtr,
+      csrValHostPtr, thetaTHost, XTHost, csrRowIndexTestHostPtr,
+      csrColIndexTestHostPtr, csrValTestHostPtr,
 
       csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr,
-      cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr,
-      cooRowIndexDevicePtr, cooColIndexDevicePtr, cooValDevicePtr, thetaTDevice,
-      XTDevice, cooRowIndexTestDevicePtr, cooColIndexTestDevicePtr,
-      cooValTestDevicePtr);
+      cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr, thetaTDevice,
+      XTDevice, csrRowIndexTestDevicePtr, csrColIndexTestDevicePtr,
+      csrValTestDevicePtr);
 }
 
 int make_factorization_data_float(
     const int m, const int n, const int f, const long nnz, const long nnz_test,
     const int *csrRowIndexHostPtr, const int *csrColIndexHostPtr,
-    const float *csrValHostPtr, const int *cscRowIndexHostPtr,
-    const int *cscColIndexHostPtr, const float *cscValHostPtr,
-    const int *cooRowIndexHostPtr, const int *cooColIndexHostPtr,
-    const float *cooValHostPtr, float *thetaTHost, float *XTHost,
-    const int *cooRowIndexTestHostPtr, const int *cooColIndexTestHostPtr,
-    const float *cooValTestHostPtr,
+    const float *csrValHostPtr, float *thetaTHost, float *XTHost,
+    const int *csrRowIndexTestHostPtr, const int *csrColIndexTestHostPtr,
+    const float *csrValTestHostPtr,
 
     int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
     float **csrValDevicePtr, int **cscRowIndexDevicePtr,
-    int **cscColIndexDevicePtr, float **cscValDevicePtr,
-    int **cooRowIndexDevicePtr, int **cooColIndexDevicePtr,
-    float **cooValDevicePtr, float **thetaTDevice, float **XTDevice,
-    int **cooRowIndexTestDevicePtr, int **cooColIndexTestDevicePtr,
-    float **cooValTestDevicePtr) {
+    int **cscColIndexDevicePtr, float **cscValDevicePtr, float **thetaTDevice,
+    float **XTDevice, int **csrRowIndexTestDevicePtr,
+    int **csrColIndexTestDevicePtr, float **csrValTestDevicePtr) {
   return make_factorization_data<float>(
       m, n, f, nnz, nnz_test, csrRowIndexHostPtr, csrColIndexHostPtr,
-      csrValHostPtr, cscRowIndexHostPtr, cscColIndexHostPtr, cscValHostPtr,
-      cooRowIndexHostPtr, cooColIndexHostPtr, cooValHostPtr, thetaTHost, XTHost,
-      cooRowIndexTestHostPtr, cooColIndexTestHostPtr, cooValTestHostPtr,
+      csrValHostPtr, thetaTHost, XTHost, csrRowIndexTestHostPtr,
+      csrColIndexTestHostPtr, csrValTestHostPtr,
 
       csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr,
-      cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr,
-      cooRowIndexDevicePtr, cooColIndexDevicePtr, cooValDevicePtr, thetaTDevice,
-      XTDevice, cooRowIndexTestDevicePtr, cooColIndexTestDevicePtr,
-      cooValTestDevicePtr);
+      cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr, thetaTDevice,
+      XTDevice, csrRowIndexTestDevicePtr, csrColIndexTestDevicePtr,
+      csrValTestDevicePtr);
 }
\ No newline at end of file
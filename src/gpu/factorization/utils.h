@@ -26,6 +26,26 @@ csrmm(cusparseHandle_t handle, cusparseOperation_t transA,
                            csrValA, csrRowPtrA, csrColIndA, B, ldb, beta, C, ldc);
 }
 
+inline cusparseStatus_t
+csr2csc(cusparseHandle_t handle, int m, int n, int nnz, const float *csrVal,
+        const int *csrRowPtr, const int *csrColInd, float *cscVal,
+        int *cscRowInd, int *cscColPtr)
+{
+    return cusparseScsr2csc(handle, m, n, nnz, csrVal, csrRowPtr, csrColInd,
+                            cscVal, cscRowInd, cscColPtr,
+                            CUSPARSE_ACTION_NUMERIC, CUSPARSE_INDEX_BASE_ZERO);
+}
+
+inline cusparseStatus_t
+csr2csc(cusparseHandle_t handle, int m, int n, int nnz, const double *csrVal,
+        const int *csrRowPtr, const int *csrColInd, double *cscVal,
+        int *cscRowInd, int *cscColPtr)
+{
+    return cusparseDcsr2csc(handle, m, n, nnz, csrVal, csrRowPtr, csrColInd,
+                            cscVal, cscRowInd, cscColPtr,
+                            CUSPARSE_ACTION_NUMERIC, CUSPARSE_INDEX_BASE_ZERO);
+}
+
 inline cublasStatus_t geam(cublasHandle_t handle, cublasOperation_t transa,
                            cublasOperation_t transb, int m, int n,
                            const float *alpha, const float *A, int lda,
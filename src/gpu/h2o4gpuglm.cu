@@ -69,7 +69,7 @@ H2O4GPU<T, M, P>::H2O4GPU(int sharedA, int me, int wDev, const M &A) :
 				0), _validmean(0), _trainstddev(0), _validstddev(0), _final_iter(
 				0), _abs_tol(static_cast<T>(kAbsTol)), _rel_tol(
 				static_cast<T>(kRelTol)), _max_iter(kMaxIter), _stop_early(1), _stop_early_error_fraction(
-				1.0), _init_iter(kInitIter), _verbose(kVerbose), _adaptive_rho(
+				1.0), _init_iter(kInitIter), _verbose(kVerbose), _anderson(kAnderson), _adaptive_rho(
 				kAdaptiveRho), _equil(kEquil), _gap_stop(kGapStop), _init_x(
 				false), _init_lambda(false), _nDev(1), //FIXME - allow larger comm groups
 		_wDev(wDev)
@@ -100,7 +100,7 @@ H2O4GPU<T, M, P>::H2O4GPU(const M &A) :
 				0), _validmean(0), _trainstddev(0), _validstddev(0), _final_iter(
 				0), _abs_tol(static_cast<T>(kAbsTol)), _rel_tol(
 				static_cast<T>(kRelTol)), _max_iter(kMaxIter), _stop_early(1), _stop_early_error_fraction(
-				1.0), _init_iter(kInitIter), _verbose(kVerbose), _adaptive_rho(
+				1.0), _init_iter(kInitIter), _verbose(kVerbose), _anderson(kAnderson), _adaptive_rho(
 				kAdaptiveRho), _equil(kEquil), _gap_stop(kGapStop), _init_x(
 				false), _init_lambda(false), _nDev(1), //FIXME - allow larger comm groups
 		_wDev(_A._wDev)
@@ -209,6 +209,13 @@ int H2O4GPU<T, M, P>::_Init() {
 	return 0;
 }
 
+// The device kernels evaluate FunctionObj arrays; expand the compact form.
+template<typename T, typename M, typename P>
+H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const FunctionVector<T> &f,
+		const FunctionVector<T> &g) {
+	return Solve(f.ToObjs(), g.ToObjs());
+}
+
 template<typename T, typename M, typename P>
 H2O4GPUStatus H2O4GPU<T, M, P>::Solve(const std::vector<FunctionObj<T> > &f,
 		const std::vector<FunctionObj<T> > &g) {
@@ -929,6 +936,45 @@ int H2O4GPU<T, M, P>::Predict() {
 	return 0;
 }
 
+// Validation predictions for k solutions at once with a single GEMM.
+// x is a host column-major n x k matrix with leading dimension ldx,
+// validPreds is a host column-major mvalid x k matrix.
+template<typename T, typename M, typename P>
+int H2O4GPU<T, M, P>::PredictBatch(const T *x, size_t ldx, size_t k,
+		T *validPreds) {
+	if (!_done_init) {
+		_Init_Predict();
+	}
+	CUDACHECK(cudaSetDevice(_wDev));
+
+	size_t mvalid = _A.ValidRows();
+	size_t n = _A.Cols();
+
+	T *xbatch, *predsbatch;
+	cudaMalloc(&xbatch, n * k * sizeof(T));
+	cudaMalloc(&predsbatch, mvalid * k * sizeof(T));
+	CUDA_CHECK_ERR();
+
+	cudaMemcpy2D(xbatch, n * sizeof(T), x, ldx * sizeof(T), n * sizeof(T), k,
+			cudaMemcpyHostToDevice);
+	CUDA_CHECK_ERR();
+
+	_A.MulvalidBatch(static_cast<T>(1.), xbatch, n, k, static_cast<T>(0.),
+			predsbatch);
+	CUDA_CHECK_ERR();
+
+	// copy back to CPU
+	cudaMemcpy(validPreds, predsbatch, mvalid * k * sizeof(T),
+			cudaMemcpyDeviceToHost);
+	CUDA_CHECK_ERR();
+
+	cudaFree(xbatch);
+	cudaFree(predsbatch);
+	CUDA_CHECK_ERR();
+
+	return 0;
+}
+
 template<typename T, typename M, typename P>
 void H2O4GPU<T, M, P>::ResetX(void) {
 	if (!_done_init)
@@ -4,6 +4,7 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <vector>
 #include <assert.h>
 #include <cuda_runtime.h>
 #include <cublas_v2.h>
@@ -73,6 +74,9 @@ template <typename T>
 void MultDiag(const T *d, const T *e, size_t m, size_t n,
               typename MatrixDense<T>::Ord ord, T *data);
 
+template <typename T>
+void CopyAddIntercept(char ord, size_t m, size_t n, const T *src, T *dst);
+
 }  // namespace
 
 ////////////////////////////////////////////////////////////////////////////////
@@ -879,6 +883,42 @@ int MatrixDense<T>::Mulvalid(char trans, T alpha, const T *x, T beta, T *y) cons
   return 0;
 }
 
+// Y = alpha * Avalid * X + beta * Y for k vectors at once, X is a
+// column-major n x k matrix with leading dimension ldx and Y is a
+// column-major mvalid x k matrix, both on the device.
+template <typename T>
+int MatrixDense<T>::MulvalidBatch(T alpha, const T *x, size_t ldx, size_t k,
+                                  T beta, T *y) const {
+
+  DEBUG_EXPECT(this->_done_init);
+  if (!this->_done_init)
+    return 1;
+  CUDACHECK(cudaSetDevice(_wDev));
+
+  GpuData<T> *info = reinterpret_cast<GpuData<T>*>(this->_info);
+  cublasHandle_t hdl = info->handle;
+
+  cml::matrix<T, CblasColMajor> X =
+      cml::matrix_view_array<T, CblasColMajor>(x, this->_n, k);
+  X.tda = ldx;
+  cml::matrix<T, CblasColMajor> Y =
+      cml::matrix_view_array<T, CblasColMajor>(y, this->_mvalid, k);
+
+  if (_ord == ROW) {
+    // row-major Avalid is its column-major transpose
+    cml::matrix<T, CblasColMajor> At =
+        cml::matrix_view_array<T, CblasColMajor>(_vdata, this->_n, this->_mvalid);
+    cml::blas_gemm(hdl, CUBLAS_OP_T, CUBLAS_OP_N, alpha, &At, &X, beta, &Y);
+  } else {
+    cml::matrix<T, CblasColMajor> A =
+        cml::matrix_view_array<T, CblasColMajor>(_vdata, this->_mvalid, this->_n);
+    cml::blas_gemm(hdl, CUBLAS_OP_N, CUBLAS_OP_N, alpha, &A, &X, beta, &Y);
+  }
+  CUDA_CHECK_ERR();
+
+  return 0;
+}
+
   // col-major order (fortran) A, but still print as row major
 template <typename T>
 void printMatrix(int m, int n, const T*A, int lda, const char* name)
@@ -1925,6 +1965,24 @@ void MultDiag(const T *d, const T *e, size_t m, size_t n,
   }
 }
 
+// Copies m x (n-1) host src into m x n device dst and sets the last column
+// of dst to 1, so that callers do not have to append the intercept column.
+template <typename T>
+void CopyAddIntercept(char ord, size_t m, size_t n, const T *src, T *dst) {
+  if (ord == 'r' || ord == 'R') {
+    CUDACHECK(cudaMemcpy2D(dst, n * sizeof(T), src, (n - 1) * sizeof(T),
+                           (n - 1) * sizeof(T), m, cudaMemcpyHostToDevice));
+    std::vector<T> ones(m, static_cast<T>(1.0));
+    CUDACHECK(cudaMemcpy2D(dst + n - 1, n * sizeof(T), ones.data(), sizeof(T),
+                           sizeof(T), m, cudaMemcpyHostToDevice));
+  } else {
+    CUDACHECK(cudaMemcpy(dst, src, m * (n - 1) * sizeof(T),
+                         cudaMemcpyHostToDevice));
+    thrust::device_ptr<T> dev_ptr = thrust::device_pointer_cast(dst);
+    thrust::fill(dev_ptr + m * (n - 1), dev_ptr + m * n, static_cast<T>(1.0));
+  }
+}
+
 }  // namespace
 
 // Explicit template instantiation.
@@ -1942,7 +2000,7 @@ template class MatrixDense<float>;
   // upload data function.  Uploads to a single GPU.
   // mimics otherwise similar MatrixDense constructor, but has no destruction of uploaded data pointers
 template <typename T>
-int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, const char ord, const T *data, const T *datay, const T *vdata, const T *vdatay, const T *weight, T **_data, T **_datay, T **_vdata, T **_vdatay, T **_weight){
+int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, const char ord, int intercept, const T *data, const T *datay, const T *vdata, const T *vdatay, const T *weight, T **_data, T **_datay, T **_vdata, T **_vdatay, T **_weight){
     checkwDev(wDev);
     CUDACHECK(cudaSetDevice(wDev));
 
@@ -1959,9 +2017,11 @@ int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n, size_t mVal
     double t0 = timer<double>();
     PUSH_RANGE("MDsendsource",MDsendsource,1);
 
+    // intercept!=0: data and vdata have n-1 columns and the constant column is added while copying
     if(data){
       CUDACHECK(cudaMalloc(_data, m * n * sizeof(T))); // allocate on GPU
-      CUDACHECK(cudaMemcpy(*_data, data, m * n * sizeof(T),cudaMemcpyHostToDevice)); // copy from orig CPU data to GPU
+      if(intercept) CopyAddIntercept(ord, m, n, data, *_data);
+      else CUDACHECK(cudaMemcpy(*_data, data, m * n * sizeof(T),cudaMemcpyHostToDevice)); // copy from orig CPU data to GPU
       //      fprintf(stderr,"_data: %p\n",(void*)*_data); fflush(stderr);
     }
     else *_data=NULL;
@@ -1975,7 +2035,8 @@ int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n, size_t mVal
 
     if(vdata){
       CUDACHECK(cudaMalloc(_vdata, mValid * n * sizeof(T))); // allocate on GPU
-      CUDACHECK(cudaMemcpy(*_vdata, vdata, mValid * n * sizeof(T),cudaMemcpyHostToDevice)); // copy from orig CPU data to GPU
+      if(intercept) CopyAddIntercept(ord, mValid, n, vdata, *_vdata);
+      else CUDACHECK(cudaMemcpy(*_vdata, vdata, mValid * n * sizeof(T),cudaMemcpyHostToDevice)); // copy from orig CPU data to GPU
       //      fprintf(stderr,"_vdata: %p\n",(void*)*_vdata); fflush(stderr);
     }
     else *_vdata=NULL;
@@ -2018,10 +2079,10 @@ int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n, size_t mVal
 
   
 
-  template int makePtr_dense<double>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, const char ord,
+  template int makePtr_dense<double>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, const char ord, int intercept,
                                      const double *data, const double *datay, const double *vdata, const double *vdatay, const double *weight,
                                      double **_data, double **_datay, double **_vdata, double **_vdatay, double **_weight);
-  template int makePtr_dense<float>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, const char ord,
+  template int makePtr_dense<float>(int sharedA, int me, int wDev, size_t m, size_t n, size_t mValid, const char ord, int intercept,
                                     const float *data, const float *datay, const float *vdata, const float *vdatay, const float *weight,
                                     float **_data, float **_datay, float **_vdata, float **_vdatay, float **_weight);
 
@@ -2051,15 +2112,15 @@ int modelfree1_float(float *aptr){
 }
 
 
-    int make_ptr_double(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord,
+    int make_ptr_double(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord, int intercept,
                         const double* trainX, const double* trainY, const double* validX, const double* validY, const double *weight,
                         double**a, double**b, double**c, double**d, double **e) {
-      return h2o4gpu::makePtr_dense<double>(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, trainX, trainY, validX, validY, weight, a, b, c, d, e);
+      return h2o4gpu::makePtr_dense<double>(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, intercept, trainX, trainY, validX, validY, weight, a, b, c, d, e);
     }
-    int make_ptr_float(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord,
+    int make_ptr_float(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord, int intercept,
                        const float* trainX, const float* trainY, const float* validX, const float* validY, const float *weight,
                        float**a, float**b, float**c, float**d, float **e) {
-      return h2o4gpu::makePtr_dense<float>(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, trainX, trainY, validX, validY, weight, a, b, c, d, e);
+      return h2o4gpu::makePtr_dense<float>(sharedA, sourceme, sourceDev, mTrain, n, mValid, ord, intercept, trainX, trainY, validX, validY, weight, a, b, c, d, e);
     }
 
 
@@ -49,7 +49,7 @@ namespace pca
 			matrix::Matrix<float>XCentered(X.rows(), X.columns());
 			matrix::subtract(X, OnesXMeanTranspose, XCentered, context);
 
-			tsvd::params svd_param = {_param.X_n, _param.X_m, _param.k, _param.algorithm, _param.n_iter, _param.random_state, _param.tol, _param.verbose, _param.gpu_id, _param.whiten};
+			tsvd::params svd_param = {_param.X_n, _param.X_m, _param.k, _param.algorithm, _param.n_iter, _param.random_state, _param.tol, _param.verbose, _param.gpu_id, _param.whiten, _param.n_oversamples, _param.n_power_iter};
 
 			tsvd::truncated_svd_matrix(XCentered, _Q, _w, _U, _X_transformed, _explained_variance, _explained_variance_ratio, svd_param);
 
@@ -103,7 +103,7 @@ namespace pca
 			matrix::Matrix<double>XCentered(X.rows(), X.columns());
 			matrix::subtract(X, OnesXMeanTranspose, XCentered, context);
 
-			tsvd::params svd_param = {_param.X_n, _param.X_m, _param.k, _param.algorithm, _param.n_iter, _param.random_state, _param.tol, _param.verbose, _param.gpu_id, _param.whiten};
+			tsvd::params svd_param = {_param.X_n, _param.X_m, _param.k, _param.algorithm, _param.n_iter, _param.random_state, _param.tol, _param.verbose, _param.gpu_id, _param.whiten, _param.n_oversamples, _param.n_power_iter};
 
 			tsvd::truncated_svd_matrix(XCentered, _Q, _w, _U, _X_transformed, _explained_variance, _explained_variance_ratio, svd_param);
 
@@ -4,6 +4,8 @@
 #include <cublas_v2.h>
 
 #include <algorithm>
+#include <atomic>
+#include <cstdio>
 #include <limits>
 
 #include "cml/cml_blas.cuh"
@@ -26,8 +28,11 @@ namespace {
 template<typename T>
 struct GpuData {
   T *AA, *L, s;
+  size_t hits, factorizations;
+  double factor_time;
   cublasHandle_t handle;
-  GpuData() : AA(0), L(0), s(static_cast<T>(-1.)) {
+  GpuData() : AA(0), L(0), s(static_cast<T>(-1.)), hits(0), factorizations(0),
+      factor_time(0.) {
     cublasCreate(&handle);
     CUDA_CHECK_ERR();
   }
@@ -196,7 +201,10 @@ int ProjectorDirect<T, M>::Project(const T *x0, const T *y0, T s, T *x, T *y,
     CUDA_CHECK_ERR();
     POP_RANGE("P1(row)",P1row,2);
 
-    if (s != info->s) {
+    if (s == info->s) {
+      info->hits++;
+    } else {
+      double tfactor = timer<double>();
       PUSH_RANGE("P1r_diagonal",P1r_diagonal,2);
       cml::matrix_memcpy(&L, &AA);
       cml::vector<T> diagL = cml::matrix_diagonal(&L); // vector view of diagonal of L
@@ -211,6 +219,8 @@ int ProjectorDirect<T, M>::Project(const T *x0, const T *y0, T s, T *x, T *y,
       wrapcudaDeviceSynchronize(); // not needed as next call is cuda call that will occur sequentially on device
       CUDA_CHECK_ERR();
       POP_RANGE("P1r_cholesky_decomp",P1r_cholesky_decomp,2);
+      info->factorizations++;
+      info->factor_time += timer<double>() - tfactor;
     }
     if (_A.Rows() > _A.Cols()) {
       PUSH_RANGE("P1r_gemv(r>c)",P1r_gemvrgc,2);
@@ -257,7 +267,10 @@ int ProjectorDirect<T, M>::Project(const T *x0, const T *y0, T s, T *x, T *y,
     CUDA_CHECK_ERR();
     POP_RANGE("P1(col)",P1col,2);
 
-    if (s != info->s) {
+    if (s == info->s) {
+      info->hits++;
+    } else {
+      double tfactor = timer<double>();
       PUSH_RANGE("P1c_diagonal",P1c_diagonal,2);
       cml::matrix_memcpy(&L, &AA);
       cml::vector<T> diagL = cml::matrix_diagonal(&L);
@@ -270,6 +283,8 @@ int ProjectorDirect<T, M>::Project(const T *x0, const T *y0, T s, T *x, T *y,
       wrapcudaDeviceSynchronize();
       CUDA_CHECK_ERR();
       POP_RANGE("P1c_cholesky_decomp",P1c_cholesky_decomp,2);
+      info->factorizations++;
+      info->factor_time += timer<double>() - tfactor;
     }
     if (_A.Rows() > _A.Cols()) {
       PUSH_RANGE("P1c_gemv(r>c)",P1c_gemvrgc,2);
@@ -319,6 +334,42 @@ int ProjectorDirect<T, M>::Project(const T *x0, const T *y0, T s, T *x, T *y,
   return 0;
 }
 
+// Only the last factorization is kept on the GPU.
+template <typename T, typename M>
+void ProjectorDirect<T, M>::SetCacheBytes(size_t cache_bytes) {
+  static std::atomic<bool> warned(false);
+  if (cache_bytes != kDirectCacheBytes && !warned.exchange(true)) {
+    fprintf(stderr, "WARNING: the GPU direct projector keeps the last "
+        "factorization only, cache_bytes is ignored.\n");
+    fflush(stderr);
+  }
+}
+
+template <typename T, typename M>
+void ProjectorDirect<T, M>::SetEigen(bool eigen) {
+  static std::atomic<bool> warned(false);
+  if (eigen && !warned.exchange(true)) {
+    fprintf(stderr, "WARNING: eigen is not supported by the GPU direct "
+        "projector, it factorizes with Cholesky.\n");
+    fflush(stderr);
+  }
+}
+
+template <typename T, typename M>
+size_t ProjectorDirect<T, M>::GetCacheHits() const {
+  return reinterpret_cast<GpuData<T>*>(this->_info)->hits;
+}
+
+template <typename T, typename M>
+size_t ProjectorDirect<T, M>::GetFactorizations() const {
+  return reinterpret_cast<GpuData<T>*>(this->_info)->factorizations;
+}
+
+template <typename T, typename M>
+double ProjectorDirect<T, M>::GetFactorTime() const {
+  return reinterpret_cast<GpuData<T>*>(this->_info)->factor_time;
+}
+
 #if !defined(H2O4GPU_DOUBLE) || H2O4GPU_DOUBLE==1
 template class ProjectorDirect<double, MatrixDense<double> >;
 #endif
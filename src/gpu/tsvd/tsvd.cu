@@ -485,6 +485,71 @@ namespace tsvd
 			std::cerr << "tsvd error\n";
 		  }
 	}
+
+	/**
+	 * Project X onto fitted components, subtracting the projected mean from
+	 * each column of the result instead of centering X
+	 *
+	 * @param _X
+	 * @param _components
+	 * @param _mean
+	 * @param _X_transformed
+	 * @param _param
+	 */
+	template<typename T>
+	void transform(const T *_X, const T *_components, const T *_mean, T *_X_transformed, params _param)
+	{
+		try
+		{
+			safe_cuda(cudaSetDevice(_param.gpu_id));
+			device::DeviceContext context;
+
+			matrix::Matrix<T>X(_param.X_m, _param.X_n);
+			X.copy(_X);
+			matrix::Matrix<T>Q(_param.k, _param.X_n);
+			Q.copy(_components);
+			matrix::Matrix<T>mean(_param.X_n, 1);
+			mean.copy(_mean);
+
+			//Q * mean, the projection of the mean
+			matrix::Matrix<T>offset(_param.k, 1);
+			multiply(Q, mean, offset, context);
+
+			//X * Q^T - 1 * offset^T
+			matrix::Matrix<T>XQt(_param.X_m, _param.k);
+			multiply(X, Q, XQt, context, false, true, 1.0f);
+			auto d_xqt = XQt.data();
+			auto d_offset = offset.data();
+			auto column_size = XQt.rows();
+			auto counting = thrust::make_counting_iterator <size_t>(0);
+			thrust::for_each(counting, counting+XQt.size(), [=]__device__(size_t idx){
+				d_xqt[idx] -= d_offset[idx/column_size];
+			} );
+			XQt.copy_to_host(_X_transformed); //Send to host
+		}
+		catch (const std::exception &e)
+		  {
+			std::cerr << "tsvd error: " << e.what() << "\n";
+		  }
+		catch (std::string e)
+		  {
+			std::cerr << "tsvd error: " << e << "\n";
+		  }
+		catch (...)
+		  {
+			std::cerr << "tsvd error\n";
+		  }
+	}
+
+	void transform_float(const float *_X, const float *_components, const float *_mean, float *_X_transformed, params _param)
+	{
+		transform(_X, _components, _mean, _X_transformed, _param);
+	}
+
+	void transform_double(const double *_X, const double *_components, const double *_mean, double *_X_transformed, params _param)
+	{
+		transform(_X, _components, _mean, _X_transformed, _param);
+	}
 }
 
 //Impl for floats and doubles
@@ -4,6 +4,10 @@
 #ifndef MATRIX_MATRIX_DENSE_H_
 #define MATRIX_MATRIX_DENSE_H_
 
+#include <memory>
+#include <mutex>
+#include <vector>
+
 #include "matrix.h"
 
 namespace h2o4gpu {
@@ -27,12 +31,28 @@ class MatrixDense : public Matrix<T> {
   T *_de;
   enum Ord {COL, ROW};
 
+  // CPU, sharedA>=0: the source matrix keeps its copy of the data here and
+  // the matrices aliasing it hold a reference, the last one frees it. With
+  // sharedA>0 the data is equilibrated once and then only read, every matrix
+  // made from it with sharedA>0 points into the same buffers. The Gram matrix
+  // of the equilibrated data is built by the first projector that needs it
+  // and reused by the others.
+  struct Shared {
+    std::vector<T> data, datay, vdata, vdatay, weight, de;
+    std::vector<T> gram;
+    std::mutex gram_lock;
+  };
+  std::shared_ptr<Shared> _shared;
+
 
  private:
   // Get rid of assignment operator.
   MatrixDense<T>& operator=(const MatrixDense<T>& A);
   Ord _ord;
 
+  // Point the data pointers at _shared (CPU).
+  void Adopt();
+
  public:
   // Constructor (only sets variables)
   MatrixDense(int sharedA, int wDev, char ord, size_t m, size_t n, const T *data); // Asource_ outside parallel for examples/cpp/elastic_net.cpp
@@ -45,6 +65,7 @@ class MatrixDense : public Matrix<T> {
 
   MatrixDense(int sharedA, int me, int wDev, int datatype, char ord, size_t m, size_t n, size_t mvalid, T *data, T *datay, T *vdata, T *vdatay, T *weight); // Asource_ inside parallel for src/common/elastic_net_ptr.cpp
   MatrixDense(int wDev, int datatype, char ord, size_t m, size_t n, size_t mvalid, T *data, T *datay, T *vdata, T *vdatay, T *weight); // not used now
+  MatrixDense(int sharedA, int me, int wDev, char ord, size_t m, size_t n, size_t mvalid, std::vector<T> &&data, std::vector<T> &&datay, const T *vdata, const T *vdatay, std::vector<T> &&weight); // CPU, takes over the fold rows built by src/common/elastic_net_ptr.cpp
 
   MatrixDense(int sharedA, int me, int wDev, const MatrixDense<T>& A); // used by examples/cpp/elasticnet*.cpp inside parallel region
   MatrixDense(int me, int wDev, const MatrixDense<T>& A); // not used
@@ -65,6 +86,7 @@ class MatrixDense : public Matrix<T> {
   // Method to multiply by A and A^T.
   int Mul(char trans, T alpha, const T *x, T beta, T *y) const;
   int Mulvalid(char trans, T alpha, const T *x, T beta, T *y) const;
+  int MulvalidBatch(T alpha, const T *x, size_t ldx, size_t k, T beta, T *y) const;
 
   int GetTrainX(int datatype, size_t size, T**data) const;
   int GetTrainY(int datatype, size_t size, T**data) const;
@@ -89,8 +111,20 @@ class MatrixDense : public Matrix<T> {
   int DoPredict() const { return _dopredict; }
 };
 
+// Makes the data pointers a solver is built from. sharedA==0 (and the GPU)
+// copies every array into new buffers, sharedA!=0 on the CPU aliases the
+// inputs, except data and vdata with intercept!=0 that get the column of
+// ones appended in new buffers. Every returned pointer that differs from
+// its input is owned by the caller and released with modelFree1.
+template <typename T>
+int makePtr_dense(int sharedA, int me, int wDev, size_t m, size_t n,
+                  size_t mValid, char ord, int intercept, const T *data,
+                  const T *datay, const T *vdata, const T *vdatay,
+                  const T *weight, T **_data, T **_datay, T **_vdata,
+                  T **_vdatay, T **_weight);
 
-
+template <typename T>
+int modelFree1(T *aptr);
 
 }  // namespace h2o4gpu
 
@@ -58,6 +58,7 @@ class MatrixSparse : public Matrix<T> {
   // Method to multiply by A and A^T.
   int Mul(char trans, T alpha, const T *x, T beta, T *y) const;
   int Mulvalid(char trans, T alpha, const T *x, T beta, T *y) const;
+  int MulvalidBatch(T alpha, const T *x, size_t ldx, size_t k, T beta, T *y) const;
 
   // Getters
   const T* Data() const { return _data; }
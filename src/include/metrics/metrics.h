@@ -4,6 +4,8 @@
 
 namespace h2o4gpu {
 
+  enum CMMetric { kMcc = 0, kF05, kF1, kF2, kAcc };
+
   double mcc(double tp, double tn, double fp, double fn);
   double f05(double tp, double tn, double fp, double fn);
   double f1(double tp, double tn, double fp, double fn);
@@ -28,6 +30,15 @@ namespace h2o4gpu {
   void confusion_matrices(double *y, int n, double *yhat, int m, double *cm, int k, int j);
   void confusion_matrices(double *y, int n, double *yhat, int m, double* w, int l, double *cm, int k, int j);
 
+  // Optimal score and threshold (res is k x 2) of every metric in metrics
+  // (CMMetric values) from one sort and one sweep. Empty w means unit weights.
+  void threshold_metrics_float(float *y, int n, float *yhat, int m,
+                               float *w, int l, int *metrics, int k,
+                               double *res, int r, int c);
+  void threshold_metrics_double(double *y, int n, double *yhat, int m,
+                                double *w, int l, int *metrics, int k,
+                                double *res, int r, int c);
+
 }
 
 #endif
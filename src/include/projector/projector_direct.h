@@ -4,10 +4,16 @@
 #ifndef PROJECTOR_PROJECTOR_DIRECT_H_
 #define PROJECTOR_PROJECTOR_DIRECT_H_ 
 
+#include <cstddef>
+
 #include "projector/projector.h"
 
 namespace h2o4gpu {
 
+// Default memory budget for factorizations of A^T A + s I kept by the CPU
+// projector. At least one factorization is always kept.
+const size_t kDirectCacheBytes = static_cast<size_t>(128) << 20;
+
 // Minimizes ||Ax - y0||^2  + s ||x - x0||^2
 template <typename T, typename M>
 class ProjectorDirect : Projector<T, M> {
@@ -29,6 +35,16 @@ class ProjectorDirect : Projector<T, M> {
   int Init();
 
   int Project(const T *x0, const T *y0, T s, T *x, T *y, T tol);
+
+  // Factorization reuse. The CPU projector keeps an LRU cache of Cholesky
+  // factors keyed by s, or with eigen mode eigendecomposes A^T A once and
+  // solves every shifted system from it. The GPU projector keeps the last
+  // factor only and warns that it ignores either setting.
+  void SetCacheBytes(size_t cache_bytes);
+  void SetEigen(bool eigen);
+  size_t GetCacheHits() const;
+  size_t GetFactorizations() const;
+  double GetFactorTime() const;
 };
 
 }  // namespace h2o4gpu
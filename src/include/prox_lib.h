@@ -7,6 +7,8 @@
 #include <algorithm>
 #include <cmath>
 #include <cstdio>
+#include <cstdlib>
+#include <functional>
 #include <limits>
 #include <vector>
 
@@ -74,6 +76,215 @@ struct FunctionObj {
   }
 };
 
+// Direction of a rescaling of FunctionParam by std::multiplies or
+// std::divides.
+template <typename T>
+inline int ScaleSign(const std::multiplies<T> &) { return 1; }
+template <typename T>
+inline int ScaleSign(const std::divides<T> &) { return -1; }
+
+// Parameter of a FunctionVector: either one value shared by every element
+// (values empty) or one value per element. A rescaled shared value stays
+// shared: element i is then value multiplied `power` times by scale[i], or
+// divided -power times, and scale (not owned) must outlive the parameter.
+template <typename T>
+struct FunctionParam {
+  T value;
+  std::vector<T> values;
+  const T *scale;
+  int power;
+
+  explicit FunctionParam(T value) : value(value), scale(NULL), power(0) { }
+
+  bool Shared() const { return values.empty(); }
+  bool Scaled() const { return values.empty() && scale != NULL; }
+  T operator[](size_t i) const {
+    if (!values.empty())
+      return values[i];
+    return scale == NULL ? value : ScaledValue(i);
+  }
+
+  // The shared value rescaled for element i.
+  T ScaledValue(size_t i) const {
+    T v = value;
+    for (int k = 0; k < std::abs(power); ++k)
+      v = power > 0 ? v * scale[i] : v / scale[i];
+    return v;
+  }
+
+  void Set(T v) {
+    value = v;
+    values.clear();
+    scale = NULL;
+    power = 0;
+  }
+  // Copies one value per element, kept as a shared value if all are equal.
+  void Set(const T *v, size_t size) {
+    if (size > 0 && std::all_of(v, v + size, [&](T x) { return x == v[0]; })) {
+      Set(v[0]);
+    } else {
+      values.assign(v, v + size);
+      scale = NULL;
+      power = 0;
+    }
+  }
+
+  // p -> op(p, s[i]) applied `times` times, as when rescaling x by s, for
+  // op std::multiplies or std::divides. A shared value only records s.
+  template <typename Op>
+  void Apply(size_t size, const T *s, Op op, int times) {
+    if (values.empty()) {
+      if (value == static_cast<T>(0))
+        return;
+      if (scale == NULL) {
+        scale = s;
+        power = ScaleSign(op) * times;
+        return;
+      }
+      // already rescaled by another vector
+      values.resize(size);
+      for (size_t i = 0; i < size; ++i)
+        values[i] = ScaledValue(i);
+      scale = NULL;
+      power = 0;
+    }
+    for (size_t i = 0; i < size; ++i)
+      for (int k = 0; k < times; ++k)
+        values[i] = op(values[i], s[i]);
+  }
+};
+
+// Consecutive elements [begin, end) of a FunctionVector sharing one kind.
+struct FunctionRun {
+  size_t begin, end;
+  Function h;
+};
+
+// Struct-of-arrays counterpart of std::vector<FunctionObj<T> >. Kinds are
+// run-length encoded, so a vector of one kind stores it once, and each of
+// a, b, c, d and e is either a shared value or an array.
+template <typename T>
+struct FunctionVector {
+  FunctionParam<T> a, b, c, d, e;
+
+  explicit FunctionVector(size_t size = 0, Function h = kZero)
+      : a(1), b(0), c(1), d(0), e(0), _size(size) { SetKind(h); }
+
+  explicit FunctionVector(const std::vector<FunctionObj<T> > &f)
+      : a(1), b(0), c(1), d(0), e(0), _size(f.size()) {
+    std::vector<T> p(_size);
+    FunctionParam<T> *params[] = {&a, &b, &c, &d, &e};
+    T FunctionObj<T>::*fields[] = {&FunctionObj<T>::a, &FunctionObj<T>::b,
+        &FunctionObj<T>::c, &FunctionObj<T>::d, &FunctionObj<T>::e};
+    for (int k = 0; k < 5; ++k) {
+      for (size_t i = 0; i < _size; ++i)
+        p[i] = f[i].*fields[k];
+      params[k]->Set(p.data(), _size);
+    }
+    std::vector<Function> h(_size);
+    for (size_t i = 0; i < _size; ++i)
+      h[i] = f[i].h;
+    _Encode(h);
+  }
+
+  size_t size() const { return _size; }
+  const std::vector<FunctionRun> &Runs() const { return _runs; }
+
+  Function Kind(size_t i) const {
+    size_t lo = 0, hi = _runs.size() - 1;
+    while (lo < hi) {
+      size_t mid = (lo + hi) / 2;
+      if (_runs[mid].end <= i) lo = mid + 1; else hi = mid;
+    }
+    return _runs[lo].h;
+  }
+
+  void SetKind(Function h) {
+    _runs.clear();
+    _runs.push_back({0, _size, h});
+  }
+  void SetKind(size_t begin, size_t end, Function h) {
+    std::vector<Function> kinds = _Kinds();
+    std::fill(kinds.begin() + begin, kinds.begin() + end, h);
+    _Encode(kinds);
+  }
+  // Sets one kind per element from any enum or integer type.
+  template <typename H>
+  void SetKinds(const H *h) {
+    std::vector<Function> kinds(_size);
+    for (size_t i = 0; i < _size; ++i)
+      kinds[i] = static_cast<Function>(h[i]);
+    _Encode(kinds);
+  }
+
+  FunctionObj<T> operator[](size_t i) const {
+    return FunctionObj<T>(Kind(i), a[i], b[i], c[i], d[i], e[i]);
+  }
+
+  std::vector<FunctionObj<T> > ToObjs() const {
+    std::vector<FunctionObj<T> > f;
+    f.reserve(_size);
+    for (const FunctionRun &run : _runs)
+      for (size_t i = run.begin; i < run.end; ++i)
+        f.emplace_back(run.h, a[i], b[i], c[i], d[i], e[i]);
+    return f;
+  }
+
+  // Elements idx[0], idx[1], ... as a new vector.
+  FunctionVector Select(const std::vector<size_t> &idx) const {
+    FunctionVector f(idx.size());
+    const FunctionParam<T> *from[] = {&a, &b, &c, &d, &e};
+    FunctionParam<T> *to[] = {&f.a, &f.b, &f.c, &f.d, &f.e};
+    std::vector<T> p(idx.size());
+    for (int k = 0; k < 5; ++k) {
+      if (from[k]->Shared() && !from[k]->Scaled()) {
+        to[k]->Set(from[k]->value);
+        continue;
+      }
+      for (size_t i = 0; i < idx.size(); ++i)
+        p[i] = (*from[k])[idx[i]];
+      to[k]->Set(p.data(), idx.size());
+    }
+    std::vector<Function> kinds(idx.size());
+    for (size_t i = 0; i < idx.size(); ++i)
+      kinds[i] = Kind(idx[i]);
+    f._Encode(kinds);
+    return f;
+  }
+
+  // Rescales every element as x -> op(x, s[i]): a, d -> op(., s[i]) and
+  // e -> op(op(., s[i]), s[i]), for op std::multiplies or std::divides.
+  // Shared parameters stay shared and refer to s, which must outlive them.
+  template <typename Op>
+  void Apply(const T *s, Op op) {
+    a.Apply(_size, s, op, 1);
+    d.Apply(_size, s, op, 1);
+    e.Apply(_size, s, op, 2);
+  }
+
+ private:
+  size_t _size;
+  std::vector<FunctionRun> _runs;
+
+  std::vector<Function> _Kinds() const {
+    std::vector<Function> kinds(_size);
+    for (const FunctionRun &run : _runs)
+      std::fill(kinds.begin() + run.begin, kinds.begin() + run.end, run.h);
+    return kinds;
+  }
+  void _Encode(const std::vector<Function> &kinds) {
+    _runs.clear();
+    for (size_t i = 0; i < kinds.size(); ++i) {
+      if (_runs.empty() || _runs.back().h != kinds[i])
+        _runs.push_back({i, i + 1, kinds[i]});
+      else
+        _runs.back().end = i + 1;
+    }
+    if (_runs.empty())
+      _runs.push_back({0, 0, kZero});
+  }
+};
+
 
 // Local Functions.
 namespace {
@@ -631,6 +842,294 @@ __DEVICE__ inline T ProjSubgradEval(const FunctionObj<T> &f_obj, T v, T x) {
 }
 
 
+// Kind-specialized evaluation.
+//
+// Same as ProxEval, FuncEval and ProjSubgradEval on a FunctionObj, with the
+// kind H fixed at compile time so that loops over elements of one kind have
+// no branch on it and can be vectorized.
+template <Function H, typename T>
+__DEVICE__ inline T ProxKind(T v, T rho) {
+  switch (H) {
+    case kAbs: return ProxAbs(v, rho);
+    case kNegEntr: return ProxNegEntr(v, rho);
+    case kExp: return ProxExp(v, rho);
+    case kHuber: return ProxHuber(v, rho);
+    case kIdentity: return ProxIdentity(v, rho);
+    case kIndBox01: return ProxIndBox01(v, rho);
+    case kIndEq0: return ProxIndEq0(v, rho);
+    case kIndGe0: return ProxIndGe0(v, rho);
+    case kIndLe0: return ProxIndLe0(v, rho);
+    case kLogistic: return ProxLogistic(v, rho);
+    case kMaxNeg0: return ProxMaxNeg0(v, rho);
+    case kMaxPos0: return ProxMaxPos0(v, rho);
+    case kNegLog: return ProxNegLog(v, rho);
+    case kRecipr: return ProxRecipr(v, rho);
+    case kSquare: return ProxSquare(v, rho);
+    case kZero: default: return ProxZero(v, rho);
+  }
+}
+
+template <Function H, typename T>
+__DEVICE__ inline T ProxEvalKind(T a, T b, T c, T d, T e, T v, T rho) {
+  v = a * (v * rho - d) / (SMALL + e + rho) - b;
+  rho = (e + rho) / (SMALL + c * a * a);
+  return (ProxKind<H>(v, rho) + b) / (SMALL + a);
+}
+
+template <Function H, typename T>
+__DEVICE__ inline T FuncKind(T x) {
+  switch (H) {
+    case kAbs: return FuncAbs(x);
+    case kNegEntr: return FuncNegEntr(x);
+    case kExp: return FuncExp(x);
+    case kHuber: return FuncHuber(x);
+    case kIdentity: return FuncIdentity(x);
+    case kIndBox01: return FuncIndBox01(x);
+    case kIndEq0: return FuncIndEq0(x);
+    case kIndGe0: return FuncIndGe0(x);
+    case kIndLe0: return FuncIndLe0(x);
+    case kLogistic: return FuncLogistic(x);
+    case kMaxNeg0: return FuncMaxNeg0(x);
+    case kMaxPos0: return FuncMaxPos0(x);
+    case kNegLog: return FuncNegLog(x);
+    case kRecipr: return FuncRecpr(x);
+    case kSquare: return FuncSquare(x);
+    case kZero: default: return FuncZero(x);
+  }
+}
+
+template <Function H, typename T>
+__DEVICE__ inline T FuncEvalKind(T a, T b, T c, T d, T e, T x) {
+  return c * FuncKind<H>(a * x - b) + d * x + e * x * x / 2;
+}
+
+template <Function H, typename T>
+__DEVICE__ inline T ProjSubgradKind(T v, T axb) {
+  switch (H) {
+    case kAbs: return ProjSubgradAbs(v, axb);
+    case kNegEntr: return ProjSubgradNegEntr(v, axb);
+    case kExp: return ProjSubgradExp(v, axb);
+    case kHuber: return ProjSubgradHuber(v, axb);
+    case kIdentity: return ProjSubgradIdentity(v, axb);
+    case kIndBox01: return ProjSubgradIndBox01(v, axb);
+    case kIndEq0: return ProjSubgradIndEq0(v, axb);
+    case kIndGe0: return ProjSubgradIndGe0(v, axb);
+    case kIndLe0: return ProjSubgradIndLe0(v, axb);
+    case kLogistic: return ProjSubgradLogistic(v, axb);
+    case kMaxNeg0: return ProjSubgradMaxNeg0(v, axb);
+    case kMaxPos0: return ProjSubgradMaxPos0(v, axb);
+    case kNegLog: return ProjSubgradNegLog(v, axb);
+    case kRecipr: return ProjSubgradRecipr(v, axb);
+    case kSquare: return ProjSubgradSquare(v, axb);
+    case kZero: default: return ProjSubgradZero(v, axb);
+  }
+}
+
+template <Function H, typename T>
+__DEVICE__ inline T ProjSubgradEvalKind(T a, T b, T c, T d, T e, T v, T x) {
+  if (a == static_cast<T>(0.) || c == static_cast<T>(0.))
+    return d + e * x;
+  v = static_cast<T>(1.) / (a * c) * (v - d - e * x);
+  return a * c * ProjSubgradKind<H>(v, a * x - b) + d + e * x;
+}
+
+// Calls op.Apply<h>() with the runtime kind h as a template argument.
+template <typename Op>
+inline void DispatchKind(Function h, Op &op) {
+  switch (h) {
+    case kAbs: op.template Apply<kAbs>(); break;
+    case kNegEntr: op.template Apply<kNegEntr>(); break;
+    case kExp: op.template Apply<kExp>(); break;
+    case kHuber: op.template Apply<kHuber>(); break;
+    case kIdentity: op.template Apply<kIdentity>(); break;
+    case kIndBox01: op.template Apply<kIndBox01>(); break;
+    case kIndEq0: op.template Apply<kIndEq0>(); break;
+    case kIndGe0: op.template Apply<kIndGe0>(); break;
+    case kIndLe0: op.template Apply<kIndLe0>(); break;
+    case kLogistic: op.template Apply<kLogistic>(); break;
+    case kMaxNeg0: op.template Apply<kMaxNeg0>(); break;
+    case kMaxPos0: op.template Apply<kMaxPos0>(); break;
+    case kNegLog: op.template Apply<kNegLog>(); break;
+    case kRecipr: op.template Apply<kRecipr>(); break;
+    case kSquare: op.template Apply<kSquare>(); break;
+    case kZero: op.template Apply<kZero>(); break;
+  }
+}
+
+// Number of elements each thread evaluates at a time on a FunctionVector.
+const size_t kFunctionBlock = 256;
+
+// Parameters of a FunctionVector seen from one block as five contiguous
+// arrays: per-element parameters in place, shared ones from a block-long
+// buffer filled once per thread, or once per block if they are rescaled.
+template <typename T>
+struct FunctionBlock {
+  T shared[5][kFunctionBlock];
+  const T *p[5];
+  const FunctionParam<T> *params[5];
+
+  explicit FunctionBlock(const FunctionVector<T> &f)
+      : params{&f.a, &f.b, &f.c, &f.d, &f.e} {
+    for (int k = 0; k < 5; ++k)
+      if (params[k]->Shared() && !params[k]->Scaled())
+        std::fill(shared[k], shared[k] + kFunctionBlock, params[k]->value);
+  }
+
+  // Points p at the parameters of elements [begin, end).
+  void Seek(size_t begin, size_t end) {
+    for (int k = 0; k < 5; ++k) {
+      const FunctionParam<T> &param = *params[k];
+      if (!param.Shared()) {
+        p[k] = &param.values[begin];
+        continue;
+      }
+      if (param.Scaled())
+        for (size_t i = begin; i < end; ++i)
+          shared[k][i - begin] = param.ScaledValue(i);
+      p[k] = shared[k];
+    }
+  }
+};
+
+// Splits the runs of f into blocks of at most kFunctionBlock elements.
+template <typename T>
+std::vector<FunctionRun> FunctionBlocks(const FunctionVector<T> &f) {
+  std::vector<FunctionRun> blocks;
+  for (const FunctionRun &run : f.Runs())
+    for (size_t i = run.begin; i < run.end; i += kFunctionBlock)
+      blocks.push_back({i, std::min(i + kFunctionBlock, run.end), run.h});
+  return blocks;
+}
+
+template <typename T>
+struct ProxEvalBlock {
+  const T *const *p;
+  size_t len;
+  T rho;
+  const T *x_in;
+  T *x_out;
+
+  template <Function H>
+  void Apply() {
+    const T *a = p[0], *b = p[1], *c = p[2], *d = p[3], *e = p[4];
+#ifdef _OPENMP
+#pragma omp simd
+#endif
+    for (size_t i = 0; i < len; ++i)
+      x_out[i] = ProxEvalKind<H>(a[i], b[i], c[i], d[i], e[i], x_in[i], rho);
+  }
+};
+
+template <typename T>
+struct FuncEvalBlock {
+  const T *const *p;
+  size_t len;
+  const T *x_in;
+  T sum;
+
+  template <Function H>
+  void Apply() {
+    const T *a = p[0], *b = p[1], *c = p[2], *d = p[3], *e = p[4];
+    T s = 0;
+#ifdef _OPENMP
+#pragma omp simd reduction(+:s)
+#endif
+    for (size_t i = 0; i < len; ++i)
+      s += FuncEvalKind<H>(a[i], b[i], c[i], d[i], e[i], x_in[i]);
+    sum = s;
+  }
+};
+
+template <typename T>
+struct ProjSubgradEvalBlock {
+  const T *const *p;
+  size_t len;
+  const T *x_in;
+  const T *v_in;
+  T *v_out;
+
+  template <Function H>
+  void Apply() {
+    const T *a = p[0], *b = p[1], *c = p[2], *d = p[3], *e = p[4];
+#ifdef _OPENMP
+#pragma omp simd
+#endif
+    for (size_t i = 0; i < len; ++i)
+      v_out[i] = ProjSubgradEvalKind<H>(a[i], b[i], c[i], d[i], e[i], v_in[i],
+                                        x_in[i]);
+  }
+};
+
+// FunctionVector counterparts of the std::vector<FunctionObj<T> > versions
+// below, dispatching on the kind once per block.
+template <typename T>
+void ProxEval(const FunctionVector<T> &f_obj, T rho, const T *x_in, T *x_out) {
+  std::vector<FunctionRun> blocks = FunctionBlocks(f_obj);
+#ifdef _OPENMP
+#pragma omp parallel
+#endif
+  {
+    FunctionBlock<T> params(f_obj);
+#ifdef _OPENMP
+#pragma omp for schedule(static)
+#endif
+    for (long k = 0; k < static_cast<long>(blocks.size()); ++k) {
+      const FunctionRun &blk = blocks[k];
+      params.Seek(blk.begin, blk.end);
+      ProxEvalBlock<T> op = {params.p, blk.end - blk.begin, rho,
+                             x_in + blk.begin, x_out + blk.begin};
+      DispatchKind(blk.h, op);
+    }
+  }
+}
+
+template <typename T>
+T FuncEval(const FunctionVector<T> &f_obj, const T *x_in) {
+  std::vector<FunctionRun> blocks = FunctionBlocks(f_obj);
+  T sum = 0;
+#ifdef _OPENMP
+#pragma omp parallel reduction(+:sum)
+#endif
+  {
+    FunctionBlock<T> params(f_obj);
+#ifdef _OPENMP
+#pragma omp for schedule(static)
+#endif
+    for (long k = 0; k < static_cast<long>(blocks.size()); ++k) {
+      const FunctionRun &blk = blocks[k];
+      params.Seek(blk.begin, blk.end);
+      FuncEvalBlock<T> op = {params.p, blk.end - blk.begin, x_in + blk.begin,
+                             static_cast<T>(0)};
+      DispatchKind(blk.h, op);
+      sum += op.sum;
+    }
+  }
+  return sum;
+}
+
+template <typename T>
+void ProjSubgradEval(const FunctionVector<T> &f_obj, const T *x_in,
+                     const T *v_in, T *v_out) {
+  std::vector<FunctionRun> blocks = FunctionBlocks(f_obj);
+#ifdef _OPENMP
+#pragma omp parallel
+#endif
+  {
+    FunctionBlock<T> params(f_obj);
+#ifdef _OPENMP
+#pragma omp for schedule(static)
+#endif
+    for (long k = 0; k < static_cast<long>(blocks.size()); ++k) {
+      const FunctionRun &blk = blocks[k];
+      params.Seek(blk.begin, blk.end);
+      ProjSubgradEvalBlock<T> op = {params.p, blk.end - blk.begin,
+                                    x_in + blk.begin, v_in + blk.begin,
+                                    v_out + blk.begin};
+      DispatchKind(blk.h, op);
+    }
+  }
+}
+
 // Evaluates the proximal operator Prox{f_obj[i]}(x_in[i]) -> x_out[i].
 //
 // @param f_obj Vector of function objects.
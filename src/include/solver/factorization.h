@@ -15,38 +15,28 @@ void copy_fecatorization_result_double(double *dst, const double **src,
 int make_factorization_data_double(
     const int m, const int n, const int f, const long nnz, const long nnz_test,
     const int *csrRowIndexHostPtr, const int *csrColIndexHostPtr,
-    const double *csrValHostPtr, const int *cscRowIndexHostPtr,
-    const int *cscColIndexHostPtr, const double *cscValHostPtr,
-    const int *cooRowIndexHostPtr, const int *cooColIndexHostPtr,
-    const double *cooValHostPtr, double *thetaTHost, double *XTHost,
-    const int *cooRowIndexTestHostPtr, const int *cooColIndexTestHostPtr,
-    const double *cooValTestHostPtr,
+    const double *csrValHostPtr, double *thetaTHost, double *XTHost,
+    const int *csrRowIndexTestHostPtr, const int *csrColIndexTestHostPtr,
+    const double *csrValTestHostPtr,
 
     int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
     double **csrValDevicePtr, int **cscRowIndexDevicePtr,
-    int **cscColIndexDevicePtr, double **cscValDevicePtr,
-    int **cooRowIndexDevicePtr, int **cooColIndexDevicePtr,
-    double **cooValDevicePtr, double **thetaTDevice, double **XTDevice,
-    int **cooRowIndexTestDevicePtr, int **cooColIndexTestDevicePtr,
-    double **cooValTestDevicePtr);
+    int **cscColIndexDevicePtr, double **cscValDevicePtr, double **thetaTDevice,
+    double **XTDevice, int **csrRowIndexTestDevicePtr,
+    int **csrColIndexTestDevicePtr, double **csrValTestDevicePtr);
 
 int make_factorization_data_float(
     const int m, const int n, const int f, const long nnz, const long nnz_test,
     const int *csrRowIndexHostPtr, const int *csrColIndexHostPtr,
-    const float *csrValHostPtr, const int *cscRowIndexHostPtr,
-    const int *cscColIndexHostPtr, const float *cscValHostPtr,
-    const int *cooRowIndexHostPtr, const int *cooColIndexHostPtr,
-    const float *cooValHostPtr, float *thetaTHost, float *XTHost,
-    const int *cooRowIndexTestHostPtr, const int *cooColIndexTestHostPtr,
-    const float *cooValTestHostPtr,
+    const float *csrValHostPtr, float *thetaTHost, float *XTHost,
+    const int *csrRowIndexTestHostPtr, const int *csrColIndexTestHostPtr,
+    const float *csrValTestHostPtr,
 
     int **csrRowIndexDevicePtr, int **csrColIndexDevicePtr,
     float **csrValDevicePtr, int **cscRowIndexDevicePtr,
-    int **cscColIndexDevicePtr, float **cscValDevicePtr,
-    int **cooRowIndexDevicePtr, int **cooColIndexDevicePtr,
-    float **cooValDevicePtr, float **thetaTDevice, float **XTDevice,
-    int **cooRowIndexTestDevicePtr, int **cooColIndexTestDevicePtr,
-    float **cooValTestDevicePtr);
+    int **cscColIndexDevicePtr, float **cscValDevicePtr, float **thetaTDevice,
+    float **XTDevice, int **csrRowIndexTestDevicePtr,
+    int **csrColIndexTestDevicePtr, float **csrValTestDevicePtr);
 
 int run_factorization_step_double(
     const int m, const int n, const int f, const long nnz, const double lambda,
@@ -65,15 +55,15 @@ int run_factorization_step_float(
 float factorization_score_float(const int m, const int n, const int f,
                                 const long nnz, const float lambda,
                                 float **thetaTDevice, float **XTDevice,
-                                int **cooRowIndexDevicePtr,
-                                int **cooColIndexDevicePtr,
-                                float **cooValDevicePtr);
+                                int **csrRowIndexDevicePtr,
+                                int **csrColIndexDevicePtr,
+                                float **csrValDevicePtr);
 
 double factorization_score_double(const int m, const int n, const int f,
                                   const long nnz, const float lambda,
                                   double **thetaTDevice, double **XTDevice,
-                                  int **cooRowIndexDevicePtr,
-                                  int **cooColIndexDevicePtr,
-                                  double **cooValDevicePtr);
+                                  int **csrRowIndexDevicePtr,
+                                  int **csrColIndexDevicePtr,
+                                  double **csrValDevicePtr);
 
 #endif
\ No newline at end of file
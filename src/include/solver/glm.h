@@ -88,6 +88,7 @@ const double kRhoInit = 1.;
 const unsigned int kVerbose = 1u;   // 0...4
 const unsigned int kMaxIter = 2500u;
 const unsigned int kInitIter = 10u;
+const unsigned int kAnderson = 0u;  // Anderson memory, 0 for plain ADMM
 const bool kAdaptiveRho = true;
 const bool kEquil = true;
 const bool kGapStop = false;
@@ -131,7 +132,7 @@ private:
 
 	// Parameters.
 	T _abs_tol, _rel_tol;
-	unsigned int _max_iter, _stop_early, _init_iter, _verbose;
+	unsigned int _max_iter, _stop_early, _init_iter, _verbose, _anderson;
 	bool _adaptive_rho, _equil, _gap_stop, _init_x, _init_lambda;
 	double _stop_early_error_fraction;
 	// cuda number of devices and which device(s) to use
@@ -154,7 +155,10 @@ public:
 	// Solve for specific objective.
 	H2O4GPUStatus Solve(const std::vector<FunctionObj<T> >& f,
 			const std::vector<FunctionObj<T> >& g);
+	H2O4GPUStatus Solve(const FunctionVector<T>& f,
+			const FunctionVector<T>& g);
 	int Predict(void);
+	int PredictBatch(const T *x, size_t ldx, size_t k, T *validPreds);
 	void ResetX(void);
 
 	// Getters for solution variables and parameters.
@@ -206,6 +210,9 @@ public:
 	unsigned int GetVerbose() const {
 		return _verbose;
 	}
+	unsigned int GetAnderson() const {
+		return _anderson;
+	}
 	bool GetAdaptiveRho() const {
 		return _adaptive_rho;
 	}
@@ -224,6 +231,10 @@ public:
 	int GetwDev() const {
 		return _wDev;
 	}
+	// Projector, e.g. to configure or inspect factorization reuse.
+	P& GetProjector() {
+		return _P;
+	}
 
 	void printMe(std::ostream &os, T fa, T fb, T fc, T fd, T fe, T ga, T gb,
 			T gc, T gd, T ge) const {
@@ -242,6 +253,7 @@ public:
 		os << "stop_early_error_fraction: " << _stop_early_error_fraction << sep;
 		os << "init_iter: " << _init_iter << sep;
 		os << "verbose: " << _verbose << sep;
+		os << "anderson: " << _anderson << sep;
 		os << "adaptive_rho: " << _adaptive_rho << sep;
 		os << "equil: " << _equil << sep;
 		os << "gap_stop: " << _gap_stop << sep;
@@ -281,6 +293,11 @@ public:
 	void SetVerbose(unsigned int verbose) {
 		_verbose = verbose;
 	}
+	// Memory of the Anderson acceleration of the ADMM iterates, 0 (default)
+	// for plain over-relaxed ADMM. Only the CPU solver accelerates.
+	void SetAnderson(unsigned int anderson) {
+		_anderson = anderson;
+	}
 	void SetAdaptiveRho(bool adaptive_rho) {
 		_adaptive_rho = adaptive_rho;
 	}
@@ -19,6 +19,8 @@ typedef struct params {
   int verbose;
   int gpu_id;
   bool whiten;
+  int n_oversamples;
+  int n_power_iter;
 } params;
 
 /**
@@ -35,4 +37,17 @@ typedef struct params {
 pca_export void pca_float(const float *_X, float *_Q, float *_w, float *_U, float* _X_transformed, float *_explained_variance, float *_explained_variance_ratio, float *_mean, params _param);
 pca_export void pca_double(const double *_X, double *_Q, double *_w, double *_U, double* _X_transformed, double *_explained_variance, double *_explained_variance_ratio, double *_mean, params _param);
 
+/**
+ * PCA of a compressed sparse row matrix, centered implicitly so it is never
+ * densified (CPU only).
+ *
+ * \param 		  	_X_data			values
+ * \param 		  	_X_indices		column of each value
+ * \param 		  	_X_indptr		X_m + 1 offsets of the rows in _X_data
+ * \param 		  	_param			as for pca_float
+ */
+
+pca_export void pca_csr_float(const float *_X_data, const int *_X_indices, const int *_X_indptr, float *_Q, float *_w, float *_U, float* _X_transformed, float *_explained_variance, float *_explained_variance_ratio, float *_mean, params _param);
+pca_export void pca_csr_double(const double *_X_data, const int *_X_indices, const int *_X_indptr, double *_Q, double *_w, double *_U, double* _X_transformed, double *_explained_variance, double *_explained_variance_ratio, double *_mean, params _param);
+
 }
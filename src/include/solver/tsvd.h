@@ -31,6 +31,8 @@ typedef struct params {
   int verbose;
   int gpu_id;
   bool whiten;
+  int n_oversamples;
+  int n_power_iter;
 } params;
 
 /**
@@ -47,6 +49,34 @@ typedef struct params {
 tsvd_export void truncated_svd_float(const float *_X, float *_Q, float *_w, float *_U, float *_X_transformed, float *_explained_variance, float *_explained_variance_ratio, params _param);
 tsvd_export void truncated_svd_double(const double *_X, double *_Q, double *_w, double *_U, double *_X_transformed, double *_explained_variance, double *_explained_variance_ratio, params _param);
 
+/**
+ * Truncated SVD of a compressed sparse row matrix, which is never densified
+ * (CPU only).
+ *
+ * \param 		  	_X_data			values
+ * \param 		  	_X_indices		column of each value
+ * \param 		  	_X_indptr		X_m + 1 offsets of the rows in _X_data
+ * \param 		  	_param			as for truncated_svd_float
+ */
+
+tsvd_export void truncated_svd_csr_float(const float *_X_data, const int *_X_indices, const int *_X_indptr, float *_Q, float *_w, float *_U, float *_X_transformed, float *_explained_variance, float *_explained_variance_ratio, params _param);
+tsvd_export void truncated_svd_csr_double(const double *_X_data, const int *_X_indices, const int *_X_indptr, double *_Q, double *_w, double *_U, double *_X_transformed, double *_explained_variance, double *_explained_variance_ratio, params _param);
+
+/**
+ * Project the rows of X onto fitted components without refitting:
+ * X_transformed = (X - 1 mean^T) Q^T, where the mean is folded into a per
+ * component offset so X is never centered.
+ *
+ * \param 		  	_X				X_m x X_n data (column major)
+ * \param 		  	_components		k x X_n components (column major)
+ * \param 		  	_mean			X_n column means (zeros for truncated SVD)
+ * \param [out] 	_X_transformed	X_m x k projection (column major)
+ * \param 		  	_param			only X_m, X_n, k and gpu_id are used
+ */
+
+tsvd_export void transform_float(const float *_X, const float *_components, const float *_mean, float *_X_transformed, params _param);
+tsvd_export void transform_double(const double *_X, const double *_components, const double *_mean, double *_X_transformed, params _param);
+
 template<typename T, typename S>
 void cusolver_tsvd(matrix::Matrix<T> &X, S _Q, S _w, S _U, S _X_transformed, S _explained_variance, S _explained_variance_ratio, params _param);
 
@@ -29,23 +29,14 @@ void * H2O4GPUInit(int wDev, size_t m, size_t n, const T *A, const char ord){
     // char ord = rowmajorbit ? 'r' : 'c';
     h2o4gpu::MatrixDense<T> A_(sharedA,wDev,ord,m,n,A);
     h2o4gpu::H2O4GPUDirect<T,h2o4gpu::MatrixDense<T> > *h2o4gpu_data;    
-    std::vector<FunctionObj<T> > *f, *g;
+    FunctionVector<T> *f, *g;
     H2O4GPUWork * work;
 
 
 
     // create h2o4gpu function vectors
-    f = new std::vector<FunctionObj<T> >;
-    g = new std::vector<FunctionObj<T> >;
-
-
-    f->reserve(m);
-    for (unsigned int i = 0; i < m; ++i)
-      f->emplace_back(static_cast<Function>(kZero), static_cast<T>(1), static_cast<T>(0), static_cast<T>(1), static_cast<T>(0), static_cast<T>(0));   
- 
-    g->reserve(n);
-    for (unsigned int j = 0; j < n; ++j)
-      g->emplace_back(static_cast<Function>(kZero), static_cast<T>(1), static_cast<T>(0), static_cast<T>(1), static_cast<T>(0), static_cast<T>(0));   
+    f = new FunctionVector<T>(m);
+    g = new FunctionVector<T>(n);
 
 
     //create new h2o4gpu_data object
@@ -69,21 +60,13 @@ void * H2O4GPUInit(int wDev, size_t m, size_t n, size_t nnz, const T *nzvals, co
     // char ord = rowmajorbit ? 'r' : 'c';
     h2o4gpu::MatrixSparse<T> A_(wDev, ord, static_cast<h2o4gpu::H2O4GPU_INT>(m), static_cast<h2o4gpu::H2O4GPU_INT>(n), static_cast<h2o4gpu::H2O4GPU_INT>(nnz), nzvals, pointers, nzindices);
     h2o4gpu::H2O4GPUIndirect<T,h2o4gpu::MatrixSparse<T> > *h2o4gpu_data;    
-    std::vector<FunctionObj<T> > *f, *g;
+    FunctionVector<T> *f, *g;
     H2O4GPUWork * work;
 
 
     // create h2o4gpu function vectors
-    f = new std::vector<FunctionObj<T> >;
-    g = new std::vector<FunctionObj<T> >;
-
-    f->reserve(m);
-    for (unsigned int i = 0; i < m; ++i)
-      f->emplace_back(static_cast<Function>(kZero), static_cast<T>(1), static_cast<T>(0), static_cast<T>(1), static_cast<T>(0), static_cast<T>(0));   
- 
-    g->reserve(n);
-    for (unsigned int j = 0; j < n; ++j)
-      g->emplace_back(static_cast<Function>(kZero), static_cast<T>(1), static_cast<T>(0), static_cast<T>(1), static_cast<T>(0), static_cast<T>(0));   
+    f = new FunctionVector<T>(m);
+    g = new FunctionVector<T>(n);
 
     //create h2o4gpu_data object
     h2o4gpu_data = new h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixSparse<T> >(A_);
@@ -95,26 +78,20 @@ void * H2O4GPUInit(int wDev, size_t m, size_t n, size_t nnz, const T *nzvals, co
 
 
 template <typename T>
-void H2O4GPUFunctionUpdate(size_t m, std::vector<FunctionObj<T> > *f, const T *f_a, const T *f_b, const T *f_c, 
+void H2O4GPUFunctionUpdate(size_t m, FunctionVector<T> *f, const T *f_a, const T *f_b, const T *f_c, 
                             const T *f_d, const T *f_e, const FUNCTION *f_h){
 
-
-  for (unsigned int i = 0; i < m; ++i)
-    f->at(i).a= f_a[i];
-  for (unsigned int i = 0; i < m; ++i)
-    f->at(i).b= f_b[i];
-  for (unsigned int i = 0; i < m; ++i)
-    f->at(i).c= f_c[i];
-  for (unsigned int i = 0; i < m; ++i)
-    f->at(i).d= f_d[i];
-  for (unsigned int i = 0; i < m; ++i)
-    f->at(i).e= f_e[i];
-  for (unsigned int i = 0; i < m; ++i)
-    f->at(i).h= static_cast<Function>(f_h[i]);
+  // parameters equal on every element are kept as one shared value
+  f->a.Set(f_a, m);
+  f->b.Set(f_b, m);
+  f->c.Set(f_c, m);
+  f->d.Set(f_d, m);
+  f->e.Set(f_e, m);
+  f->SetKinds(f_h);
 }
 
 template <typename T>
-void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_data, std::vector<FunctionObj<T> > *f, std::vector<FunctionObj<T> > *g, \
+void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_data, FunctionVector<T> *f, FunctionVector<T> *g, \
               const H2O4GPUSettings<T> *settings, H2O4GPUInfo<T> *info, H2O4GPUSolution<T> *solution){
 
 
@@ -127,6 +104,10 @@ void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_dat
   h2o4gpu_data.SetAdaptiveRho(static_cast<bool>(settings->adaptive_rho));
   h2o4gpu_data.SetEquil(static_cast<bool>(settings->equil));
   h2o4gpu_data.SetGapStop(static_cast<bool>(settings->gap_stop));
+  h2o4gpu_data.SetAnderson(settings->anderson);
+  h2o4gpu_data.GetProjector().SetEigen(static_cast<bool>(settings->eigen));
+  if (settings->cache_bytes > 0)
+    h2o4gpu_data.GetProjector().SetCacheBytes(settings->cache_bytes);
   h2o4gpu_data.SetnDev(static_cast<int>(settings->nDev));
   h2o4gpu_data.SetwDev(static_cast<int>(settings->wDev));
 
@@ -147,6 +128,9 @@ void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_dat
   info->iter = h2o4gpu_data.GetFinalIter();
   info->rho = h2o4gpu_data.GetRho();
   info->solvetime = h2o4gpu_data.GetTime();
+  info->cache_hits = h2o4gpu_data.GetProjector().GetCacheHits();
+  info->factorizations = h2o4gpu_data.GetProjector().GetFactorizations();
+  info->factor_time = h2o4gpu_data.GetProjector().GetFactorTime();
 
   size_t m = f->size();
   size_t n = g->size();
@@ -159,7 +143,7 @@ void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_dat
 }
 
 template<typename T>
-void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_data, std::vector<FunctionObj<T> > *f, std::vector<FunctionObj<T> > *g, \
+void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_data, FunctionVector<T> *f, FunctionVector<T> *g, \
                 const H2O4GPUSettings<T> *settings, H2O4GPUInfo<T> *info, H2O4GPUSolution<T> *solution){
   // Set parameters.
   h2o4gpu_data.SetRho(settings->rho);
@@ -170,6 +154,7 @@ void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_da
   h2o4gpu_data.SetAdaptiveRho(static_cast<bool>(settings->adaptive_rho));
   h2o4gpu_data.SetEquil(static_cast<bool>(settings->equil));
   h2o4gpu_data.SetGapStop(static_cast<bool>(settings->gap_stop));
+  h2o4gpu_data.SetAnderson(settings->anderson);
   h2o4gpu_data.SetnDev(static_cast<int>(settings->nDev));
   h2o4gpu_data.SetwDev(static_cast<int>(settings->wDev));
 
@@ -202,7 +187,7 @@ void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_da
 }
 
 template<typename T>
-void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_data, std::vector<FunctionObj<T> > *f, std::vector<FunctionObj<T> > *g, 
+void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_data, FunctionVector<T> *f, FunctionVector<T> *g, 
               const H2O4GPUSettings<T> *settings, H2O4GPUInfo<T> *info, H2O4GPUSolution<T> *solution){
   // Set parameters.
   h2o4gpu_data.SetRho(settings->rho);
@@ -213,6 +198,7 @@ void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_d
   h2o4gpu_data.SetAdaptiveRho(static_cast<bool>(settings->adaptive_rho));
   h2o4gpu_data.SetEquil(static_cast<bool>(settings->equil));
   h2o4gpu_data.SetGapStop(static_cast<bool>(settings->gap_stop));
+  h2o4gpu_data.SetAnderson(settings->anderson);
   h2o4gpu_data.SetnDev(static_cast<int>(settings->nDev));
   h2o4gpu_data.SetwDev(static_cast<int>(settings->wDev));
 
@@ -245,7 +231,7 @@ void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_d
 }
 
 template<typename T>
-void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_data, const std::vector<FunctionObj<T> > *f, std::vector<FunctionObj<T> > *g, 
+void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_data, const FunctionVector<T> *f, FunctionVector<T> *g, 
               const H2O4GPUSettings<T> *settings, H2O4GPUInfo<T> *info, H2O4GPUSolution<T> *solution){
   // Set parameters.
   h2o4gpu_data.SetRho(settings->rho);
@@ -256,6 +242,7 @@ void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_
   h2o4gpu_data.SetAdaptiveRho(static_cast<bool>(settings->adaptive_rho));
   h2o4gpu_data.SetEquil(static_cast<bool>(settings->equil));
   h2o4gpu_data.SetGapStop(static_cast<bool>(settings->gap_stop));
+  h2o4gpu_data.SetAnderson(settings->anderson);
   h2o4gpu_data.SetnDev(static_cast<int>(settings->nDev));
   h2o4gpu_data.SetwDev(static_cast<int>(settings->wDev));
 
@@ -304,8 +291,8 @@ int H2O4GPURun(void *work, const T *f_a, const T *f_b, const T *f_c, const T *f_
 
   size_t m = p_work->m;
   size_t n = p_work->n;
-  std::vector<FunctionObj<T> > *f = static_cast<std::vector<FunctionObj<T> > *>(p_work->f);
-  std::vector<FunctionObj<T> > *g = static_cast<std::vector<FunctionObj<T> > *>(p_work->g);
+  FunctionVector<T> *f = static_cast<FunctionVector<T> *>(p_work->f);
+  FunctionVector<T> *g = static_cast<FunctionVector<T> *>(p_work->g);
 
   // Update f and g
   H2O4GPUFunctionUpdate(m, f, f_a, f_b, f_c, f_d, f_e, f_h);
@@ -331,9 +318,9 @@ template<typename T>
 void H2O4GPUShutdown(void * work){
   H2O4GPUWork * p_work = static_cast<H2O4GPUWork *>(work);
 
-  std::vector<FunctionObj<T> > *f, *g;
-  f = static_cast<std::vector<FunctionObj<T> > *>(p_work->f);
-  g = static_cast<std::vector<FunctionObj<T> > *>(p_work->g);
+  FunctionVector<T> *f, *g;
+  f = static_cast<FunctionVector<T> *>(p_work->f);
+  g = static_cast<FunctionVector<T> *>(p_work->g);
 
   delete f;
   delete g;
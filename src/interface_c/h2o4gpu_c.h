@@ -42,6 +42,11 @@
 // - int gap_stop      : Additionally use the gap as a stopping criteria.
 // - int nDev          : Choose number of cuda devices
 // - int wDev          : Choose which cuda device(s)
+// - uint anderson     : Anderson acceleration memory, plain ADMM if 0 (CPU).
+// - int eigen         : Direct projector solves from one eigendecomposition
+//                       of A^T A instead of a Cholesky factor per rho (CPU).
+// - size_t cache_bytes: Memory for the cached Cholesky factors, the default
+//                       if 0 (CPU).
 //
 // Output arguments (real_t is either double or float)
 // - real_t *x         : Array for solution vector x.
@@ -49,6 +54,9 @@
 // - real_t *nu        : Array for dual vector nu.
 // - real_t *optval    : Pointer to single real for f(y^*) + g(x^*).
 // - uint final_iter   : # of iterations at termination
+// - size_t cache_hits : Direct projections that reused a factorization
+// - size_t factorizations : Factorizations computed by the direct projector
+// - real_t factor_time : Seconds spent computing them
 //
 // Author: H2O.ai
 //
@@ -78,24 +86,24 @@ template <typename T>
 void * H2O4GPUInit(int wDev, size_t m, size_t n, size_t nnz, const T *nzvals, const int *nzindices, const int *pointers, const char ord);
 
 template <typename T>
-void H2O4GPUFunctionUpdate(size_t m, std::vector<FunctionObj<T> > *f, const T *f_a, const T *f_b, const T *f_c, 
+void H2O4GPUFunctionUpdate(size_t m, FunctionVector<T> *f, const T *f_a, const T *f_b, const T *f_c, 
                           const T *f_d, const T *f_e, const FUNCTION *f_h);
 
 template <typename T>
-void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_data, std::vector<FunctionObj<T> > *f, std::vector<FunctionObj<T> > *g, 
+void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_data, FunctionVector<T> *f, FunctionVector<T> *g, 
   const H2O4GPUSettings<T> *settings, H2O4GPUInfo<T> *info, H2O4GPUSolution<T> *solution);
 
 
 template <typename T>
-void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_data, std::vector<FunctionObj<T> > *f, std::vector<FunctionObj<T> > *g, 
+void H2O4GPURun(h2o4gpu::H2O4GPUDirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_data, FunctionVector<T> *f, FunctionVector<T> *g, 
               const H2O4GPUSettings<T> *settings, H2O4GPUInfo<T> *info, H2O4GPUSolution<T> *solution);
 
 template<typename T>
-void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_data, std::vector<FunctionObj<T> > *f, std::vector<FunctionObj<T> > *g, 
+void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixDense<T> > &h2o4gpu_data, FunctionVector<T> *f, FunctionVector<T> *g, 
               const H2O4GPUSettings<T> *settings, H2O4GPUInfo<T> *info, H2O4GPUSolution<T> *solution);
 
 template<typename T>
-void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_data, const std::vector<FunctionObj<T> > *f, std::vector<FunctionObj<T> > *g, 
+void H2O4GPURun(h2o4gpu::H2O4GPUIndirect<T, h2o4gpu::MatrixSparse<T> > &h2o4gpu_data, const FunctionVector<T> *f, FunctionVector<T> *g, 
               const H2O4GPUSettings<T> *settings, H2O4GPUInfo<T> *info, H2O4GPUSolution<T> *solution);
 
 template<typename T>
@@ -43,6 +43,9 @@ struct H2O4GPUSettings{
   unsigned int max_iters, verbose;
   int adaptive_rho, equil, gap_stop, warm_start;
   int nDev,wDev;
+  unsigned int anderson;
+  int eigen;
+  size_t cache_bytes;
 };
 
 struct H2O4GPUSettingsS{
@@ -50,6 +53,9 @@ struct H2O4GPUSettingsS{
   unsigned int max_iters, verbose;
   int adaptive_rho, equil, gap_stop, warm_start;
   int nDev,wDev;
+  unsigned int anderson;
+  int eigen;
+  size_t cache_bytes;
 };
 
 struct H2O4GPUSettingsD{
@@ -57,6 +63,9 @@ struct H2O4GPUSettingsD{
   unsigned int max_iters, verbose;
   int adaptive_rho, equil, gap_stop, warm_start;
   int nDev,wDev;
+  unsigned int anderson;
+  int eigen;
+  size_t cache_bytes;
 };
 
 template <typename T>
@@ -64,6 +73,8 @@ struct H2O4GPUInfo{
   unsigned int iter;
   int status;
   T obj, rho, solvetime;
+  size_t cache_hits, factorizations;
+  T factor_time;
 };
 
 template <typename T>
@@ -75,12 +86,16 @@ struct H2O4GPUInfoS{
     unsigned int iter;
     int status;
     float obj, rho, solvetime;
+    size_t cache_hits, factorizations;
+    float factor_time;
 };
 
 struct H2O4GPUInfoD{
     unsigned int iter;
     int status;
     double obj, rho, solvetime;
+    size_t cache_hits, factorizations;
+    double factor_time;
 };
 
 struct H2O4GPUSolutionS{
@@ -20,6 +20,7 @@ from .solvers.linear_regression import LinearRegression
 from .solvers.logistic import LogisticRegression
 from .solvers.elastic_net import ElasticNetH2O
 from .solvers.elastic_net import ElasticNet
+from .solvers.glm_dataset import GLMDataset
 from .solvers.pogs import Pogs
 from .types import FunctionVector
 
@@ -7,6 +7,7 @@
 from ..solvers.pogs import Pogs
 from ..solvers.elastic_net import ElasticNetH2O
 from ..solvers.elastic_net import ElasticNet
+from ..solvers.glm_dataset import GLMDataset
 from ..solvers.logistic import LogisticRegression
 from ..solvers.linear_regression import LinearRegression
 from ..solvers.lasso import Lasso
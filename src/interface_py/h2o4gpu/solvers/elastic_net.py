@@ -8,15 +8,18 @@ import sys
 import time
 import warnings
 
-from ctypes import c_float, c_double, cast, POINTER
 import numpy as np
 import pandas as pd
+import scipy.sparse
 from tabulate import tabulate
 from h2o4gpu.linear_model import coordinate_descent as sk
 from ..solvers.utils import _setter
 
 from ..libs.lib_utils import get_lib
-from ..solvers.utils import prepare_and_upload_data, free_sols
+from ..solvers.utils import prepare_and_upload_data, free_sols, \
+    native_array, make_fold_ids, prepare_sparse_data, prepare_gram_data, \
+    is_out_of_core, row_blocks, _to_csc, _to_np, munge
+from ..solvers.glm_dataset import GLMDataset, unpack_dataset, _fingerprint
 
 class ElasticNetH2O(object):
     """H2O Elastic Net Solver for GPUs
@@ -50,6 +53,16 @@ class ElasticNetH2O(object):
        n_folds : int,  (Default=1)
            Number of cross validation folds.
 
+       fold_assignment : string or array_like, (Default='contiguous')
+           How training rows are assigned to folds when n_folds > 1.
+           'contiguous' for blocks of consecutive rows, 'random' for
+           shuffled rows, 'stratified' for shuffled rows balanced across
+           the values of the response, or an array with the fold
+           (0 to n_folds-1) of each training row.
+
+       fold_seed : int, (Default=None)
+           Seed of the shuffling for 'random' and 'stratified' folds.
+
        n_alphas : int, (Default=5)
            Number of alphas to be used in a search.
 
@@ -65,6 +78,33 @@ class ElasticNetH2O(object):
            Stop early when there is no more relative
            improvement on train or validation.
 
+       screening : bool, (Default=False)
+           Solve each lambda of the path only on the features that pass
+           the sequential strong rule, adding back any feature that
+           violates the KKT conditions afterwards. Speeds up wide problems
+           with few active features. The number of features screened out
+           at each lambda is in screened_full and screened_best.
+
+       anderson : int, (Default=0)
+           Number of past ADMM iterates used for safeguarded Anderson
+           acceleration, with residual balancing of rho when that is
+           adaptive. 0 runs plain ADMM. 10 is a good value for
+           ill-conditioned or tight-tolerance problems. Only the CPU
+           "admm" solver uses it.
+
+       eigen : bool, (Default=False)
+           Solve the ADMM projections of every rho from one
+           eigendecomposition of the Gram matrix instead of a Cholesky
+           factorization per rho. Pays off when adaptive rho visits many
+           values. Only the CPU "admm" solver uses it.
+
+       cache_bytes : int, (Default=None)
+           Memory for the Cholesky factorizations each ADMM solver keeps, one
+           per rho, so a warm-started lambda path reuses them. At least one
+           is always kept. None for the default 128 MiB. Only the CPU "admm"
+           solver uses it. After fit, cache_hits, factorizations and
+           factor_time hold the totals of all the solvers of the fit.
+
        glm_stop_early : bool, (Default=True)
            Stop early when there is no more relative
            improvement in the primary and dual residuals for ADMM.
@@ -82,7 +122,20 @@ class ElasticNetH2O(object):
        family : string, (Default="elasticnet")
            "logistic" for classification with logistic regression.
            Defaults to "elasticnet" for regression.
-           Must be "logistic" or "elasticnet".
+           Must be "logistic" or "elasticnet".  A logistic response with
+           more than two classes is fit as one multinomial model (with
+           the "cd" solver), which has a block of coefficients per class.
+
+       solver : string, (Default="auto")
+           "admm" for the ADMM solver or "cd" for cyclic coordinate descent
+           (as in glmnet) on the CPU.  Coordinate descent warm starts along
+           the lambda path and only sweeps the active features until
+           convergence, which is usually faster for sparse solutions.
+           screening only applies to "admm".  "auto" uses "cd" for
+           scipy.sparse training data, which is kept sparse, and for
+           out-of-core elasticnet training data (np.memmap or an iterator
+           of row blocks), which is streamed once (only "cd" supports
+           either), and "admm" otherwise.
 
        store_full_path: int, (Default=0)
            Whether to store full solution for all alphas
@@ -129,15 +182,22 @@ class ElasticNetH2O(object):
                  lambda_min_ratio=1E-7,
                  n_lambdas=100,
                  n_folds=5,
+                 fold_assignment='contiguous',
+                 fold_seed=None,
                  n_alphas=5,
                  tol=1E-2,
                  tol_seek_factor=1E-1,
                  lambda_stop_early=True,
+                 screening=False,
+                 anderson=0,
+                 eigen=False,
+                 cache_bytes=None,
                  glm_stop_early=True,
                  glm_stop_early_error_fraction=1.0,
                  max_iter=5000,
                  verbose=0,
                  family='elasticnet',
+                 solver='auto',
                  store_full_path=0,
                  lambda_max=None,
                  alpha_max=1.0,
@@ -149,6 +209,8 @@ class ElasticNetH2O(object):
         assert family in ['logistic',
                           'elasticnet'], \
             "family should be 'logistic' or 'elasticnet' but got " + family
+        assert solver in ['auto', 'admm', 'cd'], \
+            "solver should be 'auto', 'admm' or 'cd' but got " + solver
 
         self.double_precision = double_precision
 
@@ -180,6 +242,8 @@ class ElasticNetH2O(object):
         self.lambda_min_ratio = lambda_min_ratio
         self.n_lambdas = n_lambdas
         self.n_folds = n_folds
+        self.fold_assignment = fold_assignment
+        self.fold_seed = fold_seed
         self.n_alphas = n_alphas
         self.uploaded_data = 0
         self.did_fit_ptr = 0
@@ -190,6 +254,13 @@ class ElasticNetH2O(object):
             self.lambda_stop_early = 1
         else:
             self.lambda_stop_early = 0
+        if screening is True:
+            self.screening = 1
+        else:
+            self.screening = 0
+        self.anderson = int(anderson)
+        self.eigen = 1 if eigen else 0
+        self.cache_bytes = 0 if cache_bytes is None else int(cache_bytes)
         if glm_stop_early is True:
             self.glm_stop_early = 1
         else:
@@ -199,6 +270,8 @@ class ElasticNetH2O(object):
         self.verbose = verbose
         self._family_str = family  # Hold string value for family
         self._family = family.split()[0][0]
+        self._solver_str = solver  # Hold string value for solver
+        self._solver = 'a' if solver == 'auto' else solver[0]
         self.store_full_path = store_full_path
         if lambda_max is None:
             self.lambda_max = -1.0  # to trigger C code to compute
@@ -214,6 +287,7 @@ class ElasticNetH2O(object):
         self.error_vs_alpha_lambda = None
         self.intercept_ = None
         self._tols2 = None
+        self._screened2 = None
         self._lambdas2 = None
         self._alphas2 = None
         self.error_vs_alpha = None
@@ -225,14 +299,30 @@ class ElasticNetH2O(object):
         self._lambdas = None
         self._alphas = None
         self._tols = None
+        self._screened = None
         self.intercept2_ = None
 
         #Experimental features
-        #TODO _shared_a and _standardize do not work currently.
-        #TODO Always need to set to 0.
+        #_shared_a=1 (CPU only) makes all n_threads model builders share
+        #one equilibrated copy of the training data and its Gram matrix.
+        #TODO _standardize does not work currently, always set to 0.
         self._shared_a = 0
         self._standardize = 0
 
+        #GLMDataset given to fit(), reused by later calls to fit()
+        self._dataset = None
+        #weights replacing those of the GLMDataset for this estimator
+        self._fit_weight = None
+
+        #training response used to stratify folds
+        self._fold_y = None
+
+        #CSC training and validation data given to fit() as scipy.sparse
+        self._sparse_data = None
+
+        #Gram statistics of out-of-core data given to fit()
+        self._gram_data = None
+
         from ..util.gpu import device_count
         (self.n_gpus, devices) = device_count(n_gpus)
         gpu_id = gpu_id % devices if devices != 0 else 0
@@ -256,6 +346,9 @@ class ElasticNetH2O(object):
         self.count_full = None
         self.count_short = None
         self.count_more = None
+        self.cache_hits = None
+        self.factorizations = None
+        self.factor_time = None
 
     #TODO Add typechecking
 
@@ -268,7 +361,18 @@ class ElasticNetH2O(object):
             free_input_data=1):
         """Train a GLM
 
-        :param ndarray train_x : Training features array
+        :param ndarray train_x : Training features array, or a GLMDataset
+            holding already uploaded data (other data arguments are then
+            ignored, except sample_weight which replaces the weights of the
+            dataset in fits of this estimator without modifying the
+            dataset), or a scipy.sparse matrix that is fit without
+            densifying it, or out-of-core data for the elasticnet family:
+            a np.memmap or an iterator of (x, y) or (x, y, weight) row
+            blocks (train_y and sample_weight are then None).  Out-of-core
+            data is read once to accumulate its Gram statistics, so memory
+            is O(n^2) plus one block of rows.  'stratified' folds are not
+            supported for it, 'random' folds deal rows to random folds and
+            'contiguous' folds of an iterator deal rows round-robin.
 
         :param ndarray train_y : Training response array
 
@@ -283,29 +387,89 @@ class ElasticNetH2O(object):
         """
 
         source_dev = 0
-        if not (train_x is None and train_y is None and valid_x is None and
-                valid_y is None and sample_weight is None):
+        if isinstance(train_x, GLMDataset):
+            if self.family == "logistic":
+                classes = train_x.classes_
+                if not np.array_equal(classes, np.arange(classes.size)):
+                    raise ValueError('GLMDataset labels must be encoded as 0 '
+                                     'to n_classes - 1 for the logistic '
+                                     'family')
+                self.classes_ = classes
+                self._set_multinomial()
+            self._dataset = train_x
+            self._fold_y = train_x.train_y
+            if sample_weight is None:
+                self._fit_weight = None
+            else:
+                self._upload_fit_weight(train_x, sample_weight)
+
+        elif not (train_x is None and train_y is None and valid_x is None and
+                  valid_y is None and sample_weight is None):
+            self._dataset = None
+            self._fit_weight = None
 
             if self.family == "logistic" and train_y is not None:
                 self.classes_ = np.unique(train_y)
                 train_y = np.searchsorted(self.classes_, train_y)
                 if valid_y is not None:
+                    unseen = np.setdiff1d(valid_y, self.classes_)
+                    if unseen.size > 0:
+                        raise ValueError('valid_y has labels not in train_y: '
+                                         '%s' % unseen)
                     valid_y = np.searchsorted(self.classes_, valid_y)
-
-            self.prepare_and_upload_data = prepare_and_upload_data(
-                self,
-                train_x=train_x,
-                train_y=train_y,
-                valid_x=valid_x,
-                valid_y=valid_y,
-                sample_weight=sample_weight,
-                source_dev=source_dev)
+                self._set_multinomial()
+            self._fold_y = train_y
+
+            self._sparse_data = None
+            self._gram_data = None
+            out_of_core = is_out_of_core(train_x)
+            if out_of_core and (self.family == 'logistic' or
+                                self._solver_str == 'admm'):
+                raise ValueError("Out-of-core data (a np.memmap or an "
+                                 "iterator of row blocks) can only be fit "
+                                 "with family='elasticnet' and solver='cd' "
+                                 "or 'auto'")
+            if out_of_core:
+                prepare_gram_data(
+                    self,
+                    train_x=train_x,
+                    train_y=train_y,
+                    valid_x=valid_x,
+                    valid_y=valid_y,
+                    sample_weight=sample_weight)
+            elif scipy.sparse.issparse(train_x):
+                if self._solver_str == 'admm':
+                    raise ValueError("solver='admm' needs dense data, use "
+                                     "solver='cd' or 'auto' for sparse data")
+                prepare_sparse_data(
+                    self,
+                    train_x=train_x,
+                    train_y=train_y,
+                    valid_x=valid_x,
+                    valid_y=valid_y,
+                    sample_weight=sample_weight)
+            else:
+                if scipy.sparse.issparse(valid_x):
+                    valid_x = valid_x.toarray()
+                self.prepare_and_upload_data = prepare_and_upload_data(
+                    self,
+                    train_x=train_x,
+                    train_y=train_y,
+                    valid_x=valid_x,
+                    valid_y=valid_y,
+                    sample_weight=sample_weight,
+                    source_dev=source_dev)
 
         else:
             #if all None, just assume fitting with new parameters
             #and all else uses self.
             pass
 
+        if self._dataset is not None:
+            self._dataset.bind(self)
+            if self._fit_weight is not None:
+                self.e = self._fit_weight[2]
+
         self.fit_ptr(
             self.m_train,
             self.n,
@@ -321,6 +485,51 @@ class ElasticNetH2O(object):
             source_dev=source_dev)
         return self
 
+    def _upload_fit_weight(self, dataset, sample_weight):
+        """Upload weights that replace those of a GLMDataset, unless the same
+        array was already uploaded for the same upload of the dataset.
+        """
+        key = (id(dataset), dataset.fingerprint, _fingerprint(sample_weight))
+        if self._fit_weight is None or self._fit_weight[0] != key:
+            # keep the arrays referenced so that their ids are not reused
+            self._fit_weight = (key, (dataset, sample_weight),
+                                dataset.upload_weight(sample_weight))
+
+    def _upload_predict_data(self, valid_x, valid_y, sample_weight):
+        """Bind a GLMDataset or upload the arrays given to predict, nothing
+        if none are given (predict on the validation data of the fit).
+        Returns the source device of the data."""
+        source_dev = 0
+        if isinstance(valid_x, GLMDataset):
+            valid_x.bind(self, predict=True)
+        elif not (valid_x is None and valid_y is None and sample_weight is None):
+            prepare_and_upload_data(
+                self,
+                train_x=None,
+                train_y=None,
+                valid_x=valid_x,
+                valid_y=valid_y,
+                sample_weight=sample_weight,
+                source_dev=source_dev)
+        return source_dev
+
+    def _predict_ptr(self, source_dev, free_input_data):
+        """Predict in the backend on the uploaded validation data."""
+        self._fitorpredict_ptr(
+            source_dev,
+            self.m_train,
+            self.n,
+            self.m_valid,
+            self.double_precision,
+            self.ord,
+            self.a,
+            self.b,
+            self.c,
+            self.d,
+            self.e,
+            do_predict=1,
+            free_input_data=free_input_data)
+
     #TODO Add typechecking
     def predict(self,
                 valid_x=None,
@@ -340,6 +549,8 @@ class ElasticNetH2O(object):
             the end of fit(). Default is 1.
         """
         res = self.predict_proba(valid_x, valid_y, sample_weight, free_input_data)
+        if self._family == 'm':
+            return self.classes_[np.argmax(res, axis=-1)]
         if self.family == "logistic":
             return self.classes_[(res >= 0.5).astype(np.int8)]
         return res
@@ -351,7 +562,12 @@ class ElasticNetH2O(object):
                       free_input_data=1):
         """Predict on a fitted GLM and get back uncalibrated probabilities for classification models
 
-        :param ndarray valid_x : Validation features
+        Multinomial models give the probability of every class, of shape
+        (n_alphas, m_valid, n_classes), from one matrix product for all the
+        alphas and classes.
+
+        :param ndarray valid_x : Validation features, or a GLMDataset whose
+            validation data (or training data if it has none) is used
 
         :param ndarray valid_y : Validation response
 
@@ -361,18 +577,14 @@ class ElasticNetH2O(object):
             the end of fit(). Default is 1.
         """
 
-        source_dev = 0
-        if not (valid_x is None and valid_y is None and sample_weight is None):
-            prepare_and_upload_data(
-                self,
-                train_x=None,
-                train_y=None,
-                valid_x=valid_x,
-                valid_y=valid_y,
-                sample_weight=sample_weight,
-                source_dev=source_dev)
-        else:
-            pass
+        if self._host_predict(valid_x):
+            if self.store_full_path == 1:
+                self.valid_pred_vs_alpha_lambdapure = \
+                    self._predict_sparse(valid_x, path=True)
+            self.valid_pred_vs_alphapure = self._predict_sparse(valid_x)
+            return self.valid_pred_vs_alphapure
+
+        source_dev = self._upload_predict_data(valid_x, valid_y, sample_weight)
 
         #save global variable
         oldstorefullpath = self.store_full_path
@@ -380,40 +592,62 @@ class ElasticNetH2O(object):
 
         if self.store_full_path == 1:
             self.store_full_path = 1
-            self._fitorpredict_ptr(
-                source_dev,
-                self.m_train,
-                self.n,
-                self.m_valid,
-                self.double_precision,
-                self.ord,
-                self.a,
-                self.b,
-                self.c,
-                self.d,
-                self.e,
-                do_predict=1,
-                free_input_data=free_input_data)
+            self._predict_ptr(source_dev, free_input_data)
 
         self.store_full_path = 0
-        self._fitorpredict_ptr(
-            source_dev,
-            self.m_train,
-            self.n,
-            self.m_valid,
-            self.double_precision,
-            self.ord,
-            self.a,
-            self.b,
-            self.c,
-            self.d,
-            self.e,
-            do_predict=1,
-            free_input_data=free_input_data)
+        self._predict_ptr(source_dev, free_input_data)
 
         #restore variable
         self.store_full_path = oldstorefullpath
         return self.valid_pred_vs_alphapure  # something like valid_y
+
+    def predict_path(self,
+                     valid_x=None,
+                     valid_y=None,
+                     sample_weight=None,
+                     free_input_data=1,
+                     dtype=None):
+        """Predict with every model of the regularization path at once.
+
+        All (lambda, alpha) solutions are stacked into one coefficient
+        matrix and scored against the validation data with a single GEMM
+        in the backend. Requires a fit with store_full_path=1.
+
+        :param ndarray valid_x : Validation features, or a GLMDataset whose
+            validation data (or training data if it has none) is used
+
+        :param ndarray valid_y : Validation response
+
+        :param ndarray weight : Observation weights
+
+        :param int free_input_data : Indicate if input data should be freed at
+            the end of fit(). Default is 1.
+
+        :param dtype : Output dtype, e.g. np.float32 to halve the memory of
+            the path predictions of a float64 fit. Default is the fit dtype.
+
+        :returns ndarray : Predictions of shape (n_lambdas, n_alphas, m_valid),
+            probabilities for logistic models, with a last axis of n_classes
+            for multinomial ones.
+        """
+        assert self.store_full_path == 1, \
+            "predict_path requires a fit with store_full_path=1."
+
+        if self._host_predict(valid_x):
+            preds = self._predict_sparse(valid_x, path=True)
+            self.valid_pred_vs_alpha_lambdapure = preds
+            if dtype is not None:
+                preds = preds.astype(dtype, copy=False)
+            return preds
+
+        source_dev = self._upload_predict_data(valid_x, valid_y, sample_weight)
+
+        self._predict_ptr(source_dev, free_input_data)
+
+        preds = self.valid_pred_vs_alpha_lambdapure
+        if dtype is not None:
+            preds = preds.astype(dtype, copy=False)
+        return preds
     #TODO Add type checking
     #source_dev here because generally want to take in any pointer,
     #not just from our test code
@@ -588,25 +822,29 @@ class ElasticNetH2O(object):
             count_full = 0
             count_short = 0
             count_more = 0
+            cache_hits = 0
+            factorizations = 0
+            factor_time = 0.0
         else:
             #restore if predict
             count_full = self.count_full
             count_short = self.count_short
             count_more = self.count_more
+            cache_hits = self.cache_hits
+            factorizations = self.factorizations
+            factor_time = self.factor_time
 
         # ############## #
         #
         if which_precision == 1:
             c_elastic_net = self.lib.elastic_net_ptr_double
             self.dtype = np.float64
-            c_type = c_double
             if self.verbose > 0:
                 print('double precision fit')
                 sys.stdout.flush()
         else:
             c_elastic_net = self.lib.elastic_net_ptr_float
             self.dtype = np.float32
-            c_type = c_float
             if self.verbose > 0:
                 print('single precision fit')
                 sys.stdout.flush()
@@ -620,56 +858,78 @@ class ElasticNetH2O(object):
             c_lambdas = (self.lambdas_list.astype(self.dtype, copy=False))
         else:
             c_lambdas = None
+        if do_predict == 0 and self._gram_data is None:
+            c_fold_ids = make_fold_ids(m_train, self.n_folds,
+                                       self.fold_assignment, self._fold_y,
+                                       self.fold_seed)
+        else:
+            c_fold_ids = None
 
         #call elastic net in C backend
+        if self._sparse_data is not None and do_predict == 0:
+            result = self._fit_sparse(c_alphas, c_lambdas, c_fold_ids)
+        elif self._gram_data is not None and do_predict == 0:
+            result = self._fit_gram(c_alphas, c_lambdas)
+        else:
+            result = c_elastic_net(
+                self._family,
+                'c' if self._family == 'm' else self._solver,
+                do_predict,
+                source_dev,
+                1,
+                self._shared_a if self.n_gpus == 0 else 0,
+                self.n_threads,
+                self._gpu_id,
+                self.n_gpus,
+                self._total_n_gpus,
+                self.ord, # 10
+                m_train,
+                n,
+                m_valid,
+                self.fit_intercept,
+                self._standardize,
+                self.lambda_max,
+                self.lambda_min_ratio,
+                self.n_lambdas,
+                self.n_folds,
+                c_fold_ids, #20
+                self.n_alphas,
+                self.alpha_min,
+                self.alpha_max,
+                c_alphas,
+                c_lambdas,
+                self.tol,
+                self.tol_seek_factor,
+                self.lambda_stop_early,
+                self.screening,
+                self.anderson,
+                self.eigen,
+                self.cache_bytes,
+                self.glm_stop_early,
+                self.glm_stop_early_error_fraction, # 30
+                self.max_iter,
+                self.verbose,
+                int(a.p) if a.p is not None else -1,
+                int(b.p) if b.p is not None else -1,
+                int(c.p) if c.p is not None else -1,
+                int(d.p) if d.p is not None else -1,
+                int(e.p) if e.p is not None else -1,
+                self.store_full_path,
+                self.x_vs_alpha_lambda,
+                self.x_vs_alpha, # 40
+                self.valid_pred_vs_alpha_lambda,
+                self.valid_pred_vs_alpha,
+                count_full,
+                count_short,
+                count_more,
+                cache_hits,
+                factorizations,
+                factor_time
+            )
         _, x_vs_alpha_lambda, x_vs_alpha, \
         valid_pred_vs_alpha_lambda, valid_pred_vs_alpha, \
-        count_full, count_short, count_more = c_elastic_net(
-            self._family,
-            do_predict,
-            source_dev,
-            1,
-            self._shared_a,
-            self.n_threads,
-            self._gpu_id,
-            self.n_gpus,
-            self._total_n_gpus,
-            self.ord, # 10
-            m_train,
-            n,
-            m_valid,
-            self.fit_intercept,
-            self._standardize,
-            self.lambda_max,
-            self.lambda_min_ratio,
-            self.n_lambdas,
-            self.n_folds,
-            self.n_alphas, #20
-            self.alpha_min,
-            self.alpha_max,
-            c_alphas,
-            c_lambdas,
-            self.tol,
-            self.tol_seek_factor,
-            self.lambda_stop_early,
-            self.glm_stop_early,
-            self.glm_stop_early_error_fraction,
-            self.max_iter, # 30
-            self.verbose,
-            int(a.p) if a.p is not None else -1,
-            int(b.p) if b.p is not None else -1,
-            int(c.p) if c.p is not None else -1,
-            int(d.p) if d.p is not None else -1,
-            int(e.p) if e.p is not None else -1,
-            self.store_full_path,
-            self.x_vs_alpha_lambda,
-            self.x_vs_alpha,
-            self.valid_pred_vs_alpha_lambda, # 40
-            self.valid_pred_vs_alpha,
-            count_full,
-            count_short,
-            count_more
-        )
+        count_full, count_short, count_more, \
+        cache_hits, factorizations, factor_time = result
         #if should or user wanted to save or free data,
         #do that now that we are done using a, b, c, d, e
         #This means have to upload_data() again before fit_ptr
@@ -683,21 +943,28 @@ class ElasticNetH2O(object):
         self.count_full = count_full
         self.count_short = count_short
         self.count_more = count_more
+        self.cache_hits = cache_hits
+        self.factorizations = factorizations
+        self.factor_time = factor_time
 
         # ####################################
         #PROCESS OUTPUT
         #save pointers
 
+        #multinomial models have a block of n coefficients per class
+        n_classes = self.classes_.size if self._family == 'm' else 1
+        n_x = n * n_classes
+
         if self.store_full_path == 1:
             num_all = int(count_full / (self.n_alphas * self.n_lambdas))
         else:
             num_all = int(count_short / self.n_alphas)
 
-        num_all_other = num_all - n
+        num_all_other = num_all - n_x
         num_error = 3  # should be consistent w/ src/common/elastic_net_ptr.cpp
         num_other = num_all_other - num_error
-        if num_other != 3:
-            print('num_other=%d but expected 3' % num_other)
+        if num_other != 4:
+            print('num_other=%d but expected 4' % num_other)
             print('count_full=%d '
                   'count_short=%d '
                   'count_more=%d '
@@ -714,67 +981,83 @@ class ElasticNetH2O(object):
             #x_vs_alpha_lambda contains solution(and other data)
             #for all lambda and alpha
 
-            self.x_vs_alpha_lambdanew = \
-                np.fromiter(cast(self.x_vs_alpha_lambda.__int__(), POINTER(c_type)),
-                            dtype=self.dtype,
-                            count=count_full)
+            self.x_vs_alpha_lambdanew = native_array(
+                self.x_vs_alpha_lambda, count_full, self.dtype, self.lib)
 
             self.x_vs_alpha_lambdanew = \
                 np.reshape(self.x_vs_alpha_lambdanew, (self.n_lambdas,
                                                        self.n_alphas, num_all))
 
             self.x_vs_alpha_lambdapure = \
-                self.x_vs_alpha_lambdanew[:, :, 0:n]
+                self.x_vs_alpha_lambdanew[:, :, 0:n_x]
+            if n_classes > 1:
+                self.x_vs_alpha_lambdapure = np.reshape(
+                    self.x_vs_alpha_lambdapure,
+                    (self.n_lambdas, self.n_alphas, n_classes, n))
 
             self.error_vs_alpha_lambda = \
-                self.x_vs_alpha_lambdanew[:, :, n:n + num_error]
+                self.x_vs_alpha_lambdanew[:, :, n_x:n_x + num_error]
 
             self._lambdas = \
-                self.x_vs_alpha_lambdanew[:, :, n + num_error:n + num_error + 1]
+                self.x_vs_alpha_lambdanew[:, :, n_x + num_error:
+                                          n_x + num_error + 1]
+
+            self._alphas = self.x_vs_alpha_lambdanew[:, :, n_x + num_error + 1:
+                                                     n_x + num_error + 2]
 
-            self._alphas = self.x_vs_alpha_lambdanew[:, :, n + num_error + 1:
-                                                     n + num_error + 2]
+            self._tols = self.x_vs_alpha_lambdanew[:, :, n_x + num_error + 2:
+                                                   n_x + num_error + 3]
 
-            self._tols = self.x_vs_alpha_lambdanew[:, :, n + num_error + 2:
-                                                   n + num_error + 3]
+            self._screened = self.x_vs_alpha_lambdanew[:, :, n_x + num_error + 3:
+                                                       n_x + num_error + 4]
 
             if self.fit_intercept == 1:
-                self.intercept_ = self.x_vs_alpha_lambdapure[:, :, -1]
+                self.intercept_ = self.x_vs_alpha_lambdapure[..., -1]
             else:
                 self.intercept_ = None
 
-        if self.store_full_path == 1 and do_predict == 1:
-            thecount = int(count_full / (n + num_all_other) * m_valid)
+        if do_predict == 1:
+            #the backend allocates both prediction buffers on every call,
+            #wrap them right away so the unused one is released as well
+            self.did_predict = 1
+            valid_pred_vs_alpha_lambdanew = native_array(
+                self.valid_pred_vs_alpha_lambda,
+                int(count_full / (n + num_all_other) * m_valid),
+                self.dtype, self.lib)
+            valid_pred_vs_alphanew = native_array(
+                self.valid_pred_vs_alpha,
+                int(count_short / (n + num_all_other) * m_valid),
+                self.dtype, self.lib)
 
+        if self.store_full_path == 1 and do_predict == 1:
             self.valid_pred_vs_alpha_lambdanew = \
-                np.fromiter(cast(self.valid_pred_vs_alpha_lambda.__int__(), POINTER(c_type)),
-                            dtype=self.dtype,
-                            count=thecount)
-            self.valid_pred_vs_alpha_lambdanew = \
-                np.reshape(self.valid_pred_vs_alpha_lambdanew,
+                np.reshape(valid_pred_vs_alpha_lambdanew,
                            (self.n_lambdas, self.n_alphas, m_valid))
             self.valid_pred_vs_alpha_lambdapure = \
                 self.valid_pred_vs_alpha_lambdanew[:, :, 0:m_valid]
 
         if do_predict == 0:  # store_full_path==0 or 1
             #x_vs_alpha contains only best of all lambda for each alpha
-            self.x_vs_alphanew = np.fromiter(
-                cast(self.x_vs_alpha.__int__(), POINTER(c_type)),
-                dtype=self.dtype,
-                count=count_short)
+            self.x_vs_alphanew = native_array(
+                self.x_vs_alpha, count_short, self.dtype, self.lib)
             self.x_vs_alphanew = np.reshape(self.x_vs_alphanew,
                                             (self.n_alphas, num_all))
-            self.x_vs_alphapure = self.x_vs_alphanew[:, 0:n]
-            self.error_vs_alpha = self.x_vs_alphanew[:, n:n + num_error]
-            self._lambdas2 = self.x_vs_alphanew[:, n + num_error:
-                                                n + num_error + 1]
-            self._alphas2 = self.x_vs_alphanew[:, n + num_error + 1:
-                                               n + num_error + 2]
-            self._tols2 = self.x_vs_alphanew[:, n + num_error + 2:
-                                             n + num_error + 3]
+            self.x_vs_alphapure = self.x_vs_alphanew[:, 0:n_x]
+            if n_classes > 1:
+                self.x_vs_alphapure = np.reshape(
+                    self.x_vs_alphapure, (self.n_alphas, n_classes, n))
+            self.error_vs_alpha = self.x_vs_alphanew[:, n_x:n_x + num_error]
+            self._lambdas2 = self.x_vs_alphanew[:, n_x + num_error:
+                                                n_x + num_error + 1]
+            self._alphas2 = self.x_vs_alphanew[:, n_x + num_error + 1:
+                                               n_x + num_error + 2]
+            self._tols2 = self.x_vs_alphanew[:, n_x + num_error + 2:
+                                             n_x + num_error + 3]
+            self._screened2 = self.x_vs_alphanew[:, n_x + num_error + 3:
+                                                 n_x + num_error + 4]
 
             if self.fit_intercept == 1:
-                self.intercept2_ = self.x_vs_alphapure[:, -1]
+                self.intercept2_ = self.x_vs_alphapure[..., -1]
             else:
                 self.intercept2_ = None
 
@@ -796,17 +1079,200 @@ class ElasticNetH2O(object):
                       ))
                 sys.stdout.flush()
             self.valid_pred_vs_alphanew = \
-                np.fromiter(cast(self.valid_pred_vs_alpha.__int__(), POINTER(c_type)),
-                            dtype=self.dtype,
-                            count=thecount)
-            self.valid_pred_vs_alphanew = \
-                np.reshape(self.valid_pred_vs_alphanew, (self.n_alphas,
-                                                         m_valid))
+                np.reshape(valid_pred_vs_alphanew, (self.n_alphas,
+                                                    m_valid))
             self.valid_pred_vs_alphapure = \
                 self.valid_pred_vs_alphanew[:, 0:m_valid]
 
         return self
 
+    def _fit_sparse(self, c_alphas, c_lambdas, c_fold_ids):
+        """Fit on the sparse data kept by fit() with coordinate descent,
+        which reads the CSC arrays in place instead of densifying them."""
+        train_x, train_y, valid_x, valid_y, weight = self._sparse_data
+        if self.double_precision == 1:
+            c_elastic_net = self.lib.elastic_net_sparse_double
+        else:
+            c_elastic_net = self.lib.elastic_net_sparse_float
+        return c_elastic_net(
+            self._family,
+            self.n_threads,
+            self._gpu_id,
+            self.n_gpus,
+            self._total_n_gpus,
+            self.m_train,
+            self.n,
+            self.m_valid,
+            self.fit_intercept,
+            self._standardize,
+            self.lambda_max,
+            self.lambda_min_ratio,
+            self.n_lambdas,
+            self.n_folds,
+            c_fold_ids,
+            self.n_alphas,
+            self.alpha_min,
+            self.alpha_max,
+            c_alphas,
+            c_lambdas,
+            self.tol,
+            self.tol_seek_factor,
+            self.lambda_stop_early,
+            self.screening,
+            self.anderson,
+            self.eigen,
+            self.cache_bytes,
+            self.glm_stop_early,
+            self.glm_stop_early_error_fraction,
+            self.max_iter,
+            self.verbose,
+            train_x.data,
+            train_x.indices,
+            train_x.indptr,
+            train_y,
+            valid_x.data if valid_x is not None else None,
+            valid_x.indices if valid_x is not None else None,
+            valid_x.indptr if valid_x is not None else None,
+            valid_y,
+            weight,
+            self.store_full_path,
+            self.x_vs_alpha_lambda,
+            self.x_vs_alpha,
+            self.valid_pred_vs_alpha_lambda,
+            self.valid_pred_vs_alpha,
+            0,
+            0,
+            0,
+            0,
+            0,
+            0.0
+        )
+
+    def _fit_gram(self, c_alphas, c_lambdas):
+        """Fit on the Gram statistics of the out-of-core data given to fit()
+        with coordinate descent, the folds already summed separately."""
+        gram, b, sums, valid_gram, valid_b, valid_sums = self._gram_data
+        if self.double_precision == 1:
+            c_elastic_net = self.lib.elastic_net_gram_double
+        else:
+            c_elastic_net = self.lib.elastic_net_gram_float
+        return c_elastic_net(
+            self._family,
+            self.n_threads,
+            self._gpu_id,
+            self.n_gpus,
+            self._total_n_gpus,
+            self.m_train,
+            self.n,
+            self.m_valid,
+            self.fit_intercept,
+            self._standardize,
+            self.lambda_max,
+            self.lambda_min_ratio,
+            self.n_lambdas,
+            self.n_folds,
+            self.n_alphas,
+            self.alpha_min,
+            self.alpha_max,
+            c_alphas,
+            c_lambdas,
+            self.tol,
+            self.tol_seek_factor,
+            self.lambda_stop_early,
+            self.screening,
+            self.anderson,
+            self.eigen,
+            self.cache_bytes,
+            self.glm_stop_early,
+            self.glm_stop_early_error_fraction,
+            self.max_iter,
+            self.verbose,
+            gram,
+            b,
+            sums,
+            valid_gram,
+            valid_b,
+            valid_sums,
+            self.store_full_path,
+            self.x_vs_alpha_lambda,
+            self.x_vs_alpha,
+            self.valid_pred_vs_alpha_lambda,
+            self.valid_pred_vs_alpha,
+            0,
+            0,
+            0,
+            0,
+            0,
+            0.0
+        )
+
+    def _set_multinomial(self):
+        """Fit a logistic response with more than two classes (classes_)
+        as one multinomial model, which only coordinate descent solves."""
+        self._family = self._family_str[0]
+        if self.classes_.size > 2:
+            if self._solver_str == 'admm':
+                raise ValueError("solver='admm' only fits two classes, use "
+                                 "solver='cd' or 'auto' for more")
+            self._family = 'm'
+
+    def _host_predict(self, valid_x):
+        """Whether predictions are made on the host from the coefficients
+        (see _predict_sparse) rather than by the backend."""
+        return self._sparse_data is not None or \
+            self._gram_data is not None or self._family == 'm' or \
+            scipy.sparse.issparse(valid_x) or is_out_of_core(valid_x)
+
+    def _predict_sparse(self, valid_x=None, path=False):
+        """Predict with the best model of each alpha, or every model of the
+        path, as one sparse (or dense) matrix product on the host, a block
+        of rows at a time for out-of-core data.
+
+        :param valid_x : scipy.sparse, dense or out-of-core features,
+            default is the validation data given to fit()
+
+        :returns ndarray : Predictions of shape (n_alphas, m_valid), or
+            (n_lambdas, n_alphas, m_valid) for the path, probabilities for
+            logistic models and of every class, on a last axis of n_classes,
+            for multinomial ones.
+        """
+        multinomial = self._family == 'm'
+        if valid_x is None:
+            valid_x = self._sparse_data[2] \
+                if self._sparse_data is not None else None
+            if valid_x is None:
+                raise ValueError('No data to predict on, pass valid_x')
+        elif is_out_of_core(valid_x):
+            row_axis = -2 if multinomial else -1
+            preds = [self._predict_sparse(np.asarray(x), path)
+                     for x, _, _ in row_blocks(valid_x)]
+            self.m_valid = sum(p.shape[row_axis] for p in preds)
+            return np.concatenate(preds, axis=row_axis)
+        elif scipy.sparse.issparse(valid_x):
+            valid_x = _to_csc(valid_x, self.fit_intercept, self.dtype)
+        else:
+            valid_x, _, _ = _to_np(valid_x, ismatrix=True, dtype=self.dtype)
+            valid_x = munge(valid_x, self.fit_intercept)
+        if valid_x.shape[1] != self.n:
+            raise ValueError('valid_x has %d columns but the model was fit '
+                             'on %d' % (valid_x.shape[1],
+                                        self.n - self.fit_intercept))
+
+        coefs = self.x_vs_alpha_lambdapure if path else self.x_vs_alphapure
+        preds = np.asarray(valid_x.dot(coefs.reshape(-1, self.n).T))
+        self.m_valid = valid_x.shape[0]
+        if multinomial:
+            preds = np.moveaxis(
+                np.reshape(preds, (self.m_valid,) + coefs.shape[:-1]), 0, -2)
+            preds = np.exp(preds - preds.max(axis=-1, keepdims=True))
+            preds /= preds.sum(axis=-1, keepdims=True)
+            return preds.astype(self.dtype, copy=False)
+        preds = preds.T
+        if self.family == 'logistic':
+            preds = 1 / (1 + np.exp(-preds))
+        return np.reshape(preds.astype(self.dtype, copy=False),
+                          coefs.shape[:-1] + (self.m_valid,))
+
     # pylint: disable=unused-argument
     def predict_ptr(self,
                     valid_xptr=None,
@@ -1065,14 +1531,18 @@ class ElasticNetH2O(object):
         #add check
         self.family = value
 
+    @property
+    def solver(self):
+        return self._solver_str
+
     @property
     def shared_a(self):
         return self._shared_a
 
     @shared_a.setter
     def shared_a(self, value):
-        #add check
-        self.__shared_a = value
+        assert value in (0, 1), 'shared_a must be 0 or 1'
+        self._shared_a = value
 
     @property
     def standardize(self):
@@ -1190,6 +1660,13 @@ class ElasticNetH2O(object):
          '''
         return self._tols
 
+    @property
+    def screened_full(self):
+        ''' Returns the number of features screened out if store_full_path=1
+           screened[which lambda][which alpha]
+         '''
+        return self._screened
+
     @property
     def error_best(self):
         return self.error_vs_alpha
@@ -1206,6 +1683,10 @@ class ElasticNetH2O(object):
     def tols_best(self):
         return self._tols2
 
+    @property
+    def screened_best(self):
+        return self._screened2
+
     #     def score(self, X=None, y=None, sample_weight=None):
     #         if X is not None and y is not None:
     #             self.prediction = self.predict(
@@ -1386,6 +1867,24 @@ class ElasticNet(object):
         Stop early when there is no more relative
         improvement on train or validation.
 
+    screening : bool, (Default=False)
+        Solve each lambda of the path only on the features that pass
+        the sequential strong rule, adding back any feature that
+        violates the KKT conditions afterwards.
+
+    anderson : int, (Default=0)
+        Number of past ADMM iterates used for safeguarded Anderson
+        acceleration. 0 runs plain ADMM. Only the CPU "admm" solver uses it.
+
+    eigen : bool, (Default=False)
+        Solve the ADMM projections of every rho from one eigendecomposition
+        of the Gram matrix instead of a Cholesky factorization per rho.
+        Only the CPU "admm" solver uses it.
+
+    cache_bytes : int, (Default=None)
+        Memory for the Cholesky factorizations each ADMM solver keeps, None
+        for the default 128 MiB. Only the CPU "admm" solver uses it.
+
     glm_stop_early : bool, (Default=True)
         Stop early when there is no more relative
         improvement in the primary and dual residuals for ADMM.
@@ -1414,6 +1913,13 @@ class ElasticNet(object):
     n_folds : int,  (Default=1)
         Number of cross validation folds.
 
+    fold_assignment : string or array_like, (Default='contiguous')
+        How training rows are assigned to folds, 'contiguous', 'random',
+        'stratified' or an array with the fold of each training row.
+
+    fold_seed : int, (Default=None)
+        Seed of the shuffling for 'random' and 'stratified' folds.
+
     n_alphas : int, (Default=5)
         Number of alphas to be used in a search.
 
@@ -1427,6 +1933,17 @@ class ElasticNet(object):
         Defaults to "elasticnet" for regression.
         Must be "logistic" or "elasticnet".
 
+    solver : string, (Default="auto")
+        "admm" for the ADMM solver or "cd" for cyclic coordinate descent
+        (as in glmnet) on the CPU.  Coordinate descent warm starts along
+        the lambda path and only sweeps the active features until
+        convergence, which is usually faster for sparse solutions.
+        screening only applies to "admm".  "auto" uses "cd" for
+        scipy.sparse training data, which is kept sparse, and for
+        out-of-core elasticnet training data (np.memmap or an iterator
+        of row blocks), which is streamed once (only "cd" supports
+        either), and "admm" otherwise.
+
     store_full_path: int, (Default=0)
         Whether to store full solution for all alphas
         and lambdas.  If 1, then during predict will compute best
@@ -1479,6 +1996,10 @@ class ElasticNet(object):
             selection='cyclic', #scikit
             n_gpus=-1,  # h2o4gpu
             lambda_stop_early=True,  # h2o4gpu
+            screening=False,  # h2o4gpu
+            anderson=0,  # h2o4gpu
+            eigen=False,  # h2o4gpu
+            cache_bytes=None,  # h2o4gpu
             glm_stop_early=True,  # h2o4gpu
             glm_stop_early_error_fraction=1.0,  #h2o4gpu
             verbose=False, #h2o4gpu
@@ -1487,9 +2008,12 @@ class ElasticNet(object):
             lambda_min_ratio=1E-7, #h2o4gpu
             n_lambdas=100, #h2o4gpu
             n_folds=5, #h2o4gpu
+            fold_assignment='contiguous', #h2o4gpu
+            fold_seed=None, #h2o4gpu
             n_alphas=5, #h2o4gpu
             tol_seek_factor=1E-1, #h2o4gpu
             family='elasticnet', #h2o4gpu
+            solver='auto', #h2o4gpu
             store_full_path=0, #h2o4gpu
             lambda_max=None, #h2o4gpu
             alpha_max=1.0, #h2o4gpu
@@ -1560,6 +2084,7 @@ class ElasticNet(object):
             gpu_id=gpu_id,
             tol_seek_factor=tol_seek_factor,
             family=family,
+            solver=solver,
             n_threads=n_threads,
             n_gpus=n_gpus,
             double_precision=double_precision,
@@ -1567,9 +2092,15 @@ class ElasticNet(object):
             lambda_min_ratio=lambda_min_ratio,
             n_lambdas=n_lambdas,
             n_folds=n_folds,
+            fold_assignment=fold_assignment,
+            fold_seed=fold_seed,
             n_alphas=n_alphas,
             tol=tol,
             lambda_stop_early=lambda_stop_early,
+            screening=screening,
+            anderson=anderson,
+            eigen=eigen,
+            cache_bytes=cache_bytes,
             glm_stop_early=glm_stop_early,
             glm_stop_early_error_fraction=glm_stop_early_error_fraction,
             max_iter=max_iter,
@@ -1592,10 +2123,14 @@ class ElasticNet(object):
             self.model = self.model_h2o4gpu
 
         self.verbose = verbose
+        self._sklearn_path_data = None
 
     def fit(self, X, y=None, check_input=True):
         if self.do_sklearn:
+            X, y, _ = unpack_dataset(X, y)
             res = self.model.fit(X, y, check_input)
+            # the path of predict_path is computed from the same data
+            self._sklearn_path_data = (X, y)
             self.set_attributes()
             return res
         res = self.model.fit(X, y)
@@ -1606,15 +2141,60 @@ class ElasticNet(object):
         return self.model.get_params()
 
     def predict(self, X):
+        if self.do_sklearn:
+            X, _, _ = unpack_dataset(X, predict=True)
         res = self.model.predict(X)
         self.set_attributes()
         return res
 
     def predict_proba(self, X):
+        if self.do_sklearn:
+            X, _, _ = unpack_dataset(X, predict=True)
         res = self.model.predict_proba(X)
         self.set_attributes()
         return res
 
+    def predict_path(self, X, dtype=None):
+        if self.do_sklearn:
+            X, _, _ = unpack_dataset(X, predict=True)
+            res = self._sklearn_predict_path(X)
+            if dtype is not None:
+                res = res.astype(dtype, copy=False)
+            return res
+        res = self.model.predict_path(X, dtype=dtype)
+        self.set_attributes()
+        return res
+
+    def _sklearn_predict_path(self, X):
+        """Predictions of every model of the enet_path of the data of the
+        sklearn fit, over n_lambdas down to lambda_min_ratio, shaped
+        (n_lambdas, 1, m) like those of the h2o4gpu backend."""
+        if self._sklearn_path_data is None:
+            raise ValueError("predict_path requires a fit first.")
+        train_x, train_y = self._sklearn_path_data
+        if scipy.sparse.issparse(train_x):
+            train_x = train_x.toarray()
+        train_x = np.asarray(train_x, dtype=np.float64)
+        train_y = np.asarray(train_y, dtype=np.float64).ravel()
+        if self.model_sklearn.fit_intercept:
+            x_mean = train_x.mean(axis=0)
+            y_mean = train_y.mean()
+        else:
+            x_mean = np.zeros(train_x.shape[1])
+            y_mean = 0.0
+        _, coefs, _ = sk.enet_path(
+            train_x - x_mean,
+            train_y - y_mean,
+            l1_ratio=self.model_sklearn.l1_ratio,
+            eps=self.model_h2o4gpu.lambda_min_ratio,
+            n_alphas=self.model_h2o4gpu.n_lambdas,
+            max_iter=self.model_sklearn.max_iter,
+            tol=self.model_sklearn.tol,
+            positive=self.model_sklearn.positive)
+        intercepts = y_mean - x_mean.dot(coefs)
+        preds = X.dot(coefs) + intercepts
+        return np.asarray(preds).T[:, None, :]
+
     def score(self, X, y, sample_weight=None):
         # TODO: add for h2o4gpu
         if self.verbose:
@@ -1648,3 +2228,9 @@ class ElasticNet(object):
         s('oself.time_upload_data = oself.model.time_upload_data')
         self.time_fitonly = None
         s('oself.time_fitonly = oself.model.time_fitonly')
+        self.cache_hits = None
+        s('oself.cache_hits = oself.model.cache_hits')
+        self.factorizations = None
+        s('oself.factorizations = oself.model.factorizations')
+        self.factor_time = None
+        s('oself.factor_time = oself.model.factor_time')
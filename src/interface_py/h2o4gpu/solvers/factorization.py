@@ -9,38 +9,101 @@ Matrix factorization solver.
 import numpy as np
 import scipy
 import scipy.sparse
+from ..solvers.glm_dataset import _fingerprint
 
 
-def _get_sparse_matrixes(X):
-    '''Create csc, csr and coo sparse matrix from any of the above
+def _sparse_fingerprint(X):
+    '''Identity of a sparse matrix and of its index and value arrays,
+    as GLMDataset fingerprints its inputs. Content is not hashed.
 
     Arguments:
-        X {array-like, csc, csr or coo sparse matrix}
+        X {coo, csc or csr sparse matrix} or None
 
     Returns:
-        csc, csr, coo
+        tuple, or None for None
     '''
 
-    X_coo = X_csc = X_csr = None
+    if X is None:
+        return None
     if scipy.sparse.isspmatrix_coo(X):
-        X_coo = X
-        X_csr = X_coo.tocsr(True)
-        X_csc = X_coo.tocsc(True)
-    elif scipy.sparse.isspmatrix_csr(X):
-        X_csr = X
-        X_csc = X_csr.tocoo(True)
-        X_coo = X_csr.tocsc(True)
-    elif scipy.sparse.isspmatrix_csc(X):
-        X_csc = X
-        X_csr = X_csc.tocsr(True)
-        X_coo = X_csc.tocoo(True)
+        arrays = (X.data, X.row, X.col)
     else:
-        assert False, "only coo, csc and csr sparse matrixes are supported"
-    return X_csc, X_csr, X_coo
+        arrays = (X.data, X.indices, X.indptr)
+    return (id(X), X.shape) + tuple(_fingerprint(a) for a in arrays)
+
+
+def _get_csr_matrix(X):
+    '''Get the csr representation of a sparse matrix, the only one
+    the factorization backend needs (the transposition is done natively)
+
+    Arguments:
+        X {csc, csr or coo sparse matrix}
+
+    Returns:
+        csr, X itself when already in csr format
+    '''
+
+    if scipy.sparse.isspmatrix_csr(X):
+        return X
+    assert scipy.sparse.isspmatrix_coo(X) or scipy.sparse.isspmatrix_csc(X), \
+        "only coo, csc and csr sparse matrixes are supported"
+    return X.tocsr()
+
+
+def _csr_arrays(X, dtype):
+    '''Index and value arrays of a csr matrix in the backend types, X's own
+    arrays when they already are contiguous int32 and dtype
+
+    Arguments:
+        X {csr sparse matrix} or None
+        dtype numpy dtype of the values
+
+    Returns:
+        indptr, indices and data, all None for None
+    '''
+
+    if X is None:
+        return None, None, None
+    return (np.ascontiguousarray(X.indptr, dtype=np.int32),
+            np.ascontiguousarray(X.indices, dtype=np.int32),
+            np.ascontiguousarray(X.data, dtype=dtype))
+
+
+def _solve_rows(X, fixed, lambda_, dtype):
+    '''One ALS half step restricted to the rows of X against frozen factors
+
+    Arguments:
+        X {csr sparse matrix}, shape (rows, fixed.shape[0])
+        fixed {array-like}, shape (fixed.shape[0], f)
+        lambda_ float
+
+    Returns:
+        factors of the rows of X, shape (rows, f), nan for rows without
+        ratings on factored columns
+    '''
+
+    f = fixed.shape[1]
+    factors = np.full((X.shape[0], f), np.nan, dtype=dtype)
+    for row in range(X.shape[0]):
+        start, stop = X.indptr[row], X.indptr[row + 1]
+        theta = fixed[X.indices[start:stop]]
+        rated = ~np.isnan(theta[:, 0])
+        if not np.any(rated):
+            continue
+        theta = theta[rated].astype(np.float64)
+        # weighted lambda regularization, as the ALS backends
+        A = np.dot(theta.T, theta) + \
+            lambda_ * theta.shape[0] * np.eye(f)
+        try:
+            factors[row] = np.linalg.solve(
+                A, np.dot(theta.T, X.data[start:stop][rated]))
+        except np.linalg.LinAlgError:
+            pass
+    return factors
 
 
 class FactorizationH2O(object):
-    '''Matrix Factorization on GPU with Alternating Least Square (ALS) algorithm.
+    '''Matrix Factorization on GPU or CPU with Alternating Least Square (ALS) algorithm.
 
     Factors a sparse rating matrix X (m by n, with N_z non-zero elements)
     into a m-by-f and a f-by-n matrices.
@@ -59,6 +122,9 @@ class FactorizationH2O(object):
         initial theta matrix
     XT {array-like} shape (m, f), default: None
         initial XT matrix
+    n_gpus int, default: -1
+        number of GPUs to use, -1 for all available. With 0 GPUs (or without
+        the GPU library) the multithreaded CPU ALS is used.
 
     Attributes
     ----------
@@ -67,6 +133,11 @@ class FactorizationH2O(object):
     thetaT {array-like} shape (n, f)
         transposed theta matrix, item's features
 
+    New users or items can be added to a fitted model with ``fold_in``. A model
+    fitted with ``resume=True`` keeps its data and factors in the backend, so the
+    next ``fit(..., resume=True)`` on the same data continues from there without
+    setting everything up again.
+
     Warnings
     --------
     Matrixes ``XT`` and ``thetaT`` may contain nan elements. This is because in some datasets,
@@ -77,9 +148,8 @@ class FactorizationH2O(object):
 
     '''
 
-    def __init__(self, f, lambda_, max_iter=100, double_precision=False, thetaT=None, XT=None):
+    def __init__(self, f, lambda_, max_iter=100, double_precision=False, thetaT=None, XT=None, n_gpus=-1):
         assert not double_precision, 'double precision is not yet supported'
-        assert f % 10 == 0, 'f has to be a multiple of 10'
         self.f = f
         self.lambda_ = lambda_
         self.double_precision = double_precision
@@ -87,14 +157,50 @@ class FactorizationH2O(object):
         self.thetaT = thetaT
         self.XT = XT
         self.max_iter = max_iter
+        self._resident = None
+        from ..util.gpu import device_count
+        (self.n_gpus, self.devices) = device_count(n_gpus)
 
     def _load_lib(self):
-        from ..libs.lib_utils import GPUlib
-
-        gpu_lib = GPUlib().get(1)
+        from ..libs.lib_utils import GPUlib, CPUlib
+
+        gpu_lib = GPUlib().get()
+        if (self.n_gpus == 0) or (gpu_lib is None) or (self.devices == 0):
+            cpu_lib = CPUlib().get(1)
+            assert cpu_lib is not None, 'H2O4GPU library not available'
+            return cpu_lib
+        assert self.f % 10 == 0, 'f has to be a multiple of 10'
         return gpu_lib
 
-    def fit(self, X, y=None, X_test=None, X_BATCHES=1, THETA_BATCHES=1, early_stopping_rounds=None, verbose=False, scores=None):
+    def __del__(self):
+        self._free_resident()
+
+    def _free_resident(self):
+        '''Release the data and factors kept in the backend by fit(resume=True).'''
+        resident = getattr(self, '_resident', None)
+        if resident is None:
+            return
+        self._resident = None
+        _, lib, free_data, pointers, _, csr_aliased = resident
+        csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr, \
+            cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr, \
+            thetaTDevice, XTDevice, csrRowIndexTestDevicePtr, \
+            csrColIndexTestDevicePtr, csrValTestDevicePtr = pointers
+        if not csr_aliased:
+            lib.free_data_int(csrRowIndexDevicePtr)
+            lib.free_data_int(csrColIndexDevicePtr)
+            free_data(csrValDevicePtr)
+            lib.free_data_int(csrRowIndexTestDevicePtr)
+            lib.free_data_int(csrColIndexTestDevicePtr)
+            free_data(csrValTestDevicePtr)
+        lib.free_data_int(cscRowIndexDevicePtr)
+        lib.free_data_int(cscColIndexDevicePtr)
+        free_data(cscValDevicePtr)
+        free_data(thetaTDevice)
+        free_data(XTDevice)
+
+    def fit(self, X, y=None, X_test=None, X_BATCHES=1, THETA_BATCHES=1, early_stopping_rounds=None, verbose=False, scores=None,
+            resume=False):
         #pylint: disable=unused-argument
         '''Learn model from rating matrix X.
 
@@ -104,7 +210,7 @@ class FactorizationH2O(object):
             Data matrix to be decomposed.
         y None
             Ignored
-        X_test {array-like, coo sparse matrix}, shape (m, n)
+        X_test {array-like, sparse matrix}, shape (m, n)
             Data matrix for cross validation.
         X_BATCHES int, default: 1
             Batches to split XT, increase this parameter in case out of memory error.
@@ -119,6 +225,13 @@ class FactorizationH2O(object):
             Prints training and validation score(if applicable) on each iteration.
         scores {list}
             List of tuples with train, cv score for every iteration.
+        resume bool, default: False
+            Keep the data and factors in the backend after this call. When the
+            previous fit also used resume=True with the same X and X_test, continue
+            from its factors without uploading anything, so each call only costs
+            its max_iter sweeps. X and X_test are the same when they are the same
+            objects with the same arrays; their content is not compared, so pass
+            resume=False after modifying them in place.
 
         Returns
         -------
@@ -126,21 +239,25 @@ class FactorizationH2O(object):
 
         '''
 
-        csc_X, csr_X, coo_X = _get_sparse_matrixes(X)
+        csr_X = _get_csr_matrix(X)
 
         if early_stopping_rounds is not None:
             assert X_test is not None, 'X_test is mandatory with early stopping'
         if X_test is not None:
-            assert scipy.sparse.isspmatrix_coo(
-                X_test), 'X_test must be a coo sparse scipy matrix'
+            assert scipy.sparse.issparse(
+                X_test), 'X_test must be a sparse scipy matrix'
             assert X.shape == X_test.shape
             assert X_test.dtype == self.dtype
+            csr_X_test = _get_csr_matrix(X_test)
+        else:
+            csr_X_test = None
 
         assert X.dtype == self.dtype
 
-        coo_X_test = X_test
-
         lib = self._load_lib()
+        from ..libs.lib_utils import CPUlib
+        # the CPU backend reads the caller's CSR arrays instead of copying them
+        csr_aliased = lib is CPUlib().get()
         if self.double_precision:
             make_data = lib.make_factorization_data_double
             run_step = lib.run_factorization_step_double
@@ -154,55 +271,101 @@ class FactorizationH2O(object):
             copy_fecatorization_result = lib.copy_fecatorization_result_float
             free_data = lib.free_data_float
 
-        m = coo_X.shape[0]
-        n = coo_X.shape[1]
-        nnz = csc_X.nnz
-        if coo_X_test is None:
+        m = csr_X.shape[0]
+        n = csr_X.shape[1]
+        nnz = csr_X.nnz
+        if csr_X_test is None:
             nnz_test = 0
         else:
-            nnz_test = coo_X_test.nnz
-
-        if self.thetaT is None:
-            self.thetaT = np.random.rand(n, self.f).astype(self.dtype)
+            nnz_test = csr_X_test.nnz
+        key = (m, n, self.f, nnz, nnz_test, _sparse_fingerprint(X),
+               _sparse_fingerprint(X_test))
+        if self._resident is not None and \
+                not (resume and self._resident[0] == key and self._resident[1] is lib):
+            self._free_resident()
+
+        if self._resident is not None:
+            csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr, \
+                cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr, \
+                thetaTDevice, XTDevice, csrRowIndexTestDevicePtr, \
+                csrColIndexTestDevicePtr, csrValTestDevicePtr = self._resident[3]
+            # the CPU backend still reads the CSR arrays it was made from,
+            # fresh conversions would free those with the old tuple
+            host_X, host_X_test = self._resident[4][2:]
+            self._resident = None
+            status = 0
         else:
-            assert self.thetaT.dtype == self.dtype
+            # passed as they are, none is converted for the call and then
+            # freed
+            host_X = _csr_arrays(csr_X, self.dtype)
+            host_X_test = _csr_arrays(csr_X_test, self.dtype)
+
+            if self.thetaT is None:
+                self.thetaT = np.random.rand(n, self.f).astype(self.dtype)
+            else:
+                assert self.thetaT.dtype == self.dtype
+
+            if self.XT is None:
+                self.XT = np.random.rand(m, self.f).astype(self.dtype)
+            else:
+                assert self.XT.dtype == self.dtype
+
+            csrRowIndexDevicePtr = None
+            csrColIndexDevicePtr = None
+            csrValDevicePtr = None
+            cscRowIndexDevicePtr = None
+            cscColIndexDevicePtr = None
+            cscValDevicePtr = None
+            thetaTDevice = None
+            XTDevice = None
+            csrRowIndexTestDevicePtr = None
+            csrColIndexTestDevicePtr = None
+            csrValTestDevicePtr = None
+
+            status, csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr, \
+                cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr, \
+                thetaTDevice, XTDevice, csrRowIndexTestDevicePtr, \
+                csrColIndexTestDevicePtr, csrValTestDevicePtr = make_data(  # pylint: disable=W0212
+                    m, n, self.f, nnz, nnz_test, host_X[0], host_X[1], host_X[2],
+                    self.thetaT, self.XT, host_X_test[0], host_X_test[1], host_X_test[2],
+                    csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr, cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr,
+                    thetaTDevice, XTDevice, csrRowIndexTestDevicePtr,
+                    csrColIndexTestDevicePtr, csrValTestDevicePtr)
+
+        pointers = (
+            csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr,
+            cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr,
+            thetaTDevice, XTDevice, csrRowIndexTestDevicePtr,
+            csrColIndexTestDevicePtr, csrValTestDevicePtr)
+        completed = False
+        try:
+            assert status == 0, 'Failure uploading the data'
+            self._run_steps(m, n, nnz, nnz_test, X_test, pointers, run_step,
+                            factorization_score, X_BATCHES, THETA_BATCHES,
+                            early_stopping_rounds, verbose, scores)
+            copy_fecatorization_result(self.XT, XTDevice, m * self.f)
+            copy_fecatorization_result(self.thetaT, thetaTDevice, n * self.f)
+            completed = True
+        finally:
+            # an interrupted fit frees the native data instead of leaking it.
+            # The inputs stay referenced with the resident data, so their ids
+            # in the key cannot be reused by other matrices meanwhile, and so
+            # do the CSR arrays the CPU backend reads.
+            self._resident = (key, lib, free_data, pointers,
+                              (X, X_test, host_X, host_X_test), csr_aliased)
+            if not (resume and completed):
+                self._free_resident()
 
-        if self.XT is None:
-            self.XT = np.random.rand(m, self.f).astype(self.dtype)
-        else:
-            assert self.XT.dtype == self.dtype
-
-        csrRowIndexDevicePtr = None
-        csrColIndexDevicePtr = None
-        csrValDevicePtr = None
-        cscRowIndexDevicePtr = None
-        cscColIndexDevicePtr = None
-        cscValDevicePtr = None
-        cooRowIndexDevicePtr = None
-        cooColIndexDevicePtr = None
-        cooValDevicePtr = None
-        thetaTDevice = None
-        XTDevice = None
-        cooRowIndexTestDevicePtr = None
-        cooColIndexTestDevicePtr = None
-        cooValTestDevicePtr = None
-
-        status, csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr, \
+        return self
+
+    def _run_steps(self, m, n, nnz, nnz_test, X_test, pointers, run_step,
+                   factorization_score, X_BATCHES, THETA_BATCHES,
+                   early_stopping_rounds, verbose, scores):
+        '''ALS sweeps of fit() on the uploaded data.'''
+        csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr, \
             cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr, \
-            cooRowIndexDevicePtr, cooColIndexDevicePtr, cooValDevicePtr, \
-            thetaTDevice, XTDevice, cooRowIndexTestDevicePtr, \
-            cooColIndexTestDevicePtr, cooValTestDevicePtr = make_data(  # pylint: disable=W0212
-                m, n, self.f, nnz, nnz_test, csr_X.indptr, csr_X.indices, csr_X.data,
-                csc_X.indices, csc_X.indptr, csc_X.data,
-                coo_X.row, coo_X.col, coo_X.data,
-                self.thetaT, self.XT, coo_X_test.row if coo_X_test is not None else None,
-                coo_X_test.col if coo_X_test is not None else None, coo_X_test.data if coo_X_test is not None else None,
-                csrRowIndexDevicePtr, csrColIndexDevicePtr, csrValDevicePtr, cscRowIndexDevicePtr, cscColIndexDevicePtr, cscValDevicePtr,
-                cooRowIndexDevicePtr, cooColIndexDevicePtr, cooValDevicePtr,
-                thetaTDevice, XTDevice, cooRowIndexTestDevicePtr,
-                cooColIndexTestDevicePtr, cooValTestDevicePtr)
-
-        assert status == 0, 'Failure uploading the data'
+            thetaTDevice, XTDevice, csrRowIndexTestDevicePtr, \
+            csrColIndexTestDevicePtr, csrValTestDevicePtr = pointers
 
         self.best_train_score = np.inf
         self.best_cv_score = np.inf
@@ -233,9 +396,9 @@ class FactorizationH2O(object):
                                              self.lambda_,
                                              thetaTDevice,
                                              XTDevice,
-                                             cooRowIndexDevicePtr,
-                                             cooColIndexDevicePtr,
-                                             cooValDevicePtr)
+                                             csrRowIndexDevicePtr,
+                                             csrColIndexDevicePtr,
+                                             csrValDevicePtr)
                 train_score = result[0]
             if X_test is not None and (verbose or early_stopping_rounds is not None or scores is not None):
                 result = factorization_score(m,
@@ -245,9 +408,9 @@ class FactorizationH2O(object):
                                              self.lambda_,
                                              thetaTDevice,
                                              XTDevice,
-                                             cooRowIndexTestDevicePtr,
-                                             cooColIndexTestDevicePtr,
-                                             cooValTestDevicePtr)
+                                             csrRowIndexTestDevicePtr,
+                                             csrColIndexTestDevicePtr,
+                                             csrValTestDevicePtr)
                 cv_score = result[0]
             if verbose:
                 print("iteration {0} train: {1} cv: {2}".format(
@@ -266,34 +429,53 @@ class FactorizationH2O(object):
                             self.best_iteration, self.best_train_score, self.best_cv_score))
                     break
 
-        lib.free_data_int(csrRowIndexDevicePtr)
-        lib.free_data_int(csrColIndexDevicePtr)
-        free_data(csrValDevicePtr)
-        lib.free_data_int(cscRowIndexDevicePtr)
-        lib.free_data_int(cscColIndexDevicePtr)
-        free_data(cscValDevicePtr)
-        lib.free_data_int(cooRowIndexDevicePtr)
-        lib.free_data_int(cooColIndexDevicePtr)
-        free_data(cooValDevicePtr)
-        lib.free_data_int(cooRowIndexTestDevicePtr)
-        lib.free_data_int(cooColIndexTestDevicePtr)
-        free_data(cooValTestDevicePtr)
+    def fold_in(self, X, items=False):
+        '''Add new users (or items) to the fitted model without retraining.
 
-        copy_fecatorization_result(self.XT, XTDevice, m * self.f)
-        copy_fecatorization_result(self.thetaT, thetaTDevice, n * self.f)
+        Solves only the new rows of XT against the frozen thetaT (or the new rows
+        of thetaT against the frozen XT), i.e. one ALS half step restricted to them.
 
-        free_data(thetaTDevice)
-        free_data(XTDevice)
+        Parameters
+        ----------
+            X {sparse matrix} shape (m_new, n), or (m, n_new) with items=True
+                Ratings of the new users on the known items, or of the known
+                users on the new items.
+            items bool, default: False
+                Fold in new items (columns of the rating matrix) instead of
+                new users (rows).
 
-        return self
+        Returns
+        -------
+            {array-like} shape (m_new, f) or (n_new, f)
+                Factors of the new users or items, also appended to XT or thetaT.
 
-    def predict(self, X):
+        '''
+
+        assert self.XT is not None and self.thetaT is not None, 'fold_in is invoked on an unfitted model'
+        assert scipy.sparse.issparse(X), 'X must be a sparse scipy matrix'
+        assert X.dtype == self.dtype
+        # the backend copies no longer match the factors
+        self._free_resident()
+        if items:
+            assert X.shape[0] == self.XT.shape[0]
+            factors = _solve_rows(_get_csr_matrix(X.T), self.XT, self.lambda_, self.dtype)
+            self.thetaT = np.concatenate([self.thetaT, factors])
+        else:
+            assert X.shape[1] == self.thetaT.shape[0]
+            factors = _solve_rows(_get_csr_matrix(X), self.thetaT, self.lambda_, self.dtype)
+            self.XT = np.concatenate([self.XT, factors])
+        return factors
+
+    def predict(self, X, batch_size=65536):
         '''Predict none zero elements of coo sparse matrix X according to the fitted model.
 
         Parameters
         ----------
             X {array-like, sparse coo matrix} shape (m, n)
                 Data matrix in coo format. Values are ignored.
+            batch_size int, default: 65536
+                Number of elements scored at once, bounds the temporaries
+                to batch_size x f.
 
         Returns
         -------
@@ -306,7 +488,65 @@ class FactorizationH2O(object):
         assert scipy.sparse.isspmatrix_coo(
             X), 'convert X to coo sparse matrix'
         assert X.dtype == self.dtype
-        a = np.take(self.XT, X.row, axis=0)
-        b = np.take(self.thetaT, X.col, axis=0)
-        val = np.sum(a * b, axis=1)
+        val = np.empty(X.nnz, dtype=self.dtype)
+        for start in range(0, X.nnz, batch_size):
+            stop = min(start + batch_size, X.nnz)
+            a = np.take(self.XT, X.row[start:stop], axis=0)
+            b = np.take(self.thetaT, X.col[start:stop], axis=0)
+            val[start:stop] = np.einsum('ij,ij->i', a, b)
         return scipy.sparse.coo_matrix((val, (X.row, X.col)), shape=X.shape)
+
+    def recommend(self, users, k=10, exclude=None, batch_size=1024):
+        '''Top k items for each of the given users according to the fitted model.
+
+        Scores are computed for batch_size users at a time, the full users by
+        items score matrix is never materialized.
+
+        Parameters
+        ----------
+            users {array-like} shape (n_users,)
+                Row indices of the users.
+            k int, default: 10
+                Number of items to recommend per user, positive, capped at n.
+            exclude {sparse matrix} shape (m, n), default: None
+                Items not to recommend, typically the training ratings
+                (already rated items). Values are ignored.
+            batch_size int, default: 1024
+                Number of users scored at once, bounds the temporaries to
+                batch_size x n.
+
+        Returns
+        -------
+            items {array-like} shape (n_users, k)
+                Recommended item indices, best first.
+            scores {array-like} shape (n_users, k)
+                Predicted values of the recommended items. Excluded items and
+                items or users without factors (nan) score -inf.
+
+        '''
+
+        assert self.XT is not None and self.thetaT is not None, 'recommend is invoked on an unfitted model'
+        if k <= 0:
+            raise ValueError('k has to be positive, got %r' % k)
+        users = np.asarray(users, dtype=np.int64).ravel()
+        n = self.thetaT.shape[0]
+        k = min(k, n)
+        if exclude is not None:
+            assert exclude.shape == (self.XT.shape[0], n)
+            exclude = _get_csr_matrix(exclude)
+
+        items = np.empty((users.size, k), dtype=np.int64)
+        scores = np.empty((users.size, k), dtype=self.dtype)
+        for start in range(0, users.size, batch_size):
+            block = users[start:start + batch_size]
+            score = np.dot(self.XT[block], self.thetaT.T)
+            score[np.isnan(score)] = -np.inf
+            if exclude is not None:
+                rows, cols = exclude[block].nonzero()
+                score[rows, cols] = -np.inf
+            top = np.argpartition(-score, k - 1, axis=1)[:, :k]
+            top_score = np.take_along_axis(score, top, axis=1)
+            order = np.argsort(-top_score, axis=1, kind='stable')
+            items[start:start + block.size] = np.take_along_axis(top, order, axis=1)
+            scores[start:start + block.size] = np.take_along_axis(top_score, order, axis=1)
+        return items, scores
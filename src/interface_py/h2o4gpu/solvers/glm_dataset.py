@@ -0,0 +1,261 @@
+#- * - encoding : utf - 8 - * -
+"""
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+
+from ..libs.lib_utils import get_lib
+from ..solvers.utils import prepare_and_upload_data, WrappedPointer
+
+
+def _fingerprint(data):
+    """Identity of an input array: the object itself, where its memory
+    lives and how it is laid out. Content is not hashed, in-place
+    modifications have to be signalled with GLMDataset.update(force=True).
+    """
+    if data is None:
+        return None
+    interface = getattr(data, '__array_interface__', None)
+    if interface is None:
+        return (id(data),)
+    return (id(data), interface['data'][0], interface['shape'],
+            interface['typestr'], interface.get('strides'))
+
+
+class GLMDataset(object):
+    """Training and validation data uploaded once through the backend
+    library and shared by any number of GLM fits and predictions.
+
+    Passing a GLMDataset instead of arrays to ``fit``/``predict`` of
+    ElasticNetH2O (and Ridge, Lasso, LinearRegression, LogisticRegression,
+    ElasticNet) skips conversion, intercept munging, checks and the upload
+    of the data. Refitting after ``set_params`` reuses it as well.
+
+    Parameters
+    ----------
+    train_x : array_like
+        Training features.
+
+    train_y : array_like
+        Training response. For the logistic family the labels must already
+        be encoded as 0 and 1.
+
+    valid_x : array_like, optional
+        Validation features, used by ``predict`` when given.
+
+    valid_y : array_like, optional
+        Validation response.
+
+    sample_weight : array_like, optional
+        Observation weights.
+
+    fit_intercept : bool, (Default=True)
+        Must match the ``fit_intercept`` of the estimators using this
+        dataset, as the intercept column is appended during upload.
+
+    n_gpus : int, (Default=-1)
+        Number of GPUs, selects the same backend library as the estimators.
+
+    order : 'r' or 'c', optional
+        Row or column major order, deduced from the data if None.
+
+    verbose : int, (Default=0)
+        Print verbose information to the console if set to > 0.
+    """
+
+    def __init__(self,
+                 train_x=None,
+                 train_y=None,
+                 valid_x=None,
+                 valid_y=None,
+                 sample_weight=None,
+                 fit_intercept=True,
+                 n_gpus=-1,
+                 order=None,
+                 verbose=0):
+        if train_x is None and valid_x is None:
+            raise ValueError('GLMDataset needs train_x or valid_x')
+
+        from ..util.gpu import device_count
+        (n_gpus, devices) = device_count(n_gpus)
+        self.lib = get_lib(n_gpus, devices)
+
+        self.fit_intercept = 1 if fit_intercept else 0
+        self.verbose = verbose
+        self.ord = order
+        self.dtype = None
+        self.double_precision = None
+        self.source_me = 0
+        self.source_dev = 0
+
+        self.train_x = None
+        self.train_y = None
+        self.valid_x = None
+        self.valid_y = None
+        self.sample_weight = None
+        self.version = 0
+        self._fingerprints = None
+        self._classes = None
+        self.released = False
+
+        self.update(train_x, train_y, valid_x, valid_y, sample_weight,
+                    force=True)
+
+    @property
+    def fingerprint(self):
+        """Identity of the uploaded inputs and the upload version"""
+        return self._fingerprints, self.version
+
+    @property
+    def classes_(self):
+        """Sorted unique training labels"""
+        if self._classes is None and self.train_y is not None:
+            self._classes = np.unique(self.train_y)
+        return self._classes
+
+    def update(self,
+               train_x=None,
+               train_y=None,
+               valid_x=None,
+               valid_y=None,
+               sample_weight=None,
+               force=False):
+        """Replace some of the inputs and upload the data again.
+
+        Inputs left as None are kept. Nothing is uploaded if all inputs are
+        the same arrays as before, unless ``force`` is set, which is needed
+        after modifying an input array in place.
+
+        :return: self
+        """
+        args = [train_x, train_y, valid_x, valid_y, sample_weight]
+        current = [self.train_x, self.train_y, self.valid_x, self.valid_y,
+                   self.sample_weight]
+        inputs = [new if new is not None else old
+                  for new, old in zip(args, current)]
+        fingerprints = tuple(_fingerprint(data) for data in inputs)
+
+        if not force and not self.released and \
+                fingerprints == self._fingerprints:
+            return self
+
+        (self.train_x, self.train_y, self.valid_x, self.valid_y,
+         self.sample_weight) = inputs
+        prepare_and_upload_data(
+            self,
+            train_x=self.train_x,
+            train_y=self.train_y,
+            valid_x=self.valid_x,
+            valid_y=self.valid_y,
+            sample_weight=self.sample_weight,
+            source_dev=self.source_dev)
+        self._fingerprints = fingerprints
+        self._classes = None
+        self.released = False
+        self.version += 1
+        return self
+
+    def release(self):
+        """Free the uploaded data now instead of when garbage collected.
+
+        Estimators fitted on this dataset need new data (or a call to
+        ``update(force=True)``) before they can fit or predict again.
+        """
+        if self.released:
+            return
+        for ptr in (self.a, self.b, self.c, self.d, self.e):
+            if ptr is not None and ptr.p is not None:
+                if ptr.double_precision:
+                    self.lib.modelfree1_double(ptr.p)
+                else:
+                    self.lib.modelfree1_float(ptr.p)
+                ptr.p = None
+        self.released = True
+
+    def upload_weight(self, sample_weight):
+        """Upload observation weights of the training rows on their own, so
+        a fit can use them instead of the weights of this dataset without
+        modifying it or uploading the data again.
+
+        :param sample_weight: array_like, one weight per training row
+        :return: WrappedPointer to the uploaded weights
+        """
+        if self.released:
+            raise ValueError('GLMDataset was released, call update(force=True)'
+                             ' to upload the data again')
+        weight = np.ascontiguousarray(np.ravel(sample_weight),
+                                      dtype=self.dtype)
+        if weight.shape[0] != self.m_train:
+            raise ValueError('sample_weight has %d rows but the GLMDataset '
+                             'has %d training rows' %
+                             (weight.shape[0], self.m_train))
+        if self.double_precision == 1:
+            c_upload_data = self.lib.make_ptr_double
+        else:
+            c_upload_data = self.lib.make_ptr_float
+        status, _, _, _, _, e = c_upload_data(
+            0, self.source_me, self.source_dev, self.m_train, self.n, 0,
+            self.ord, 0, None, None, None, None, weight, None, None, None,
+            None, None)
+        assert status == 0, 'Failure uploading the weights'
+        return WrappedPointer(e, self.double_precision == 1, self.lib)
+
+    def bind(self, model, predict=False):
+        """Point the data handles of an ElasticNetH2O instance at this
+        dataset, either at the training data or at the data to predict on.
+
+        Prediction uses the validation data when present and the training
+        data otherwise.
+        """
+        if self.released:
+            raise ValueError('GLMDataset was released, call update(force=True)'
+                             ' to upload the data again')
+        if model.lib is not self.lib:
+            raise ValueError('GLMDataset and the model use different backend '
+                             'libraries, create both with the same n_gpus')
+        if int(model.fit_intercept) != self.fit_intercept:
+            raise ValueError('GLMDataset was built with fit_intercept=%d but '
+                             'the model uses fit_intercept=%d' %
+                             (self.fit_intercept, int(model.fit_intercept)))
+
+        model.ord = self.ord
+        model.dtype = self.dtype
+        model.double_precision = self.double_precision
+        model.n = self.n
+        model.time_prepare = 0.0
+        model.time_upload_data = 0.0
+
+        if not predict:
+            model.m_train = self.m_train
+            model.m_valid = self.m_valid
+            (model.a, model.b, model.c, model.d, model.e) = \
+                (self.a, self.b, self.c, self.d, self.e)
+        else:
+            null = WrappedPointer(None, self.double_precision == 1, self.lib)
+            model.m_train = 0
+            model.a = null
+            model.b = null
+            model.e = null
+            if self.c is not None and self.c.p is not None:
+                model.m_valid = self.m_valid
+                model.c = self.c
+                model.d = self.d
+            else:
+                model.m_valid = self.m_train
+                model.c = self.a
+                model.d = self.b
+        return self
+
+
+def unpack_dataset(X, y=None, sample_weight=None, predict=False):
+    """Return the arrays behind a GLMDataset for backends that cannot use
+    the uploaded data (e.g. sklearn); other inputs are returned unchanged.
+    """
+    if not isinstance(X, GLMDataset):
+        return X, y, sample_weight
+    if predict:
+        if X.valid_x is not None:
+            return X.valid_x, X.valid_y, None
+        return X.train_x, X.train_y, None
+    return X.train_x, X.train_y, X.sample_weight
@@ -15,6 +15,18 @@ from ..solvers.utils import _check_data_content, \
 from ..typecheck.typechecks import assert_satisfies
 
 
+def _iter_chunks(X, batch_size):
+    """Yields X in row slices of batch_size if it is an array (e.g. a
+    np.memmap), otherwise yields the chunks of the iterable X."""
+    if hasattr(X, 'shape'):
+        rows = np.shape(X)[0]
+        for start in range(0, rows, batch_size):
+            yield X[start:start + batch_size]
+    else:
+        for chunk in X:
+            yield chunk
+
+
 class KMeansH2O(object):
     """K-Means clustering
 
@@ -33,8 +45,8 @@ class KMeansH2O(object):
      init : string, {'k-means++', 'random' or an ndarray}
         Method for initialization, defaults to 'random':
         'k-means++' : selects initial cluster centers for k-mean
-        clustering in a smart way to speed up convergence.
-        *Not supported yet* - if chosen we will use SKLearn's methods.
+        clustering in a smart way to speed up convergence, implemented
+        with the scalable K-Means|| variant on both GPU and CPU.
         'random': choose k observations (rows) at random from data for
         the initial centroids.
         If an ndarray is passed, it should be of shape (n_clusters, n_features)
@@ -84,14 +96,16 @@ class KMeansH2O(object):
         used at all, which is useful for debugging. For n_jobs below -1,
         (n_cpus + 1 + n_jobs) are used. Thus for n_jobs = -2, all CPUs but one
         are used.
-        *Not supported yet* - CPU backend not yet implemented.
+        *Not supported yet* - the CPU backend uses all OpenMP threads
+        (see OMP_NUM_THREADS).
 
      algorithm : string, "auto", "full" or "elkan", default="auto"
         K-means algorithm to use. The classical EM-style algorithm is "full".
         The "elkan" variation is more efficient by using the triangle
         inequality, but currently doesn't support sparse data. "auto" chooses
         "elkan" for dense data and "full" for sparse data.
-        *Not supported yet* - always uses full if running h2o4gpu version.
+        *Not supported yet* - the GPU backend always uses full, the CPU
+        backend always uses Hamerly's triangle inequality bounds.
 
      gpu_id : int, optional, default: 0
         ID of the GPU on which the algorithm should run.
@@ -115,6 +129,10 @@ class KMeansH2O(object):
     inertia_ : float
         Sum of distances of samples to their closest cluster center.
 
+    counts_ : array, [n_clusters,]
+        Number of rows assigned to each cluster so far, used to weight
+        the centroid updates done by partial_fit.
+
     Example:
     -------
         >>> from h2o4gpu import KMeans
@@ -186,6 +204,8 @@ class KMeansH2O(object):
 
         self.inertia_ = None  # TODO: Not set yet
 
+        self.counts_ = None
+
         self.sklearn_model = None
 
     @classmethod
@@ -316,6 +336,55 @@ class KMeansH2O(object):
 
         return self
 
+    # pylint: disable=unused-argument
+    def partial_fit(self, X, y=None, batch_size=65536):
+        """Update cluster centers with one or more chunks of data.
+
+        Each chunk is labeled with the native predict kernels and every
+        centroid moves to the running mean of all rows assigned to it so
+        far (weighted by counts_). The first chunk, if no model was fitted
+        before, is clustered with fit() to initialize the centroids and
+        needs at least n_clusters rows.
+
+        Only one chunk plus the n_clusters x n_features centroids are held
+        in memory at a time, so X can be larger than RAM.
+
+        :param X: array-like, np.memmap or iterable of array-like chunks,
+            each of shape=(n_samples, n_features)
+            Training instances. Arrays (including memory-mapped ones) are
+            processed in slices of batch_size rows.
+        :param batch_size: int, optional, default: 65536
+            Number of rows processed at once when X is a single array.
+        """
+        for chunk in _iter_chunks(X, batch_size):
+            if self.cluster_centers_ is None:
+                self.fit(chunk)
+                continue
+
+            chunk = np.asarray(chunk, dtype=self.cluster_centers_.dtype)
+            labels = self.predict(chunk)
+
+            cols = np.shape(chunk)[1]
+            counts = np.bincount(labels, minlength=self._n_clusters)
+            sums = np.empty((self._n_clusters, cols), dtype=np.float64)
+            for col in range(cols):
+                sums[:, col] = np.bincount(
+                    labels, weights=chunk[:, col], minlength=self._n_clusters)
+
+            total = self.counts_ + counts
+            updated = counts > 0
+            centers = self.cluster_centers_.astype(np.float64)
+            centers[updated] = (
+                centers[updated] * self.counts_[updated, None] +
+                sums[updated]) / total[updated, None]
+
+            self.cluster_centers_ = centers.astype(
+                self.cluster_centers_.dtype)
+            self.counts_ = total
+            self.labels_ = labels
+
+        return self
+
     # y is here just for compatibility with sklearn api
     # pylint: disable=unused-argument
     def sklearn_fit(self, X, y=None):
@@ -477,7 +546,7 @@ class KMeansH2O(object):
         rows = np.shape(data)[0]
         cols = np.shape(data)[1]
 
-        centroids = np.empty([])
+        centroids = np.empty([], data.dtype)
         pred_centers = np.zeros(cols * self._n_clusters, data.dtype)
         pred_labels = np.zeros(rows, dtype=np.int32)
 
@@ -500,6 +569,7 @@ class KMeansH2O(object):
         self.cluster_centers_ = centroids
 
         self.labels_ = np.reshape(pred_labels, rows)
+        self.counts_ = np.bincount(self.labels_, minlength=self._n_clusters)
 
         return self.cluster_centers_, self.labels_
 
@@ -518,7 +588,8 @@ class KMeansH2O(object):
             self._print_verbose(1, "Detected np.float32 data")
             self.double_precision = 0
 
-        return data.flatten()
+        # View rather than copy for C-contiguous data
+        return np.ravel(data, order='C')
 
     def _print_verbose(self, level, msg):
         if self.verbose > level:
@@ -537,8 +608,11 @@ class KMeansH2O(object):
         cpu_lib = CPUlib().get()
 
         if (self.n_gpus == 0) or (gpu_lib is None) or (self.devices == 0):
-            self._print_verbose(0, "H2O KMeans for CPU not yet supported.")
-            return None
+            if cpu_lib is None:
+                self._print_verbose(0, "H2O KMeans for CPU not available.")
+                return None
+            self._print_verbose(0, "\nUsing CPU KMeans solver.\n")
+            return cpu_lib
         elif (self.n_gpus > 0) or (cpu_lib is None) or (self.devices == 0):
             self._print_verbose(
                 0, "\nUsing GPU KMeans solver with %d GPUs.\n" % self.n_gpus)
@@ -605,8 +679,8 @@ class KMeans(object):
      init : string, {'k-means++', 'random' or an ndarray}
         Method for initialization, defaults to 'random':
         'k-means++' : selects initial cluster centers for k-mean
-        clustering in a smart way to speed up convergence.
-        *Not supported yet* - if chosen we will use SKLearn's methods.
+        clustering in a smart way to speed up convergence, implemented
+        with the scalable K-Means|| variant on both GPU and CPU.
         'random': choose k observations (rows) at random from data for
         the initial centroids.
         If an ndarray is passed, it should be of shape (n_clusters, n_features)
@@ -656,14 +730,16 @@ class KMeans(object):
         used at all, which is useful for debugging. For n_jobs below -1,
         (n_cpus + 1 + n_jobs) are used. Thus for n_jobs = -2, all CPUs but one
         are used.
-        *Not supported yet* - CPU backend not yet implemented.
+        *Not supported yet* - the CPU backend uses all OpenMP threads
+        (see OMP_NUM_THREADS).
 
      algorithm : string, "auto", "full" or "elkan", default="auto"
         K-means algorithm to use. The classical EM-style algorithm is "full".
         The "elkan" variation is more efficient by using the triangle
         inequality, but currently doesn't support sparse data. "auto" chooses
         "elkan" for dense data and "full" for sparse data.
-        *Not supported yet* - always uses full if running h2o4gpu version.
+        *Not supported yet* - the GPU backend always uses full, the CPU
+        backend always uses Hamerly's triangle inequality bounds.
 
      gpu_id : int, optional, default: 0
         ID of the GPU on which the algorithm should run.
@@ -783,6 +859,31 @@ class KMeans(object):
         self.set_attributes()
         return res
 
+    def partial_fit(self, X, y=None, batch_size=65536):
+        """Update cluster centers with one or more chunks of data, see
+        KMeansH2O.partial_fit. scikit-learn's KMeans has no incremental
+        mode, so the sklearn backend feeds the chunks to a MiniBatchKMeans
+        with the same parameters, which is then used as the model."""
+        if self.model is self.model_sklearn:
+            from h2o4gpu.cluster import k_means_
+            params = self.model_sklearn.get_params()
+            self.model = k_means_.MiniBatchKMeansSklearn(
+                n_clusters=params['n_clusters'],
+                init=params['init'],
+                max_iter=params['max_iter'],
+                batch_size=batch_size,
+                verbose=params['verbose'],
+                random_state=params['random_state'],
+                tol=params['tol'])
+        if self.model is not self.model_h2o4gpu:
+            for chunk in _iter_chunks(X, batch_size):
+                self.model.partial_fit(chunk)
+            self.set_attributes()
+            return self.model
+        res = self.model.partial_fit(X, y, batch_size=batch_size)
+        self.set_attributes()
+        return res
+
     def fit_transform(self, X, y=None):
         res = self.model.fit_transform(X, y)
         self.set_attributes()
@@ -821,6 +922,8 @@ class KMeans(object):
         s('oself.labels_ = oself.model.labels_')
         self.inertia_ = None
         s('oself.inertia_ = oself.model.intertia_')
+        self.counts_ = None
+        s('oself.counts_ = oself.model.counts_')
 
     # TODO use a proper logger in Python classes
     @staticmethod
@@ -8,6 +8,7 @@
 from h2o4gpu.solvers import elastic_net
 from h2o4gpu.linear_model import coordinate_descent as sk
 from ..solvers.utils import _setter
+from ..solvers.glm_dataset import GLMDataset, unpack_dataset
 
 
 class Lasso(object):
@@ -205,21 +206,32 @@ class Lasso(object):
                 print("Running h2o4gpu Lasso Regression")
             self.model = self.model_h2o4gpu
         self.verbose = verbose
+        self._dataset_weight = None
 
     def fit(self, X, y=None, check_input=True):
         """H2O Lasso Regression Fitter
         """
 
         if self.do_sklearn:
+            X, y, _ = unpack_dataset(X, y)
             res = self.model.fit(X, y, check_input)
             self.set_attributes()
             return res
         import numpy as np
-        # FIXME: only works if numpy input
-        if len(X.shape) == 2:
-            sample_weight = X[:, 0] * 0.0 + 1.0 / (2.0 * np.shape(X)[0])
-        else:
-            sample_weight = X[:] * 0.0 + 1.0 / (2.0 * np.shape(X)[0])
+        if isinstance(X, GLMDataset):
+            # Lasso scales the loss through the weights, they are uploaded
+            # once for this estimator and leave the shared dataset unchanged
+            m = X.m_train
+            if self._dataset_weight is None or \
+                    self._dataset_weight.shape[0] != m or \
+                    self._dataset_weight.dtype != X.dtype:
+                self._dataset_weight = np.full(m, 1.0 / (2.0 * m),
+                                               dtype=X.dtype)
+            res = self.model.fit(X, sample_weight=self._dataset_weight)
+            self.set_attributes()
+            return res
+        m = np.shape(X)[0]
+        sample_weight = np.full(m, 1.0 / (2.0 * m))
         res = self.model.fit(X, y, sample_weight=sample_weight)
         self.set_attributes()
         return res
@@ -228,6 +240,8 @@ class Lasso(object):
         return self.model.get_params()
 
     def predict(self, X):
+        if self.do_sklearn:
+            X, _, _ = unpack_dataset(X, predict=True)
         res = self.model.predict(X)
         self.set_attributes()
         return res
@@ -9,6 +9,7 @@ import numpy as np
 from h2o4gpu.solvers import elastic_net
 from h2o4gpu.linear_model import logistic as sk
 from ..solvers.utils import _setter
+from ..solvers.glm_dataset import unpack_dataset
 
 
 class LogisticRegression(object):
@@ -105,7 +106,8 @@ class LogisticRegression(object):
         chosen is 'ovr', then a binary problem is fit for each label. Else
         the loss minimised is the multinomial loss fit across
         the entire probability distribution. Does not work for liblinear
-        solver.
+        solver.  The h2o4gpu backend fits more than two classes with one
+        multinomial model either way.
 
         .. versionadded:: 0.18
            Stochastic Average Gradient descent solver for 'multinomial' case.
@@ -177,11 +179,12 @@ class LogisticRegression(object):
                 'intercept_scaling', 'class_weight', 'solver', 'multi_class'
             ]
             params = [intercept_scaling, class_weight, solver, multi_class]
-            params_default = [1.0, None, 'liblinear', 'ovr']
+            params_default = [(1.0,), (None,), ('liblinear',),
+                              ('ovr', 'multinomial')]
 
             i = 0
             for param in params:
-                if param != params_default[i]:
+                if param not in params_default[i]:
                     self.do_sklearn = True
                     if verbose:
                         print("WARNING:"
@@ -272,16 +275,23 @@ class LogisticRegression(object):
         self.verbose = verbose
 
     def fit(self, X, y=None, sample_weight=None):
+        if self.do_sklearn:
+            X, y, sample_weight = unpack_dataset(X, y, sample_weight)
         res = self.model.fit(X, y, sample_weight)
         self.set_attributes()
         return res
 
     def predict_proba(self, X):
         if self.do_sklearn:
+            X, _, _ = unpack_dataset(X, predict=True)
             res = self.model.predict_proba(X)
             self.set_attributes()
             return res
-        res = self.model.predict(X)
+        if self.model._family == 'm':
+            # (n_samples, n_classes) of the single alpha
+            res = self.model.predict_proba(X)[0]
+        else:
+            res = self.model.predict(X)
         self.set_attributes()
         return res
 
@@ -300,9 +310,14 @@ class LogisticRegression(object):
 
     def predict(self, X):
         if self.do_sklearn:
+            X, _, _ = unpack_dataset(X, predict=True)
             res = self.model.predict(X)
             self.set_attributes()
             return res
+        if self.model._family == 'm':
+            res = self.model.predict(X)[0]
+            self.set_attributes()
+            return res
         res = self.model.predict(X)
         res[res < 0.5] = 0
         res[res > 0.5] = 1
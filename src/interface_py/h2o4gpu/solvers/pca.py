@@ -5,6 +5,7 @@
 :license:   Apache License Version 2.0 (see LICENSE for details)
 """
 import numpy as np
+import scipy.sparse
 from ..solvers.utils import _setter
 from ..solvers.truncated_svd import TruncatedSVDH2O, TruncatedSVD
 
@@ -17,7 +18,8 @@ class PCAH2O(TruncatedSVDH2O):
 
     This implementation uses the Cusolver implementation of the truncated SVD.
     Contrary to SVD, this estimator does center the data before computing
-    the singular value decomposition.
+    the singular value decomposition. Sparse data runs on the CPU and is
+    centered implicitly, so it is never densified.
 
     Parameters
     ----------
@@ -34,23 +36,44 @@ class PCAH2O(TruncatedSVDH2O):
         improve the predictive accuracy of the downstream estimators by
         making their data respect some hard-wired assumptions.
 
+        The fitted `components_` carry this scaling, so `transform`
+        returns whitened data.
+
     verbose: bool
         Verbose or not
 
     gpu_id : int, optional, default: 0
         ID of the GPU on which the algorithm should run.
+
+    n_gpus : int, optional, default: 1
+        How many gpus to use.  If 0, use the CPU backend.
+
+    algorithm: string, Default="cusolver"
+        SVD solver to use, as for TruncatedSVDH2O.
+
+    random_state: int, Default=None
+        Seed of the "randomized" algorithm and of the CPU "cusolver"
+        algorithm (None for auto-generated)
+
+    n_oversamples : int, optional, default: 10
+        Random vectors sampled beyond n_components, as for TruncatedSVDH2O.
+
+    n_power_iter : int, optional, default: 4
+        Power iterations of the "randomized" algorithm.
     """
 
     def __init__(self, n_components=2, whiten=False,
-                 verbose=0, gpu_id=0):
-        super().__init__(n_components)
+                 verbose=0, gpu_id=0, n_gpus=1, algorithm="cusolver",
+                 random_state=None, n_oversamples=10, n_power_iter=4):
+        super().__init__(n_components, algorithm=algorithm,
+                         random_state=random_state, verbose=verbose,
+                         n_gpus=n_gpus, gpu_id=gpu_id,
+                         n_oversamples=n_oversamples,
+                         n_power_iter=n_power_iter)
         self.whiten = whiten
         self.n_components_ = n_components
         self.mean_ = None
         self.noise_variance_ = None
-        self.algorithm = "cusolver"
-        self.verbose = verbose
-        self.gpu_id = gpu_id
 
     # pylint: disable=unused-argument
     def fit(self, X, y=None):
@@ -85,9 +108,9 @@ class PCAH2O(TruncatedSVDH2O):
 
         """
         # SWIG takes care of mapping to Fortran order
-        X = self._check_double(X)
+        X, X_args = self._native_input(X)
+        sparse = scipy.sparse.issparse(X)
         matrix_type = np.float64 if self.double_precision == 1 else np.float32
-        X = np.asfortranarray(X, dtype=matrix_type)
         Q = np.empty(
             (self.n_components, X.shape[1]), dtype=matrix_type)
         U = np.empty(
@@ -98,7 +121,7 @@ class PCAH2O(TruncatedSVDH2O):
         mean = np.empty(X.shape[1], dtype=matrix_type)
         X_transformed = np.empty((U.shape[0], self.n_components), dtype=matrix_type)
 
-        lib = self._load_lib()
+        lib = self._load_lib(sparse)
 
         param = lib.params_pca()
         param.X_m = X.shape[0]
@@ -111,11 +134,14 @@ class PCAH2O(TruncatedSVDH2O):
         param.verbose = 1 if self.verbose else 0
         param.gpu_id = self.gpu_id
         param.whiten = self.whiten
+        param.n_oversamples = self.n_oversamples
+        param.n_power_iter = self.n_power_iter
 
         if self.double_precision == 1:
-            lib.pca_double(X, Q, w, U, X_transformed, explained_variance, explained_variance_ratio, mean, param)
+            fit = lib.pca_csr_double if sparse else lib.pca_double
         else:
-            lib.pca_float(X, Q, w, U, X_transformed, explained_variance, explained_variance_ratio, mean, param)
+            fit = lib.pca_csr_float if sparse else lib.pca_float
+        fit(*(X_args + (Q, w, U, X_transformed, explained_variance, explained_variance_ratio, mean, param)))
 
         self._w = w
         self._U = U
@@ -125,7 +151,11 @@ class PCAH2O(TruncatedSVDH2O):
         n = X.shape[0]
         # To match sci-kit #TODO Port to cuda?
         self.explained_variance = self.singular_values_**2 / (n - 1)
-        total_var = np.var(X, ddof=1, axis=0)
+        if sparse:
+            sum_squares = np.asarray(X.power(2).sum(axis=0, dtype=np.float64))
+            total_var = (sum_squares.ravel() - n * mean.astype(np.float64)**2) / (n - 1)
+        else:
+            total_var = np.var(X, ddof=1, axis=0)
         self.explained_variance_ratio = \
             self.explained_variance / total_var.sum()
         #self.explained_variance_ratio = explained_variance_ratio
@@ -134,7 +164,6 @@ class PCAH2O(TruncatedSVDH2O):
         # TODO noise_variance_ calculation
         # can be done inside lib.pca if a bottleneck
         n_samples, n_features = X.shape
-        total_var = np.var(X, ddof=1, axis=0)
         if self.n_components_ < min(n_features, n_samples):
             self.noise_variance_ = \
                 (total_var.sum() - self.explained_variance_.sum())
@@ -145,12 +174,16 @@ class PCAH2O(TruncatedSVDH2O):
 
         return X_transformed
 
+    def _transform_mean(self):
+        """Column means the data is centered with before projecting."""
+        return self.mean_
+
     def _check_double(self, data, convert=True):
         """Transform input data into a type which can be passed into C land."""
         if convert and data.dtype != np.float64 and data.dtype != np.float32:
             self._print_verbose(0, "Detected numeric data format which is not "
                                    "supported. Casting to np.float32.")
-            data = np.ascontiguousarray(data, dtype=np.floa32)
+            data = np.ascontiguousarray(data, dtype=np.float32)
         if data.dtype == np.float64:
             self._print_verbose(0, "Detected np.float64 data")
             self.double_precision = 1
@@ -165,14 +198,6 @@ class PCAH2O(TruncatedSVDH2O):
                 "should be either np.float32 or np.float64" % data.dtype)
         return data
 
-    # Util to load gpu lib
-    def _load_lib(self):
-        from ..libs.lib_utils import GPUlib
-
-        gpu_lib = GPUlib().get()
-
-        return gpu_lib
-
 
 class PCA(TruncatedSVD):
     """
@@ -211,13 +236,15 @@ class PCA(TruncatedSVD):
         `scipy.linalg.svd` and select the components by postprocessing
         'arpack'runs SVD truncated to n_components calling ARPACK solver via `scipy.sparse.linalg.svds`.
         It requires strictly 0 < n_components < columns. 'randomized' runs randomized SVD by the method of Halko et al.
+        The h2o4gpu backend runs its "randomized" algorithm for
+        'randomized' and its "cusolver" algorithm otherwise.
 
     tol : float >= 0, optional (default .0)
         Tolerance for singular values computed by svd_solver == 'arpack'.
 
     iterated_power : int >= 0, or 'auto', (default 'auto')
         Number of iterations for the power method computed by
-        svd_solver == 'randomized'.
+        svd_solver == 'randomized'. 'auto' is 4 for the h2o4gpu backend.
 
     random_state : int, RandomState instance or None, optional (default None)
         If int, random_state is the seed used by the random number generator;
@@ -237,6 +264,13 @@ class PCA(TruncatedSVD):
         ID of the GPU on which the algorithm should run. Only used by
         h2o4gpu backend.
 
+    n_gpus : int, optional, default: 1
+        How many gpus to use.  If 0, the h2o4gpu backend runs on the CPU.
+
+    n_oversamples : int, optional, default: 10
+        Random vectors sampled beyond n_components by the randomized
+        solver. Only used by h2o4gpu backend.
+
     """
 
     # pylint: disable=unused-argument
@@ -250,8 +284,15 @@ class PCA(TruncatedSVD):
                  random_state=None,
                  verbose=False,
                  backend='auto',
-                 gpu_id=0):
-        super().__init__(n_components, random_state, tol, verbose, backend, gpu_id)
+                 gpu_id=0,
+                 n_gpus=1,
+                 n_oversamples=10):
+        n_power_iter = 4 if iterated_power == "auto" else iterated_power
+        super().__init__(n_components=n_components, random_state=random_state,
+                         tol=tol, verbose=verbose, backend=backend,
+                         n_gpus=n_gpus, gpu_id=gpu_id,
+                         n_oversamples=n_oversamples,
+                         n_power_iter=n_power_iter)
         self.svd_solver = svd_solver
         self.whiten = whiten
 
@@ -304,7 +345,13 @@ class PCA(TruncatedSVD):
             n_components=self.n_components,
             whiten=self.whiten,
             verbose=self.verbose,
-            gpu_id=self.gpu_id)
+            gpu_id=self.gpu_id,
+            n_gpus=self.n_gpus,
+            algorithm="randomized" if svd_solver == "randomized" else
+            "cusolver",
+            random_state=self.random_state,
+            n_oversamples=self.n_oversamples,
+            n_power_iter=self.n_power_iter)
 
         if self.do_sklearn:
             self.model = self.model_sklearn
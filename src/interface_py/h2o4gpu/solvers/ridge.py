@@ -8,6 +8,7 @@
 from h2o4gpu.solvers import elastic_net
 from h2o4gpu.linear_model import ridge as sk
 from ..solvers.utils import _setter
+from ..solvers.glm_dataset import unpack_dataset
 
 
 class Ridge(object):
@@ -248,6 +249,8 @@ class Ridge(object):
         self.verbose = verbose
 
     def fit(self, X, y=None, sample_weight=None):
+        if self.model is not self.model_h2o4gpu:
+            X, y, sample_weight = unpack_dataset(X, y, sample_weight)
         if self.do_sklearn:
             res = self.model.fit(X, y, sample_weight)
             self.set_attributes()
@@ -260,6 +263,8 @@ class Ridge(object):
         return self.model.get_params()
 
     def predict(self, X):
+        if self.model is not self.model_h2o4gpu:
+            X, _, _ = unpack_dataset(X, predict=True)
         res = self.model.predict(X)
         self.set_attributes()
         return res
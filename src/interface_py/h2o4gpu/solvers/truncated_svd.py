@@ -7,7 +7,8 @@
 from __future__ import print_function
 import sys
 import numpy as np
-from ..solvers.utils import _setter
+import scipy.sparse
+from ..solvers.utils import _setter, _BLOCK_VALUES, is_out_of_core, row_blocks
 
 class TruncatedSVDH2O(object):
     """Dimensionality reduction using truncated SVD for GPUs
@@ -15,6 +16,10 @@ class TruncatedSVDH2O(object):
     Perform linear dimensionality reduction by means of truncated singular value decomposition (SVD).
     Contrary to PCA, this estimator does not center the data before computing the singular value decomposition.
 
+    Dense data is decomposed on the GPU unless n_gpus=0 or no GPU build is
+    available. Sparse (CSR) data and the "randomized" algorithm always run
+    on the multithreaded CPU backend, which never densifies sparse data.
+
     Parameters
     ----------
     n_components: int, Default=2
@@ -22,11 +27,16 @@ class TruncatedSVDH2O(object):
 
     algorithm: string, Default="power"
         SVD solver to use.
-        Either "cusolver" (similar to ARPACK)
-        or "power" for the power method.
+        Either "cusolver" (similar to ARPACK),
+        "power" for the power method
+        or "randomized" for the randomized range finder of Halko et al.
+        (2011), CPU only. On the CPU "cusolver" refines the randomized
+        basis until the singular values converge, so it never forms the
+        n_features x n_features matrix X^T X.
 
     n_iter: int, Default=100
-        number of iterations (only relevant for power method)
+        number of iterations (only relevant for power method, and the
+        "cusolver" method on the CPU)
         Should be at most 2147483647 due to INT_MAX in C++ backend.
 
     int random_state: seed (None for auto-generated)
@@ -47,11 +57,20 @@ class TruncatedSVDH2O(object):
     gpu_id : int, optional, default: 0
         ID of the GPU on which the algorithm should run.
 
+    n_oversamples : int, optional, default: 10
+        Random vectors sampled beyond n_components by the "randomized"
+        algorithm.
+
+    n_power_iter : int, optional, default: 4
+        Power iterations of the "randomized" algorithm, which improve the
+        accuracy when the singular values decay slowly.
+
     """
 
     def __init__(self, n_components=2, algorithm="power",
                  n_iter=100, random_state=None, tol=1e-5,
-                 verbose=0, n_gpus=1, gpu_id=0):
+                 verbose=0, n_gpus=1, gpu_id=0, n_oversamples=10,
+                 n_power_iter=4):
         self.n_components = n_components
         self.algorithm = algorithm
         self.n_iter = n_iter
@@ -63,6 +82,8 @@ class TruncatedSVDH2O(object):
         self.verbose = verbose
         self.n_gpus = n_gpus
         self.gpu_id = gpu_id
+        self.n_oversamples = n_oversamples
+        self.n_power_iter = n_power_iter
 
     # pylint: disable=unused-argument
     def fit(self, X, y=None):
@@ -96,14 +117,10 @@ class TruncatedSVDH2O(object):
                          dense array.
 
         """
-        import scipy
-        if isinstance(X, scipy.sparse.csr.csr_matrix):
-            X = scipy.sparse.csr_matrix.todense(X)
-
-        X = self._check_double(X)
+        X, X_args = self._native_input(X)
+        sparse = scipy.sparse.issparse(X)
         matrix_type = np.float64 if self.double_precision == 1 else np.float32
 
-        X = np.asfortranarray(X, dtype=matrix_type)
         Q = np.empty((self.n_components, X.shape[1]), dtype=matrix_type)
         U = np.empty((X.shape[0], self.n_components), dtype=matrix_type)
         w = np.empty(self.n_components, dtype=matrix_type)
@@ -112,7 +129,7 @@ class TruncatedSVDH2O(object):
                                             dtype=matrix_type)
         X_transformed = np.empty((U.shape[0], self.n_components), dtype=matrix_type)
 
-        lib = self._load_lib()
+        lib = self._load_lib(sparse)
 
         param = lib.params_tsvd()
         param.X_m = X.shape[0]
@@ -125,6 +142,8 @@ class TruncatedSVDH2O(object):
         param.verbose = self.verbose
         param.gpu_id = self.gpu_id
         param.whiten = False #Whitening is not exposed for tsvd yet
+        param.n_oversamples = self.n_oversamples
+        param.n_power_iter = self.n_power_iter
 
         if param.tol < 0.0:
             raise ValueError("The `tol` parameter must be >= 0.0 "
@@ -139,9 +158,10 @@ class TruncatedSVDH2O(object):
                              "but got`" + str(self.n_iter))
 
         if self.double_precision == 1:
-            lib.truncated_svd_double(X, Q, w, U, X_transformed, explained_variance, explained_variance_ratio, param)
+            fit = lib.truncated_svd_csr_double if sparse else lib.truncated_svd_double
         else:
-            lib.truncated_svd_float(X, Q, w, U, X_transformed, explained_variance, explained_variance_ratio, param)
+            fit = lib.truncated_svd_csr_float if sparse else lib.truncated_svd_float
+        fit(*(X_args + (Q, w, U, X_transformed, explained_variance, explained_variance_ratio, param)))
 
         self._w = w
         self._X = X
@@ -151,21 +171,77 @@ class TruncatedSVDH2O(object):
         self.explained_variance_ratio = explained_variance_ratio
         return X_transformed
 
-    def transform(self, X):
-        """Perform dimensionality reduction on X.
+    def transform(self, X, batch_size=None):
+        """Perform dimensionality reduction on X by projecting it onto the
+        fitted components_, without refitting.
 
         :param X : {array-like, sparse matrix}, shape (n_samples, n_features)
-                  Training data.
+                  New data, or a np.memmap or an iterator of row blocks,
+                  which are read one block at a time.
+
+        :param batch_size : int, optional
+                Rows projected per call to the backend, which bounds the
+                memory used by the dense copy of each block (Default: as
+                many rows as fit in 64MB of float64).
 
         :returns X_new : array, shape (n_samples, n_components)
                          Reduced version of X. This will always
                          be a dense array.
 
         """
-        fit = self.fit(X)
-        X_new = fit.U * fit.singular_values_
+        assert getattr(self, '_Q', None) is not None, \
+            "Components are None. Run fit() first."
+        n_features = self._Q.shape[1]
+        if batch_size is None:
+            batch_size = max(1, _BLOCK_VALUES // n_features)
+        if is_out_of_core(X):
+            blocks = (x for x, _, _ in row_blocks(X))
+        else:
+            if not scipy.sparse.issparse(X):
+                X = np.asarray(X)
+            blocks = (X[start:start + batch_size]
+                      for start in range(0, X.shape[0], batch_size))
+
+        X_new = []
+        for x in blocks:
+            # row blocks can be larger than batch_size
+            for start in range(0, x.shape[0], batch_size):
+                X_new.append(self._transform_block(x[start:start + batch_size]))
+        if not X_new:
+            return np.empty((0, self._Q.shape[0]), dtype=self._Q.dtype)
+        return np.concatenate(X_new)
+
+    def _transform_block(self, x):
+        """Project one block of rows with the native backend."""
+        if scipy.sparse.issparse(x):
+            x = x.toarray()
+        x = np.asfortranarray(x, dtype=self._Q.dtype)
+        if x.ndim != 2 or x.shape[1] != self._Q.shape[1]:
+            raise ValueError("X should have %d features but got shape %s" %
+                             (self._Q.shape[1], x.shape))
+        # allocated like the outputs of fit(): the INPLACE_FARRAY2 typemap
+        # takes a C contiguous array and makes it a Fortran ordered one
+        X_new = np.empty((x.shape[0], self._Q.shape[0]), dtype=x.dtype)
+        if x.shape[0] == 0:
+            return X_new
+
+        lib = self._load_transform_lib()
+        param = lib.params_tsvd()
+        param.X_m = x.shape[0]
+        param.X_n = x.shape[1]
+        param.k = self._Q.shape[0]
+        param.gpu_id = self.gpu_id
+        mean = np.ascontiguousarray(self._transform_mean(), dtype=x.dtype)
+        if x.dtype == np.float64:
+            lib.transform_double(x, self._Q, mean, X_new, param)
+        else:
+            lib.transform_float(x, self._Q, mean, X_new, param)
         return X_new
 
+    def _transform_mean(self):
+        """Column means the data is centered with before projecting."""
+        return np.zeros(self._Q.shape[1], dtype=self._Q.dtype)
+
     def inverse_transform(self, X):
         """Transform X back to its original space.
 
@@ -178,6 +254,19 @@ class TruncatedSVDH2O(object):
         """
         return np.dot(X, self.components_)
 
+    def _native_input(self, X):
+        """X cast for the native fit, and the arrays it is passed as: a
+        Fortran ordered array, or the data, indices and indptr of sparse X,
+        which is converted to CSR but never densified."""
+        if scipy.sparse.issparse(X):
+            X = scipy.sparse.csr_matrix(X)
+            return X, (self._check_double(X.data),
+                       np.ascontiguousarray(X.indices, dtype=np.int32),
+                       np.ascontiguousarray(X.indptr, dtype=np.int32))
+        X = self._check_double(X)
+        X = np.asfortranarray(X, dtype=X.dtype)
+        return X, (X,)
+
     def _check_double(self, data, convert=True):
         """Transform input data into a type which can be passed into C land."""
         if convert and data.dtype != np.float64 and data.dtype != np.float32:
@@ -338,13 +427,27 @@ class TruncatedSVDH2O(object):
         """
         return self._U
 
-    # Util to load gpu lib
-    def _load_lib(self):
-        from ..libs.lib_utils import GPUlib
+    # Util to load the lib fitting the model, the GPU lib unless n_gpus=0,
+    # it is not available or the fit is CPU only (sparse or randomized)
+    def _load_lib(self, sparse=False):
+        from ..libs.lib_utils import CPUlib, GPUlib
+
+        lib = None
+        if self.n_gpus != 0 and not sparse and self.algorithm != "randomized":
+            lib = GPUlib().get()
+        if lib is None:
+            lib = CPUlib().get()
+        return lib
 
-        gpu_lib = GPUlib().get()
+    # Util to load the lib projecting new data, the GPU lib unless n_gpus=0
+    # or it is not available
+    def _load_transform_lib(self):
+        from ..libs.lib_utils import CPUlib, GPUlib
 
-        return gpu_lib
+        lib = GPUlib().get() if self.n_gpus != 0 else None
+        if lib is None:
+            lib = CPUlib().get()
+        return lib
 
 class TruncatedSVD(object):
     """
@@ -360,9 +463,11 @@ class TruncatedSVD(object):
 
     algorithm: string, Default="power"
         SVD solver to use.
-        H2O4GPU options are either "cusolver" (similar to ARPACK)
-        or "power" for the power method. SKlearn options are either "arpack" for the ARPACK wrapper
-        in SciPy (scipy.sparse.linalg.svds), or "randomized" for the randomized algorithm due to Halko (2009).
+        H2O4GPU options are either "cusolver" (similar to ARPACK),
+        "power" for the power method or "randomized" for the randomized
+        algorithm due to Halko (2009), which runs on the CPU. SKlearn
+        options are either "arpack" for the ARPACK wrapper
+        in SciPy (scipy.sparse.linalg.svds), or "randomized".
 
     n_iter: int, Default=100
         number of iterations (only relevant for power method)
@@ -386,12 +491,20 @@ class TruncatedSVD(object):
         Saves as attribute for actual backend used.
 
     n_gpus : int, optional, default: 1
-        How many gpus to use.  If 0, use CPU backup method.
+        How many gpus to use.  If 0, use the h2o4gpu CPU backend.
         Currently SVD only uses 1 GPU, so >1 has no effect compared to 1.
 
     gpu_id : int, optional, default: 0
         ID of the GPU on which the algorithm should run.
 
+    n_oversamples : int, optional, default: 10
+        Random vectors sampled beyond n_components by the "randomized"
+        algorithm. Only used by h2o4gpu backend.
+
+    n_power_iter : int, optional, default: 4
+        Power iterations of the "randomized" algorithm. Only used by
+        h2o4gpu backend.
+
     """
 
     def __init__(self,
@@ -403,7 +516,9 @@ class TruncatedSVD(object):
                  verbose=False,
                  backend='auto',
                  n_gpus=1,
-                 gpu_id=0):
+                 gpu_id=0,
+                 n_oversamples=10,
+                 n_power_iter=4):
         if isinstance(algorithm, list):
             self.algorithm = algorithm[0]
         else:
@@ -424,6 +539,8 @@ class TruncatedSVD(object):
         self.verbose = 1 if verbose else 0
         self.n_gpus = n_gpus
         self.gpu_id = gpu_id
+        self.n_oversamples = n_oversamples
+        self.n_power_iter = n_power_iter
 
         import os
         _backend = os.environ.get('H2O4GPU_BACKEND', None)
@@ -439,18 +556,19 @@ class TruncatedSVD(object):
         sklearn_n_iter = 5
         sklearn_tol = 1E-5
 
-        if n_gpus == 0:
-            # we don't have CPU back-end for SVD yet.
-            backend = 'sklearn'
-        else:
-            backend = 'h2o4gpu'
+        if backend == 'auto':
+            # h2o4gpu has CPU back-ends for all of its algorithms
+            if self.algorithm in ['cusolver', 'power', 'randomized']:
+                backend = 'h2o4gpu'
+            else:
+                backend = 'sklearn'
 
-        if backend in ['auto', 'sklearn']:
+        if backend == 'sklearn':
             self.do_sklearn = True
             self.backend = 'sklearn'
             params_string = ['algorithm']
             params = [self.algorithm]
-            params_gpu = [['cusolver', 'power']]
+            params_gpu = [['cusolver', 'power', 'randomized']]
 
             i = 0
             for param in params:
@@ -509,7 +627,10 @@ class TruncatedSVD(object):
             random_state=self.random_state,
             tol=self.tol,
             verbose=self.verbose,
-            gpu_id=self.gpu_id)
+            n_gpus=self.n_gpus,
+            gpu_id=self.gpu_id,
+            n_oversamples=self.n_oversamples,
+            n_power_iter=self.n_power_iter)
 
         # select final model type
         if self.do_sklearn:
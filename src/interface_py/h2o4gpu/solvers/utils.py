@@ -3,9 +3,11 @@
 :copyright: 2017-2018 H2O.ai, Inc.
 :license:   Apache License Version 2.0 (see LICENSE for details)
 """
+import collections.abc
 import sys
 import time
 import numpy as np
+import scipy.sparse
 
 # Data utils
 
@@ -29,6 +31,58 @@ class WrappedPointer(object):
         else:
             self.lib.modelfree1_float(self.p)
 
+
+class _NativeBuffer(object):
+    '''Exposes a buffer allocated by the backend library through the numpy
+    array interface and releases it once no array refers to it anymore
+
+    Arguments:
+        p {[type]} -- pointer returned by the backend (SWIG object or int)
+        count {int} -- number of elements in the buffer
+        dtype {numpy.dtype} -- np.float32 or np.float64
+        lib{object} -- python wrapper over lib.so
+    '''
+
+    def __init__(self, p, count, dtype, lib):
+        self.p = p
+        self.dtype = np.dtype(dtype)
+        self.lib = lib
+        self.__array_interface__ = {
+            'shape': (int(count),),
+            'typestr': self.dtype.str,
+            'data': (int(p), False),
+            'version': 3
+        }
+
+    def __del__(self):
+        if self.lib is None or self.p is None:
+            return
+        if self.dtype == np.float64:
+            self.lib.modelfree2_double(self.p)
+        else:
+            self.lib.modelfree2_float(self.p)
+        self.p = None
+
+
+def native_array(p, count, dtype, lib):
+    """Wrap a buffer allocated by the backend as a 1D numpy array without
+    copying it.
+
+    The returned array owns the buffer: the memory is given back to the
+    backend (modelfree2) when the array and all views of it are garbage
+    collected, so the caller must not free ``p`` itself.
+
+    :param p: pointer returned by the backend, None for NULL
+    :param count: number of elements in the buffer
+    :param dtype: np.float32 or np.float64
+    :param lib: backend library used to free the buffer
+    :return: ndarray or None if ``p`` is NULL
+    """
+    if p is None or int(p) == 0:
+        return None
+    return np.asarray(_NativeBuffer(p, count, dtype, lib))
+
+
 def _get_order(data, fortran, order):
     """ Return the Unicode code point representing the
     order of this data set. """
@@ -154,9 +208,10 @@ def _check_data_content(do_check, name, data):
         Data to be checked
     :return:
     """
-    if do_check == 1:
-        assert np.isfinite(data).all(), "%s contains Inf" % name
-        assert not np.isnan(data).any(), "%s contains NA" % name
+    # one scan, np.isfinite is False for NaN too; look again only to report
+    if do_check == 1 and not np.isfinite(data).all():
+        raise AssertionError("%s contains %s" %
+                             (name, "NA" if np.isnan(data).any() else "Inf"))
 
 
 def _data_info(data, verbose=0):
@@ -211,6 +266,66 @@ def _check_equal(iterator):
     return all(first == rest for rest in iterator)
 
 
+def make_fold_ids(m_train, n_folds, fold_assignment='contiguous', y=None,
+                  seed=None):
+    """Assign each training row to a cross validation fold.
+
+    :param int m_train: Number of training rows
+    :param int n_folds: Number of folds
+    :param fold_assignment: 'contiguous' (blocks of consecutive rows),
+        'random' (shuffled rows), 'stratified' (shuffled rows within each
+        value of y) or array_like with the fold of each row
+    :param y: Training response, required by 'stratified'
+    :param seed: Seed of the shuffling
+    :return: int32 ndarray with the fold of each row, or None for
+        'contiguous', which the backend computes itself
+    """
+    if n_folds <= 1:
+        return None
+
+    if isinstance(fold_assignment, str):
+        if fold_assignment == 'contiguous':
+            return None
+        rng = np.random.RandomState(seed)
+        if fold_assignment == 'random':
+            order = rng.permutation(m_train)
+        elif fold_assignment == 'stratified':
+            if y is None:
+                raise ValueError("fold_assignment='stratified' needs the "
+                                 "training response")
+            y = np.ravel(y)
+            if y.shape[0] != m_train:
+                raise ValueError('Training response has %d rows but %d '
+                                 'training rows were uploaded' %
+                                 (y.shape[0], m_train))
+            _, classes = np.unique(y, return_inverse=True)
+            #shuffle, then sort stably by class so dealing rows out
+            #round-robin spreads every class evenly across the folds
+            order = rng.permutation(m_train)
+            order = order[np.argsort(classes[order], kind='mergesort')]
+        else:
+            raise ValueError("fold_assignment should be 'contiguous', "
+                             "'random', 'stratified' or an array but got " +
+                             fold_assignment)
+        fold_ids = np.empty(m_train, dtype=np.int32)
+        fold_ids[order] = np.arange(m_train) % n_folds
+    else:
+        fold_ids = np.ascontiguousarray(
+            np.ravel(fold_assignment), dtype=np.int32)
+        if fold_ids.shape[0] != m_train:
+            raise ValueError('fold_assignment has %d entries but there are '
+                             '%d training rows' %
+                             (fold_ids.shape[0], m_train))
+
+    counts = np.bincount(fold_ids.clip(0), minlength=n_folds)
+    if fold_ids.min() < 0 or fold_ids.max() >= n_folds:
+        raise ValueError('Fold ids must be in [0, %d)' % n_folds)
+    if (counts == 0).any() or (counts == m_train).any():
+        raise ValueError('Every fold needs held-out and training rows, '
+                         'got fold sizes %s' % counts.tolist())
+    return fold_ids
+
+
 def prepare_and_upload_data(self,
                             train_x=None,
                             train_y=None,
@@ -221,10 +336,10 @@ def prepare_and_upload_data(self,
     """ Prepare data and then upload data
     """
     time_prepare0 = time.time()
+    # the intercept column is added by the backend while copying the data
     train_x_np, m_train, n1, fortran1, self.ord, self.dtype = _get_data(
         train_x,
         ismatrix=True,
-        fit_intercept=self.fit_intercept,
         order=self.ord,
         dtype=self.dtype)
     train_y_np, m_y, _, fortran2, self.ord, self.dtype = _get_data(
@@ -232,7 +347,6 @@ def prepare_and_upload_data(self,
     valid_x_np, m_valid, n2, fortran3, self.ord, self.dtype = _get_data(
         valid_x,
         ismatrix=True,
-        fit_intercept=self.fit_intercept,
         order=self.ord,
         dtype=self.dtype)
     valid_y_np, m_valid_y, _, fortran4, self.ord, self.dtype = \
@@ -271,7 +385,8 @@ def prepare_and_upload_data(self,
 
     time_upload_data0 = time.time()
     (a, b, c, d, e) = upload_data(self, train_x_np, train_y_np, valid_x_np,
-                                  valid_y_np, weight_np, source_dev)
+                                  valid_y_np, weight_np, source_dev,
+                                  intercept=self.fit_intercept)
 
     self.time_upload_data = time.time() - time_upload_data0
 
@@ -289,8 +404,14 @@ def upload_data(self,
                 valid_x=None,
                 valid_y=None,
                 sample_weight=None,
-                source_dev=0):
-    """Upload the data through the backend library"""
+                source_dev=0,
+                intercept=0):
+    """Upload the data through the backend library
+
+    With ``intercept`` set, train_x and valid_x hold only the features and
+    the backend appends the column of ones while copying them, which saves
+    a full copy of the data compared to munge().
+    """
 
     self.double_precision1, m_train, n1 = _data_info(train_x, self.verbose)
     self.m_train = m_train
@@ -345,6 +466,8 @@ def upload_data(self,
         n = n1
     elif n2 >= 0:
         n = n2
+    if n >= 0 and intercept:
+        n += 1
     self.n = n
 
     # ############## #
@@ -368,11 +491,12 @@ def upload_data(self,
     d = None
     e = None
 
-    A = train_x
-    B = train_y
-    C = valid_x
-    D = valid_y
-    E = sample_weight
+    # The backend reads the matrices in self.ord, so hand it their own
+    # buffers: the 1-D typemaps would make C ordered copies of Fortran
+    # ordered matrices, which the backend would then read as column major.
+    A, B, C, D, E = [
+        None if x is None else np.ravel(x, order='K')
+        for x in (train_x, train_y, valid_x, valid_y, sample_weight)]
 
     if self.double_precision == 1:
         c_upload_data = self.lib.make_ptr_double
@@ -385,13 +509,14 @@ def upload_data(self,
         return a, b, c, d, e
 
     status, a, b, c, d, e = c_upload_data(
-        self._shared_a,  # pylint: disable=W0212
+        0,  # always upload a copy, the backend handles sharing itself
         self.source_me,
         source_dev,
         m_train,
         n,
         m_valid,
         self.ord,
+        1 if intercept else 0,
         A,
         B,
         C,
@@ -418,26 +543,335 @@ def upload_data(self,
            WrappedPointer(e, self.double_precision == 1, self.lib)
 
 
+def _to_csc(data, fit_intercept=False, dtype=None):
+    """Convert sparse features to CSC with 32 bit indices without
+    densifying them.
+
+    :param data: scipy.sparse matrix or array_like
+    :param fit_intercept: Append the intercept column of ones
+    :param dtype: np.float32 or np.float64, default is the dtype of data
+    :return: csc_matrix
+    """
+    data = scipy.sparse.csc_matrix(data)
+    if dtype is None:
+        dtype = data.dtype
+    if dtype != np.float32 and dtype != np.float64:
+        dtype = np.float32
+    if fit_intercept:
+        data = scipy.sparse.hstack(
+            [data, np.ones((data.shape[0], 1), dtype=dtype)], format='csc')
+    data = data.astype(dtype, copy=False)
+    data.sum_duplicates()
+    if data.nnz >= np.iinfo(np.int32).max:
+        raise ValueError('Sparse data has %d nonzeros but at most %d are '
+                         'supported' % (data.nnz, np.iinfo(np.int32).max - 1))
+    data.indices = data.indices.astype(np.int32, copy=False)
+    data.indptr = data.indptr.astype(np.int32, copy=False)
+    return data
+
+
+def prepare_sparse_data(self,
+                        train_x=None,
+                        train_y=None,
+                        valid_x=None,
+                        valid_y=None,
+                        sample_weight=None):
+    """ Prepare sparse data for the backend, which reads it in place
+
+    The features are kept sparse (CSC with the intercept column appended),
+    so memory stays proportional to the number of nonzeros.
+    """
+    time_prepare0 = time.time()
+    train_x = _to_csc(train_x, self.fit_intercept, self.dtype)
+    self.dtype = train_x.dtype
+    if valid_x is not None:
+        if not scipy.sparse.issparse(valid_x):
+            valid_x, _, _ = _to_np(valid_x, ismatrix=True, dtype=self.dtype)
+        valid_x = _to_csc(valid_x, self.fit_intercept, self.dtype)
+
+    def _vector(data):
+        if data is None:
+            return None
+        data, _, _ = _to_np(data, dtype=self.dtype)
+        return np.ascontiguousarray(np.ravel(data))
+
+    train_y = _vector(train_y)
+    valid_y = _vector(valid_y)
+    sample_weight = _vector(sample_weight)
+
+    self.m_train, self.n = train_x.shape
+    self.m_valid = 0
+    if train_y is None or train_y.shape[0] != self.m_train:
+        raise ValueError('training X and Y must have same number of rows')
+    if sample_weight is not None and sample_weight.shape[0] != self.m_train:
+        raise ValueError('training X and sample_weight must have same '
+                         'number of rows')
+    if valid_x is not None:
+        if valid_x.shape[1] != self.n:
+            raise ValueError(
+                'train_x and valid_x must have same number of columns, '
+                'but n=%d n2=%d\n' % (self.n, valid_x.shape[1]))
+        self.m_valid = valid_x.shape[0]
+        if valid_y is not None and valid_y.shape[0] != self.m_valid:
+            raise ValueError('valid_x and valid_y must have same number of '
+                             'rows, but m_valid=%d m_valid_y=%d\n' %
+                             (self.m_valid, valid_y.shape[0]))
+    # one scan of the nonzeros, the backend would only find them while
+    # computing lambda_max
+    for name, data in [('x', train_x.data), ('y', train_y),
+                       ('valid_x', valid_x.data
+                        if valid_x is not None else None),
+                       ('valid_y', valid_y), ('sample_weight', sample_weight)]:
+        if data is not None:
+            _check_data_content(1, name, data)
+
+    self.double_precision = 1 if self.dtype == np.float64 else 0
+    self.ord = 'c'
+    self.time_prepare = time.time() - time_prepare0
+    self.time_upload_data = 0
+
+    self.a = None
+    self.b = None
+    self.c = None
+    self.d = None
+    self.e = None
+    self._sparse_data = (train_x, train_y, valid_x, valid_y, sample_weight)
+    return self._sparse_data
+
+
+# values per row block (64MB of float64) when streaming a np.memmap
+_BLOCK_VALUES = 1 << 23
+
+# entries of the sums of GramStats in src/common/coordinate_descent.h
+(_GRAM_ROWS, _GRAM_W, _GRAM_WY, _GRAM_WYY, _GRAM_Y, _GRAM_YY, _GRAM_MIN,
+ _GRAM_MAX, _GRAM_SUMS) = range(9)
+
+
+def is_out_of_core(data):
+    """Whether data is streamed in row blocks instead of being loaded:
+    a np.memmap or an iterator of row blocks."""
+    return isinstance(data, (np.memmap, collections.abc.Iterator))
+
+
+def row_blocks(x, y=None, weight=None):
+    """Iterate over out-of-core data in blocks of rows.
+
+    :param x: np.memmap (or any array) of features, read a block at a time,
+        or an iterator of (x, y), (x, y, weight) or x blocks
+    :param y: Response of the rows of an array x
+    :param weight: Weights of the rows of an array x
+    :return: iterator of (x, y, weight) blocks, y and weight can be None
+    """
+    if isinstance(x, collections.abc.Iterator):
+        if y is not None or weight is not None:
+            raise ValueError('The response and weights of an iterator of row '
+                             'blocks must come with each block')
+        for block in x:
+            if not isinstance(block, tuple):
+                block = (block,)
+            if not 1 <= len(block) <= 3:
+                raise ValueError('Row blocks should be x, (x, y) or '
+                                 '(x, y, weight) but got a tuple of %d' %
+                                 len(block))
+            yield block + (None,) * (3 - len(block))
+        return
+
+    m = x.shape[0]
+    for name, data in [('y', y), ('weight', weight)]:
+        if data is not None and np.shape(data)[0] != m:
+            raise ValueError('x and %s must have same number of rows, but '
+                             'got %d and %d' % (name, m, np.shape(data)[0]))
+    n = x.shape[1] if len(x.shape) > 1 else 1
+    chunk_rows = max(1, _BLOCK_VALUES // n)
+    for start in range(0, m, chunk_rows):
+        stop = min(start + chunk_rows, m)
+        yield (x[start:stop], y[start:stop] if y is not None else None,
+               weight[start:stop] if weight is not None else None)
+
+
+def gram_stats(blocks, n_folds=1, fold_assignment='contiguous', m=None,
+               seed=None, fit_intercept=False):
+    """Accumulate the statistics the elastic net needs from the data in one
+    pass over its row blocks, so the data never has to fit in memory.
+
+    With the rows a_i (intercept column appended), response y_i and weights
+    w_i of each fold, these are the Gram matrix sum_i w_i a_i a_i^T,
+    b = sum_i w_i y_i a_i and the sums of GramStats (kept in float64).
+
+    :param blocks: iterator of (x, y, weight) row blocks, weight can be None
+    :param n_folds: Number of cross validation folds
+    :param fold_assignment: 'contiguous' (blocks of consecutive rows if m
+        is known, else rows dealt round-robin), 'random' (rows dealt to
+        random folds) or array_like with the fold of each row
+    :param m: Number of rows if known
+    :param seed: Seed of the 'random' folds
+    :param fit_intercept: Append the intercept column of ones
+    :return: gram (n_sets, n, n), b (n_sets, n) and sums (n_sets, 8) with
+        n_sets = max(n_folds, 1), the dtype of the first block of features
+    """
+    n_sets = max(n_folds, 1)
+    if n_sets > 1 and isinstance(fold_assignment, str):
+        if fold_assignment == 'stratified':
+            raise ValueError("fold_assignment='stratified' is not supported "
+                             "for out-of-core data")
+        if fold_assignment not in ['contiguous', 'random']:
+            raise ValueError("fold_assignment should be 'contiguous', "
+                             "'random' or an array but got " +
+                             fold_assignment)
+    elif n_sets > 1:
+        fold_assignment = np.ravel(fold_assignment)
+    rng = np.random.RandomState(seed)
+
+    gram = b = sums = dtype = None
+    start = 0
+    for x, y, weight in blocks:
+        if y is None:
+            raise ValueError('Rows need a response')
+        if dtype is None:
+            dtype = np.asarray(x[:0]).dtype
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            x = x.reshape((-1, 1))
+        y = np.ravel(np.asarray(y, dtype=np.float64))
+        weight = np.ones_like(y) if weight is None else \
+            np.ravel(np.asarray(weight, dtype=np.float64))
+        rows = x.shape[0]
+        if y.shape[0] != rows or weight.shape[0] != rows:
+            raise ValueError('Row block has %d rows of features, %d of '
+                             'response and %d weights' %
+                             (rows, y.shape[0], weight.shape[0]))
+        for name, data in [('x', x), ('y', y), ('weight', weight)]:
+            _check_data_content(1, name, data)
+        x = munge(x, fit_intercept)
+        if gram is None:
+            n = x.shape[1]
+            gram = np.zeros((n_sets, n, n))
+            b = np.zeros((n_sets, n))
+            sums = np.zeros((n_sets, _GRAM_SUMS))
+            sums[:, _GRAM_MIN] = np.inf
+            sums[:, _GRAM_MAX] = -np.inf
+        elif x.shape[1] != gram.shape[1]:
+            raise ValueError('Row blocks have %d and %d columns' %
+                             (gram.shape[1] - fit_intercept,
+                              x.shape[1] - fit_intercept))
+
+        if n_sets == 1:
+            folds = np.zeros(rows, dtype=np.int32)
+        elif not isinstance(fold_assignment, str):
+            folds = fold_assignment[start:start + rows]
+            if folds.shape[0] != rows:
+                raise ValueError('fold_assignment has %d entries but there '
+                                 'are more training rows' %
+                                 fold_assignment.shape[0])
+            if folds.min() < 0 or folds.max() >= n_sets:
+                raise ValueError('Fold ids must be in [0, %d)' % n_sets)
+        elif fold_assignment == 'random':
+            folds = rng.randint(n_sets, size=rows)
+        elif m is not None:
+            folds = np.arange(start, start + rows) * n_sets // m
+        else:
+            folds = np.arange(start, start + rows) % n_sets
+        start += rows
+
+        for f in np.unique(folds):
+            sel = folds == f
+            xf, yf, wf = x[sel], y[sel], weight[sel]
+            gram[f] += np.dot(xf.T * wf, xf)
+            b[f] += np.dot(xf.T, wf * yf)
+            sums[f, _GRAM_ROWS] += yf.shape[0]
+            sums[f, _GRAM_W] += wf.sum()
+            sums[f, _GRAM_WY] += np.dot(wf, yf)
+            sums[f, _GRAM_WYY] += np.dot(wf, yf * yf)
+            sums[f, _GRAM_Y] += yf.sum()
+            sums[f, _GRAM_YY] += np.dot(yf, yf)
+            sums[f, _GRAM_MIN] = min(sums[f, _GRAM_MIN], yf.min())
+            sums[f, _GRAM_MAX] = max(sums[f, _GRAM_MAX], yf.max())
+
+    if gram is None:
+        raise ValueError('No training rows')
+    counts = sums[:, _GRAM_ROWS]
+    if n_sets > 1 and ((counts == 0).any() or (counts == start).any()):
+        raise ValueError('Every fold needs held-out and training rows, '
+                         'got fold sizes %s' % counts.astype(int).tolist())
+    return gram, b, sums, dtype
+
+
+def prepare_gram_data(self,
+                      train_x=None,
+                      train_y=None,
+                      valid_x=None,
+                      valid_y=None,
+                      sample_weight=None):
+    """ Prepare out-of-core data for the backend by streaming it once
+
+    Only the Gram statistics of each fold (and of the validation data) are
+    kept, so memory is O(n^2) plus one block of rows however many rows
+    there are.
+    """
+    time_prepare0 = time.time()
+    m_train = None if isinstance(train_x, collections.abc.Iterator) \
+        else train_x.shape[0]
+    n_folds = self.n_folds if self.n_folds > 1 else 1
+    gram, b, sums, dtype = gram_stats(
+        row_blocks(train_x, train_y, sample_weight), n_folds,
+        self.fold_assignment, m_train, self.fold_seed, self.fit_intercept)
+    if self.dtype is None:
+        self.dtype = dtype
+    if self.dtype != np.float32 and self.dtype != np.float64:
+        self.dtype = np.float32
+
+    self.m_train = int(sums[:, _GRAM_ROWS].sum())
+    self.n = gram.shape[1]
+    self.m_valid = 0
+    valid = (None, None, None)
+    if valid_x is not None:
+        if valid_y is None and not isinstance(valid_x,
+                                              collections.abc.Iterator):
+            raise ValueError('valid_y is needed with valid_x for '
+                             'out-of-core data')
+        vgram, vb, vsums, _ = gram_stats(
+            row_blocks(valid_x, valid_y), fit_intercept=self.fit_intercept)
+        if vgram.shape[1] != self.n:
+            raise ValueError(
+                'train_x and valid_x must have same number of columns, '
+                'but n=%d n2=%d\n' % (self.n, vgram.shape[1]))
+        self.m_valid = int(vsums[0, _GRAM_ROWS])
+        valid = (np.ravel(vgram).astype(self.dtype), np.ravel(vb).astype(
+            self.dtype), np.ravel(vsums))
+
+    self.double_precision = 1 if self.dtype == np.float64 else 0
+    self.ord = 'c'
+    self.time_prepare = time.time() - time_prepare0
+    self.time_upload_data = 0
+
+    self.a = None
+    self.b = None
+    self.c = None
+    self.d = None
+    self.e = None
+    self._gram_data = (np.ravel(gram).astype(self.dtype),
+                       np.ravel(b).astype(self.dtype), np.ravel(sums)) + valid
+    return self._gram_data
+
+
 def free_sols(self):
+    # Solution buffers are owned by the arrays returned by native_array(),
+    # so only drop our references and let the last view release them.
     if self.did_fit_ptr == 1:
         self.did_fit_ptr = 0
-        if self.double_precision == 1:
-            self.lib.modelfree2_double(self.x_vs_alpha_lambda)
-            self.lib.modelfree2_double(self.x_vs_alpha)
-        else:
-            self.lib.modelfree2_float(self.x_vs_alpha_lambda)
-            self.lib.modelfree2_float(self.x_vs_alpha)
+        self.x_vs_alpha_lambda = None
+        self.x_vs_alpha = None
+        self.x_vs_alpha_lambdanew = None
+        self.x_vs_alphanew = None
 
 
 def free_preds(self):
     if self.did_predict == 1:
         self.did_predict = 0
-        if self.double_precision == 1:
-            self.lib.modelfree2_double(self.valid_pred_vs_alpha_lambda)
-            self.lib.modelfree2_double(self.valid_pred_vs_alpha)
-        else:
-            self.lib.modelfree2_float(self.valid_pred_vs_alpha_lambda)
-            self.lib.modelfree2_float(self.valid_pred_vs_alpha)
+        self.valid_pred_vs_alpha_lambda = None
+        self.valid_pred_vs_alpha = None
+        self.valid_pred_vs_alpha_lambdanew = None
+        self.valid_pred_vs_alphanew = None
 
 def finish(self):
     import warnings
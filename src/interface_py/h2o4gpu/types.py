@@ -34,6 +34,9 @@ class H2OSolverDefault(object):
     WARM_START = 0  # warm_start = False
     N_DEV = 1  # number of cuda devices =1
     W_DEV = 0  # which cuda devices (0)
+    ANDERSON = 0  # anderson = 0, plain ADMM
+    EIGEN = 0  # eigen = False, Cholesky factor per rho
+    CACHE_BYTES = 0  # cache_bytes = 0, default memory for cached factors
 
 #H2O4GPU types
 class Solution(object):
@@ -62,6 +65,9 @@ def change_settings(settings, **kwargs):
     if 'adaptive_rho' in kwargs: settings.adaptive_rho = kwargs['adaptive_rho']
     if 'equil' in kwargs: settings.equil = kwargs['equil']
     if 'gap_stop' in kwargs: settings.gap_stop = kwargs['gap_stop']
+    if 'anderson' in kwargs: settings.anderson = kwargs['anderson']
+    if 'eigen' in kwargs: settings.eigen = kwargs['eigen']
+    if 'cache_bytes' in kwargs: settings.cache_bytes = kwargs['cache_bytes']
 
     #warm_start must be specified each time it is desired
     if 'warm_start' in kwargs:
@@ -103,6 +109,12 @@ def make_settings(double_precision=False, **kwargs):
         kwargs.keys()) else H2OSolverDefault.N_DEV
     settings.wdev = kwargs['wDev'] if 'wDev' in list(
         kwargs.keys()) else H2OSolverDefault.W_DEV
+    settings.anderson = kwargs['anderson'] if 'anderson' in list(
+        kwargs.keys()) else H2OSolverDefault.ANDERSON
+    settings.eigen = kwargs['eigen'] if 'eigen' in list(
+        kwargs.keys()) else H2OSolverDefault.EIGEN
+    settings.cache_bytes = kwargs['cache_bytes'] if 'cache_bytes' in list(
+        kwargs.keys()) else H2OSolverDefault.CACHE_BYTES
     return settings
 
 def change_solution(py_solution, **kwargs):
@@ -130,10 +142,20 @@ def make_info(double_precision):
     info.obj = inf
     info.rho = 0
     info.solvetime = 0
+    info.cache_hits = 0
+    info.factorizations = 0
+    info.factor_time = 0
     return info
 
 class FunctionVector(object):
-    """Class representing a function"""
+    """Class representing a function
+
+    One function c * h(a * x - b) + d * x + e * x * x / 2 per element, with
+    the kinds in h and the parameters in a, b, c, d and e. The solver keeps
+    them as the native FunctionVector: a parameter equal on every element is
+    stored once, and consecutive elements of one kind are evaluated together
+    with a single dispatch on the kind.
+    """
 
     def __init__(self, length, double_precision=False):
         T = np.float64 if double_precision else np.float32
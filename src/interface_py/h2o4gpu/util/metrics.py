@@ -225,30 +225,53 @@ def tied_rank(x):
     """
     Computes the tied rank of elements in x.
 
-    This function computes the tied rank of elements in x.
+    This function computes the tied rank of elements in x. Tied elements
+    share the average of the ranks they span.
 
     :param x: list of numbers, numpy array
 
-    :returns: list of numbers
-            The tied rank f each element in x
-    """
-    sorted_x = sorted(zip(x, range(len(x))))
-    r = [0] * len(x)
-    cur_val = sorted_x[0][0]
-    last_rank = 0
-    for i, e in enumerate(sorted_x):
-        if cur_val != e[0]:
-            cur_val = e[0]
-            for j in range(last_rank, i):
-                r[sorted_x[j][1]] = float(last_rank + 1 + i) / 2.0
-            last_rank = i
-        if i == len(sorted_x) - 1:
-            for j in range(last_rank, i + 1):
-                r[e[1]] = float(last_rank + i + 2) / 2.0
+    :returns: numpy array
+            The tied rank of each element in x
+    """
+    x = np.asarray(x).ravel()
+    r = np.empty(x.shape[0])
+    if x.shape[0] == 0:
+        return r
+    order = np.argsort(x, kind='mergesort')
+    sorted_x = x[order]
+    starts = np.flatnonzero(np.r_[True, sorted_x[1:] != sorted_x[:-1]])
+    ends = np.r_[starts[1:], x.shape[0]]
+    r[order] = np.repeat((starts + ends + 1) / 2.0, ends - starts)
     return r
 
 
-def auc(actual, posterior):
+def _binary_clf_curve(actual, posterior, sample_weight=None):
+    """
+    Cumulative weighted true and false positives per distinct threshold.
+
+    Thresholds are visited from the highest posterior down, rows equal to
+    1 in actual count as positives. The inputs are only read, so float32
+    arrays are sorted as they are; only the running sums are float64.
+
+    :returns: tuple of numpy arrays (fps, tps)
+    """
+    actual = np.asarray(actual).ravel()
+    posterior = np.asarray(posterior).ravel()
+    order = np.argsort(posterior, kind='mergesort')[::-1]
+    sorted_posterior = posterior[order]
+    positive = actual[order] == 1
+    if sample_weight is None:
+        tps = np.cumsum(positive, dtype=np.float64)
+        fps = np.arange(1, positive.shape[0] + 1, dtype=np.float64) - tps
+    else:
+        weight = np.asarray(sample_weight).ravel()[order]
+        tps = np.cumsum(weight * positive, dtype=np.float64)
+        fps = np.cumsum(weight, dtype=np.float64) - tps
+    last = np.r_[sorted_posterior[1:] != sorted_posterior[:-1], True]
+    return fps[last], tps[last]
+
+
+def auc(actual, posterior, sample_weight=None):
     """
     Computes the area under the receiver-operater characteristic (AUC)
 
@@ -260,18 +283,72 @@ def auc(actual, posterior):
                        Defines a ranking on the binary numbers,
                        from most likely to be positive to least
                        likely to be positive.
+    :param sample_weight: numpy array or None
+                           sample weights
 
     :returns: double
              The AUC between actual and posterior
+    :raises ValueError: when actual holds only one class
+    """
+    fps, tps = _binary_clf_curve(actual, posterior, sample_weight)
+    if fps.shape[0] == 0 or fps[-1] == 0 or tps[-1] == 0:
+        raise ValueError("Only one class present in actual. "
+                         "AUC is not defined in that case.")
+    fps = np.r_[0.0, fps]
+    tps = np.r_[0.0, tps]
+    area_under_curve = np.sum(np.diff(fps) * (tps[1:] + tps[:-1])) / 2.0
+    return float(area_under_curve / (fps[-1] * tps[-1]))
+
+
+def pr_auc(actual, posterior, sample_weight=None):
     """
-    r = tied_rank(posterior)
-    num_positive = len([0 for x in actual if x == 1])
-    num_negative = len(actual) - num_positive
-    sum_positive = sum([r[i] for i in range(len(r)) if actual[i] == 1])
-    area_under_curve = ((sum_positive - num_positive *
-                         (num_positive + 1) / 2.0) /
-                        (num_negative * num_positive))
-    return area_under_curve
+    Computes the area under the precision-recall curve (PR-AUC)
+
+    This function computes the PR-AUC as the average precision, i.e.
+    the precision at each threshold weighted by the increase in recall.
+
+    :param actual: list of binary numbers, numpy array
+                    The ground truth value
+    :param posterior: same type as actual
+                       Defines a ranking on the binary numbers,
+                       from most likely to be positive to least
+                       likely to be positive.
+    :param sample_weight: numpy array or None
+                           sample weights
+
+    :returns: double
+             The PR-AUC between actual and posterior
+    :raises ValueError: when actual holds no positive rows
+    """
+    fps, tps = _binary_clf_curve(actual, posterior, sample_weight)
+    if fps.shape[0] == 0 or tps[-1] == 0:
+        raise ValueError("No positive class present in actual. "
+                         "PR-AUC is not defined in that case.")
+    precision = tps / (tps + fps)
+    recall_gain = np.diff(np.r_[0.0, tps])
+    return float(np.sum(recall_gain * precision) / tps[-1])
+
+
+def gini(actual, posterior, sample_weight=None):
+    """
+    Computes the Gini coefficient
+
+    This function computes the Gini coefficient, 2 * AUC - 1.
+
+    :param actual: list of binary numbers, numpy array
+                    The ground truth value
+    :param posterior: same type as actual
+                       Defines a ranking on the binary numbers,
+                       from most likely to be positive to least
+                       likely to be positive.
+    :param sample_weight: numpy array or None
+                           sample weights
+
+    :returns: double
+             The Gini coefficient between actual and posterior
+    :raises ValueError: when actual holds only one class
+    """
+    return 2.0 * auc(actual, posterior, sample_weight) - 1.0
 
 
 def f05_opt(actual, predicted, sample_weight=None):
@@ -397,6 +474,59 @@ def acc_opt(actual, predicted, sample_weight=None):
     return lib.acc_opt(actual.ravel(), predicted.ravel(),
                        sample_weight.ravel())
 
+
+_THRESHOLD_METRICS = ['mcc', 'f05', 'f1', 'f2', 'acc']
+
+
+def threshold_metrics(actual, predicted, sample_weight=None,
+                      metrics=('mcc', 'f05', 'f1', 'f2', 'acc')):
+    """
+    Computes several metrics after optimal predictions thresholding.
+
+    This function sorts the predictions once and sweeps all thresholds
+    once, maximizing every requested metric in the same pass. float32
+    inputs are passed to the native library without conversion.
+
+    :param actual: numpy array
+                    The ground truth value
+    :param predicted: numpy array
+                       The predicted value
+    :param sample_weight: numpy array or None
+                           sample weights
+    :param metrics: list of str
+                     Any of 'mcc', 'f05', 'f1', 'f2' and 'acc'
+
+    :returns: dict
+             Maps every metric name to its (optimal score, threshold),
+             where rows with predicted >= threshold count as positive
+    """
+    unknown = [metric for metric in metrics
+               if metric not in _THRESHOLD_METRICS]
+    if unknown:
+        raise ValueError("Unknown threshold metrics %s, expected any of %s"
+                         % (unknown, _THRESHOLD_METRICS))
+    from ..libs.lib_utils import CPUlib
+    lib = CPUlib.get()
+    dtype = np.float32 if np.asarray(predicted).dtype == np.float32 \
+        else np.float64
+    actual = np.ravel(np.asarray(actual, dtype=dtype))
+    predicted = np.ravel(np.asarray(predicted, dtype=dtype))
+    if sample_weight is None:
+        sample_weight = np.empty(0, dtype=dtype)
+    else:
+        sample_weight = np.ravel(np.asarray(sample_weight, dtype=dtype))
+    ids = np.array([_THRESHOLD_METRICS.index(metric) for metric in metrics],
+                   dtype=np.int32)
+    res = np.zeros((len(metrics), 2))
+    if dtype == np.float32:
+        lib.threshold_metrics_float(actual, predicted, sample_weight, ids,
+                                    res)
+    else:
+        lib.threshold_metrics_double(actual, predicted, sample_weight, ids,
+                                     res)
+    return {metric: (res[i, 0], res[i, 1]) for i, metric in enumerate(metrics)}
+
+
 def confusion_matrices(actual, predicted, sample_weight=None):
     """
     Computes confusion matrices for ROC analysis.
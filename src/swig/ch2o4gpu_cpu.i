@@ -13,5 +13,8 @@
 %include "solver/kmeans.i"
 %include "solver/elastic_net.i"
 %include "solver/pogs.i"
+%include "solver/factorization.i"
+%include "solver/pca.i"
+%include "solver/tsvd.i"
 %include "matrix/matrix_dense.i"
 %include "metrics.i"
\ No newline at end of file
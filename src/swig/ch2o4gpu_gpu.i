@@ -12,8 +12,13 @@
 %include "cpointer.i"
 %include "solver/kmeans.i"
 %include "solver/elastic_net.i"
+// sparse input is only decomposed on the CPU
+%ignore pca::pca_csr_float;
+%ignore pca::pca_csr_double;
 %include "solver/pca.i"
 %include "solver/pogs.i"
+%ignore tsvd::truncated_svd_csr_float;
+%ignore tsvd::truncated_svd_csr_double;
 %include "solver/tsvd.i"
 %include "solver/factorization.i"
 %include "matrix/matrix_dense.i"
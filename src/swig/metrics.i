@@ -6,6 +6,11 @@
 %apply (double* IN_ARRAY1, int DIM1) {(double *y, int n),
                                       (double *yhat, int m),
                                       (double *w, int l)};
-%apply (double* INPLACE_ARRAY2, int DIM1, int DIM2) {(double *cm, int k, int j)};
+%apply (float* IN_ARRAY1, int DIM1) {(float *y, int n),
+                                     (float *yhat, int m),
+                                     (float *w, int l)};
+%apply (int* IN_ARRAY1, int DIM1) {(int *metrics, int k)};
+%apply (double* INPLACE_ARRAY2, int DIM1, int DIM2) {(double *cm, int k, int j),
+                                                     (double *res, int r, int c)};
 
 %include "../include/metrics/metrics.h"
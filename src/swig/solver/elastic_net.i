@@ -1,11 +1,12 @@
 /* File : elastic_net.i */
 %{
+#include <stdexcept>
 #include "../../common/elastic_net_ptr.h"
 
-extern int make_ptr_double(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord,
+extern int make_ptr_double(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord, int intercept,
                         const double* trainX, const double* trainY, const double* validX, const double* validY, const double *weight,
                         double** a, double** b, double** c, double** d, double** e);
-extern int make_ptr_float(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord,
+extern int make_ptr_float(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord, int intercept,
                        const float* trainX, const float* trainY, const float* validX, const float* validY, const float *weight,
                        float** a, float** b, float** c, float** d, float** e);
 
@@ -55,16 +56,41 @@ extern int make_ptr_float(int sharedA, int sourceme, int sourceDev, size_t mTrai
     }
 }
 
-%apply (float *IN_ARRAY1) {float *alphas, float *lambdas, float* trainX, float* trainY, float* validX, float* validY, float *weight};
-%apply (double *IN_ARRAY1) {double *alphas, double *lambdas, double* trainX, double* trainY, double* validX, double* validY, double *weight};
+%apply (float *IN_ARRAY1) {float *alphas, float *lambdas, float* trainX, float* trainY, float* validX, float* validY, float *weight,
+                           float *trainval, float *validval, float *traingram, float *trainb, float *validgram, float *validb};
+%apply (double *IN_ARRAY1) {double *alphas, double *lambdas, double* trainX, double* trainY, double* validX, double* validY, double *weight,
+                            double *trainval, double *validval, double *traingram, double *trainb, double *validgram, double *validb,
+                            double *trainsums, double *validsums};
 
-%apply size_t *INOUT {size_t *countfull, size_t *countshort, size_t *countmore}
+%apply (int *IN_ARRAY1) {int *foldid, int *trainind, int *trainptr, int *validind, int *validptr};
+
+%apply size_t *INOUT {size_t *countfull, size_t *countshort, size_t *countmore,
+                      size_t *cachehits, size_t *factorizations}
+%apply double *INOUT {double *factortime}
+
+// invalid input (e.g. fold ids) is thrown by the solver, raise it in Python
+%exception {
+    try {
+        $action
+    } catch (const std::invalid_argument &e) {
+        PyErr_SetString(PyExc_ValueError, e.what());
+        SWIG_fail;
+    } catch (const std::exception &e) {
+        PyErr_SetString(PyExc_RuntimeError, e.what());
+        SWIG_fail;
+    } catch (const char *e) {
+        PyErr_SetString(PyExc_ValueError, e);
+        SWIG_fail;
+    }
+}
 
 %include "../../common/elastic_net_ptr.h"
 
-extern int make_ptr_double(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord,
+%exception;
+
+extern int make_ptr_double(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord, int intercept,
                         const double* trainX, const double* trainY, const double* validX, const double* validY, const double *weight,
                         double** a, double** b, double** c, double** d, double** e);
-extern int make_ptr_float(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord,
+extern int make_ptr_float(int sharedA, int sourceme, int sourceDev, size_t mTrain, size_t n, size_t mValid, const char ord, int intercept,
                        const float* trainX, const float* trainY, const float* validX, const float* validY, const float *weight,
                        float** a, float** b, float** c, float** d, float** e);
\ No newline at end of file
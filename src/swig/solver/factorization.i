@@ -33,10 +33,9 @@
     %append_output(SWIG_NewPointerObj(%as_voidptr(*$1), $*1_descriptor, 0));
 }
 
-%apply (int *IN_ARRAY1) {int* csrRowIndexHostPtr, int* csrColIndexHostPtr, int* cscRowIndexHostPtr,
-                         int* cscColIndexHostPtr, int* cooRowIndexHostPtr, int* cooColIndexHostPtr,
-                         int* cooRowIndexTestHostPtr, int* cooColIndexTestHostPtr};
-%apply (float *IN_ARRAY1) {float* dst, float* csrValHostPtr, float* cscValHostPtr, float* cooValHostPtr, float* thetaTHost, float* XTHost, float* cooValTestHostPtr};
-%apply (double *IN_ARRAY1) {double* dst, double* csrValHostPtr, double* cscValHostPtr, double* cooValHostPtr, double* thetaTHost, double* XTHost, double* cooValTestHostPtr};
+%apply (int *IN_ARRAY1) {int* csrRowIndexHostPtr, int* csrColIndexHostPtr,
+                         int* csrRowIndexTestHostPtr, int* csrColIndexTestHostPtr};
+%apply (float *IN_ARRAY1) {float* dst, float* csrValHostPtr, float* thetaTHost, float* XTHost, float* csrValTestHostPtr};
+%apply (double *IN_ARRAY1) {double* dst, double* csrValHostPtr, double* thetaTHost, double* XTHost, double* csrValTestHostPtr};
 
 %include "../../include/solver/factorization.h"
@@ -13,4 +13,8 @@
 %apply (float *INPLACE_FARRAY2) {float *_Q, float *_U, float *_X_transformed, float *_mean};
 %apply (float *INPLACE_ARRAY1) {float *_w, float *_mean, float *_explained_variance, float *_explained_variance_ratio};
 
+%apply (float *IN_ARRAY1) {const float *_X_data};
+%apply (double *IN_ARRAY1) {const double *_X_data};
+%apply (int *IN_ARRAY1) {const int *_X_indices, const int *_X_indptr};
+
 %include "../../include/solver/pca.h"
\ No newline at end of file
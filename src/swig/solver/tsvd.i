@@ -8,9 +8,17 @@
 %apply (float *IN_FARRAY2) {float *_X};
 %apply (float *INPLACE_FARRAY2) {float *_Q, float *_U, float *_X_transformed};
 %apply (float *INPLACE_ARRAY1) {float *_w, float *_explained_variance, float *_explained_variance_ratio};
+%apply (float *IN_FARRAY2) {const float *_components};
+%apply (float *IN_ARRAY1) {const float *_mean};
 
 %apply (double *IN_FARRAY2) {double *_X};
 %apply (double *INPLACE_FARRAY2) {double *_Q, double *_U, double *_X_transformed};
 %apply (double *INPLACE_ARRAY1) {double *_w, double *_explained_variance, double *_explained_variance_ratio};
+%apply (double *IN_FARRAY2) {const double *_components};
+%apply (double *IN_ARRAY1) {const double *_mean};
+
+%apply (float *IN_ARRAY1) {const float *_X_data};
+%apply (double *IN_ARRAY1) {const double *_X_data};
+%apply (int *IN_ARRAY1) {const int *_X_indices, const int *_X_indptr};
 
 %include "../../include/solver/tsvd.h"
\ No newline at end of file
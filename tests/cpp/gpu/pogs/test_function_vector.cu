@@ -0,0 +1,216 @@
+#include "gtest/gtest.h"
+
+#include "prox_lib.h"
+#include <cmath>
+#include <functional>
+#include <random>
+#include <vector>
+
+namespace {
+
+const Function kKinds[] = {kAbs,     kNegEntr, kExp,     kHuber,
+                           kIdentity, kIndBox01, kIndEq0,  kIndGe0,
+                           kIndLe0,  kLogistic, kMaxNeg0, kMaxPos0,
+                           kNegLog,  kRecipr,  kSquare,  kZero};
+
+// More elements than one block, with a partial last block
+const size_t kSize = 3 * kFunctionBlock + 37;
+
+template <typename T>
+void ExpectNear(T expected, T actual, T tol) {
+  EXPECT_NEAR(expected, actual, tol * (1 + std::abs(expected)));
+}
+
+template <typename T>
+std::vector<T> Uniform(std::mt19937 &gen, size_t size, T lo, T hi) {
+  std::uniform_real_distribution<T> dist(lo, hi);
+  std::vector<T> v(size);
+  for (size_t i = 0; i < size; ++i)
+    v[i] = dist(gen);
+  return v;
+}
+
+// Blocked ProxEval, FuncEval and ProjSubgradEval of f against the
+// FunctionObj versions on every element. The points x have a x - b > 0, in
+// the domain of every kind.
+template <typename T>
+void ExpectMatchesObjs(const FunctionVector<T> &f, unsigned int seed,
+                       T tol) {
+  const size_t size = f.size();
+  const std::vector<FunctionObj<T> > objs = f.ToObjs();
+  ASSERT_EQ(size, objs.size());
+
+  std::mt19937 gen(seed);
+  std::vector<T> z = Uniform<T>(gen, size, 0.1, 2);
+  std::vector<T> v = Uniform<T>(gen, size, -2, 2);
+  std::vector<T> x(size), out(size);
+  for (size_t i = 0; i < size; ++i) {
+    EXPECT_EQ(objs[i].h, f.Kind(i));
+    x[i] = (z[i] + objs[i].b) / objs[i].a;
+  }
+  const T rho = static_cast<T>(1.3);
+
+  ProxEval(f, rho, x.data(), out.data());
+  for (size_t i = 0; i < size; ++i)
+    ExpectNear(ProxEval(objs[i], x[i], rho), out[i], tol);
+
+  T sum = 0;
+  for (size_t i = 0; i < size; ++i)
+    sum += FuncEval(objs[i], x[i]);
+  ExpectNear(sum, FuncEval(f, x.data()), tol);
+
+  ProjSubgradEval(f, x.data(), v.data(), out.data());
+  for (size_t i = 0; i < size; ++i)
+    ExpectNear(ProjSubgradEval(objs[i], v[i], x[i]), out[i], tol);
+}
+
+// Per-element parameters with c, e >= 0 as the solver requires
+template <typename T>
+void SetPerElement(FunctionVector<T> *f, std::mt19937 &gen) {
+  const size_t size = f->size();
+  f->a.Set(Uniform<T>(gen, size, 0.5, 2).data(), size);
+  f->b.Set(Uniform<T>(gen, size, -1, 1).data(), size);
+  f->c.Set(Uniform<T>(gen, size, 0, 2).data(), size);
+  f->d.Set(Uniform<T>(gen, size, -1, 1).data(), size);
+  f->e.Set(Uniform<T>(gen, size, 0, 1).data(), size);
+}
+
+template <typename T>
+void SetShared(FunctionVector<T> *f) {
+  f->a.Set(static_cast<T>(1.5));
+  f->b.Set(static_cast<T>(0.25));
+  f->c.Set(static_cast<T>(2));
+  f->d.Set(static_cast<T>(-0.1));
+  f->e.Set(static_cast<T>(0.3));
+}
+
+// Kinds in runs of random length, some shorter and some longer than a block
+std::vector<int> MixedKinds(std::mt19937 &gen, size_t size) {
+  std::uniform_int_distribution<int> kind(0, 15), length(1, 400);
+  std::vector<int> kinds;
+  while (kinds.size() < size)
+    kinds.resize(std::min(size, kinds.size() + length(gen)),
+                 static_cast<int>(kKinds[kind(gen)]));
+  return kinds;
+}
+
+}  // namespace
+
+TEST(FunctionVector, SharedParamsMatchObjs) {
+  for (Function h : kKinds) {
+    SCOPED_TRACE(h);
+    FunctionVector<double> f(kSize, h);
+    SetShared(&f);
+    EXPECT_TRUE(f.a.Shared() && f.e.Shared());
+    EXPECT_EQ(1u, f.Runs().size());
+    ExpectMatchesObjs(f, 1, 1e-12);
+  }
+}
+
+TEST(FunctionVector, PerElementParamsMatchObjs) {
+  std::mt19937 gen(2);
+  for (Function h : kKinds) {
+    SCOPED_TRACE(h);
+    FunctionVector<double> f(kSize, h);
+    SetPerElement(&f, gen);
+    EXPECT_FALSE(f.a.Shared() || f.e.Shared());
+    ExpectMatchesObjs(f, 3, 1e-12);
+  }
+}
+
+TEST(FunctionVector, MixedRunsMatchObjs) {
+  std::mt19937 gen(4);
+  const std::vector<int> kinds = MixedKinds(gen, kSize);
+
+  FunctionVector<double> f(kSize);
+  f.SetKinds(kinds.data());
+  SetPerElement(&f, gen);
+  f.b.Set(0.5);
+  f.d.Set(0.0);
+  EXPECT_GT(f.Runs().size(), 2u);
+  for (size_t i = 0; i < kSize; ++i)
+    EXPECT_EQ(kinds[i], f.Kind(i));
+  ExpectMatchesObjs(f, 5, 1e-12);
+
+  FunctionVector<float> g(kSize);
+  g.SetKinds(kinds.data());
+  SetPerElement(&g, gen);
+  ExpectMatchesObjs(g, 6, 1e-5f);
+}
+
+TEST(FunctionVector, FromObjsKeepsEqualParamsShared) {
+  std::mt19937 gen(7);
+  const std::vector<int> kinds = MixedKinds(gen, kSize);
+  FunctionVector<double> f(kSize);
+  f.SetKinds(kinds.data());
+  SetPerElement(&f, gen);
+  f.c.Set(2.0);
+
+  FunctionVector<double> g(f.ToObjs());
+  EXPECT_TRUE(g.c.Shared());
+  EXPECT_FALSE(g.a.Shared());
+  EXPECT_EQ(f.Runs().size(), g.Runs().size());
+  ExpectMatchesObjs(g, 8, 1e-12);
+}
+
+TEST(FunctionVector, SelectMatchesObjs) {
+  std::mt19937 gen(9);
+  const std::vector<int> kinds = MixedKinds(gen, kSize);
+  FunctionVector<double> f(kSize);
+  f.SetKinds(kinds.data());
+  SetPerElement(&f, gen);
+  f.e.Set(0.2);
+
+  std::vector<size_t> idx;
+  for (size_t i = 0; i < kSize; i += 3)
+    idx.push_back(i);
+  FunctionVector<double> g = f.Select(idx);
+  EXPECT_TRUE(g.e.Shared());
+  for (size_t i = 0; i < idx.size(); ++i) {
+    EXPECT_EQ(f.Kind(idx[i]), g.Kind(i));
+    EXPECT_EQ(f.a[idx[i]], g.a[i]);
+  }
+  ExpectMatchesObjs(g, 10, 1e-12);
+}
+
+// Equilibration rescales a and d by s and e by s twice: shared parameters
+// refer to s instead of being expanded, and evaluate as the expanded ones.
+TEST(FunctionVector, RescaledSharedParamsStayShared) {
+  std::mt19937 gen(11);
+  const std::vector<int> kinds = MixedKinds(gen, kSize);
+  const std::vector<double> s = Uniform<double>(gen, kSize, 0.5, 2);
+
+  FunctionVector<double> f(kSize);
+  f.SetKinds(kinds.data());
+  SetShared(&f);
+  f.b.Set(Uniform<double>(gen, kSize, -1, 1).data(), kSize);
+  std::vector<FunctionObj<double> > expanded = f.ToObjs();
+  for (size_t i = 0; i < kSize; ++i) {
+    expanded[i].a /= s[i];
+    expanded[i].d /= s[i];
+    expanded[i].e = expanded[i].e / s[i] / s[i];
+  }
+
+  f.Apply(s.data(), std::divides<double>());
+  EXPECT_TRUE(f.a.Shared() && f.d.Shared() && f.e.Shared());
+  EXPECT_TRUE(f.a.values.empty() && f.e.values.empty());
+  EXPECT_TRUE(f.a.Scaled() && !f.c.Scaled());
+  for (size_t i = 0; i < kSize; ++i) {
+    EXPECT_EQ(expanded[i].a, f.a[i]);
+    EXPECT_EQ(expanded[i].e, f.e[i]);
+  }
+  ExpectMatchesObjs(f, 12, 1e-12);
+  ExpectMatchesObjs(FunctionVector<double>(expanded), 12, 1e-12);
+
+  std::vector<size_t> idx = {1, 5, kSize - 1};
+  FunctionVector<double> g = f.Select(idx);
+  for (size_t i = 0; i < idx.size(); ++i)
+    EXPECT_EQ(f.a[idx[i]], g.a[i]);
+
+  // a second rescaling by another vector expands the parameter
+  const std::vector<double> t(kSize, 2.0);
+  f.Apply(t.data(), std::multiplies<double>());
+  EXPECT_FALSE(f.a.Shared());
+  for (size_t i = 0; i < kSize; ++i)
+    EXPECT_EQ(expanded[i].a * 2.0, f.a[i]);
+}
@@ -0,0 +1,100 @@
+import numpy as np
+import scipy
+import scipy.sparse
+import h2o4gpu
+from sklearn.metrics import mean_squared_error
+
+
+def _make_ratings(m=600, n=400, rank=4, density=0.1):
+    np.random.seed(1234)
+    users = np.random.randn(m, rank)
+    items = np.random.randn(n, rank)
+    mask = np.random.rand(m, n) < density
+    row, col = np.nonzero(mask)
+    data = np.sum(users[row] * items[col], axis=1) + \
+        0.1 * np.random.randn(row.size)
+    test = np.random.rand(row.size) < 0.1
+    X = scipy.sparse.coo_matrix(
+        (data[~test].astype(np.float32), (row[~test], col[~test])),
+        shape=(m, n))
+    X_test = scipy.sparse.coo_matrix(
+        (data[test].astype(np.float32), (row[test], col[test])),
+        shape=(m, n))
+    return X, X_test
+
+
+def factorization_fit_predict(F, BATCHES=1):
+    X, X_test = _make_ratings()
+    scores = []
+    factorization = h2o4gpu.solvers.FactorizationH2O(
+        F, 0.01, max_iter=10, n_gpus=0)
+    factorization.fit(X.tocsc(), scores=scores, X_test=X_test,
+                      X_BATCHES=BATCHES, THETA_BATCHES=BATCHES)
+    X_pred = factorization.predict(X)
+    assert not np.any(np.isnan(X_pred.data))
+    assert np.allclose(np.sqrt(mean_squared_error(
+        X.data, X_pred.data)), scores[-1][0], rtol=1e-4)
+    assert scores[-1][0] < 0.2
+    assert scores[-1][1] < 0.5
+    return factorization
+
+
+def test_factorization_cpu_fit_predict(): factorization_fit_predict(8)
+
+
+def test_factorization_cpu_batches_match():
+    one = factorization_fit_predict(10)
+    three = factorization_fit_predict(10, BATCHES=3)
+    assert np.allclose(one.XT, three.XT, atol=1e-4)
+    assert np.allclose(one.thetaT, three.thetaT, atol=1e-4)
+
+
+def test_factorization_cpu_unrated_is_nan():
+    X, _ = _make_ratings()
+    X = scipy.sparse.coo_matrix(
+        (X.data, (X.row, X.col)), shape=(X.shape[0] + 1, X.shape[1]))
+    factorization = h2o4gpu.solvers.FactorizationH2O(
+        10, 0.01, max_iter=2, n_gpus=0)
+    factorization.fit(X)
+    assert np.all(np.isnan(factorization.XT[-1]))
+    assert not np.any(np.isnan(factorization.XT[:-1]))
+
+
+def test_factorization_cpu_input_formats_match():
+    X, X_test = _make_ratings()
+    scores = {}
+    factors = {}
+    for fmt in ['coo', 'csr', 'csc']:
+        np.random.seed(0)
+        scores[fmt] = []
+        factorization = h2o4gpu.solvers.FactorizationH2O(
+            10, 0.01, max_iter=3, n_gpus=0)
+        factorization.fit(X.asformat(fmt), X_test=X_test.asformat(fmt),
+                          scores=scores[fmt])
+        factors[fmt] = factorization.XT
+    for fmt in ['csr', 'csc']:
+        assert np.allclose(factors[fmt], factors['coo'])
+        assert np.allclose(scores[fmt], scores['coo'])
+
+
+def test_factorization_cpu_resume_on_converted_csr():
+    # int64 indices are converted once and the backend reads the converted
+    # arrays in place for every resumed fit
+    X, _ = _make_ratings()
+    X = X.tocsr()
+    wide = X.copy()
+    wide.indptr = wide.indptr.astype(np.int64)
+    wide.indices = wide.indices.astype(np.int64)
+    data = X.data.copy()
+
+    np.random.seed(0)
+    resumed = h2o4gpu.solvers.FactorizationH2O(10, 0.01, max_iter=2, n_gpus=0)
+    resumed.fit(wide, resume=True)
+    resumed.fit(wide, resume=True)
+    np.random.seed(0)
+    once = h2o4gpu.solvers.FactorizationH2O(10, 0.01, max_iter=4, n_gpus=0)
+    once.fit(X)
+
+    assert np.allclose(resumed.XT, once.XT, atol=1e-5)
+    assert np.allclose(resumed.thetaT, once.thetaT, atol=1e-5)
+    assert np.array_equal(X.data, data)
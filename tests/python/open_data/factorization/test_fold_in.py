@@ -0,0 +1,112 @@
+import numpy as np
+import scipy
+import scipy.sparse
+import h2o4gpu
+
+
+def _make_ratings(m=500, n=300, rank=4, density=0.15):
+    np.random.seed(1234)
+    users = np.random.randn(m, rank)
+    items = np.random.randn(n, rank)
+    mask = np.random.rand(m, n) < density
+    row, col = np.nonzero(mask)
+    data = np.sum(users[row] * items[col], axis=1) + \
+        0.1 * np.random.randn(row.size)
+    return scipy.sparse.csr_matrix(
+        (data.astype(np.float32), (row, col)), shape=(m, n))
+
+
+def _model(max_iter):
+    np.random.seed(0)
+    return h2o4gpu.solvers.FactorizationH2O(
+        10, 0.01, max_iter=max_iter, n_gpus=0)
+
+
+def _rmse(factorization, X, rows, cols):
+    """RMSE on the ratings in X[rows, cols], kept at their indices in X."""
+    X = X.tocoo()
+    keep = np.isin(X.row, np.arange(X.shape[0])[rows]) & \
+        np.isin(X.col, np.arange(X.shape[1])[cols])
+    X = scipy.sparse.coo_matrix(
+        (X.data[keep], (X.row[keep], X.col[keep])), shape=X.shape)
+    pred = factorization.predict(X)
+    return np.sqrt(np.mean((pred.data - X.data) ** 2))
+
+
+def test_fold_in_users_and_items():
+    X = _make_ratings()
+    factorization = _model(10).fit(X[:450, :250])
+
+    users = factorization.fold_in(X[450:, :250])
+    assert users.shape == (50, 10)
+    assert factorization.XT.shape == (500, 10)
+    assert np.all(factorization.XT[450:] == users)
+
+    items = factorization.fold_in(X[:, 250:], items=True)
+    assert items.shape == (50, 10)
+    assert factorization.thetaT.shape == (300, 10)
+
+    assert _rmse(factorization, X, slice(450, None), slice(None, 250)) < 0.15
+    assert _rmse(factorization, X, slice(None), slice(250, None)) < 0.15
+
+
+def test_fold_in_solves_half_step():
+    X = _make_ratings()
+    factorization = _model(5).fit(X)
+    thetaT = factorization.thetaT.copy()
+    users = factorization.fold_in(X[:3])
+
+    for user in range(3):
+        cols = X[user].indices
+        theta = thetaT[cols].astype(np.float64)
+        A = np.dot(theta.T, theta) + 0.01 * cols.size * np.eye(10)
+        expected = np.linalg.solve(A, np.dot(theta.T, X[user].data))
+        assert np.allclose(users[user], expected, atol=1e-4)
+
+
+def test_resume_continues_from_resident_factors():
+    X = _make_ratings()
+    scores = []
+    once = _model(5).fit(X, scores=scores)
+
+    resumed_scores = []
+    resumed = _model(3).fit(X, scores=resumed_scores, resume=True)
+    resumed.max_iter = 2
+    resumed.fit(X, scores=resumed_scores, resume=True)
+    resumed.fit(X, scores=resumed_scores, resume=False)
+
+    assert np.allclose(np.array(resumed_scores)[:5], scores, rtol=1e-5)
+    assert len(resumed_scores) == 7
+    assert resumed._resident is None
+
+
+def test_resume_uploads_other_data_of_the_same_shape():
+    X = _make_ratings()
+    X_other = X.copy()
+    X_other.data = np.random.RandomState(0).permutation(X_other.data)
+
+    resumed_scores = []
+    resumed = _model(3).fit(X, resume=True)
+    resumed.max_iter = 2
+    resumed.fit(X_other, scores=resumed_scores, resume=True)
+
+    scores = []
+    uploaded = _model(3).fit(X)
+    uploaded.max_iter = 2
+    uploaded.fit(X_other, scores=scores)
+
+    assert np.allclose(resumed_scores, scores, rtol=1e-5)
+
+
+def test_interrupted_fit_frees_resident_data():
+    class Interrupt(list):
+        def append(self, item):
+            raise KeyboardInterrupt
+
+    X = _make_ratings()
+    factorization = _model(3).fit(X, resume=True)
+    try:
+        factorization.fit(X, scores=Interrupt(), resume=True)
+    except KeyboardInterrupt:
+        pass
+    assert factorization._resident is None
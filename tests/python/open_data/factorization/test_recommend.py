@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import scipy
+import scipy.sparse
+import h2o4gpu
+
+
+def _fitted_model(m=300, n=200, f=10):
+    np.random.seed(1234)
+    factorization = h2o4gpu.solvers.FactorizationH2O(f, 0.01, n_gpus=0)
+    factorization.XT = np.random.randn(m, f).astype(np.float32)
+    factorization.thetaT = np.random.randn(n, f).astype(np.float32)
+    return factorization
+
+
+def test_predict_in_batches():
+    factorization = _fitted_model()
+    X = scipy.sparse.random(300, 200, density=0.1, format='coo',
+                            dtype=np.float32, random_state=0)
+    expected = np.sum(factorization.XT[X.row] *
+                      factorization.thetaT[X.col], axis=1)
+    for batch_size in [7, 1000, 65536]:
+        X_pred = factorization.predict(X, batch_size=batch_size)
+        assert np.allclose(X_pred.data, expected, atol=1e-5)
+        assert np.all(X_pred.row == X.row)
+        assert np.all(X_pred.col == X.col)
+
+
+def test_recommend_matches_full_scores():
+    factorization = _fitted_model()
+    seen = scipy.sparse.random(300, 200, density=0.2, format='csr',
+                               dtype=np.float32, random_state=0)
+    users = np.array([5, 0, 299, 42, 42, 17])
+
+    items, scores = factorization.recommend(users, k=20, exclude=seen,
+                                            batch_size=4)
+
+    full = np.dot(factorization.XT[users], factorization.thetaT.T)
+    full[seen[users].toarray() != 0] = -np.inf
+    expected = np.argsort(-full, axis=1, kind='stable')[:, :20]
+    assert items.shape == scores.shape == (users.size, 20)
+    assert np.all(items == expected)
+    assert np.allclose(scores, np.take_along_axis(full, expected, axis=1))
+    assert not np.any(seen[users[:, None], items].toarray())
+
+
+def test_recommend_all_items_and_nan_factors():
+    factorization = _fitted_model(n=15)
+    factorization.thetaT[3] = np.nan
+
+    items, scores = factorization.recommend([1, 2], k=100)
+
+    assert items.shape == (2, 15)
+    assert np.all(items[:, -1] == 3)
+    assert np.all(np.isneginf(scores[:, -1]))
+    assert np.all(np.sort(items, axis=1) == np.arange(15))
+
+
+@pytest.mark.parametrize('k', [0, -1])
+def test_recommend_rejects_nonpositive_k(k):
+    factorization = _fitted_model()
+    with pytest.raises(ValueError, match='k has to be positive'):
+        factorization.recommend([1, 2], k=k)
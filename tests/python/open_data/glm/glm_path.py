@@ -0,0 +1,48 @@
+# -*- encoding: utf-8 -*-
+"""
+Data and lambda path fits shared by the screening, coordinate descent and
+sparse data tests.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import scipy.sparse
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+
+
+def make_data(family, m=1000, n=50, n_active=10, density=None, scale=2.0):
+    """n_active features with nonzero coefficients, dense standard normal
+    features or scipy.sparse csr ones with the given density."""
+    np.random.seed(1234)
+    if density is None:
+        X = np.random.randn(m, n)
+    else:
+        X = scipy.sparse.random(m, n, density=density, format='csr',
+                                random_state=1234)
+    beta = np.zeros(n)
+    beta[np.random.choice(n, n_active, replace=False)] = \
+        scale * np.random.randn(n_active)
+    y = X.dot(beta) + 0.5
+    if family == 'logistic':
+        y = (np.random.rand(m) < 1 / (1 + np.exp(-y))).astype(np.float64)
+    else:
+        y += 0.1 * np.random.randn(m)
+    return X, y
+
+
+def fit_path(X, y, family='elasticnet', alpha=1.0, n_folds=1, **kwargs):
+    """The full path of 20 lambdas down to 1e-2 lambda_max for one alpha."""
+    model = ElasticNetH2O(n_gpus=0, n_folds=n_folds, n_alphas=1,
+                          alpha_min=alpha, alpha_max=alpha, n_lambdas=20,
+                          lambda_min_ratio=1e-2, lambda_stop_early=False,
+                          family=family, store_full_path=1, **kwargs)
+    model.fit(X, y)
+    return model
+
+
+def solved_lambdas(*models):
+    """Mask of the lambdas all the models solved, a lambda is skipped when
+    the previous one took no iterations."""
+    return np.logical_and.reduce(
+        [model.lambdas_full[:, 0, 0] > 0 for model in models])
@@ -0,0 +1,69 @@
+# -*- encoding: utf-8 -*-
+"""
+Anderson-accelerated ADMM along the lambda path.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import os
+import time
+import numpy as np
+import pytest
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+
+
+def correlated_data(family, m=2000, n=100, corr=0.9):
+    np.random.seed(1234)
+    common = np.random.randn(m, 1)
+    X = np.sqrt(corr) * common + np.sqrt(1 - corr) * np.random.randn(m, n)
+    beta = np.random.randn(n)
+    y = X.dot(beta) / np.sqrt(n) + 0.5
+    if family == 'logistic':
+        y = (np.random.rand(m) < 1 / (1 + np.exp(-y))).astype(np.float64)
+    else:
+        y += 0.1 * np.random.randn(m)
+    return X, y
+
+
+def fit(anderson, family, X, y, tol=1e-4):
+    model = ElasticNetH2O(n_gpus=0, n_folds=1, n_alphas=1,
+                          alpha_min=0.5, alpha_max=0.5, n_lambdas=10,
+                          lambda_min_ratio=1e-2, lambda_stop_early=False,
+                          family=family, store_full_path=1, tol=tol,
+                          solver='admm', anderson=anderson)
+    model.fit(X, y)
+    return model
+
+
+@pytest.mark.parametrize("family", ['elasticnet', 'logistic'])
+def test_anderson_matches_plain_admm(family):
+    X, y = correlated_data(family)
+
+    plain = fit(0, family, X, y)
+    accelerated = fit(10, family, X, y)
+
+    solved = (plain.lambdas_full[:, 0, 0] > 0) & \
+             (accelerated.lambdas_full[:, 0, 0] > 0)
+    assert np.sum(solved) > 5
+    # same path up to the solver tolerance
+    assert np.allclose(accelerated.error_full[solved, 0, 0],
+                       plain.error_full[solved, 0, 0], rtol=0.02)
+    assert np.allclose(accelerated.X_full[-1, 0], plain.X_full[-1, 0],
+                       atol=0.05)
+
+
+@pytest.mark.parametrize("family", ['elasticnet', 'logistic'])
+def test_anderson_wall_time(family):
+    X, y = correlated_data(family)
+
+    start = time.time()
+    fit(0, family, X, y, tol=1e-6)
+    time_plain = time.time() - start
+    start = time.time()
+    fit(10, family, X, y, tol=1e-6)
+    time_anderson = time.time() - start
+
+    print("plain ADMM: %f s, anderson=10: %f s" % (time_plain, time_anderson))
+    if os.getenv("CHECKPERFORMANCE") is not None:
+        assert time_anderson < time_plain, \
+            "anderson is not faster than plain ADMM for %s" % family
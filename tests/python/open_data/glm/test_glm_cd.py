@@ -0,0 +1,55 @@
+# -*- encoding: utf-8 -*-
+"""
+Coordinate descent solver along the lambda path.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import itertools
+import numpy as np
+import pytest
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+from glm_path import make_data, fit_path, solved_lambdas
+
+
+@pytest.fixture(scope='module', params=list(itertools.product(
+    ['elasticnet', 'logistic'], [1.0, 0.5], [(1000, 50), (200, 500)])))
+def paths(request):
+    """The same data fit with ADMM and with coordinate descent."""
+    family, alpha, (m, n) = request.param
+    X, y = make_data(family, m, n)
+    return (fit_path(X, y, family, alpha, solver='admm'),
+            fit_path(X, y, family, alpha, solver='cd'))
+
+
+def test_cd_matches_admm(paths):
+    admm, cd = paths
+    solved = solved_lambdas(admm, cd)
+
+    assert np.sum(solved) > 10
+    # same path up to the solvers' tolerances
+    assert np.allclose(cd.error_full[solved, 0, 0],
+                       admm.error_full[solved, 0, 0], rtol=0.05)
+
+
+def test_cd_finds_admm_active_features(paths):
+    admm, cd = paths
+    last = np.where(solved_lambdas(admm, cd))[0][-1]
+
+    largest = np.argsort(-np.abs(admm.X_full[last, 0, :-1]))[:5]
+    assert np.all(cd.X_full[last, 0, largest] != 0)
+
+
+def test_cd_with_folds():
+    X, y = make_data('elasticnet')
+
+    model = fit_path(X, y, alpha=0.5, n_folds=3, solver='cd')
+
+    assert np.all(np.isfinite(model.X_best))
+    assert np.corrcoef(model.predict(X).ravel(), y)[0, 1] > 0.99
+
+
+def test_solver_validated():
+    with pytest.raises(AssertionError):
+        ElasticNetH2O(n_gpus=0, solver='lbfgs')
+    assert ElasticNetH2O(n_gpus=0, solver='cd').solver == 'cd'
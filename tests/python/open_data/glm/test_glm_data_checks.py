@@ -0,0 +1,69 @@
+# -*- encoding: utf-8 -*-
+"""
+Validation of the data and the statistics (lambda_max) computed from it
+in the same pass.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+import scipy.sparse
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+from h2o4gpu.solvers.utils import _check_data_content
+
+
+def fit(X, y, weight):
+    model = ElasticNetH2O(n_gpus=0, n_folds=1, n_alphas=1, alpha_min=1.0,
+                          alpha_max=1.0, n_lambdas=5, lambda_stop_early=False,
+                          store_full_path=1)
+    model.fit(X, y, X[:100], y[:100], sample_weight=weight)
+    return model
+
+
+def test_lambda_max_independent_of_order():
+    np.random.seed(1234)
+    X = np.random.randn(2000, 30)
+    y = X.dot(np.random.randn(30)) + 3.0
+    weight = np.random.rand(2000)
+
+    row_major = fit(X, y, weight)
+    col_major = fit(np.asfortranarray(X), y, weight)
+
+    assert np.allclose(row_major.lambdas_full, col_major.lambdas_full)
+    assert np.allclose(row_major.X_full, col_major.X_full, atol=1e-3)
+
+
+@pytest.mark.parametrize("value, message", [(np.nan, 'NA'), (np.inf, 'Inf')])
+def test_check_data_content(value, message):
+    data = np.ones(10)
+    _check_data_content(1, 'x', data)
+    data[7] = value
+    with pytest.raises(AssertionError, match='x contains ' + message):
+        _check_data_content(1, 'x', data)
+    _check_data_content(0, 'x', data)
+
+
+@pytest.mark.parametrize("value, message", [(np.nan, 'NA'), (np.inf, 'Inf')])
+def test_sparse_data_checked(value, message):
+    X = scipy.sparse.random(200, 20, density=0.1, format='csr',
+                            random_state=1234)
+    X.data[3] = value
+    y = np.ones(200)
+    with pytest.raises(AssertionError, match='x contains ' + message):
+        ElasticNetH2O(n_gpus=0, n_folds=1).fit(X, y)
+
+
+@pytest.mark.parametrize("value", [np.nan, np.inf])
+@pytest.mark.parametrize("bad", ['x', 'y', 'valid_x'])
+def test_dense_data_checked(value, bad):
+    np.random.seed(1234)
+    X = np.random.randn(200, 20)
+    y = np.ones(200)
+    if bad == 'y':
+        y[3] = value
+    else:
+        X[3 if bad == 'x' else 150, 7] = value
+    with pytest.raises(ValueError, match='nan/inf'):
+        ElasticNetH2O(n_gpus=0, n_folds=1).fit(X[:100], y[:100], X[100:],
+                                               y[100:])
@@ -0,0 +1,109 @@
+# -*- encoding: utf-8 -*-
+"""
+GLMDataset reuse tests.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+from h2o4gpu.solvers import GLMDataset
+from h2o4gpu import Ridge, Lasso
+
+
+def generate_data(m=1000, n=10, seed=1234):
+    np.random.seed(seed)
+    X = np.random.rand(m, n)
+    y = X.dot(np.arange(1, n + 1)) + 3.0
+    return X, y
+
+
+def make_model(**kwargs):
+    return ElasticNetH2O(n_gpus=0, n_folds=1, n_alphas=1, n_lambdas=1,
+                         lambda_max=0.0, lambda_min_ratio=0.0, alpha_max=0.0,
+                         alpha_min=0.0, glm_stop_early=False,
+                         lambda_stop_early=False, tol=1E-4, **kwargs)
+
+
+def test_dataset_matches_arrays():
+    X, y = generate_data()
+    data = GLMDataset(X, y, valid_x=X, valid_y=y, n_gpus=0)
+
+    lm_arrays = make_model()
+    lm_arrays.fit(X, y, X, y)
+    preds_arrays = lm_arrays.predict(X)
+
+    lm_dataset = make_model()
+    lm_dataset.fit(data)
+    preds_dataset = lm_dataset.predict(data)
+
+    assert np.allclose(lm_arrays.X, lm_dataset.X)
+    assert np.allclose(preds_arrays, preds_dataset)
+    assert lm_dataset.time_upload_data == 0.0
+
+
+def test_dataset_refit_does_not_upload():
+    X, y = generate_data()
+    data = GLMDataset(X, y, n_gpus=0)
+    version = data.version
+    a = data.a
+
+    lm = make_model()
+    lm.fit(data)
+    lm.predict(data)
+    lm.set_params(max_iter=100)
+    lm.fit()
+    assert lm.a is a
+    assert data.version == version
+
+    # same arrays, nothing to upload
+    data.update(X, y)
+    assert data.version == version
+    data.update(X, y, force=True)
+    assert data.version == version + 1
+
+
+def test_dataset_wrappers():
+    X, y = generate_data()
+    data = GLMDataset(X, y, n_gpus=0)
+    for model in [Ridge(n_gpus=0), Lasso(n_gpus=0, alpha=0.01)]:
+        model.fit(data)
+        assert np.shape(model.predict(data))[-1] == X.shape[0]
+
+
+def test_dataset_weights_of_one_fit():
+    X, y = generate_data()
+    data = GLMDataset(X, y, n_gpus=0)
+    version = data.version
+
+    lasso = Lasso(n_gpus=0, alpha=0.01)
+    lasso.fit(data)
+    lasso.fit(data)
+    assert data.version == version
+    assert data.sample_weight is None
+
+    # Ridge uses the unit weights of the dataset, not those of Lasso
+    ridge = Ridge(n_gpus=0)
+    ridge.fit(data)
+    ridge_fresh = Ridge(n_gpus=0)
+    ridge_fresh.fit(GLMDataset(X, y, n_gpus=0))
+    assert np.allclose(ridge.coef_, ridge_fresh.coef_)
+    assert np.allclose(ridge.intercept_, ridge_fresh.intercept_)
+
+    lasso_arrays = Lasso(n_gpus=0, alpha=0.01)
+    lasso_arrays.fit(X, y)
+    assert np.allclose(lasso.coef_, lasso_arrays.coef_)
+
+    with pytest.raises(ValueError):
+        make_model().fit(data, sample_weight=np.ones(X.shape[0] - 1))
+
+
+def test_dataset_checks():
+    X, y = generate_data()
+    data = GLMDataset(X, y, n_gpus=0, fit_intercept=False)
+    with pytest.raises(ValueError):
+        make_model(fit_intercept=True).fit(data)
+    data.release()
+    with pytest.raises(ValueError):
+        make_model(fit_intercept=False).fit(data)
@@ -0,0 +1,87 @@
+import ctypes
+import ctypes.util
+import gc
+import os
+import time
+import numpy as np
+from h2o4gpu.solvers.utils import native_array
+
+libc = ctypes.CDLL(ctypes.util.find_library("c"))
+libc.malloc.restype = ctypes.c_void_p
+libc.malloc.argtypes = [ctypes.c_size_t]
+libc.free.argtypes = [ctypes.c_void_p]
+
+
+class FreeCounter(object):
+    """Stands in for the backend library, releases buffers with libc"""
+
+    def __init__(self):
+        self.freed = 0
+
+    def modelfree2_double(self, p):
+        libc.free(p)
+        self.freed += 1
+
+    def modelfree2_float(self, p):
+        libc.free(p)
+        self.freed += 1
+
+
+def alloc(count, dtype):
+    p = libc.malloc(count * np.dtype(dtype).itemsize)
+    ctypes.memset(p, 0, count * np.dtype(dtype).itemsize)
+    return p
+
+
+def func(n_lambdas=100, n_alphas=8, n=1000, dtype=np.float64):
+    if os.getenv("CHECKPERFORMANCE") is None:
+        n = int(n / 10)
+    count = n_lambdas * n_alphas * (n + 6)
+    c_type = ctypes.c_double if dtype == np.float64 else ctypes.c_float
+    lib = FreeCounter()
+
+    p = alloc(count, dtype)
+    start = time.time()
+    copied = np.fromiter(ctypes.cast(p, ctypes.POINTER(c_type)),
+                         dtype=dtype, count=count)
+    time_copy = time.time() - start
+    libc.free(p)
+
+    p = alloc(count, dtype)
+    start = time.time()
+    wrapped = native_array(p, count, dtype, lib)
+    time_wrap = time.time() - start
+
+    assert wrapped.dtype == dtype
+    assert wrapped.shape == copied.shape
+    assert np.array_equal(wrapped, copied)
+
+    # views keep the buffer alive, the last one releases it
+    view = np.reshape(wrapped, (n_lambdas, n_alphas, n + 6))[:, :, 0:n]
+    del wrapped
+    gc.collect()
+    assert lib.freed == 0
+    assert view.sum() == 0
+    del view
+    gc.collect()
+    assert lib.freed == 1
+
+    print("fromiter copy: %f s, zero-copy wrap: %f s" % (time_copy, time_wrap))
+    return time_wrap, time_copy
+
+
+def run_bench(n_lambdas=100, n_alphas=8, n=1000, dtype=np.float64):
+    results = func(n_lambdas, n_alphas, n, dtype)
+    if os.getenv("CHECKPERFORMANCE") is not None:
+        assert results[0] <= results[1], \
+            "wrapping is not faster than copying for n = %s" % n
+
+
+def test_native_array_null():
+    assert native_array(None, 10, np.float64, FreeCounter()) is None
+    assert native_array(0, 10, np.float32, FreeCounter()) is None
+
+
+def test_glm_extraction_bench_double(): run_bench(dtype=np.float64)
+def test_glm_extraction_bench_float(): run_bench(dtype=np.float32)
+def test_glm_extraction_bench_wide(): run_bench(n_lambdas=20, n=50000)
@@ -0,0 +1,61 @@
+# -*- encoding: utf-8 -*-
+"""
+Cross validation folds built from row index lists: shuffled, stratified
+and user-supplied fold assignments.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+from h2o4gpu.solvers.utils import make_fold_ids
+
+
+def test_contiguous_folds_left_to_backend():
+    assert make_fold_ids(100, 5) is None
+    assert make_fold_ids(100, 1, 'random') is None
+
+
+def test_random_folds_balanced():
+    fold_ids = make_fold_ids(103, 5, 'random', seed=1)
+    counts = np.bincount(fold_ids)
+    assert counts.max() - counts.min() <= 1
+    assert np.array_equal(fold_ids, make_fold_ids(103, 5, 'random', seed=1))
+
+
+def test_stratified_folds_balance_classes():
+    y = np.array([0] * 90 + [1] * 10)
+    fold_ids = make_fold_ids(100, 5, 'stratified', y, seed=1)
+    for fold in range(5):
+        assert np.sum(y[fold_ids == fold]) == 2
+
+
+def test_user_folds_validated():
+    fold_ids = make_fold_ids(6, 3, [0, 1, 2, 0, 1, 2])
+    assert fold_ids.dtype == np.int32
+    with pytest.raises(ValueError):
+        make_fold_ids(6, 3, [0, 1, 3, 0, 1, 2])
+    with pytest.raises(ValueError):
+        make_fold_ids(6, 3, [0, 1, 1, 0, 1, 0])
+    with pytest.raises(ValueError):
+        make_fold_ids(5, 3, [0, 1, 2, 0, 1, 2])
+
+
+@pytest.mark.parametrize("fold_assignment", ['contiguous', 'random',
+                                             'stratified'])
+def test_fit_with_folds(fold_assignment):
+    np.random.seed(1234)
+    X = np.random.rand(1000, 10)
+    y = (X[:, 0] + X[:, 1] > 1.0).astype(np.float64)
+    # flip some labels so the classes are not separable
+    flip = np.random.rand(1000) < 0.1
+    y[flip] = 1 - y[flip]
+    model = ElasticNetH2O(n_gpus=0, n_folds=5, n_alphas=2, n_lambdas=10,
+                          family='logistic', fold_assignment=fold_assignment,
+                          fold_seed=1)
+    model.fit(X, y)
+    assert np.all(np.isfinite(model.X))
+    # every alpha finds the two informative columns
+    assert np.all(model.X[:, :2] > 1.0)
+    assert model.get_params()['fold_assignment'] == fold_assignment
@@ -0,0 +1,44 @@
+# -*- encoding: utf-8 -*-
+"""
+Intercept column added by the backend must give the same model as an
+explicitly appended column of ones.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+from h2o4gpu.solvers.utils import upload_data
+
+
+def make_model():
+    return ElasticNetH2O(n_gpus=0, n_folds=1, n_alphas=1, n_lambdas=1,
+                         lambda_max=0.0, lambda_min_ratio=0.0, alpha_max=0.0,
+                         alpha_min=0.0, glm_stop_early=False,
+                         lambda_stop_early=False, tol=1E-4,
+                         fit_intercept=True)
+
+
+@pytest.mark.parametrize("order", ['C', 'F'])
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_implicit_intercept(order, dtype):
+    np.random.seed(1234)
+    X = np.asarray(np.random.rand(500, 7), dtype=dtype, order=order)
+    y = (X.dot(np.arange(1, 8)) + 5.0).astype(dtype)
+    ones = np.ones((X.shape[0], 1), dtype=dtype)
+    X_explicit = np.asarray(np.hstack([X, ones]), order=order)
+
+    implicit = make_model()
+    implicit.fit(X, y, X, y)
+    assert implicit.n == X.shape[1] + 1
+
+    explicit = make_model()
+    explicit.ord = 'r' if order == 'C' else 'c'
+    a, b, c, d, e = upload_data(explicit, X_explicit, y, X_explicit, y,
+                                intercept=0)
+    explicit.fit_ptr(X.shape[0], X_explicit.shape[1], X.shape[0],
+                     explicit.double_precision, explicit.ord, a, b, c, d, e)
+
+    assert np.array_equal(implicit.X, explicit.X)
+    assert np.array_equal(implicit.intercept_, explicit.intercept_)
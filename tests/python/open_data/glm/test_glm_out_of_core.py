@@ -0,0 +1,98 @@
+# -*- encoding: utf-8 -*-
+"""
+GLM fit on out-of-core data from its Gram statistics.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+
+
+def make_data(m=3000, n=40, n_active=10):
+    np.random.seed(1234)
+    X = np.random.randn(m, n)
+    beta = np.zeros(n)
+    beta[np.random.choice(n, n_active, replace=False)] = \
+        4 * np.random.randn(n_active)
+    y = X.dot(beta) + 0.5 + 0.1 * np.random.randn(m)
+    return X, y
+
+
+def blocks(X, y, size=700):
+    for start in range(0, X.shape[0], size):
+        yield X[start:start + size], y[start:start + size]
+
+
+def model(n_folds=1, fold_assignment='contiguous', solver='auto',
+          family='elasticnet'):
+    return ElasticNetH2O(n_gpus=0, n_folds=n_folds, n_alphas=1,
+                         alpha_min=0.5, alpha_max=0.5, n_lambdas=20,
+                         lambda_min_ratio=1e-2, lambda_stop_early=False,
+                         fold_assignment=fold_assignment, family=family,
+                         store_full_path=1, solver=solver)
+
+
+def test_memmap_matches_in_memory(tmpdir):
+    X, y = make_data()
+    mapped = np.memmap(str(tmpdir.join('X.dat')), dtype=np.float64,
+                       mode='w+', shape=X.shape)
+    mapped[:] = X
+    mapped.flush()
+
+    dense = model(solver='cd')
+    dense.fit(X, y)
+    streamed = model()
+    streamed.fit(mapped, y)
+
+    assert np.allclose(streamed.lambdas_full, dense.lambdas_full)
+    assert np.allclose(streamed.X_full, dense.X_full, atol=1e-4)
+    assert np.allclose(streamed.error_full[..., 0], dense.error_full[..., 0],
+                       atol=1e-4)
+    assert np.allclose(streamed.predict_path(mapped),
+                       dense.predict_path(X), atol=1e-3)
+
+
+def test_iterator_with_folds_and_validation():
+    X, y = make_data()
+    train, valid = slice(0, 2400), slice(2400, None)
+    # blocks deal their rows round-robin to the folds
+    folds = np.arange(2400) % 3
+
+    dense = model(n_folds=3, fold_assignment=folds, solver='cd')
+    dense.fit(X[train], y[train], X[valid], y[valid])
+    streamed = model(n_folds=3)
+    streamed.fit(blocks(X[train], y[train]), None,
+                 blocks(X[valid], y[valid]))
+
+    assert streamed.m_train == 2400
+    assert streamed.m_valid == 600
+    assert np.allclose(streamed.X_full, dense.X_full, atol=1e-4)
+    assert np.allclose(streamed.error_full, dense.error_full, atol=1e-4)
+
+
+def test_iterator_needs_elasticnet_cd():
+    X, y = make_data(m=100, n=5, n_active=3)
+    with pytest.raises(ValueError):
+        model(family='logistic').fit(blocks(X, y), None)
+    with pytest.raises(ValueError):
+        model(solver='admm').fit(blocks(X, y), None)
+
+
+def test_memmap_needs_elasticnet_cd(tmpdir):
+    X, y = make_data(m=100, n=5, n_active=3)
+    mapped = np.memmap(str(tmpdir.join('X.dat')), dtype=np.float64,
+                       mode='w+', shape=X.shape)
+    mapped[:] = X
+    with pytest.raises(ValueError):
+        model(family='logistic').fit(mapped, (y > 0).astype(np.float64))
+    with pytest.raises(ValueError):
+        model(solver='admm').fit(mapped, y)
+
+
+def test_iterator_zero_response_raises():
+    X, _ = make_data(m=100, n=5, n_active=3)
+    # every coefficient is zero at any lambda
+    with pytest.raises(ValueError, match='lambda_max0'):
+        model().fit(blocks(X, np.zeros(100)), None)
@@ -0,0 +1,63 @@
+# -*- encoding: utf-8 -*-
+"""
+Batched prediction for every model of the regularization path.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+from h2o4gpu import ElasticNet
+
+
+def fit_path(dtype=np.float64):
+    np.random.seed(1234)
+    X = np.random.rand(1000, 10).astype(dtype)
+    y = X.dot(np.arange(1, 11)).astype(dtype)
+    model = ElasticNetH2O(n_gpus=0, n_folds=1, n_alphas=3, n_lambdas=20,
+                          fit_intercept=False, store_full_path=1)
+    model.fit(X, y)
+    return model, X
+
+
+def test_predict_path_matches_coefficients():
+    model, X = fit_path()
+    preds = model.predict_path(X)
+
+    assert preds.shape == (20, 3, X.shape[0])
+    expected = np.einsum('mn,lan->lam', X, model.X_full)
+    assert np.allclose(preds, expected)
+
+
+def test_predict_path_float32_output():
+    model, X = fit_path()
+    preds = model.predict_path(X, dtype=np.float32)
+
+    assert preds.dtype == np.float32
+    assert np.allclose(preds, model.predict_path(X), rtol=1e-5, atol=1e-4)
+
+
+def test_predict_path_requires_full_path():
+    np.random.seed(1234)
+    X = np.random.rand(100, 5)
+    model = ElasticNetH2O(n_gpus=0, n_folds=1, n_alphas=1, n_lambdas=5)
+    model.fit(X, X.sum(axis=1))
+    with pytest.raises(AssertionError):
+        model.predict_path(X)
+
+
+def test_predict_path_sklearn_backend():
+    np.random.seed(1234)
+    X = np.random.rand(500, 10)
+    y = X.dot(np.arange(1, 11)) + 3.0
+    model = ElasticNet(backend='sklearn', l1_ratio=0.5, n_lambdas=20,
+                       lambda_min_ratio=1e-4)
+    model.fit(X, y)
+    preds = model.predict_path(X)
+
+    assert preds.shape == (20, 1, X.shape[0])
+    # all coefficients are zero at lambda_max, the intercept remains
+    assert np.allclose(preds[0, 0], y.mean())
+    # and the smallest lambda nearly fits the data
+    assert np.abs(preds[-1, 0] - y).max() < 0.05 * np.abs(y).max()
@@ -0,0 +1,55 @@
+# -*- encoding: utf-8 -*-
+"""
+Reuse of the ADMM projector factorizations along the lambda path.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+
+
+def generate_data(m=2000, n=100):
+    np.random.seed(1234)
+    X = np.random.randn(m, n)
+    beta = np.random.randn(n) * (np.random.rand(n) < 0.3)
+    y = X.dot(beta) + 0.5 + 0.1 * np.random.randn(m)
+    return X, y
+
+
+def fit(X, y, **kwargs):
+    model = ElasticNetH2O(n_gpus=0, n_threads=1, n_folds=1, n_alphas=1,
+                          alpha_min=0.5, alpha_max=0.5, n_lambdas=20,
+                          lambda_min_ratio=1e-3, lambda_stop_early=False,
+                          store_full_path=1, tol=1e-4, solver='admm',
+                          **kwargs)
+    model.fit(X, y)
+    return model
+
+
+def test_cache_hits_along_lambda_path():
+    X, y = generate_data()
+    model = fit(X, y)
+
+    # every lambda after the first projects with a cached factorization
+    assert model.factorizations >= 1
+    assert model.cache_hits > model.factorizations
+    assert model.factor_time >= 0
+
+    # the budget keeps at least one factorization
+    small = fit(X, y, cache_bytes=1)
+    assert small.cache_hits > 0
+    assert small.factorizations >= model.factorizations
+    assert np.allclose(small.X_full, model.X_full)
+
+
+def test_eigen_matches_cholesky():
+    X, y = generate_data()
+    cholesky = fit(X, y)
+    eigen = fit(X, y, eigen=True)
+
+    # one eigendecomposition serves every rho
+    assert eigen.factorizations == 1
+    assert eigen.cache_hits > 0
+    assert np.allclose(eigen.X_full, cholesky.X_full, atol=1e-6)
+    assert np.allclose(eigen.error_full, cholesky.error_full, atol=1e-6)
@@ -0,0 +1,59 @@
+# -*- encoding: utf-8 -*-
+"""
+Strong rule screening along the lambda path.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+from glm_path import make_data, fit_path, solved_lambdas
+
+
+@pytest.fixture(scope='module', params=['elasticnet', 'logistic'])
+def paths(request):
+    """Wide data fit without and with screening."""
+    family = request.param
+    X, y = make_data(family, m=500, n=1000)
+    return (X, fit_path(X, y, family, screening=False),
+            fit_path(X, y, family, screening=True))
+
+
+def test_screening_leaves_out_features(paths):
+    X, full, screened = paths
+    solved = solved_lambdas(full, screened)
+
+    assert np.all(full.screened_full == 0)
+    # most features are left out of the solves at the start of a sparse path
+    assert np.all(screened.screened_full[:10, 0, 0][solved[:10]] >
+                  X.shape[1] // 2)
+
+
+def test_screening_matches_full_path(paths):
+    _, full, screened = paths
+    solved = solved_lambdas(full, screened)
+
+    assert np.sum(solved) > 10
+    # same path up to the solver tolerance
+    assert np.allclose(screened.error_full[solved, 0, 0],
+                       full.error_full[solved, 0, 0], rtol=0.05)
+
+
+@pytest.mark.parametrize('paths', ['elasticnet'], indirect=True)
+def test_screening_keeps_largest_coefficients(paths):
+    _, full, screened = paths
+
+    largest = np.argsort(-np.abs(full.X_full[-1, 0, :-1]))[:10]
+    assert np.array_equal(
+        np.sort(np.argsort(-np.abs(screened.X_full[-1, 0, :-1]))[:10]),
+        np.sort(largest))
+
+
+def test_screening_with_folds():
+    X, y = make_data('elasticnet', m=500, n=1000)
+
+    model = fit_path(X, y, n_folds=3, screening=True)
+
+    assert np.all(np.isfinite(model.X_best))
+    assert model.screened_best.shape == (1, 1)
+    assert np.corrcoef(model.predict(X).ravel(), y)[0, 1] > 0.99
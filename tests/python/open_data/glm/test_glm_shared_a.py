@@ -0,0 +1,56 @@
+# -*- encoding: utf-8 -*-
+"""
+CPU model builders sharing one equilibrated copy of the training data.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+
+
+def fit(shared_a, n_threads, n_folds, X, y):
+    model = ElasticNetH2O(n_gpus=0, n_threads=n_threads, n_folds=n_folds,
+                          n_alphas=4, n_lambdas=10, store_full_path=1)
+    model.shared_a = shared_a
+    model.fit(X, y)
+    return model
+
+
+@pytest.mark.parametrize("n_folds", [1, 3])
+def test_shared_matches_private_copies(n_folds):
+    np.random.seed(1234)
+    X = np.random.rand(1000, 10)
+    y = X.dot(np.arange(1, 11)) + 0.1 * np.random.rand(1000)
+    X_orig = X.copy()
+
+    private = fit(0, 1, n_folds, X, y)
+    shared = fit(1, 1, n_folds, X, y)
+
+    assert np.array_equal(X, X_orig)
+    assert np.allclose(shared.X_full, private.X_full)
+    assert np.allclose(shared.X, private.X)
+
+
+@pytest.mark.parametrize("n_folds", [1, 3])
+@pytest.mark.parametrize("shared_a", [0, 1])
+def test_shared_multithreaded(shared_a, n_folds):
+    np.random.seed(1234)
+    X = np.random.rand(1000, 10)
+    y = X.dot(np.arange(1, 11)) + 0.1 * np.random.rand(1000)
+
+    model = fit(shared_a, 4, n_folds, X, y)
+
+    assert np.all(np.isfinite(model.X_full))
+    # one row of predictions per alpha
+    pred = model.predict(X)
+    assert pred.shape == (4, 1000)
+    for pred_alpha in pred:
+        assert np.corrcoef(pred_alpha, y)[0, 1] > 0.99
+
+
+def test_shared_a_validated():
+    model = ElasticNetH2O(n_gpus=0)
+    with pytest.raises(AssertionError):
+        model.shared_a = 2
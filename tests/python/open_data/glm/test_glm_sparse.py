@@ -0,0 +1,97 @@
+# -*- encoding: utf-8 -*-
+"""
+GLM fit and predict on scipy.sparse data.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import itertools
+import numpy as np
+import pytest
+import h2o4gpu
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+from glm_path import make_data, fit_path
+
+
+def sparse_data(family, m=2000, n=500):
+    return make_data(family, m, n, n_active=20, density=0.02, scale=4.0)
+
+
+@pytest.fixture(scope='module', params=list(itertools.product(
+    ['elasticnet', 'logistic'], ['csr', 'csc'])))
+def paths(request):
+    """Sparse data fit as it is and densified."""
+    family, fmt = request.param
+    X, y = sparse_data(family)
+    X = X.asformat(fmt)
+    return (X, fit_path(X.toarray(), y, family, 0.5, solver='cd'),
+            fit_path(X, y, family, 0.5))
+
+
+def test_sparse_matches_dense(paths):
+    _, dense, sparse = paths
+
+    assert sparse.solver == 'auto'
+    assert np.allclose(sparse.lambdas_full, dense.lambdas_full)
+    assert np.allclose(sparse.X_full, dense.X_full, atol=1e-2)
+
+
+def test_sparse_predictions_match_dense(paths):
+    X, dense, sparse = paths
+
+    assert np.allclose(sparse.predict_proba(X),
+                       dense.predict_proba(X.toarray()), atol=1e-2)
+    assert np.allclose(sparse.predict_path(X),
+                       dense.predict_path(X.toarray()), atol=1e-2)
+
+
+def test_sparse_with_folds_and_validation():
+    X, y = sparse_data('elasticnet')
+    model = ElasticNetH2O(n_gpus=0, n_folds=3, n_alphas=2, n_lambdas=20,
+                          lambda_min_ratio=1e-2)
+
+    model.fit(X[:1500], y[:1500], X[1500:], y[1500:])
+
+    assert np.all(np.isfinite(model.X_best))
+    assert model.predict(X[1500:]).shape == (2, 500)
+    # predictions default to the validation data given to fit()
+    assert np.allclose(model.predict(), model.predict(X[1500:]))
+    assert np.corrcoef(model.predict(X[1500:])[0], y[1500:])[0, 1] > 0.9
+
+
+@pytest.mark.parametrize("family", ['elasticnet', 'logistic'])
+def test_sparse_without_validation(family):
+    X, y = sparse_data(family)
+    model = ElasticNetH2O(n_gpus=0, n_folds=1, n_alphas=2, n_lambdas=20,
+                          lambda_min_ratio=1e-2, family=family)
+
+    model.fit(X, y)
+
+    assert np.all(np.isfinite(model.X_best))
+    assert model.predict(X).shape == (2, 2000)
+
+
+def test_sparse_needs_cd():
+    X, y = sparse_data('elasticnet', m=100, n=20)
+    with pytest.raises(ValueError):
+        fit_path(X, y, 'elasticnet', 0.5, solver='admm')
+
+
+@pytest.mark.parametrize("Solver, kwargs", [
+    (h2o4gpu.Lasso, dict(alpha=1e-3)),
+    (h2o4gpu.Ridge, dict(alpha=1e-3)),
+    (h2o4gpu.ElasticNet, dict(n_folds=1, n_alphas=1, alpha_min=0.5,
+                              alpha_max=0.5, n_lambdas=20,
+                              lambda_min_ratio=1e-2,
+                              lambda_stop_early=False)),
+])
+def test_wrappers_fit_sparse(Solver, kwargs):
+    X, y = sparse_data('elasticnet')
+    model = Solver(n_gpus=0, backend='h2o4gpu', **kwargs)
+
+    model.fit(X, y)
+
+    pred = np.ravel(model.predict(X))
+    assert np.all(np.isfinite(pred))
+    assert np.allclose(pred, np.ravel(model.predict(X.toarray())), atol=1e-4)
+    assert np.corrcoef(pred, y)[0, 1] > 0.9
@@ -0,0 +1,98 @@
+# -*- encoding: utf-8 -*-
+"""
+Multinomial logistic regression on more than two classes.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+import scipy.sparse
+import h2o4gpu
+from h2o4gpu import datasets
+from h2o4gpu.solvers.elastic_net import ElasticNetH2O
+from h2o4gpu.solvers.glm_dataset import GLMDataset
+
+
+def make_data():
+    iris = datasets.load_iris()
+    X = iris.data - np.mean(iris.data, 0)
+    train = np.arange(X.shape[0]) % 5 != 0
+    return X[train], iris.target[train], X[~train], iris.target[~train]
+
+
+def model(**kwargs):
+    params = dict(n_gpus=0, n_folds=1, n_alphas=1, alpha_min=0.5,
+                  alpha_max=0.5, n_lambdas=20, lambda_min_ratio=1e-3,
+                  lambda_stop_early=False, family='logistic',
+                  store_full_path=1)
+    params.update(kwargs)
+    return ElasticNetH2O(**params)
+
+
+def test_multinomial_fit_and_predict():
+    X, y, X_test, y_test = make_data()
+    names = np.array(['setosa', 'versicolor', 'virginica'])
+
+    lr = model().fit(X, names[y], X_test, names[y_test])
+
+    assert lr.X_best.shape == (1, 3, X.shape[1] + 1)
+    assert lr.X_full.shape == (20, 1, 3, X.shape[1] + 1)
+    assert lr.intercept_.shape == (1, 3)
+    assert np.allclose(lr.intercept_.sum(axis=-1), 0, atol=1e-5)
+    assert np.all(lr.error_best[:, 2] < 0.5)
+
+    proba = lr.predict_proba(X_test)
+    assert proba.shape == (1, X_test.shape[0], 3)
+    assert np.allclose(proba.sum(axis=-1), 1, atol=1e-5)
+    assert lr.predict_path(X_test).shape == (20, 1, X_test.shape[0], 3)
+    pred = lr.predict(X_test)
+    assert np.all(pred == names[np.argmax(proba, axis=-1)])
+    assert np.mean(pred[0] == names[y_test]) > 0.9
+
+
+def test_multinomial_sparse_and_folds_match_dense():
+    X, y, X_test, _ = make_data()
+
+    dense = model(solver='cd').fit(X, y)
+    sparse = model().fit(scipy.sparse.csr_matrix(X), y)
+    assert np.allclose(sparse.X_full, dense.X_full, atol=1e-3)
+    assert np.allclose(sparse.predict_proba(X_test),
+                       dense.predict_proba(X_test), atol=1e-3)
+
+    cv = model(n_folds=3, n_alphas=2).fit(X, y)
+    assert cv.X_best.shape == (2, 3, X.shape[1] + 1)
+    assert np.all(cv.error_best[:, 1] > 0)
+
+
+def test_logistic_regression_wrapper():
+    X, y, X_test, y_test = make_data()
+
+    logreg = h2o4gpu.LogisticRegression(penalty='l1', C=10.0,
+                                        multi_class='multinomial')
+    assert logreg.backend == 'h2o4gpu'
+    logreg.fit(X, y)
+
+    proba = logreg.predict_proba(X_test)
+    assert proba.shape == (X_test.shape[0], 3)
+    assert np.all(logreg.predict(X_test) == np.argmax(proba, axis=1))
+    assert np.mean(logreg.predict(X_test) == y_test) > 0.9
+
+
+def test_multinomial_unseen_validation_label():
+    X, y, X_test, y_test = make_data()
+    y_test = y_test.copy()
+    y_test[0] = 3
+
+    with pytest.raises(ValueError, match='not in train_y'):
+        model().fit(X, y, X_test, y_test)
+    # labels already encoded in a GLMDataset are checked by the backend
+    data = GLMDataset(X, y, X_test, y_test.astype(np.float64), n_gpus=0)
+    with pytest.raises(ValueError, match='seen in training'):
+        model().fit(data)
+
+
+def test_multinomial_needs_cd():
+    X, y, _, _ = make_data()
+    with pytest.raises(ValueError):
+        model(solver='admm').fit(X, y)
@@ -0,0 +1,63 @@
+# -*- encoding: utf-8 -*-
+"""
+KMeans solver tests for the multithreaded CPU backend.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+from h2o4gpu.solvers.kmeans import KMeansH2O
+from h2o4gpu.datasets.samples_generator import make_blobs
+from h2o4gpu.metrics.cluster import v_measure_score
+
+
+@pytest.mark.parametrize("init", ['k-means++', 'random'])
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_fit_blobs_cpu(init, dtype):
+    X, true_labels = make_blobs(n_samples=5000, centers=5, n_features=10,
+                                cluster_std=0.5, random_state=42)
+    X = X.astype(dtype)
+    model = KMeansH2O(n_gpus=0, n_clusters=5, init=init,
+                      random_state=1234).fit(X)
+
+    assert model.cluster_centers_.shape == (5, 10)
+    # every row is labeled with its nearest centroid
+    distances = ((X[:, None, :] - model.cluster_centers_[None, :, :]) ** 2
+                ).sum(axis=2)
+    assert np.array_equal(np.argmin(distances, axis=1), model.labels_)
+    # A single random init (n_init is not supported) usually draws two
+    # rows from one blob and converges with two blobs merged into one.
+    min_score = 0.95 if init == 'k-means++' else 0.8
+    assert v_measure_score(true_labels, model.labels_) > min_score
+
+    # Same random_state should yield same results
+    model_rerun = KMeansH2O(n_gpus=0, n_clusters=5, init=init,
+                            random_state=1234).fit(X)
+    assert np.allclose(model.cluster_centers_, model_rerun.cluster_centers_)
+    assert np.array_equal(model.labels_, model_rerun.labels_)
+
+
+@pytest.mark.parametrize("random_state", range(5))
+def test_kmeans_plus_plus_finds_every_blob_cpu(random_state):
+    X, true_labels = make_blobs(n_samples=4000, centers=20, n_features=10,
+                                cluster_std=0.5, random_state=random_state)
+    model = KMeansH2O(n_gpus=0, n_clusters=20, init='k-means++',
+                      random_state=random_state).fit(X)
+
+    assert v_measure_score(true_labels, model.labels_) > 0.99
+
+
+def test_predict_transform_cpu():
+    X, _ = make_blobs(n_samples=1000, centers=4, n_features=3,
+                      random_state=7)
+    model = KMeansH2O(n_gpus=0, n_clusters=4, random_state=7).fit(X)
+
+    assert np.array_equal(model.predict(X), model.labels_)
+
+    distances = model.transform(X)
+    assert distances.shape == (1000, 4)
+    expected = ((X[:, None, :] - model.cluster_centers_[None, :, :]) ** 2
+               ).sum(axis=2)
+    assert np.allclose(distances, expected)
+    assert np.array_equal(np.argmin(distances, axis=1), model.labels_)
@@ -0,0 +1,67 @@
+# -*- encoding: utf-8 -*-
+"""
+KMeans mini-batch tests: partial_fit over chunks, iterators and memmaps.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+from h2o4gpu import KMeans
+from h2o4gpu.solvers.kmeans import KMeansH2O
+from h2o4gpu.datasets.samples_generator import make_blobs
+from h2o4gpu.metrics.cluster import v_measure_score
+
+
+def _blobs():
+    return make_blobs(n_samples=6000, centers=4, n_features=5,
+                      cluster_std=0.5, random_state=3)
+
+
+def test_partial_fit_array_chunks():
+    X, true_labels = _blobs()
+    model = KMeansH2O(n_clusters=4, random_state=3)
+    model.partial_fit(X, batch_size=1000)
+
+    assert model.cluster_centers_.shape == (4, 5)
+    assert model.counts_.sum() == X.shape[0]
+    assert v_measure_score(true_labels, model.predict(X)) > 0.95
+
+
+def test_partial_fit_iterator_matches_array():
+    X, _ = _blobs()
+    model_array = KMeansH2O(n_clusters=4, random_state=3)
+    model_array.partial_fit(X, batch_size=1500)
+
+    model_iter = KMeansH2O(n_clusters=4, random_state=3)
+    for start in range(0, X.shape[0], 1500):
+        model_iter.partial_fit(X[start:start + 1500])
+
+    assert np.allclose(model_array.cluster_centers_,
+                       model_iter.cluster_centers_)
+    assert np.array_equal(model_array.counts_, model_iter.counts_)
+
+
+def test_partial_fit_memmap(tmpdir):
+    X, true_labels = _blobs()
+    path = str(tmpdir.join("blobs.dat"))
+    X_mm = np.memmap(path, dtype=np.float32, mode='w+', shape=X.shape)
+    X_mm[:] = X
+    X_mm.flush()
+
+    model = KMeans(n_clusters=4, random_state=3)
+    model.partial_fit(np.memmap(path, dtype=np.float32, mode='r',
+                                shape=X.shape), batch_size=2000)
+
+    assert model.cluster_centers_.dtype == np.float32
+    assert v_measure_score(true_labels, model.predict(X_mm)) > 0.95
+
+
+def test_partial_fit_sklearn_backend():
+    X, true_labels = _blobs()
+    model = KMeans(n_clusters=4, random_state=3, backend='sklearn')
+    for start in range(0, X.shape[0], 1500):
+        model.partial_fit(X[start:start + 1500])
+
+    assert model.cluster_centers_.shape == (4, 5)
+    assert model.counts_.shape == (4,)
+    assert v_measure_score(true_labels, model.predict(X)) > 0.95
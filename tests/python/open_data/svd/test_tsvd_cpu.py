@@ -0,0 +1,110 @@
+# -*- encoding: utf-8 -*-
+"""
+The CPU backend fits dense and CSR data, sparse data without densifying it.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+import scipy.sparse
+from h2o4gpu.solvers import TruncatedSVDH2O
+from h2o4gpu.solvers.pca import PCAH2O
+from h2o4gpu import PCA, TruncatedSVD
+
+
+def make_data(m=1000, n=40, dtype=np.float64):
+    """Sparse data of about rank 8 with decaying singular values."""
+    np.random.seed(1234)
+    left = np.random.randn(m, 8) * (np.random.rand(m, 8) < 0.25)
+    right = np.random.randn(8, n) * (np.random.rand(8, n) < 0.25)
+    X = (left * 0.7 ** np.arange(8)).dot(right)
+    return (X + 0.01 * np.random.randn(m, n) * (X != 0)).astype(dtype)
+
+
+@pytest.mark.parametrize("algorithm", ["cusolver", "power", "randomized"])
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_tsvd_cpu_dense_and_sparse(algorithm, dtype):
+    X = make_data(dtype=dtype)
+    s = np.linalg.svd(X.astype(np.float64), compute_uv=False)[:4]
+
+    dense = TruncatedSVDH2O(n_components=4, algorithm=algorithm,
+                            random_state=42, n_gpus=0)
+    X_dense = dense.fit_transform(X)
+    sparse = TruncatedSVDH2O(n_components=4, algorithm=algorithm,
+                             random_state=42, n_gpus=0)
+    X_sparse = sparse.fit_transform(scipy.sparse.csr_matrix(X))
+
+    # power stops at a relative change of tol=1e-5 in the eigenvalue
+    rtol = 1e-3 if dtype == np.float32 or algorithm == "power" else 1e-5
+    assert X_sparse.dtype == dtype
+    assert np.allclose(dense.singular_values_, s, rtol=rtol)
+    assert np.allclose(sparse.singular_values_, s, rtol=rtol)
+    assert np.allclose(X_sparse, X_dense, atol=rtol * np.abs(X_dense).max())
+    assert np.allclose(X.dot(sparse.components_.T), X_sparse,
+                       atol=rtol * np.abs(X_sparse).max())
+
+
+def test_tsvd_randomized_matches_exact():
+    X = make_data(m=3000, n=200)
+    exact = TruncatedSVDH2O(n_components=5, algorithm="cusolver",
+                            n_gpus=0).fit(X)
+    randomized = TruncatedSVDH2O(n_components=5, algorithm="randomized",
+                                 n_oversamples=10, n_power_iter=4,
+                                 random_state=0, n_gpus=0).fit(X)
+
+    assert np.allclose(randomized.singular_values_, exact.singular_values_,
+                       rtol=1e-6)
+    assert np.allclose(np.abs(randomized.components_.dot(
+        exact.components_.T)), np.eye(5), atol=1e-4)
+
+
+@pytest.mark.parametrize("algorithm", ["cusolver", "randomized"])
+def test_pca_sparse_is_centered_implicitly(algorithm):
+    X = make_data()
+    dense = PCAH2O(n_components=3, algorithm=algorithm, n_gpus=0,
+                   random_state=42)
+    X_dense = dense.fit_transform(X)
+    sparse = PCAH2O(n_components=3, algorithm=algorithm, n_gpus=0,
+                    random_state=42)
+    X_sparse = sparse.fit_transform(scipy.sparse.csr_matrix(X))
+
+    assert np.allclose(sparse.mean_, X.mean(axis=0))
+    assert np.allclose(X_sparse, X_dense, atol=1e-8 * np.abs(X_dense).max())
+    assert np.allclose(sparse.explained_variance_ratio_,
+                       dense.explained_variance_ratio_)
+    s = np.linalg.svd(X - X.mean(axis=0), compute_uv=False)[:3]
+    assert np.allclose(sparse.singular_values_, s, rtol=1e-6)
+
+
+def test_tsvd_cusolver_wide_sparse():
+    # X^T X would be 50000 x 50000, the CPU "cusolver" never forms it
+    np.random.seed(1234)
+    m, n, nnz = 400, 50000, 20000
+    X = scipy.sparse.csr_matrix(
+        (np.random.rand(nnz), (np.random.randint(0, m, nnz),
+                               np.random.randint(0, n, nnz))), shape=(m, n))
+    tsvd = TruncatedSVDH2O(n_components=3, algorithm="cusolver",
+                           random_state=0, n_gpus=0).fit(X)
+    s = np.linalg.svd(X.toarray(), compute_uv=False)[:3]
+    assert np.allclose(tsvd.singular_values_, s, rtol=1e-6)
+
+
+def test_wrappers_forward_randomized_options():
+    tsvd = TruncatedSVD(n_components=3, algorithm="randomized",
+                        backend="h2o4gpu", n_gpus=0, random_state=7,
+                        n_oversamples=5, n_power_iter=2)
+    pca = PCA(n_components=3, svd_solver="randomized", iterated_power=2,
+              backend="h2o4gpu", n_gpus=0, random_state=7, n_oversamples=5)
+    for model in [tsvd.model, pca.model]:
+        assert model.algorithm == "randomized"
+        assert model.random_state == 7
+        assert model.n_oversamples == 5
+        assert model.n_power_iter == 2
+
+    X = make_data()
+    X_pca = pca.fit_transform(X)
+    X_h2o = PCAH2O(n_components=3, algorithm="randomized", n_gpus=0,
+                   random_state=7, n_oversamples=5,
+                   n_power_iter=2).fit_transform(X)
+    assert np.allclose(X_pca, X_h2o)
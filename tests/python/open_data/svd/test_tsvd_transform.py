@@ -0,0 +1,62 @@
+# -*- encoding: utf-8 -*-
+"""
+transform projects new data onto the fitted components without refitting.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+import scipy.sparse
+from h2o4gpu.solvers import TruncatedSVDH2O
+from h2o4gpu.solvers.pca import PCAH2O
+
+
+def make_data(m=2000, n=20, dtype=np.float64):
+    np.random.seed(1234)
+    return (np.random.rand(m, n) * np.arange(1, n + 1)).astype(dtype)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_tsvd_transform_projects_onto_components(dtype):
+    X = make_data(dtype=dtype)
+    tsvd = TruncatedSVDH2O(n_components=4, algorithm="cusolver",
+                           random_state=42)
+    X_fit = tsvd.fit_transform(X[:1000])
+    components = tsvd.components_.copy()
+
+    rtol = 1e-3 if dtype == np.float32 else 1e-8
+    assert np.allclose(tsvd.transform(X[:1000]), X_fit, rtol=rtol,
+                       atol=rtol * np.abs(X_fit).max())
+    X_new = tsvd.transform(X[1000:])
+    assert X_new.dtype == dtype
+    assert np.allclose(X_new, X[1000:].dot(components.T), rtol=rtol,
+                       atol=rtol * np.abs(X_new).max())
+    # not refitted
+    assert np.array_equal(tsvd.components_, components)
+
+
+def test_pca_transform_centers_with_mean():
+    X = make_data()
+    pca = PCAH2O(n_components=3).fit(X[:1000])
+
+    X_new = pca.transform(X[1000:])
+    expected = (X[1000:] - pca.mean_).dot(pca.components_.T)
+    assert np.allclose(X_new, expected, atol=1e-8 * np.abs(expected).max())
+
+
+def test_transform_in_blocks(tmpdir):
+    X = make_data()
+    tsvd = TruncatedSVDH2O(n_components=4, algorithm="cusolver",
+                           random_state=42).fit(X)
+    expected = tsvd.transform(X)
+
+    path = str(tmpdir.join('X.dat'))
+    memmap = np.memmap(path, dtype=X.dtype, mode='w+', shape=X.shape)
+    memmap[:] = X
+    assert np.allclose(tsvd.transform(memmap, batch_size=300), expected)
+    assert np.allclose(tsvd.transform(iter([X[:700], X[700:]]),
+                                      batch_size=500), expected)
+    assert np.allclose(
+        tsvd.transform(scipy.sparse.csr_matrix(X), batch_size=128), expected)
+    assert tsvd.transform(X[:0]).shape == (0, 4)
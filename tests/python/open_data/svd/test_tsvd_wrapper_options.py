@@ -69,10 +69,10 @@ def func(m=5000, n=10, k=9, algorithm="cusolver", convert_to_float32=False):
     print(sklearn_tsvd2.explained_variance_ratio_)
     print(sklearn_tsvd2.get_params())
 
-    print("Sklearn run through h2o4gpu wrapper using n_gpus=0")
+    print("Sklearn run through h2o4gpu wrapper using backend='sklearn'")
     #FAILS to agree, seems cusolver solution is diverging or (unlikely) bug in randomized in same way.
     #h2o4gpu_tsvd_sklearn_wrapper2 = TruncatedSVD(n_components=k, algorithm=[algorithm, 'randomized'], random_state=42, verbose=True, n_gpus=0, n_iter=[1000,400], tol=[1E-7, 1E-7])
-    h2o4gpu_tsvd_sklearn_wrapper2 = TruncatedSVD(n_components=k, algorithm=[algorithm, 'randomized'], random_state=42, verbose=True, n_gpus=0, n_iter=[1000,5], tol=[1E-7, 1E-4])
+    h2o4gpu_tsvd_sklearn_wrapper2 = TruncatedSVD(n_components=k, algorithm=[algorithm, 'randomized'], random_state=42, verbose=True, backend='sklearn', n_gpus=0, n_iter=[1000,5], tol=[1E-7, 1E-4])
     h2o4gpu_tsvd_sklearn_wrapper2.fit(X)
     print("h2o4gpu tsvd Singular Values")
     print(h2o4gpu_tsvd_sklearn_wrapper2.singular_values_)
@@ -0,0 +1,96 @@
+# -*- encoding: utf-8 -*-
+"""
+Ranking metrics: tied ranks, (weighted) AUC, PR-AUC and gini, plus a timing
+comparison against the previous pure Python AUC.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import os
+import time
+import numpy as np
+import pytest
+import h2o4gpu.util.metrics as daicx
+
+
+def python_auc(actual, posterior):
+    """Mann-Whitney AUC from pure Python loops, as shipped before."""
+    sorted_x = sorted(zip(posterior, range(len(posterior))))
+    r = [0.0] * len(posterior)
+    i = 0
+    while i < len(sorted_x):
+        j = i
+        while j < len(sorted_x) and sorted_x[j][0] == sorted_x[i][0]:
+            j += 1
+        for k in range(i, j):
+            r[sorted_x[k][1]] = (i + 1 + j) / 2.0
+        i = j
+    num_positive = len([0 for x in actual if x == 1])
+    num_negative = len(actual) - num_positive
+    sum_positive = sum([r[i] for i in range(len(r)) if actual[i] == 1])
+    return ((sum_positive - num_positive * (num_positive + 1) / 2.0) /
+            (num_negative * num_positive))
+
+
+def test_tied_rank():
+    rank = daicx.tied_rank([0.3, 0.1, 0.3, 0.3, 0.5, 0.1])
+    assert np.array_equal(rank, [4.0, 1.5, 4.0, 4.0, 6.0, 1.5])
+    assert np.array_equal(daicx.tied_rank([1, 2, 2]), [1.0, 2.5, 2.5])
+
+
+def test_auc_matches_rank_sum():
+    np.random.seed(1234)
+    actual = (np.random.rand(1000) > 0.7).astype(np.float64)
+    posterior = np.round(np.random.rand(1000), 2)
+    assert np.isclose(daicx.auc(actual, posterior),
+                      python_auc(actual, posterior))
+    assert np.isclose(daicx.gini(actual, posterior),
+                      2 * python_auc(actual, posterior) - 1)
+
+
+def test_weighted_metrics_match_repeated_rows():
+    np.random.seed(1234)
+    actual = (np.random.rand(500) > 0.5).astype(np.float64)
+    posterior = np.round(np.random.rand(500), 1)
+    weight = np.random.randint(1, 4, 500)
+    actual_rep = np.repeat(actual, weight)
+    posterior_rep = np.repeat(posterior, weight)
+    assert np.isclose(daicx.auc(actual, posterior, weight),
+                      daicx.auc(actual_rep, posterior_rep))
+    assert np.isclose(daicx.pr_auc(actual, posterior, weight),
+                      daicx.pr_auc(actual_rep, posterior_rep))
+
+
+def test_pr_auc():
+    actual = np.array([1, 0, 1, 1, 0])
+    posterior = np.array([0.9, 0.8, 0.7, 0.6, 0.1])
+    assert np.isclose(daicx.pr_auc(actual, posterior),
+                      (1.0 + 2.0 / 3.0 + 3.0 / 4.0) / 3.0)
+
+
+def test_single_class_raises():
+    posterior = np.array([0.9, 0.8, 0.7])
+    with pytest.raises(ValueError, match='Only one class'):
+        daicx.auc(np.ones(3), posterior)
+    with pytest.raises(ValueError, match='Only one class'):
+        daicx.gini(np.zeros(3), posterior)
+    with pytest.raises(ValueError, match='No positive class'):
+        daicx.pr_auc(np.zeros(3), posterior)
+
+
+def test_auc_float32_faster_than_python():
+    m = 2000000 if os.getenv("CHECKPERFORMANCE") is not None else 100000
+    np.random.seed(1234)
+    actual = (np.random.rand(m) > 0.5).astype(np.float32)
+    posterior = np.random.rand(m).astype(np.float32)
+
+    start_time = time.time()
+    score = daicx.auc(actual, posterior)
+    end_time = time.time() - start_time
+
+    start_py = time.time()
+    score_py = python_auc(actual, posterior)
+    end_py = time.time() - start_py
+
+    assert np.isclose(score, score_py)
+    assert end_time < end_py
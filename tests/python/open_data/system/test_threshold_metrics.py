@@ -0,0 +1,43 @@
+# -*- encoding: utf-8 -*-
+"""
+Single pass threshold sweep returning several optimal metrics at once.
+
+:copyright: 2017-2018 H2O.ai, Inc.
+:license:   Apache License Version 2.0 (see LICENSE for details)
+"""
+import numpy as np
+import pytest
+import h2o4gpu.util.metrics as daicx
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("weighted", [False, True])
+def test_threshold_metrics_match_single_metrics(dtype, weighted):
+    np.random.seed(1234)
+    actual = (np.random.rand(10000) > 0.7).astype(np.float64)
+    predicted = np.round(np.random.rand(10000), 3)
+    weight = np.random.randint(1, 4, 10000).astype(np.float64) \
+        if weighted else None
+
+    res = daicx.threshold_metrics(
+        actual.astype(dtype), predicted.astype(dtype),
+        None if weight is None else weight.astype(dtype))
+
+    for metric, opt in [('mcc', daicx.mcc_opt), ('f05', daicx.f05_opt),
+                        ('f1', daicx.f1_opt), ('f2', daicx.f2_opt),
+                        ('acc', daicx.acc_opt)]:
+        score, threshold = res[metric]
+        assert np.isclose(score, opt(actual, predicted, weight))
+        positive = predicted.astype(dtype) >= threshold
+        assert 0 < np.sum(positive) <= actual.shape[0]
+
+
+def test_threshold_metrics_subset_and_threshold():
+    actual = np.array([0, 0, 1, 1], dtype=np.float64)
+    predicted = np.array([0.1, 0.4, 0.35, 0.8])
+    res = daicx.threshold_metrics(actual, predicted, metrics=['f1', 'acc'])
+    assert sorted(res.keys()) == ['acc', 'f1']
+    assert res['f1'] == (0.8, 0.35)
+    assert res['acc'] == (0.75, 0.35)
+    with pytest.raises(ValueError):
+        daicx.threshold_metrics(actual, predicted, metrics=['auc'])